@@ -0,0 +1,89 @@
+"""add duplicate signature index
+
+Revision ID: 125a8fd453be
+Revises: 241cfa625db2
+Create Date: 2026-10-17 09:12:37.218943
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "125a8fd453be"
+down_revision: Union[str, None] = "241cfa625db2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "duplicatesignature",
+        sa.Column("sdoc_id", sa.Integer(), nullable=False),
+        sa.Column("project_id", sa.Integer(), nullable=False),
+        sa.Column("num_words", sa.Integer(), nullable=False),
+        sa.Column("signature", sa.LargeBinary(), nullable=False),
+        sa.Column("checked_max_different_words", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["project_id"], ["project.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["sdoc_id"], ["sourcedocument.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("sdoc_id"),
+    )
+    op.create_index(
+        op.f("ix_duplicatesignature_project_id"),
+        "duplicatesignature",
+        ["project_id"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_duplicatesignature_sdoc_id"),
+        "duplicatesignature",
+        ["sdoc_id"],
+        unique=False,
+    )
+    op.create_table(
+        "duplicatepair",
+        sa.Column("sdoc_id", sa.Integer(), nullable=False),
+        sa.Column("duplicate_sdoc_id", sa.Integer(), nullable=False),
+        sa.Column("project_id", sa.Integer(), nullable=False),
+        sa.Column("distance", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["duplicate_sdoc_id"], ["sourcedocument.id"], ondelete="CASCADE"
+        ),
+        sa.ForeignKeyConstraint(["project_id"], ["project.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["sdoc_id"], ["sourcedocument.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("sdoc_id", "duplicate_sdoc_id"),
+    )
+    op.create_index(
+        op.f("ix_duplicatepair_duplicate_sdoc_id"),
+        "duplicatepair",
+        ["duplicate_sdoc_id"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_duplicatepair_project_id"),
+        "duplicatepair",
+        ["project_id"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_duplicatepair_sdoc_id"), "duplicatepair", ["sdoc_id"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_duplicatepair_sdoc_id"), table_name="duplicatepair")
+    op.drop_index(op.f("ix_duplicatepair_project_id"), table_name="duplicatepair")
+    op.drop_index(
+        op.f("ix_duplicatepair_duplicate_sdoc_id"), table_name="duplicatepair"
+    )
+    op.drop_table("duplicatepair")
+    op.drop_index(
+        op.f("ix_duplicatesignature_sdoc_id"), table_name="duplicatesignature"
+    )
+    op.drop_index(
+        op.f("ix_duplicatesignature_project_id"), table_name="duplicatesignature"
+    )
+    op.drop_table("duplicatesignature")
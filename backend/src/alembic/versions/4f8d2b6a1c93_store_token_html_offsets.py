@@ -0,0 +1,131 @@
+"""store token html offsets instead of the token markup
+
+Revision ID: 4f8d2b6a1c93
+Revises: 9c2e6f1d4b7a
+Create Date: 2026-10-17 23:41:27.310954
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from loguru import logger
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+from app.util.token_markup import render_token_markup, strip_token_markup
+
+# revision identifiers, used by Alembic.
+revision: str = "4f8d2b6a1c93"
+down_revision: Union[str, None] = "9c2e6f1d4b7a"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 500
+
+
+def _iterate_batches(conn, query: str):
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.text(query), {"last_id": last_id, "limit": BATCH_SIZE}
+        ).fetchall()
+        if len(rows) == 0:
+            break
+        yield rows
+        last_id = rows[-1].id
+
+
+def upgrade() -> None:
+    op.add_column(
+        "sourcedocumentdata",
+        sa.Column("token_html_starts", postgresql.ARRAY(sa.Integer()), nullable=True),
+    )
+    op.add_column(
+        "sourcedocumentdata",
+        sa.Column("token_html_ends", postgresql.ARRAY(sa.Integer()), nullable=True),
+    )
+
+    # strip the markup from the stored html, documents whose markup cannot be
+    # rendered identically from the offsets keep it (and are served as before)
+    conn = op.get_bind()
+    num_converted = 0
+    num_kept = 0
+    for rows in _iterate_batches(
+        conn,
+        "SELECT id, html, token_starts, token_ends, sentence_starts, sentence_ends "
+        "FROM sourcedocumentdata WHERE id > :last_id ORDER BY id LIMIT :limit",
+    ):
+        updates = []
+        for row in rows:
+            stripped = strip_token_markup(row.html)
+            if stripped is not None:
+                html, token_html_starts, token_html_ends = stripped
+                if (
+                    len(token_html_starts) == len(row.token_starts)
+                    and render_token_markup(
+                        html=html,
+                        token_starts=row.token_starts,
+                        token_ends=row.token_ends,
+                        token_html_starts=token_html_starts,
+                        token_html_ends=token_html_ends,
+                        sentence_starts=row.sentence_starts,
+                        sentence_ends=row.sentence_ends,
+                    )
+                    == row.html
+                ):
+                    updates.append(
+                        {
+                            "id": row.id,
+                            "html": html,
+                            "starts": token_html_starts,
+                            "ends": token_html_ends,
+                        }
+                    )
+                    continue
+            num_kept += 1
+        if len(updates) > 0:
+            conn.execute(
+                sa.text(
+                    "UPDATE sourcedocumentdata SET html = :html, "
+                    "token_html_starts = :starts, token_html_ends = :ends "
+                    "WHERE id = :id"
+                ),
+                updates,
+            )
+        num_converted += len(updates)
+    logger.info(
+        f"Stripped the token markup of {num_converted} documents, kept {num_kept}"
+    )
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    for rows in _iterate_batches(
+        conn,
+        "SELECT id, html, token_starts, token_ends, token_html_starts, "
+        "token_html_ends, sentence_starts, sentence_ends FROM sourcedocumentdata "
+        "WHERE id > :last_id AND token_html_starts IS NOT NULL "
+        "ORDER BY id LIMIT :limit",
+    ):
+        conn.execute(
+            sa.text("UPDATE sourcedocumentdata SET html = :html WHERE id = :id"),
+            [
+                {
+                    "id": row.id,
+                    "html": render_token_markup(
+                        html=row.html,
+                        token_starts=row.token_starts,
+                        token_ends=row.token_ends,
+                        token_html_starts=row.token_html_starts,
+                        token_html_ends=row.token_html_ends,
+                        sentence_starts=row.sentence_starts,
+                        sentence_ends=row.sentence_ends,
+                    ),
+                }
+                for row in rows
+            ],
+        )
+
+    op.drop_column("sourcedocumentdata", "token_html_ends")
+    op.drop_column("sourcedocumentdata", "token_html_starts")
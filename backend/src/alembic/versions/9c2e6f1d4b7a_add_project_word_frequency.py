@@ -0,0 +1,63 @@
+"""add project word frequency
+
+Revision ID: 9c2e6f1d4b7a
+Revises: 125a8fd453be
+Create Date: 2026-10-17 23:05:12.481376
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9c2e6f1d4b7a"
+down_revision: Union[str, None] = "125a8fd453be"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "projectwordfrequency",
+        sa.Column("project_id", sa.Integer(), nullable=False),
+        sa.Column("word", sa.String(), nullable=False),
+        sa.Column("count", sa.BigInteger(), nullable=False),
+        sa.Column("sdoc_count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["project_id"], ["project.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("project_id", "word"),
+    )
+    op.create_table(
+        "projectwordfrequencystats",
+        sa.Column("project_id", sa.Integer(), nullable=False),
+        sa.Column("word_count", sa.BigInteger(), nullable=False),
+        sa.Column("sdoc_count", sa.Integer(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["project_id"], ["project.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("project_id"),
+    )
+
+    # aggregate the existing word frequencies
+    op.execute(
+        """
+        INSERT INTO projectwordfrequency (project_id, word, count, sdoc_count)
+        SELECT sd.project_id, wf.word, SUM(wf.count), COUNT(wf.sdoc_id)
+        FROM wordfrequency wf JOIN sourcedocument sd ON wf.sdoc_id = sd.id
+        GROUP BY sd.project_id, wf.word
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO projectwordfrequencystats (project_id, word_count, sdoc_count, version)
+        SELECT sd.project_id, SUM(wf.count), COUNT(DISTINCT wf.sdoc_id), 0
+        FROM wordfrequency wf JOIN sourcedocument sd ON wf.sdoc_id = sd.id
+        GROUP BY sd.project_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("projectwordfrequencystats")
+    op.drop_table("projectwordfrequency")
@@ -58,6 +58,7 @@ def search_sdocs(
     highlight: bool,
     page_number: Optional[int] = None,
     page_size: Optional[int] = None,
+    cursor: Optional[str] = None,
     authz_user: AuthzUser = Depends(),
 ) -> PaginatedElasticSearchDocumentHits:
     authz_user.assert_in_project(project_id)
@@ -70,6 +71,7 @@ def search_sdocs(
         sorts=sorts,
         page_number=page_number,
         page_size=page_size,
+        cursor=cursor,
     )
 
 
@@ -1,6 +1,7 @@
-from typing import Dict, List
+import hashlib
+from typing import Dict, List, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request, Response
 from loguru import logger
 from sqlalchemy.orm import Session
 
@@ -28,7 +29,11 @@ from app.core.data.dto.source_document import (
     SourceDocumentRead,
     SourceDocumentUpdate,
 )
-from app.core.data.dto.source_document_data import SourceDocumentDataRead
+from app.core.data.dto.source_document_data import (
+    SourceDocumentDataRange,
+    SourceDocumentDataRangeUnit,
+    SourceDocumentDataRead,
+)
 from app.core.data.dto.source_document_metadata import (
     SourceDocumentMetadataRead,
 )
@@ -64,6 +69,25 @@ def get_by_id(
     return SourceDocumentRead.model_validate(crud_sdoc.read(db=db, id=sdoc_id))
 
 
+def _etag(*parts) -> str:
+    return '"' + hashlib.sha1(":".join(map(str, parts)).encode()).hexdigest() + '"'
+
+
+def _conditional_response(
+    request: Request, response: Response, etag: str
+) -> Optional[Response]:
+    # the browser revalidates the cached data with the ETag on every request
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None and (
+        if_none_match.strip() == "*"
+        or etag in [tag.strip() for tag in if_none_match.split(",")]
+    ):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
 @router.get(
     "/data/{sdoc_id}",
     response_model=SourceDocumentDataRead,
@@ -71,20 +95,66 @@ def get_by_id(
 )
 def get_by_id_with_data(
     *,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db_session),
     sdoc_id: int,
     only_if_finished: bool = True,
+    with_markup: bool = False,
     authz_user: AuthzUser = Depends(),
-) -> SourceDocumentDataRead:
+) -> SourceDocumentDataRead | Response:
     authz_user.assert_in_same_project_as(Crud.SOURCE_DOCUMENT, sdoc_id)
 
     if not only_if_finished:
         crud_sdoc.get_status(db=db, sdoc_id=sdoc_id, raise_error_on_unfinished=True)
 
-    sdoc_data = crud_sdoc.read_data(db=db, id=sdoc_id)
+    # the data is written once, every change of the sdoc updates its timestamp
+    updated = crud_sdoc.read_updated(db=db, id=sdoc_id)
+    not_modified = _conditional_response(
+        request, response, _etag(sdoc_id, updated.isoformat(), with_markup)
+    )
+    if not_modified is not None:
+        return not_modified
+
+    sdoc_data = crud_sdoc.read_data(db=db, id=sdoc_id, with_markup=with_markup)
     return SourceDocumentDataRead.model_validate(sdoc_data)
 
 
+@router.get(
+    "/data/{sdoc_id}/range",
+    response_model=SourceDocumentDataRange,
+    summary=(
+        "Returns the tokens or sentences start to end (exclusive) of the "
+        "SourceDocumentData with the given ID if it exists"
+    ),
+)
+def get_data_range_by_id(
+    *,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db_session),
+    sdoc_id: int,
+    unit: SourceDocumentDataRangeUnit = SourceDocumentDataRangeUnit.SENTENCE,
+    start: int = Query(ge=0),
+    end: int = Query(ge=0),
+    authz_user: AuthzUser = Depends(),
+) -> SourceDocumentDataRange | Response:
+    authz_user.assert_in_same_project_as(Crud.SOURCE_DOCUMENT, sdoc_id)
+
+    updated = crud_sdoc.read_updated(db=db, id=sdoc_id)
+    not_modified = _conditional_response(
+        request,
+        response,
+        _etag(sdoc_id, updated.isoformat(), unit.value, start, end),
+    )
+    if not_modified is not None:
+        return not_modified
+
+    return crud_sdoc.read_data_range(
+        db=db, id=sdoc_id, unit=unit, start=start, end=max(start, end)
+    )
+
+
 @router.delete(
     "/{sdoc_id}",
     response_model=SourceDocumentRead,
@@ -311,7 +381,7 @@ def get_sentence_annotator(
     authz_user.assert_in_same_project_as(Crud.SOURCE_DOCUMENT, sdoc_id)
 
     # read sentences
-    sdoc_data = crud_sdoc.read_data(db=db, id=sdoc_id)
+    sdoc_data = crud_sdoc.read_data(db=db, id=sdoc_id, with_markup=False)
     if sdoc_data is None:
         raise ValueError("SourceDocument is not a text document")
 
@@ -1,9 +1,11 @@
+import math
+import uuid
 from pathlib import Path
 from typing import Any, List
 
-from celery import Task, group
-from celery.result import GroupResult
+from celery import Signature, Task, chord, group
 
+from app.celery.celery_worker import MAX_PRIORITY
 from app.core.data.crawler.crawler_service import CrawlerService
 from app.core.data.dto.crawler_job import CrawlerJobParameters, CrawlerJobRead
 from app.core.data.dto.export_job import ExportJobParameters, ExportJobRead
@@ -12,7 +14,10 @@ from app.core.data.dto.llm_job import LLMJobParameters2, LLMJobRead
 from app.core.data.export.export_service import ExportService
 from app.core.data.import_.import_service import ImportService
 from app.core.data.llm.llm_service import LLMService
+from app.core.db.elasticsearch_service import ElasticSearchService
+from app.core.db.redis_service import RedisService
 from app.preprocessing.pipeline.model.pipeline_cargo import PipelineCargo
+from config import conf
 
 
 def start_cota_refinement_job_async(
@@ -112,21 +117,79 @@ def prepare_and_start_llm_job_async(
     return llm_job
 
 
+def _preprocessing_priority(proj_id: int, num_docs: int) -> int:
+    """
+    Returns the priority of preprocessing tasks of the project, which decreases with
+    the number of queued documents of the project (including the num_docs new ones):
+    less than 10 documents get priority 9, less than 100 priority 7, and so on. Thus,
+    a small upload is preprocessed before the remaining documents of a large import.
+    """
+    cs = conf.celery.scheduling
+    if str(cs.fair_priorities).lower() != "true":
+        return MAX_PRIORITY
+    backlog = RedisService().add_preprocessing_backlog(
+        proj_id=proj_id, num_docs=num_docs, ttl=int(cs.backlog_ttl)
+    )
+    return max(1, MAX_PRIORITY - 2 * int(math.log10(max(backlog, 1))))
+
+
+def apply_preprocessing_tasks_async(
+    tasks: List[Signature], proj_id: int, num_docs: int, num_text_docs: int
+) -> Any:
+    """
+    Executes the preprocessing tasks of num_docs documents as a group, with a priority
+    depending on the number of queued documents of the project. Large imports index
+    the documents in ElasticSearch with bulk indexing settings, which are restored
+    once all tasks finished (or failed). Ending the bulk indexing of the import is
+    idempotent, so it may run as the chord body and as its error callback.
+    """
+    from app.celery.background_jobs.tasks import end_bulk_indexing_task
+
+    assert isinstance(end_bulk_indexing_task, Task), "Not a Celery Task"
+
+    priority = _preprocessing_priority(proj_id=proj_id, num_docs=num_docs)
+    for task in tasks:
+        task.set(priority=priority)
+
+    if num_text_docs < int(conf.elasticsearch.bulk.large_import_size):
+        return group(tasks).apply_async()
+
+    job_id = str(uuid.uuid4())
+    ElasticSearchService().begin_bulk_indexing(proj_id=proj_id, job_id=job_id)
+    end_bulk_indexing = end_bulk_indexing_task.si(proj_id=proj_id, job_id=job_id)
+    end_bulk_indexing.on_error(
+        end_bulk_indexing_task.si(proj_id=proj_id, job_id=job_id)
+    )
+    return chord(tasks)(end_bulk_indexing)
+
+
 def execute_text_preprocessing_pipeline_apply_async(
     cargos: List[PipelineCargo],
-) -> GroupResult:
+) -> Any:
     from app.celery.background_jobs.tasks import (
-        execute_text_preprocessing_pipeline_task,
+        execute_text_preprocessing_pipeline_batch_task,
     )
 
     assert isinstance(
-        execute_text_preprocessing_pipeline_task, Task
+        execute_text_preprocessing_pipeline_batch_task, Task
     ), "Not a Celery Task"
 
+    # short text documents are dominated by the per-document overhead,
+    # so multiple documents are preprocessed together in one task
+    batch_size = int(conf.celery.preprocessing.text_batch_size)
     tasks = []
-    for cargo in cargos:
-        tasks.append(execute_text_preprocessing_pipeline_task.s(cargo=cargo))
-    return group(tasks).apply_async()
+    for start in range(0, len(cargos), batch_size):
+        tasks.append(
+            execute_text_preprocessing_pipeline_batch_task.s(
+                cargos=cargos[start : start + batch_size]
+            )
+        )
+    return apply_preprocessing_tasks_async(
+        tasks,
+        proj_id=cargos[0].ppj_payload.project_id,
+        num_docs=len(cargos),
+        num_text_docs=len(cargos),
+    )
 
 
 def execute_image_preprocessing_pipeline_apply_async(
@@ -140,8 +203,12 @@ def execute_image_preprocessing_pipeline_apply_async(
         execute_image_preprocessing_pipeline_task, Task
     ), "Not a Celery Task"
 
-    for cargo in cargos:
-        execute_image_preprocessing_pipeline_task.apply_async(kwargs={"cargo": cargo})
+    apply_preprocessing_tasks_async(
+        [execute_image_preprocessing_pipeline_task.s(cargo=cargo) for cargo in cargos],
+        proj_id=cargos[0].ppj_payload.project_id,
+        num_docs=len(cargos),
+        num_text_docs=0,
+    )
 
 
 def execute_audio_preprocessing_pipeline_apply_async(
@@ -155,8 +222,12 @@ def execute_audio_preprocessing_pipeline_apply_async(
         execute_audio_preprocessing_pipeline_task, Task
     ), "Not a Celery Task"
 
-    for cargo in cargos:
-        execute_audio_preprocessing_pipeline_task.apply_async(kwargs={"cargo": cargo})
+    apply_preprocessing_tasks_async(
+        [execute_audio_preprocessing_pipeline_task.s(cargo=cargo) for cargo in cargos],
+        proj_id=cargos[0].ppj_payload.project_id,
+        num_docs=len(cargos),
+        num_text_docs=0,
+    )
 
 
 def execute_video_preprocessing_pipeline_apply_async(
@@ -170,5 +241,17 @@ def execute_video_preprocessing_pipeline_apply_async(
         execute_video_preprocessing_pipeline_task, Task
     ), "Not a Celery Task"
 
-    for cargo in cargos:
-        execute_video_preprocessing_pipeline_task.apply_async(kwargs={"cargo": cargo})
+    apply_preprocessing_tasks_async(
+        [execute_video_preprocessing_pipeline_task.s(cargo=cargo) for cargo in cargos],
+        proj_id=cargos[0].ppj_payload.project_id,
+        num_docs=len(cargos),
+        num_text_docs=0,
+    )
+
+
+def flush_embedding_write_buffer_apply_async(countdown: float) -> None:
+    from app.celery.background_jobs.tasks import flush_embedding_write_buffer_task
+
+    assert isinstance(flush_embedding_write_buffer_task, Task), "Not a Celery Task"
+
+    flush_embedding_write_buffer_task.apply_async(countdown=countdown)
@@ -1,12 +1,17 @@
+from collections import Counter
 from pathlib import Path
+from typing import List
 
 from loguru import logger
 
 from app.core.data.repo.repo_service import RepoService
+from app.core.db.elasticsearch_service import ElasticSearchService
 from app.core.db.redis_service import RedisService
+from app.core.db.simsearch_service import SimSearchService
 from app.core.db.sql_service import SQLService
 from app.preprocessing.pipeline.model.pipeline_cargo import PipelineCargo
 from app.preprocessing.preprocessing_service import PreprocessingService
+from config import conf
 
 sql: SQLService = SQLService(echo=False)
 redis: RedisService = RedisService()
@@ -20,49 +25,109 @@ def import_uploaded_archive_(archive_file_path: Path, project_id: int) -> None:
     )
 
 
+def _flush_due_embeddings() -> None:
+    # the pipelines only push their embeddings to the write buffer, a failed flush
+    # leaves them pending for the scheduled flush
+    try:
+        SimSearchService().flush_write_buffer(force=False)
+    except Exception as e:
+        logger.warning(f"Cannot flush the embedding write buffer: {e}")
+
+
 def execute_text_preprocessing_pipeline_(
-    cargo: PipelineCargo, is_init: bool = True
+    cargo: PipelineCargo,
+    is_init: bool = True,
+    retry_transient_errors: bool = False,
 ) -> None:
     pipeline = prepro.get_text_pipeline(is_init)
     logger.debug(
         f"Executing text Preprocessing Pipeline\n\t{pipeline}\n\t for cargo"
         f" {cargo.ppj_payload.filename}!"
     )
-    pipeline.execute(cargo=cargo)
+    try:
+        pipeline.execute(cargo=cargo, retry_transient_errors=retry_transient_errors)
+    finally:
+        _flush_due_embeddings()
+
+
+def execute_text_preprocessing_pipeline_batch_(
+    cargos: List[PipelineCargo],
+    is_init: bool = True,
+    retry_transient_errors: bool = False,
+) -> None:
+    pipeline = prepro.get_text_pipeline(is_init)
+    logger.debug(
+        f"Executing text Preprocessing Pipeline\n\t{pipeline}\n\t for"
+        f" {len(cargos)} cargos!"
+    )
+    try:
+        pipeline.execute_batch(
+            cargos=cargos, retry_transient_errors=retry_transient_errors
+        )
+    finally:
+        _flush_due_embeddings()
 
 
 def execute_image_preprocessing_pipeline_(
-    cargo: PipelineCargo, is_init: bool = True
+    cargo: PipelineCargo,
+    is_init: bool = True,
+    retry_transient_errors: bool = False,
 ) -> None:
     pipeline = prepro.get_image_pipeline(is_init=is_init)
     logger.debug(
         f"Executing image Preprocessing Pipeline\n\t{pipeline}\n\t for cargo"
         f" {cargo.ppj_payload.filename}!"
     )
-    pipeline.execute(cargo=cargo)
+    try:
+        pipeline.execute(cargo=cargo, retry_transient_errors=retry_transient_errors)
+    finally:
+        _flush_due_embeddings()
 
 
 def execute_audio_preprocessing_pipeline_(
     cargo: PipelineCargo,
     is_init: bool = True,
+    retry_transient_errors: bool = False,
 ) -> None:
     pipeline = prepro.get_audio_pipeline(is_init=is_init)
     logger.debug(
         f"Executing audio Preprocessing Pipeline\n\t{pipeline}\n\t for cargo"
         f" {cargo.ppj_payload.filename}!"
     )
-    pipeline.execute(
-        cargo=cargo,
-    )
+    try:
+        pipeline.execute(cargo=cargo, retry_transient_errors=retry_transient_errors)
+    finally:
+        _flush_due_embeddings()
 
 
 def execute_video_preprocessing_pipeline_(
     cargo: PipelineCargo,
     is_init: bool = True,
+    retry_transient_errors: bool = False,
 ) -> None:
     pipeline = prepro.get_video_pipeline(is_init=is_init)
     logger.debug(
         f"Executing audio Preprocessing Pipeline\n\t{pipeline}\n\t for cargo"
         f" {cargo.ppj_payload.filename}!"
     )
-    pipeline.execute(cargo=cargo)
+    try:
+        pipeline.execute(cargo=cargo, retry_transient_errors=retry_transient_errors)
+    finally:
+        _flush_due_embeddings()
+
+
+def flush_embedding_write_buffer_() -> None:
+    num_flushed = SimSearchService().flush_write_buffer(force=True)
+    logger.debug(f"Flushed the embeddings of {num_flushed} SDocs from the write buffer")
+
+
+def end_bulk_indexing_(proj_id: int, job_id: str) -> None:
+    ElasticSearchService().end_bulk_indexing(proj_id=proj_id, job_id=job_id)
+
+
+def release_preprocessing_backlog_(cargos: List[PipelineCargo]) -> None:
+    if str(conf.celery.scheduling.fair_priorities).lower() != "true":
+        return
+    num_docs = Counter(cargo.ppj_payload.project_id for cargo in cargos)
+    for proj_id, num in num_docs.items():
+        redis.remove_preprocessing_backlog(proj_id=proj_id, num_docs=num)
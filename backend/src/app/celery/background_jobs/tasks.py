@@ -1,5 +1,8 @@
 from pathlib import Path
-from typing import Tuple
+from typing import Any, Dict, List, Optional, Tuple
+
+from celery import Task, states
+from celery.signals import task_postrun
 
 from app.celery.background_jobs.cota import start_cota_refinement_job_
 from app.celery.background_jobs.crawl import start_crawler_job_
@@ -7,11 +10,15 @@ from app.celery.background_jobs.export import start_export_job_
 from app.celery.background_jobs.import_ import start_import_job_
 from app.celery.background_jobs.llm import start_llm_job_
 from app.celery.background_jobs.preprocess import (
+    end_bulk_indexing_,
     execute_audio_preprocessing_pipeline_,
     execute_image_preprocessing_pipeline_,
     execute_text_preprocessing_pipeline_,
+    execute_text_preprocessing_pipeline_batch_,
     execute_video_preprocessing_pipeline_,
+    flush_embedding_write_buffer_,
     import_uploaded_archive_,
+    release_preprocessing_backlog_,
 )
 from app.celery.background_jobs.trainer import (
     start_trainer_job_,
@@ -23,6 +30,10 @@ from app.core.data.dto.import_job import ImportJobRead
 from app.core.data.dto.llm_job import LLMJobRead
 from app.preprocessing.pipeline.model.pipeline_cargo import PipelineCargo
 
+# the preprocessing pipelines raise transient errors (e.g. of an unavailable database)
+# while the task can be retried, the retries resume from the last checkpoint
+PREPROCESSING_MAX_RETRIES = 5
+
 
 @celery_worker.task(
     acks_late=True,
@@ -64,49 +75,105 @@ def start_llm_job(llm_job: LLMJobRead) -> None:
 
 
 @celery_worker.task(
+    bind=True,
     acks_late=True,
     autoretry_for=(Exception,),
-    retry_kwargs={"max_retries": 5, "countdown": 5},
+    retry_kwargs={"max_retries": PREPROCESSING_MAX_RETRIES, "countdown": 5},
 )
 def execute_text_preprocessing_pipeline_task(
-    cargo: PipelineCargo, is_init: bool = True
+    self: Task, cargo: PipelineCargo, is_init: bool = True
 ) -> None:
-    execute_text_preprocessing_pipeline_(cargo=cargo, is_init=is_init)
+    execute_text_preprocessing_pipeline_(
+        cargo=cargo,
+        is_init=is_init,
+        retry_transient_errors=self.request.retries < PREPROCESSING_MAX_RETRIES,
+    )
 
 
 @celery_worker.task(
+    bind=True,
     acks_late=True,
     autoretry_for=(Exception,),
-    retry_kwargs={"max_retries": 5, "countdown": 5},
+    retry_kwargs={"max_retries": PREPROCESSING_MAX_RETRIES, "countdown": 5},
+)
+def execute_text_preprocessing_pipeline_batch_task(
+    self: Task, cargos: List[PipelineCargo], is_init: bool = True
+) -> None:
+    execute_text_preprocessing_pipeline_batch_(
+        cargos=cargos,
+        is_init=is_init,
+        retry_transient_errors=self.request.retries < PREPROCESSING_MAX_RETRIES,
+    )
+
+
+@celery_worker.task(
+    bind=True,
+    acks_late=True,
+    autoretry_for=(Exception,),
+    retry_kwargs={"max_retries": PREPROCESSING_MAX_RETRIES, "countdown": 5},
 )
 def execute_image_preprocessing_pipeline_task(
-    cargo: PipelineCargo, is_init: bool = True
+    self: Task, cargo: PipelineCargo, is_init: bool = True
 ) -> None:
-    execute_image_preprocessing_pipeline_(cargo=cargo, is_init=is_init)
+    execute_image_preprocessing_pipeline_(
+        cargo=cargo,
+        is_init=is_init,
+        retry_transient_errors=self.request.retries < PREPROCESSING_MAX_RETRIES,
+    )
 
 
 @celery_worker.task(
+    bind=True,
     acks_late=True,
     autoretry_for=(Exception,),
-    retry_kwargs={"max_retries": 5, "countdown": 5},
+    retry_kwargs={"max_retries": PREPROCESSING_MAX_RETRIES, "countdown": 5},
 )
 def execute_audio_preprocessing_pipeline_task(
+    self: Task,
     cargo: PipelineCargo,
     is_init: bool = True,
 ) -> None:
-    execute_audio_preprocessing_pipeline_(cargo=cargo, is_init=is_init)
+    execute_audio_preprocessing_pipeline_(
+        cargo=cargo,
+        is_init=is_init,
+        retry_transient_errors=self.request.retries < PREPROCESSING_MAX_RETRIES,
+    )
 
 
 @celery_worker.task(
+    bind=True,
     acks_late=True,
     autoretry_for=(Exception,),
-    retry_kwargs={"max_retries": 5, "countdown": 5},
+    retry_kwargs={"max_retries": PREPROCESSING_MAX_RETRIES, "countdown": 5},
 )
 def execute_video_preprocessing_pipeline_task(
+    self: Task,
     cargo: PipelineCargo,
     is_init: bool = True,
 ) -> None:
-    execute_video_preprocessing_pipeline_(cargo=cargo, is_init=is_init)
+    execute_video_preprocessing_pipeline_(
+        cargo=cargo,
+        is_init=is_init,
+        retry_transient_errors=self.request.retries < PREPROCESSING_MAX_RETRIES,
+    )
+
+
+@celery_worker.task(
+    acks_late=True,
+    autoretry_for=(Exception,),
+    retry_kwargs={"max_retries": 5, "countdown": 5},
+)
+def end_bulk_indexing_task(proj_id: int, job_id: str) -> None:
+    end_bulk_indexing_(proj_id=proj_id, job_id=job_id)
+
+
+@celery_worker.task(
+    acks_late=True,
+    autoretry_for=(Exception,),
+    retry_kwargs={"max_retries": 5, "countdown": 5},
+)
+def flush_embedding_write_buffer_task() -> None:
+    flush_embedding_write_buffer_()
 
 
 @celery_worker.task(
@@ -118,3 +185,28 @@ def import_uploaded_archive(archive_file_path_and_project_id: Tuple[Path, int])
     # we need a tuple to chain the task since chaining only allows for one return object
     archive_file_path, project_id = archive_file_path_and_project_id
     import_uploaded_archive_(archive_file_path=archive_file_path, project_id=project_id)
+
+
+@task_postrun.connect
+def release_preprocessing_backlog(
+    sender: Optional[Task] = None,
+    args: Optional[Tuple] = None,
+    kwargs: Optional[Dict[str, Any]] = None,
+    state: Optional[str] = None,
+    **_,
+) -> None:
+    # the documents of finished (or finally failed) preprocessing tasks are no longer
+    # queued, see apply_preprocessing_tasks_async
+    if (
+        sender is None
+        or not sender.name.startswith(f"{__name__}.execute_")
+        or state == states.RETRY
+    ):
+        return
+    kwargs = kwargs or {}
+    cargos = kwargs.get("cargos", kwargs.get("cargo", args[0] if args else None))
+    if cargos is None:
+        return
+    if isinstance(cargos, PipelineCargo):
+        cargos = [cargos]
+    release_preprocessing_backlog_(cargos=cargos)
@@ -2,11 +2,24 @@ import inspect
 from typing import Dict
 
 from celery import Celery
+from kombu import Queue
 
 from config import conf
 
 cc = conf.celery
 
+# priorities of the tasks in the (RabbitMQ) priority queues, higher is more urgent
+MAX_PRIORITY = 9
+DEFAULT_PRIORITY = 5
+
+# one queue per workload class, so that e.g. the preprocessing tasks of a large import
+# do not delay the exports, COTA refinements or LLM jobs of other users
+INTERACTIVE_QUEUES = ["interactiveQ"]
+BULK_QUEUES = ["bulkQ"]
+PREPROCESSING_QUEUES = ["textPreproQ", "imagePreproQ", "audioPreproQ", "videoPreproQ"]
+# the former queue of all background jobs, consumed until it is drained
+LEGACY_QUEUES = ["bgJobsQ", "celery"]
+
 
 class CeleryConfig:
     # Flo: we cannot use standard (json) serialization because we need to serialize full python objects via pickle
@@ -18,9 +31,35 @@ class CeleryConfig:
     task_track_started = True
 
     # https://docs.celeryq.dev/en/stable/userguide/routing.html
+    task_queues = [
+        Queue(name, routing_key=name, queue_arguments={"x-max-priority": MAX_PRIORITY})
+        for name in INTERACTIVE_QUEUES + BULK_QUEUES + PREPROCESSING_QUEUES
+    ] + [Queue(name, routing_key=name) for name in LEGACY_QUEUES]
+    task_default_queue = "interactiveQ"
+    task_default_priority = DEFAULT_PRIORITY
+    # the patterns are matched in order
     task_routes = {
-        "app.celery.background_jobs.tasks.*": {"queue": "bgJobsQ"},
+        "app.celery.background_jobs.tasks.execute_text_preprocessing_pipeline_*": {
+            "queue": "textPreproQ"
+        },
+        "app.celery.background_jobs.tasks.execute_image_preprocessing_pipeline_*": {
+            "queue": "imagePreproQ"
+        },
+        "app.celery.background_jobs.tasks.execute_audio_preprocessing_pipeline_*": {
+            "queue": "audioPreproQ"
+        },
+        "app.celery.background_jobs.tasks.execute_video_preprocessing_pipeline_*": {
+            "queue": "videoPreproQ"
+        },
+        "app.celery.background_jobs.tasks.start_import_job": {"queue": "bulkQ"},
+        "app.celery.background_jobs.tasks.start_crawler_job": {"queue": "bulkQ"},
+        "app.celery.background_jobs.tasks.import_uploaded_archive": {"queue": "bulkQ"},
+        "app.celery.background_jobs.tasks.start_trainer_job_task": {"queue": "bulkQ"},
+        "app.celery.background_jobs.tasks.*": {"queue": "interactiveQ"},
     }
+    # workers reserve one task per thread at a time, so that the priorities apply to
+    # all other queued tasks and no worker hoards tasks that idle workers could run
+    worker_prefetch_multiplier = 1
 
     def to_dict(self) -> Dict[str, str]:
         d: Dict[str, str] = {}
@@ -0,0 +1,249 @@
+from abc import ABC, abstractmethod
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+from app.core.analysis.duplicate_finder.document_vectors import DocumentVectors
+from app.core.analysis.duplicate_finder.minhash import (
+    MinHasher,
+    hash_words,
+    lsh_band_keys,
+)
+from app.core.analysis.duplicate_finder.union_find import UnionFind
+
+
+class CandidateGenerator(ABC):
+    """
+    Generates candidate pairs (row indices into the DocumentVectors) that might have an
+    L1 distance of at most max_different_words. Every candidate is verified exactly
+    afterwards, so generators may produce false positives but should avoid false negatives.
+    Pairs are generated lazily: if a UnionFind of the verified duplicates is given, pairs
+    of documents that are already in the same group are skipped.
+    """
+
+    @abstractmethod
+    def generate(
+        self,
+        docs: DocumentVectors,
+        max_different_words: int,
+        uf: Optional[UnionFind] = None,
+    ) -> Iterator[Tuple[int, int]]:
+        pass
+
+
+def _partner_mask(
+    a: int, others: np.ndarray, query_mask: Optional[np.ndarray]
+) -> np.ndarray:
+    # pairs of two query documents are seen from both sides, only emit them once
+    if query_mask is None:
+        return others > a
+    return (others != a) & (~query_mask[others] | (others > a))
+
+
+def _emit_pairs(a: int, partners: np.ndarray) -> Iterator[Tuple[int, int]]:
+    for b in partners.tolist():
+        yield min(a, b), max(a, b)
+
+
+def length_window_pairs(
+    lengths: np.ndarray,
+    max_different_words: int,
+    max_length: float,
+    query_mask: Optional[np.ndarray] = None,
+    uf: Optional[UnionFind] = None,
+) -> Iterator[Tuple[int, int]]:
+    """
+    |a - b|_1 >= ||a|_1 - |b|_1|, so only documents with similar lengths can be duplicates.
+    Every query document shorter than max_length is paired with all documents whose length
+    differs by at most max_different_words. All documents are queries if query_mask is None.
+    """
+    order = np.argsort(lengths, kind="stable")
+    sorted_lengths = lengths[order]
+    window_starts = np.searchsorted(
+        sorted_lengths, sorted_lengths - max_different_words, side="left"
+    )
+    window_ends = np.searchsorted(
+        sorted_lengths, sorted_lengths + max_different_words, side="right"
+    )
+    for pos in range(len(order)):
+        a = int(order[pos])
+        if query_mask is not None and not query_mask[a]:
+            continue
+        start, end = window_starts[pos], window_ends[pos]
+        if end - start < 2:
+            continue
+        others = order[start:end]
+        keep = _partner_mask(a, others, query_mask)
+        # pairs of two long documents are left to other generators
+        if sorted_lengths[pos] >= max_length:
+            keep &= sorted_lengths[start:end] < max_length
+        if uf is not None:
+            keep &= uf.find_many(others) != uf.find(a)
+        yield from _emit_pairs(a, others[keep])
+
+
+def lsh_band_pairs(
+    band_keys: np.ndarray,
+    lengths: np.ndarray,
+    max_different_words: int,
+    short_length: float,
+    query_mask: Optional[np.ndarray] = None,
+    uf: Optional[UnionFind] = None,
+) -> Iterator[Tuple[int, int]]:
+    """
+    Pairs every query document with all documents that share the bucket of at least one
+    band. Pairs with a short document or too different lengths are skipped. Buckets are
+    looked up via binary search on the sorted keys of one band at a time, so memory stays
+    linear in the number of documents. All documents are queries if query_mask is None.
+
+    Large buckets are typically clusters of near-identical documents. Given a UnionFind,
+    a bucket is skipped as soon as all of its documents are in the same group, so such a
+    cluster costs about one pair per document instead of one per two documents.
+    """
+    query_idxs = (
+        np.arange(len(lengths)) if query_mask is None else np.nonzero(query_mask)[0]
+    )
+    query_idxs = query_idxs[lengths[query_idxs] >= short_length]
+    for band in range(band_keys.shape[1]):
+        order = np.argsort(band_keys[:, band], kind="stable")
+        sorted_keys = band_keys[order, band]
+        query_keys = band_keys[query_idxs, band]
+        bucket_starts = np.searchsorted(sorted_keys, query_keys, side="left")
+        bucket_ends = np.searchsorted(sorted_keys, query_keys, side="right")
+
+        # visit the queries bucket by bucket
+        by_bucket = np.argsort(bucket_starts, kind="stable")
+        connected_bucket = -1
+        for a, start, end in zip(
+            query_idxs[by_bucket].tolist(),
+            bucket_starts[by_bucket].tolist(),
+            bucket_ends[by_bucket].tolist(),
+        ):
+            if end - start < 2 or start == connected_bucket:
+                continue
+            members = order[start:end]
+            members = members[lengths[members] >= short_length]
+            keep = _partner_mask(a, members, query_mask)
+            keep &= np.abs(lengths[members] - lengths[a]) <= max_different_words
+            if uf is not None:
+                roots = uf.find_many(members)
+                root = uf.find(a)
+                if np.all(roots == root):
+                    connected_bucket = start
+                    continue
+                keep &= roots != root
+            # only emit a pair in the first band both documents collide in
+            if band > 0:
+                keep &= ~np.any(
+                    band_keys[members, :band] == band_keys[a, :band], axis=1
+                )
+            yield from _emit_pairs(a, members[keep])
+
+
+class ExactCandidateGenerator(CandidateGenerator):
+    """
+    Pairs all documents whose lengths differ by at most max_different_words.
+    Finds all duplicates but is quadratic for documents of similar length.
+    """
+
+    def generate(
+        self,
+        docs: DocumentVectors,
+        max_different_words: int,
+        uf: Optional[UnionFind] = None,
+    ) -> Iterator[Tuple[int, int]]:
+        yield from length_window_pairs(
+            docs.lengths,
+            max_different_words=max_different_words,
+            max_length=np.inf,
+            uf=uf,
+        )
+
+
+class MinHashLSHCandidateGenerator(CandidateGenerator):
+    """
+    Locality sensitive hashing of MinHash signatures: two documents become a candidate
+    pair if all signature values of at least one band are equal.
+
+    For two documents with |a - b|_1 <= k, whose shorter one has n words, the multiset
+    Jaccard similarity is at least (n - k) / n. This is too low for short documents, so
+    documents with fewer than short_document_factor * k words are paired exactly by length.
+    """
+
+    def __init__(
+        self,
+        num_perm: int = 128,
+        bands: int = 32,
+        short_document_factor: float = 3.0,
+    ):
+        self.minhasher = MinHasher(num_perm=num_perm)
+        self.bands = bands
+        self.short_document_factor = short_document_factor
+
+    def compute_signatures(self, docs: DocumentVectors) -> np.ndarray:
+        word_hashes = hash_words(docs.vocab)
+        signatures = np.empty((len(docs), self.minhasher.num_perm), dtype=np.uint32)
+        for idx in range(len(docs)):
+            word_ids, counts = docs.row(idx)
+            signatures[idx] = self.minhasher.signature(word_hashes[word_ids], counts)
+        return signatures
+
+    def generate(
+        self,
+        docs: DocumentVectors,
+        max_different_words: int,
+        uf: Optional[UnionFind] = None,
+    ) -> Iterator[Tuple[int, int]]:
+        yield from self.generate_from_signatures(
+            signatures=self.compute_signatures(docs),
+            lengths=docs.lengths,
+            max_different_words=max_different_words,
+            uf=uf,
+        )
+
+    def generate_from_signatures(
+        self,
+        signatures: np.ndarray,
+        lengths: np.ndarray,
+        max_different_words: int,
+        query_mask: Optional[np.ndarray] = None,
+        uf: Optional[UnionFind] = None,
+    ) -> Iterator[Tuple[int, int]]:
+        short_length = self.short_document_factor * max_different_words
+        yield from length_window_pairs(
+            lengths,
+            max_different_words=max_different_words,
+            max_length=short_length,
+            query_mask=query_mask,
+            uf=uf,
+        )
+        yield from lsh_band_pairs(
+            band_keys=lsh_band_keys(signatures, bands=self.bands),
+            lengths=lengths,
+            max_different_words=max_different_words,
+            short_length=short_length,
+            query_mask=query_mask,
+            uf=uf,
+        )
+
+
+def create_candidate_generator(
+    engine: str,
+    num_perm: int = 128,
+    bands: int = 32,
+    short_document_factor: float = 3.0,
+) -> CandidateGenerator:
+    match engine:
+        case "exact":
+            return ExactCandidateGenerator()
+        case "minhash_lsh":
+            return MinHashLSHCandidateGenerator(
+                num_perm=num_perm,
+                bands=bands,
+                short_document_factor=short_document_factor,
+            )
+        case _:
+            msg = f"Unknown duplicate finder engine: {engine}"
+            logger.error(msg)
+            raise ValueError(msg)
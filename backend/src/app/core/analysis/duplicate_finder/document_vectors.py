@@ -0,0 +1,88 @@
+from array import array
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+from scipy import sparse
+
+
+class DocumentVectors:
+    """
+    Compact bag-of-words vectors (CSR layout) of all documents of a project.
+    Rows are documents, columns are (lowercased) words, values are word counts.
+    Memory grows linearly with the number of non-zero word frequencies.
+    """
+
+    def __init__(
+        self,
+        sdoc_ids: np.ndarray,
+        vectors: sparse.csr_matrix,
+        vocab: List[str],
+    ):
+        self.sdoc_ids = sdoc_ids
+        self.vectors = vectors
+        self.vocab = vocab
+        # total number of words per document, i.e. the L1 norm of each row
+        self.lengths: np.ndarray = np.asarray(vectors.sum(axis=1)).ravel()
+
+    @classmethod
+    def from_word_frequency_stream(
+        cls, rows: Iterable[Tuple[int, str, int]]
+    ) -> "DocumentVectors":
+        """
+        Builds the vectors from (sdoc_id, word, count) rows that are ordered by sdoc_id.
+        """
+        word2idx: Dict[str, int] = dict()
+        sdoc_ids = array("q")
+        row_indices = array("l")
+        col_indices = array("l")
+        values = array("l")
+
+        for sdoc_id, word, count in rows:
+            if len(sdoc_ids) == 0 or sdoc_ids[-1] != sdoc_id:
+                sdoc_ids.append(sdoc_id)
+            word = word.lower()
+            word_idx = word2idx.get(word)
+            if word_idx is None:
+                word_idx = len(word2idx)
+                word2idx[word] = word_idx
+            row_indices.append(len(sdoc_ids) - 1)
+            col_indices.append(word_idx)
+            values.append(count)
+
+        # duplicate (row, col) entries (e.g. "The" and "the") are summed up
+        vectors = sparse.csr_matrix(
+            (
+                np.frombuffer(values, dtype=values.typecode),
+                (
+                    np.frombuffer(row_indices, dtype=row_indices.typecode),
+                    np.frombuffer(col_indices, dtype=col_indices.typecode),
+                ),
+            ),
+            shape=(len(sdoc_ids), len(word2idx)),
+            dtype=np.int64,
+        )
+        vectors.sum_duplicates()
+        vectors.sort_indices()
+
+        return cls(
+            sdoc_ids=np.frombuffer(sdoc_ids, dtype=np.int64).copy(),
+            vectors=vectors,
+            vocab=list(word2idx.keys()),
+        )
+
+    def row(self, idx: int) -> Tuple[np.ndarray, np.ndarray]:
+        start, end = self.vectors.indptr[idx], self.vectors.indptr[idx + 1]
+        return self.vectors.indices[start:end], self.vectors.data[start:end]
+
+    def l1_distance(self, a: int, b: int) -> int:
+        # |a - b|_1 = |a|_1 + |b|_1 - 2 * sum(min(a, b)) for non-negative vectors
+        a_indices, a_values = self.row(a)
+        b_indices, b_values = self.row(b)
+        _, a_common, b_common = np.intersect1d(
+            a_indices, b_indices, assume_unique=True, return_indices=True
+        )
+        overlap = np.minimum(a_values[a_common], b_values[b_common]).sum()
+        return int(self.lengths[a] + self.lengths[b] - 2 * overlap)
+
+    def __len__(self) -> int:
+        return len(self.sdoc_ids)
@@ -0,0 +1,20 @@
+from pydantic import BaseModel, Field
+
+
+class DuplicateFinderStats(BaseModel):
+    num_documents: int = Field(description="Number of compared documents.", default=0)
+    new_documents: int = Field(
+        description="Number of documents that have not been compared before.",
+        default=0,
+    )
+    vocab_size: int = Field(description="Number of distinct words.", default=0)
+    candidate_pairs: int = Field(
+        description="Number of pairs proposed by the candidate generator.", default=0
+    )
+    verified_pairs: int = Field(
+        description="Number of candidate pairs whose exact L1 distance was computed.",
+        default=0,
+    )
+    duplicate_pairs: int = Field(
+        description="Number of verified pairs that are duplicates.", default=0
+    )
@@ -0,0 +1,86 @@
+import zlib
+from typing import Iterable
+
+import numpy as np
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_GOLDEN_RATIO = np.uint32(0x9E3779B1)
+_SEED = 42
+# number of tokens hashed at once, bounds the (num_perm x chunk) intermediate matrix
+_CHUNK_SIZE = 8192
+
+
+def _fmix32(h: np.ndarray) -> np.ndarray:
+    # finalizer of MurmurHash3, spreads the bits of the input hashes
+    h = h.astype(np.uint32)
+    h ^= h >> np.uint32(16)
+    h *= np.uint32(0x85EBCA6B)
+    h ^= h >> np.uint32(13)
+    h *= np.uint32(0xC2B2AE35)
+    h ^= h >> np.uint32(16)
+    return h
+
+
+def hash_words(words: Iterable[str]) -> np.ndarray:
+    # crc32 is stable across processes (unlike the builtin hash), so signatures
+    # computed by different workers can be compared with each other
+    return np.fromiter(
+        (zlib.crc32(w.lower().encode("utf-8")) for w in words), dtype=np.uint32
+    )
+
+
+class MinHasher:
+    """
+    MinHash over the multiset of words of a document. The n-th occurrence of a word is
+    treated as its own element, so the Jaccard similarity estimated by the signatures is
+    sum(min(a, b)) / sum(max(a, b)) of the word count vectors a and b, which is directly
+    related to their L1 distance: sum(max) - sum(min) = |a - b|_1.
+    """
+
+    def __init__(self, num_perm: int = 128, seed: int = _SEED):
+        self.num_perm = num_perm
+        rng = np.random.RandomState(seed)
+        # a < 2^31 and x < 2^32 guarantee that a * x + b does not overflow uint64
+        self._a = rng.randint(1, 1 << 31, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 31, size=num_perm, dtype=np.uint64)
+
+    def signature(self, word_hashes: np.ndarray, counts: np.ndarray) -> np.ndarray:
+        signature = np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        counts = counts.astype(np.int64)
+        total = int(counts.sum())
+        if total == 0:
+            return signature.astype(np.uint32)
+
+        token_hashes = np.repeat(word_hashes.astype(np.uint32), counts)
+        # occurrence number of each token within its word: 0, 1, ..., count - 1
+        offsets = np.repeat(np.cumsum(counts) - counts, counts)
+        occurrences = (np.arange(total, dtype=np.int64) - offsets).astype(np.uint32)
+        token_hashes = _fmix32(token_hashes + occurrences * _GOLDEN_RATIO)
+
+        for start in range(0, total, _CHUNK_SIZE):
+            chunk = token_hashes[start : start + _CHUNK_SIZE].astype(np.uint64)
+            permuted = (
+                np.outer(self._a, chunk) + self._b[:, None]
+            ) % _MERSENNE_PRIME & _MAX_HASH
+            np.minimum(signature, permuted.min(axis=1), out=signature)
+
+        return signature.astype(np.uint32)
+
+
+def lsh_band_keys(signatures: np.ndarray, bands: int) -> np.ndarray:
+    """
+    Splits the (n x num_perm) signature matrix into bands and hashes every band of every
+    document to a single 64 bit bucket key. Returns a (n x bands) matrix of keys.
+    """
+    n, num_perm = signatures.shape
+    if num_perm % bands != 0:
+        raise ValueError(
+            f"The number of permutations ({num_perm}) must be divisible by the number of bands ({bands})!"
+        )
+    rows = num_perm // bands
+    banded = signatures.reshape(n, bands, rows).astype(np.uint64)
+    keys = np.zeros((n, bands), dtype=np.uint64)
+    for r in range(rows):
+        keys = keys * np.uint64(0x100000001B3) ^ banded[:, :, r]
+    return keys
@@ -0,0 +1,205 @@
+from collections import Counter
+from functools import lru_cache
+from itertools import islice
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+from loguru import logger
+from sqlalchemy.orm import Session
+
+from app.core.analysis.duplicate_finder.candidate_generator import (
+    MinHashLSHCandidateGenerator,
+)
+from app.core.analysis.duplicate_finder.document_vectors import DocumentVectors
+from app.core.analysis.duplicate_finder.duplicate_finder_stats import (
+    DuplicateFinderStats,
+)
+from app.core.analysis.duplicate_finder.minhash import MinHasher, hash_words
+from app.core.analysis.duplicate_finder.union_find import UnionFind
+from app.core.data.crud.duplicate_pair import crud_duplicate_pair
+from app.core.data.crud.duplicate_signature import crud_duplicate_signature
+from app.core.data.crud.word_frequency import crud_word_frequency
+from app.core.data.doc_type import DocType
+from app.core.data.dto.duplicate_pair import DuplicatePairCreate
+from app.core.data.dto.duplicate_signature import DuplicateSignatureCreate
+from config import conf
+
+
+@lru_cache(maxsize=1)
+def get_minhasher() -> MinHasher:
+    return MinHasher(num_perm=conf.duplicate_finder.minhash.num_perm)
+
+
+def compute_duplicate_signature(
+    sdoc_id: int, project_id: int, word_freqs: Dict[str, int]
+) -> DuplicateSignatureCreate:
+    # words are compared case-insensitively, like in the DocumentVectors
+    lowercased = Counter()
+    for word, count in word_freqs.items():
+        lowercased[word.lower()] += count
+
+    counts = np.fromiter(lowercased.values(), dtype=np.int64, count=len(lowercased))
+    signature = get_minhasher().signature(hash_words(lowercased.keys()), counts)
+    return DuplicateSignatureCreate(
+        sdoc_id=sdoc_id,
+        project_id=project_id,
+        num_words=int(counts.sum()),
+        signature=signature.tobytes(),
+    )
+
+
+def _signatures_from_word_frequency_stream(
+    project_id: int, rows: Iterable[Tuple[int, str, int]]
+) -> List[DuplicateSignatureCreate]:
+    sdoc_id2word_freqs: Dict[int, Dict[str, int]] = dict()
+    for sdoc_id, word, count in rows:
+        sdoc_id2word_freqs.setdefault(sdoc_id, dict())[word] = count
+    return [
+        compute_duplicate_signature(
+            sdoc_id=sdoc_id, project_id=project_id, word_freqs=word_freqs
+        )
+        for sdoc_id, word_freqs in sdoc_id2word_freqs.items()
+    ]
+
+
+def _compute_and_store_signatures(
+    db: Session, project_id: int, sdoc_ids: List[int], batch_size: int = 1000
+) -> None:
+    for start in range(0, len(sdoc_ids), batch_size):
+        batch = sdoc_ids[start : start + batch_size]
+        create_dtos = _signatures_from_word_frequency_stream(
+            project_id=project_id,
+            rows=crud_word_frequency.stream_by_sdoc_ids(db=db, sdoc_ids=batch),
+        )
+        crud_duplicate_signature.upsert_multi(db=db, create_dtos=create_dtos)
+
+
+def _verify_candidates(
+    db: Session,
+    project_id: int,
+    sdoc_ids: np.ndarray,
+    candidates: List[Tuple[int, int]],
+    max_different_words: int,
+    uf: UnionFind,
+    stats: DuplicateFinderStats,
+) -> None:
+    stats.candidate_pairs += len(candidates)
+    # only the word frequencies of documents in candidate pairs are needed
+    candidate_idxs = sorted({idx for pair in candidates for idx in pair})
+    docs = DocumentVectors.from_word_frequency_stream(
+        crud_word_frequency.stream_by_sdoc_ids(
+            db=db, sdoc_ids=[int(sdoc_ids[idx]) for idx in candidate_idxs]
+        )
+    )
+    stats.vocab_size = max(stats.vocab_size, len(docs.vocab))
+    sdoc_id2row = {int(sdoc_id): row for row, sdoc_id in enumerate(docs.sdoc_ids)}
+
+    pair_create_dtos = []
+    for a, b in candidates:
+        # pairs within a group are verified, too: all pairs of the threshold are
+        # persisted, so that smaller thresholds are served by the persisted pairs
+        stats.verified_pairs += 1
+        distance = docs.l1_distance(
+            sdoc_id2row[int(sdoc_ids[a])], sdoc_id2row[int(sdoc_ids[b])]
+        )
+        if distance <= max_different_words:
+            stats.duplicate_pairs += 1
+            uf.union(a, b)
+            pair_create_dtos.append(
+                DuplicatePairCreate(
+                    sdoc_id=int(sdoc_ids[a]),
+                    duplicate_sdoc_id=int(sdoc_ids[b]),
+                    project_id=project_id,
+                    distance=distance,
+                )
+            )
+    crud_duplicate_pair.upsert_multi(db=db, create_dtos=pair_create_dtos)
+
+
+def find_duplicates_with_signature_index(
+    db: Session,
+    project_id: int,
+    max_different_words: int,
+    candidate_generator: MinHashLSHCandidateGenerator,
+    stats: DuplicateFinderStats,
+    chunk_size: int = 10000,
+) -> List[List[int]]:
+    """
+    Uses the persisted MinHash signatures and the previously verified duplicate pairs
+    of the project. Only documents that have not been compared with (at least)
+    max_different_words yet are compared with all other documents of the project, the
+    groups of all other documents follow from their persisted pairs.
+    """
+    doctype = DocType.text
+    # documents preprocessed before the signature index existed have no signatures yet
+    missing = crud_duplicate_signature.read_sdoc_ids_without_signature(
+        db=db, project_id=project_id, doctype=doctype
+    )
+    if len(missing) > 0:
+        logger.info(f"Computing {len(missing)} missing duplicate signatures")
+        _compute_and_store_signatures(db=db, project_id=project_id, sdoc_ids=missing)
+
+    rows = crud_duplicate_signature.read_by_project_and_doctype(
+        db=db, project_id=project_id, doctype=doctype
+    )
+    signature_size = candidate_generator.minhasher.num_perm * 4
+    # signatures computed with a different number of permutations cannot be compared
+    outdated = [row[0] for row in rows if len(row[2]) != signature_size]
+    if len(outdated) > 0:
+        logger.info(f"Recomputing {len(outdated)} outdated duplicate signatures")
+        _compute_and_store_signatures(db=db, project_id=project_id, sdoc_ids=outdated)
+        rows = crud_duplicate_signature.read_by_project_and_doctype(
+            db=db, project_id=project_id, doctype=doctype
+        )
+
+    stats.num_documents = len(rows)
+    sdoc_ids = np.array([row[0] for row in rows], dtype=np.int64)
+    lengths = np.array([row[1] for row in rows], dtype=np.int64)
+    # all duplicate pairs of a document within the threshold it was compared with are
+    # persisted, so a smaller threshold only filters them
+    query_mask = np.array(
+        [row[3] is None or row[3] < max_different_words for row in rows], dtype=bool
+    )
+    stats.new_documents = int(query_mask.sum())
+
+    # group all documents that are connected by persisted duplicate pairs
+    sdoc_id2idx = {int(sdoc_id): idx for idx, sdoc_id in enumerate(sdoc_ids)}
+    uf = UnionFind(len(sdoc_ids))
+    for sdoc_id, duplicate_sdoc_id in crud_duplicate_pair.read_by_project(
+        db=db, project_id=project_id, max_distance=max_different_words
+    ):
+        if sdoc_id in sdoc_id2idx and duplicate_sdoc_id in sdoc_id2idx:
+            uf.union(sdoc_id2idx[sdoc_id], sdoc_id2idx[duplicate_sdoc_id])
+
+    if stats.new_documents > 0:
+        signatures = np.frombuffer(
+            b"".join(row[2] for row in rows), dtype=np.uint32
+        ).reshape(len(rows), candidate_generator.minhasher.num_perm)
+        # the candidates are generated lazily. They must not skip the groups found
+        # so far, all pairs of the new documents are persisted
+        candidates = candidate_generator.generate_from_signatures(
+            signatures=signatures,
+            lengths=lengths,
+            max_different_words=max_different_words,
+            query_mask=query_mask,
+        )
+        while True:
+            chunk = list(islice(candidates, chunk_size))
+            if len(chunk) == 0:
+                break
+            _verify_candidates(
+                db=db,
+                project_id=project_id,
+                sdoc_ids=sdoc_ids,
+                candidates=chunk,
+                max_different_words=max_different_words,
+                uf=uf,
+                stats=stats,
+            )
+        crud_duplicate_signature.update_checked_max_different_words(
+            db=db,
+            sdoc_ids=[int(sdoc_id) for sdoc_id in sdoc_ids[query_mask]],
+            max_different_words=max_different_words,
+        )
+
+    return [[int(sdoc_ids[idx]) for idx in group] for group in uf.groups()]
@@ -0,0 +1,56 @@
+from typing import Dict, List
+
+import numpy as np
+
+
+class UnionFind:
+    """
+    Disjoint-set forest over the indices 0..n-1 with path halving and union by size.
+    Used to group duplicate documents into connected components without building a graph.
+    """
+
+    def __init__(self, n: int):
+        self._parent = np.arange(n, dtype=np.int64)
+        self._size = np.ones(n, dtype=np.int64)
+
+    def find(self, x: int) -> int:
+        parent = self._parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = int(parent[x])
+        return x
+
+    def find_many(self, xs: np.ndarray) -> np.ndarray:
+        # follows the parents of all xs at once until every one of them is a root
+        roots = self._parent[xs]
+        while True:
+            parents = self._parent[roots]
+            if np.array_equal(parents, roots):
+                return roots
+            roots = parents
+
+    def union(self, x: int, y: int) -> bool:
+        root_x = self.find(x)
+        root_y = self.find(y)
+        if root_x == root_y:
+            return False
+        if self._size[root_x] < self._size[root_y]:
+            root_x, root_y = root_y, root_x
+        self._parent[root_y] = root_x
+        self._size[root_x] += self._size[root_y]
+        return True
+
+    def connected(self, x: int, y: int) -> bool:
+        return self.find(x) == self.find(y)
+
+    def groups(self, min_size: int = 2) -> List[List[int]]:
+        root2members: Dict[int, List[int]] = dict()
+        for x in range(len(self._parent)):
+            root = self.find(x)
+            if self._size[root] < min_size:
+                continue
+            root2members.setdefault(root, []).append(x)
+        return list(root2members.values())
+
+    def __len__(self) -> int:
+        return len(self._parent)
@@ -1,24 +1,41 @@
 from typing import List, Optional
 
-from sqlalchemy import distinct, func
+import numpy as np
+from sqlalchemy import desc, distinct, func
 
 from app.core.analysis.word_frequency_analysis.word_frequency_columns import (
     WordFrequencyColumns,
 )
+from app.core.analysis.word_frequency_analysis.word_frequency_matrix import (
+    get_word_frequency_matrix,
+)
 from app.core.data.crud.project_metadata import crud_project_meta
+from app.core.data.crud.project_word_frequency import crud_project_word_frequency
 from app.core.data.doc_type import DocType
 from app.core.data.dto.analysis import WordFrequencyResult, WordFrequencyStat
 from app.core.data.dto.project_metadata import ProjectMetadataRead
 from app.core.data.export.export_service import ExportService
+from app.core.data.orm.project_word_frequency import ProjectWordFrequencyORM
 from app.core.data.orm.source_document import SourceDocumentORM
 from app.core.data.orm.word_frequency import WordFrequencyORM
 from app.core.db.sql_service import SQLService
 from app.core.search.column_info import (
     ColumnInfo,
 )
-from app.core.search.filtering import Filter
+from app.core.search.filtering import Filter, get_columns_affected_by_filter
+from app.core.search.pagination import apply_pagination
 from app.core.search.search_builder import SearchBuilder
-from app.core.search.sorting import Sort
+from app.core.search.sorting import Sort, SortDirection
+from config import conf
+
+# columns of the word statistics, all other columns are columns of the documents
+WORD_STAT_COLUMNS = {
+    WordFrequencyColumns.WORD,
+    WordFrequencyColumns.WORD_FREQUENCY,
+    WordFrequencyColumns.WORD_PERCENT,
+    WordFrequencyColumns.SOURCE_DOCUMENT_FREQUENCY,
+    WordFrequencyColumns.SOURCE_DOCUMENT_PERCENT,
+}
 
 
 def word_frequency_info(
@@ -47,6 +64,210 @@ def word_frequency(
     sorts: List[Sort[WordFrequencyColumns]],
     page: Optional[int] = None,
     page_size: Optional[int] = None,
+) -> WordFrequencyResult:
+    filter_columns = get_columns_affected_by_filter(filter)
+    sorts_by_word_stats = all(sort.column in WORD_STAT_COLUMNS for sort in sorts)
+    # unfiltered: read the precomputed project word frequencies
+    if len(filter_columns) == 0 and sorts_by_word_stats:
+        return _word_frequency_of_project(
+            project_id=project_id, sorts=sorts, page=page, page_size=page_size
+        )
+    # filtered by documents only: sum up the rows of the document-term matrix
+    if (
+        conf.word_frequency.matrix_cache
+        and len(filter_columns & WORD_STAT_COLUMNS) == 0
+        and sorts_by_word_stats
+    ):
+        return _word_frequency_of_sdocs(
+            project_id=project_id,
+            filter=filter,
+            sorts=sorts,
+            page=page,
+            page_size=page_size,
+        )
+    return _word_frequency_sql(
+        project_id=project_id,
+        filter=filter,
+        sorts=sorts,
+        page=page,
+        page_size=page_size,
+    )
+
+
+def _word_frequency_of_project(
+    project_id: int,
+    sorts: List[Sort[WordFrequencyColumns]],
+    page: Optional[int] = None,
+    page_size: Optional[int] = None,
+) -> WordFrequencyResult:
+    with SQLService().db_session() as db:
+        stats = crud_project_word_frequency.read_stats(db=db, project_id=project_id)
+        if stats is None or stats.word_count <= 0 or stats.sdoc_count <= 0:
+            return WordFrequencyResult(
+                total_results=0,
+                sdocs_total=0,
+                words_total=0,
+                word_frequencies=[],
+            )
+
+        word_count = ProjectWordFrequencyORM.count.label(
+            WordFrequencyColumns.WORD_FREQUENCY
+        )
+        sdoc_count = ProjectWordFrequencyORM.sdoc_count.label(
+            WordFrequencyColumns.SOURCE_DOCUMENT_FREQUENCY
+        )
+        query = db.query(
+            word_count,
+            ProjectWordFrequencyORM.word,
+            (ProjectWordFrequencyORM.count / stats.word_count).label(
+                WordFrequencyColumns.WORD_PERCENT
+            ),
+            sdoc_count,
+            (ProjectWordFrequencyORM.sdoc_count / stats.sdoc_count).label(
+                WordFrequencyColumns.SOURCE_DOCUMENT_PERCENT
+            ),
+        ).filter(ProjectWordFrequencyORM.project_id == project_id)
+
+        if len(sorts) > 0:
+            query = query.order_by(
+                *[
+                    sort.direction.apply(
+                        ProjectWordFrequencyORM.word  # type: ignore
+                        if sort.column == WordFrequencyColumns.WORD
+                        else sort.column.get_sort_column()  # type: ignore
+                    )
+                    for sort in sorts
+                ]
+            )
+        else:
+            query = query.order_by(desc(WordFrequencyColumns.WORD_FREQUENCY))
+
+        if page is not None and page_size is not None:
+            query, pagination = apply_pagination(
+                query=query, page_number=page + 1, page_size=page_size
+            )
+            total_results = pagination.total_results
+            result_rows = query.all()
+        else:
+            result_rows = query.all()
+            total_results = len(result_rows)
+
+        return WordFrequencyResult(
+            total_results=total_results,
+            sdocs_total=stats.sdoc_count,
+            words_total=stats.word_count,
+            word_frequencies=[
+                WordFrequencyStat(
+                    count=row[0],
+                    word=row[1],
+                    word_percent=row[2],
+                    sdocs=row[3],
+                    sdocs_percent=row[4],
+                )
+                for row in result_rows
+            ],
+        )
+
+
+def _word_frequency_of_sdocs(
+    project_id: int,
+    filter: Filter[WordFrequencyColumns],
+    sorts: List[Sort[WordFrequencyColumns]],
+    page: Optional[int] = None,
+    page_size: Optional[int] = None,
+) -> WordFrequencyResult:
+    with SQLService().db_session() as db:
+        stats = crud_project_word_frequency.read_stats(db=db, project_id=project_id)
+        if stats is None:
+            return WordFrequencyResult(
+                total_results=0,
+                sdocs_total=0,
+                words_total=0,
+                word_frequencies=[],
+            )
+        matrix = get_word_frequency_matrix(
+            db=db, project_id=project_id, version=stats.version
+        )
+
+        # all sdocs matching the filter
+        builder = SearchBuilder(db=db, filter=filter, sorts=[])
+        subquery = builder.build_subquery(
+            subquery=(
+                db.query(
+                    SourceDocumentORM.id.label("id"),
+                )
+                .filter(
+                    SourceDocumentORM.project_id == project_id,
+                )
+                .group_by(SourceDocumentORM.id)
+            )
+        )
+        builder.build_query(
+            query=db.query(SourceDocumentORM.id).join(
+                subquery, SourceDocumentORM.id == subquery.c.id
+            )
+        )
+        result_rows, _ = builder.execute_query(page_number=None, page_size=None)
+
+    word_counts, sdoc_counts, global_sdoc_count = matrix.sum_rows(
+        [row[0] for row in result_rows]
+    )
+    global_word_count = int(word_counts.sum())
+    if global_word_count == 0 or global_sdoc_count == 0:
+        return WordFrequencyResult(
+            total_results=0,
+            sdocs_total=0,
+            words_total=0,
+            word_frequencies=[],
+        )
+
+    word_idxs = np.nonzero(word_counts)[0]
+    columns = {
+        WordFrequencyColumns.WORD_FREQUENCY: word_counts[word_idxs],
+        WordFrequencyColumns.WORD_PERCENT: word_counts[word_idxs],
+        WordFrequencyColumns.SOURCE_DOCUMENT_FREQUENCY: sdoc_counts[word_idxs],
+        WordFrequencyColumns.SOURCE_DOCUMENT_PERCENT: sdoc_counts[word_idxs],
+    }
+    if any(sort.column == WordFrequencyColumns.WORD for sort in sorts):
+        words = np.array(matrix.vocab, dtype=object)[word_idxs]
+        columns[WordFrequencyColumns.WORD] = np.unique(words, return_inverse=True)[1]
+
+    # np.lexsort sorts by the last key first, descending order by negating the ranks
+    sort_keys = [
+        columns[sort.column]  # type: ignore
+        if sort.direction == SortDirection.ASC
+        else -columns[sort.column]  # type: ignore
+        for sort in sorts
+    ] or [-columns[WordFrequencyColumns.WORD_FREQUENCY]]
+    word_idxs = word_idxs[np.lexsort(sort_keys[::-1])]
+
+    total_results = len(word_idxs)
+    if page is not None and page_size is not None:
+        word_idxs = word_idxs[page * page_size : (page + 1) * page_size]
+
+    return WordFrequencyResult(
+        total_results=total_results,
+        sdocs_total=global_sdoc_count,
+        words_total=global_word_count,
+        word_frequencies=[
+            WordFrequencyStat(
+                count=int(word_counts[idx]),
+                word=matrix.vocab[idx],
+                word_percent=word_counts[idx] / global_word_count,
+                sdocs=int(sdoc_counts[idx]),
+                sdocs_percent=sdoc_counts[idx] / global_sdoc_count,
+            )
+            for idx in word_idxs
+        ],
+    )
+
+
+def _word_frequency_sql(
+    project_id: int,
+    filter: Filter[WordFrequencyColumns],
+    sorts: List[Sort[WordFrequencyColumns]],
+    page: Optional[int] = None,
+    page_size: Optional[int] = None,
 ) -> WordFrequencyResult:
     with SQLService().db_session() as db:
         # count all words, all sdocs query (uses filtering)
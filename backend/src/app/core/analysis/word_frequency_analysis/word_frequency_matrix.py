@@ -0,0 +1,262 @@
+import json
+import shutil
+import threading
+import uuid
+from array import array
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+from scipy import sparse
+from sqlalchemy.orm import Session
+
+from app.core.data.crud.word_frequency import crud_word_frequency
+from app.core.data.repo.repo_service import RepoService
+
+
+class WordFrequencyMatrix:
+    """
+    Sparse document-term matrix (CSR layout) of the word frequencies of a project.
+    Rows are documents (ordered by sdoc id), columns are words, values are counts.
+    The matrix is stored as .npy files in the project repository and memory-mapped,
+    so the word frequencies of any subset of documents are summed up without SQL.
+    """
+
+    def __init__(
+        self,
+        sdoc_ids: np.ndarray,
+        vectors: sparse.csr_matrix,
+        vocab: List[str],
+        version: int,
+    ):
+        self.sdoc_ids = sdoc_ids
+        self.vectors = vectors
+        self.vocab = vocab
+        self.version = version
+
+    @classmethod
+    def from_word_frequency_stream(
+        cls, rows: Iterable[Tuple[int, str, int]], version: int
+    ) -> "WordFrequencyMatrix":
+        """
+        Builds the matrix from (sdoc_id, word, count) rows that are ordered by sdoc_id.
+        """
+        sdoc_ids, vectors, vocab = _build_rows(rows, vocab=[])
+        return cls(sdoc_ids=sdoc_ids, vectors=vectors, vocab=vocab, version=version)
+
+    def extend(
+        self, rows: Iterable[Tuple[int, str, int]], version: int
+    ) -> "WordFrequencyMatrix":
+        """
+        Returns a new matrix with the (sdoc_id, word, count) rows appended. The rows
+        have to be ordered by sdoc_id and belong to documents after the last row.
+        """
+        sdoc_ids, vectors, vocab = _build_rows(rows, vocab=self.vocab)
+        if len(sdoc_ids) > 0 and len(self.sdoc_ids) > 0:
+            assert sdoc_ids[0] > self.sdoc_ids[-1], "Rows have to be appended in order!"
+        # the new words are appended to the vocabulary, i.e., as new columns
+        old_vectors = sparse.csr_matrix(
+            (self.vectors.data, self.vectors.indices, self.vectors.indptr),
+            shape=(len(self.sdoc_ids), len(vocab)),
+        )
+        return WordFrequencyMatrix(
+            sdoc_ids=np.concatenate([self.sdoc_ids, sdoc_ids]),
+            vectors=sparse.vstack([old_vectors, vectors], format="csr"),
+            vocab=vocab,
+            version=version,
+        )
+
+    def save(self, path: Path) -> None:
+        path.mkdir(parents=True, exist_ok=True)
+        np.save(path / "sdoc_ids.npy", self.sdoc_ids)
+        np.save(path / "indptr.npy", self.vectors.indptr)
+        np.save(path / "indices.npy", self.vectors.indices)
+        np.save(path / "data.npy", self.vectors.data)
+        with open(path / "vocab.json", "w") as f:
+            json.dump(self.vocab, f)
+
+    @classmethod
+    def load(cls, path: Path, version: int) -> "WordFrequencyMatrix":
+        sdoc_ids = np.load(path / "sdoc_ids.npy", mmap_mode="r")
+        with open(path / "vocab.json", "r") as f:
+            vocab = json.load(f)
+        vectors = sparse.csr_matrix(
+            (
+                np.load(path / "data.npy", mmap_mode="r"),
+                np.load(path / "indices.npy", mmap_mode="r"),
+                np.load(path / "indptr.npy", mmap_mode="r"),
+            ),
+            shape=(len(sdoc_ids), len(vocab)),
+            copy=False,
+        )
+        return cls(sdoc_ids=sdoc_ids, vectors=vectors, vocab=vocab, version=version)
+
+    def sum_rows(self, sdoc_ids: List[int]) -> Tuple[np.ndarray, np.ndarray, int]:
+        """
+        Returns the total count and the number of documents of every word for the
+        given documents, as well as the number of these documents with word frequencies.
+        """
+        sdoc_ids_arr = np.unique(np.asarray(sdoc_ids, dtype=np.int64))
+        rows = np.searchsorted(self.sdoc_ids, sdoc_ids_arr)
+        rows = rows[rows < len(self.sdoc_ids)]
+        rows = rows[self.sdoc_ids[rows] == sdoc_ids_arr[: len(rows)]]
+        if len(rows) == 0:
+            return (
+                np.zeros(len(self.vocab), dtype=np.int64),
+                np.zeros(len(self.vocab), dtype=np.int64),
+                0,
+            )
+
+        subset = self.vectors[rows]
+        word_counts = np.asarray(subset.sum(axis=0)).ravel()
+        # every (document, word) pair is stored only once
+        sdoc_counts = np.bincount(subset.indices, minlength=len(self.vocab))
+        return word_counts, sdoc_counts, len(rows)
+
+
+def _build_rows(
+    rows: Iterable[Tuple[int, str, int]], vocab: List[str]
+) -> Tuple[np.ndarray, sparse.csr_matrix, List[str]]:
+    """
+    Builds CSR rows from (sdoc_id, word, count) rows that are ordered by sdoc_id.
+    Words that are not in the vocabulary are appended to (a copy of) it.
+    """
+    word2idx: Dict[str, int] = {word: idx for idx, word in enumerate(vocab)}
+    sdoc_ids = array("q")
+    indptr = array("q", [0])
+    indices = array("l")
+    values = array("q")
+
+    for sdoc_id, word, count in rows:
+        if len(sdoc_ids) == 0 or sdoc_ids[-1] != sdoc_id:
+            sdoc_ids.append(sdoc_id)
+            indptr.append(indptr[-1])
+        word_idx = word2idx.get(word)
+        if word_idx is None:
+            word_idx = len(word2idx)
+            word2idx[word] = word_idx
+        indices.append(word_idx)
+        values.append(count)
+        indptr[-1] += 1
+
+    vectors = sparse.csr_matrix(
+        (
+            np.frombuffer(values, dtype=np.int64),
+            np.frombuffer(indices, dtype=indices.typecode).astype(np.int32),
+            np.frombuffer(indptr, dtype=np.int64),
+        ),
+        shape=(len(sdoc_ids), len(word2idx)),
+    )
+    return (
+        np.frombuffer(sdoc_ids, dtype=np.int64).copy(),
+        vectors,
+        list(word2idx.keys()),
+    )
+
+
+_matrices: Dict[int, WordFrequencyMatrix] = dict()
+_project_locks: Dict[int, threading.Lock] = defaultdict(threading.Lock)
+_lock = threading.Lock()
+
+
+def _matrix_path(project_id: int) -> Path:
+    return RepoService().get_project_repo_root_path(project_id) / "word_frequencies"
+
+
+def _project_lock(project_id: int) -> threading.Lock:
+    with _lock:
+        return _project_locks[project_id]
+
+
+def _load_latest_matrix(path: Path) -> Optional[WordFrequencyMatrix]:
+    versions = [
+        int(saved.name[1:])
+        for saved in path.glob("v*")
+        if saved.name[1:].isdigit() and saved.is_dir()
+    ]
+    if len(versions) == 0:
+        return None
+    version = max(versions)
+    try:
+        return WordFrequencyMatrix.load(path / f"v{version}", version=version)
+    except OSError:
+        # removed by another process in the meantime
+        return None
+
+
+def _build_matrix(
+    db: Session,
+    project_id: int,
+    version: int,
+    outdated: Optional[WordFrequencyMatrix],
+) -> WordFrequencyMatrix:
+    # documents are mostly added, e.g., during an import. if all documents of the
+    # outdated matrix are unchanged, only the rows of the new documents are appended
+    if outdated is not None:
+        last_sdoc_id = int(outdated.sdoc_ids[-1]) if len(outdated.sdoc_ids) > 0 else 0
+        sdoc_ids = crud_word_frequency.read_sdoc_ids_by_project(
+            db, project_id=project_id, max_sdoc_id=last_sdoc_id
+        )
+        if np.array_equal(outdated.sdoc_ids, sdoc_ids):
+            logger.info(
+                f"Extending word frequency matrix of project {project_id} "
+                f"(v{outdated.version} -> v{version})"
+            )
+            return outdated.extend(
+                crud_word_frequency.stream_by_project(
+                    db, project_id=project_id, after_sdoc_id=last_sdoc_id
+                ),
+                version=version,
+            )
+
+    logger.info(f"Building word frequency matrix of project {project_id} (v{version})")
+    # all doctypes, like the project word frequencies and the SQL aggregation
+    return WordFrequencyMatrix.from_word_frequency_stream(
+        crud_word_frequency.stream_by_project(db, project_id=project_id),
+        version=version,
+    )
+
+
+def get_word_frequency_matrix(
+    db: Session, project_id: int, version: int
+) -> WordFrequencyMatrix:
+    """
+    Returns the WordFrequencyMatrix of the project. It is rebuilt if the word
+    frequencies of the project changed, i.e., if its version is outdated.
+    Only the matrix of one project is built at a time.
+    """
+    with _project_lock(project_id):
+        matrix = _matrices.get(project_id)
+        if matrix is not None and matrix.version == version:
+            return matrix
+
+        path = _matrix_path(project_id) / f"v{version}"
+        if path.exists():
+            matrix = WordFrequencyMatrix.load(path, version=version)
+        else:
+            if matrix is None:
+                matrix = _load_latest_matrix(path.parent)
+            if matrix is not None and matrix.version > version:
+                matrix = None
+            matrix = _build_matrix(
+                db, project_id=project_id, version=version, outdated=matrix
+            )
+            # write to a temporary directory first, so that other processes never
+            # load an incomplete matrix
+            tmp_path = path.with_name(f"{path.name}.{uuid.uuid4()}.tmp")
+            matrix.save(tmp_path)
+            try:
+                tmp_path.rename(path)
+            except OSError:
+                # another process stored the same version in the meantime
+                shutil.rmtree(tmp_path, ignore_errors=True)
+            # remove outdated versions
+            for outdated in path.parent.glob("v*"):
+                if outdated.name[1:].isdigit() and int(outdated.name[1:]) < version:
+                    shutil.rmtree(outdated, ignore_errors=True)
+            matrix = WordFrequencyMatrix.load(path, version=version)
+
+        _matrices[project_id] = matrix
+        return matrix
@@ -1,8 +1,7 @@
 from time import perf_counter_ns
 from typing import Dict, Iterable, List, Tuple
 
-import numpy as np
-
+from app.core.annoscaling.sentence_linking import link_spans_to_sentences
 from app.core.data.crud.span_annotation import crud_span_anno
 from app.core.data.dto.span_annotation import SpanAnnotationCreate
 from app.core.data.orm.annotation_document import AnnotationDocumentORM
@@ -53,8 +52,8 @@ class AnnoScalingService(metaclass=SingletonMeta):
                     sdoc_id=sdoc_id,
                     begin=begin_char,
                     end=end_char,
-                    begin_token=sdoc.sentence_token_starts[sent],
-                    end_token=sdoc.sentence_token_ends[sent],
+                    begin_token=sdoc.token_index.span_starting_at(begin_char),
+                    end_token=sdoc.token_index.span_ending_at(end_char),
                     span_text=sdoc.content[begin_char:end_char],
                 )
                 to_create.append(span_anno)
@@ -68,8 +67,8 @@ class AnnoScalingService(metaclass=SingletonMeta):
                     sdoc_id=sdoc_id,
                     begin=begin_char,
                     end=end_char,
-                    begin_token=sdoc.sentence_token_starts[sent],
-                    end_token=sdoc.sentence_token_ends[sent],
+                    begin_token=sdoc.token_index.span_starting_at(begin_char),
+                    end_token=sdoc.token_index.span_ending_at(end_char),
                     span_text=sdoc.content[begin_char:end_char],
                 )
                 to_create.append(span_anno)
@@ -93,7 +92,7 @@ class AnnoScalingService(metaclass=SingletonMeta):
 
         start_time = perf_counter_ns()
         # takes 2ms (small project)
-        sdoc_sentences = self.__get_sentences(
+        sdoc_sentences = self.__get_sentence_offsets(
             {id for _, _, id in occurrences + rejections}
         )
         end_time = perf_counter_ns()
@@ -126,18 +125,13 @@ class AnnoScalingService(metaclass=SingletonMeta):
     def __get_sdoc_sent_ids(
         self,
         spans: List[Tuple[int, int, int]],
-        sdoc_sentences: Dict[int, Tuple[List[int], List[int], str]],
+        sdoc_sentences: Dict[int, Tuple[List[int], List[int]]],
     ) -> List[Tuple[int, int]]:
-        sdoc_sent_ids = []
-        # takes around 0.1ms per annotation
-        for start, end, sdoc_id in spans:
-            # TODO loops are bad, need a much faster way to link annotations to sentences
-            # best: do everything in DB and only return sentence ID per annotation
-            # alternative: load all from DB (in chunks?) and compute via numpy
-            starts, ends, _ = sdoc_sentences[sdoc_id]
-            sent_match = self.__best_match(starts, ends, start, end)
-            sdoc_sent_ids.append((sdoc_id, sent_match))
-        return sdoc_sent_ids
+        if len(spans) == 0:
+            return []
+        begins, ends, sdoc_ids = zip(*spans)
+        sent_ids = link_spans_to_sentences(begins, ends, sdoc_ids, sdoc_sentences)
+        return list(zip(sdoc_ids, sent_ids.tolist()))
 
     def __get_annotations(
         self, project_id: int, user_ids: List[int], code_id: int
@@ -167,6 +161,19 @@ class AnnoScalingService(metaclass=SingletonMeta):
             res = query.all()
             return [(r[0], r[1], r[2]) for r in res]
 
+    def __get_sentence_offsets(
+        self, sdoc_ids: Iterable[int]
+    ) -> Dict[int, Tuple[List[int], List[int]]]:
+        # the content is not required to link annotations to sentences
+        with self.sqls.db_session() as db:
+            query = db.query(
+                SourceDocumentDataORM.id,
+                SourceDocumentDataORM.sentence_starts,
+                SourceDocumentDataORM.sentence_ends,
+            ).filter(SourceDocumentDataORM.id.in_(sdoc_ids))
+            res = query.all()
+            return {r[0]: (r[1], r[2]) for r in res}
+
     def __get_sentences(
         self, sdoc_ids: Iterable[int]
     ) -> Dict[int, Tuple[List[int], List[int], str]]:
@@ -179,17 +186,3 @@ class AnnoScalingService(metaclass=SingletonMeta):
             ).filter(SourceDocumentDataORM.id.in_(sdoc_ids))
             res = query.all()
             return {r[0]: (r[1], r[2], r[3]) for r in res}
-
-    def __best_match(self, starts: List[int], ends: List[int], begin: int, end: int):
-        overlap = [self.__overlap(s, e, begin, end) for s, e in zip(starts, ends)]
-        return np.asarray(overlap).argmax().item()
-
-    def __overlap(self, s1: int, e1: int, s2: int, e2: int):
-        return max(min(e1, e2) - max(s1, s2), 0)
-        return max(min(e1, e2) - max(s1, s2), 0)
-        return max(min(e1, e2) - max(s1, s2), 0)
-        return max(min(e1, e2) - max(s1, s2), 0)
-        return max(min(e1, e2) - max(s1, s2), 0)
-        return max(min(e1, e2) - max(s1, s2), 0)
-        return max(min(e1, e2) - max(s1, s2), 0)
-        return max(min(e1, e2) - max(s1, s2), 0)
@@ -0,0 +1,88 @@
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+
+def link_spans_to_sentences(
+    span_begins: Sequence[int],
+    span_ends: Sequence[int],
+    span_sdoc_ids: Sequence[int],
+    sdoc_sentences: Dict[int, Tuple[List[int], List[int]]],
+) -> np.ndarray:
+    """
+    Returns the id of the sentence that overlaps most with each span (or 0 if no
+    sentence of the document overlaps with it). All spans of all documents are
+    resolved at once: the sentences of all documents are concatenated into one sorted
+    array, so that the candidate sentences of every span are found by binary search
+    and the best candidate is selected with vectorized operations.
+    """
+    begins = np.asarray(span_begins, dtype=np.int64)
+    ends = np.asarray(span_ends, dtype=np.int64)
+    sdoc_ids = np.asarray(span_sdoc_ids, dtype=np.int64)
+    if len(begins) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    # concatenate the sentences of all documents, every document is shifted behind
+    # the previous one, so that the offsets of different documents never overlap
+    unique_sdoc_ids, doc_idx = np.unique(sdoc_ids, return_inverse=True)
+    max_span_ends = np.zeros(len(unique_sdoc_ids), dtype=np.int64)
+    np.maximum.at(max_span_ends, doc_idx, ends)
+    sent_starts_list: List[np.ndarray] = []
+    sent_ends_list: List[np.ndarray] = []
+    char_bases = np.zeros(len(unique_sdoc_ids), dtype=np.int64)
+    first_sentences = np.zeros(len(unique_sdoc_ids), dtype=np.int64)
+    char_base = 0
+    num_sentences = 0
+    for idx, sdoc_id in enumerate(unique_sdoc_ids.tolist()):
+        starts, sent_ends = sdoc_sentences[sdoc_id]
+        starts_arr = np.asarray(starts, dtype=np.int64)
+        ends_arr = np.asarray(sent_ends, dtype=np.int64)
+        char_bases[idx] = char_base
+        first_sentences[idx] = num_sentences
+        sent_starts_list.append(starts_arr + char_base)
+        sent_ends_list.append(ends_arr + char_base)
+        doc_end = max(
+            int(ends_arr[-1]) if len(ends_arr) > 0 else 0, int(max_span_ends[idx])
+        )
+        char_base += doc_end + 1
+        num_sentences += len(starts_arr)
+    sent_starts = np.concatenate(sent_starts_list)
+    sent_ends = np.concatenate(sent_ends_list)
+
+    # shift the spans like the sentences of their document
+    begins = begins + char_bases[doc_idx]
+    ends = ends + char_bases[doc_idx]
+
+    # candidate sentences [first, last) of every span
+    first = np.searchsorted(sent_ends, begins, side="right")
+    last = np.searchsorted(sent_starts, ends, side="left")
+    # candidates of other documents do not overlap, because the documents are separated
+    num_candidates = np.maximum(last - first, 0)
+
+    # default: the first sentence of the document
+    result = np.zeros(len(begins), dtype=np.int64)
+
+    has_candidates = num_candidates > 0
+    if has_candidates.any():
+        span_idx = np.repeat(np.arange(len(begins)), num_candidates)
+        group_starts = np.cumsum(num_candidates) - num_candidates
+        candidates = (
+            np.arange(len(span_idx))
+            - np.repeat(group_starts, num_candidates)
+            + np.repeat(first, num_candidates)
+        )
+        overlap = np.minimum(sent_ends[candidates], ends[span_idx]) - np.maximum(
+            sent_starts[candidates], begins[span_idx]
+        )
+        # sort by span, then by descending overlap, then by sentence (like argmax)
+        order = np.lexsort((candidates, -overlap, span_idx))
+        is_best = np.ones(len(order), dtype=bool)
+        is_best[1:] = span_idx[order][1:] != span_idx[order][:-1]
+        best = order[is_best]
+        # spans without any overlap (e.g. empty spans) keep the default
+        best = best[overlap[best] > 0]
+        result[span_idx[best]] = (
+            candidates[best] - first_sentences[doc_idx[span_idx[best]]]
+        )
+
+    return result
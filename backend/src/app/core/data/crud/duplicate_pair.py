@@ -0,0 +1,80 @@
+from typing import List, Tuple
+
+from sqlalchemy import delete, or_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.data.crud.crud_base import CRUDBase, UpdateNotAllowed
+from app.core.data.dto.duplicate_pair import DuplicatePairCreate
+from app.core.data.orm.duplicate_pair import DuplicatePairORM
+
+
+class CrudDuplicatePair(
+    CRUDBase[
+        DuplicatePairORM,
+        DuplicatePairCreate,
+        UpdateNotAllowed,
+    ]
+):
+    def update(self, db: Session, *, id: int, update_dto):
+        raise NotImplementedError()
+
+    def create_multi(
+        self, db: Session, *, create_dtos: List[DuplicatePairCreate]
+    ) -> List[DuplicatePairORM]:
+        raise NotImplementedError("Use upsert_multi instead!")
+
+    def upsert_multi(
+        self,
+        db: Session,
+        *,
+        create_dtos: List[DuplicatePairCreate],
+        batch_size: int = 5000,
+    ) -> int:
+        for start in range(0, len(create_dtos), batch_size):
+            insert_stmt = insert(DuplicatePairORM).values(
+                [dto.model_dump() for dto in create_dtos[start : start + batch_size]]
+            )
+            insert_stmt = insert_stmt.on_conflict_do_update(
+                index_elements=[
+                    DuplicatePairORM.sdoc_id,
+                    DuplicatePairORM.duplicate_sdoc_id,
+                ],
+                set_={"distance": insert_stmt.excluded.distance},
+            )
+            db.execute(insert_stmt)
+        db.commit()
+        return len(create_dtos)
+
+    def remove_by_sdoc_ids(self, db: Session, *, sdoc_ids: List[int]) -> None:
+        """
+        Deletes all pairs of the SourceDocuments without committing.
+        """
+        if len(sdoc_ids) == 0:
+            return
+        db.execute(
+            delete(DuplicatePairORM)
+            .where(
+                or_(
+                    DuplicatePairORM.sdoc_id.in_(sdoc_ids),
+                    DuplicatePairORM.duplicate_sdoc_id.in_(sdoc_ids),
+                )
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    def read_by_project(
+        self, db: Session, *, project_id: int, max_distance: int
+    ) -> List[Tuple[int, int]]:
+        rows = (
+            db.query(DuplicatePairORM.sdoc_id, DuplicatePairORM.duplicate_sdoc_id)
+            .filter(
+                DuplicatePairORM.project_id == project_id,
+                DuplicatePairORM.distance <= max_distance,
+            )
+            .all()
+        )
+        return [(row[0], row[1]) for row in rows]
+
+
+crud_duplicate_pair = CrudDuplicatePair(DuplicatePairORM)
@@ -0,0 +1,121 @@
+from typing import List, Tuple
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.data.crud.crud_base import CRUDBase, UpdateNotAllowed
+from app.core.data.crud.duplicate_pair import crud_duplicate_pair
+from app.core.data.doc_type import DocType
+from app.core.data.dto.duplicate_signature import DuplicateSignatureCreate
+from app.core.data.orm.duplicate_signature import DuplicateSignatureORM
+from app.core.data.orm.source_document import SourceDocumentORM
+
+
+class CrudDuplicateSignature(
+    CRUDBase[
+        DuplicateSignatureORM,
+        DuplicateSignatureCreate,
+        UpdateNotAllowed,
+    ]
+):
+    def update(self, db: Session, *, id: int, update_dto):
+        raise NotImplementedError()
+
+    def create_multi(
+        self, db: Session, *, create_dtos: List[DuplicateSignatureCreate]
+    ) -> List[DuplicateSignatureORM]:
+        raise NotImplementedError("Use upsert_multi instead!")
+
+    def upsert_multi(
+        self,
+        db: Session,
+        *,
+        create_dtos: List[DuplicateSignatureCreate],
+        batch_size: int = 5000,
+    ) -> int:
+        # the pairs of the old signatures are outdated
+        self.remove_duplicate_pairs(
+            db=db, sdoc_ids=[dto.sdoc_id for dto in create_dtos]
+        )
+        for start in range(0, len(create_dtos), batch_size):
+            # we cannot use jsonable_encoder here, since it would decode the signature bytes
+            insert_stmt = insert(DuplicateSignatureORM).values(
+                [dto.model_dump() for dto in create_dtos[start : start + batch_size]]
+            )
+            # a new signature has to be compared with the other documents again
+            insert_stmt = insert_stmt.on_conflict_do_update(
+                index_elements=[DuplicateSignatureORM.sdoc_id],
+                set_={
+                    "num_words": insert_stmt.excluded.num_words,
+                    "signature": insert_stmt.excluded.signature,
+                    "checked_max_different_words": None,
+                },
+            )
+            db.execute(insert_stmt)
+        db.commit()
+        return len(create_dtos)
+
+    def remove_duplicate_pairs(self, db: Session, *, sdoc_ids: List[int]) -> None:
+        """
+        Deletes the duplicate pairs of the SourceDocuments without committing. All
+        pairs of the other documents are persisted, so their groups follow from the
+        remaining pairs and they do not have to be compared again.
+        """
+        crud_duplicate_pair.remove_by_sdoc_ids(db=db, sdoc_ids=sdoc_ids)
+
+    def read_by_project_and_doctype(
+        self, db: Session, *, project_id: int, doctype: DocType
+    ) -> List[Tuple[int, int, bytes, int | None]]:
+        # returns raw (sdoc_id, num_words, signature, checked_max_different_words) rows
+        rows = (
+            db.query(
+                DuplicateSignatureORM.sdoc_id,
+                DuplicateSignatureORM.num_words,
+                DuplicateSignatureORM.signature,
+                DuplicateSignatureORM.checked_max_different_words,
+            )
+            .join(DuplicateSignatureORM.source_document)
+            .filter(
+                DuplicateSignatureORM.project_id == project_id,
+                SourceDocumentORM.doctype == doctype,
+            )
+            .order_by(DuplicateSignatureORM.sdoc_id)
+            .all()
+        )
+        return [tuple(row) for row in rows]  # type: ignore
+
+    def read_sdoc_ids_without_signature(
+        self, db: Session, *, project_id: int, doctype: DocType
+    ) -> List[int]:
+        # sdocs with word frequencies that were preprocessed before the signature index existed
+        rows = (
+            db.query(SourceDocumentORM.id)
+            .outerjoin(
+                DuplicateSignatureORM,
+                DuplicateSignatureORM.sdoc_id == SourceDocumentORM.id,
+            )
+            .filter(
+                SourceDocumentORM.project_id == project_id,
+                SourceDocumentORM.doctype == doctype,
+                DuplicateSignatureORM.sdoc_id.is_(None),
+                SourceDocumentORM.word_frequencies.any(),
+            )
+            .all()
+        )
+        return [row[0] for row in rows]
+
+    def update_checked_max_different_words(
+        self, db: Session, *, sdoc_ids: List[int], max_different_words: int
+    ) -> None:
+        if len(sdoc_ids) == 0:
+            return
+        db.query(DuplicateSignatureORM).filter(
+            DuplicateSignatureORM.sdoc_id.in_(sdoc_ids)
+        ).update(
+            {DuplicateSignatureORM.checked_max_different_words: max_different_words},
+            synchronize_session=False,
+        )
+        db.commit()
+
+
+crud_duplicate_signature = CrudDuplicateSignature(DuplicateSignatureORM)
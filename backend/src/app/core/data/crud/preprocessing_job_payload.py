@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
@@ -76,6 +76,16 @@ class CRUDPreprocessingJobPayload(
 
         return db_obj
 
+    def update_multi(
+        self, db: Session, *, update_dtos: Dict[str, PreprocessingJobPayloadUpdate]
+    ) -> int:
+        # all updates are written in a single transaction without reading the rows
+        for uuid, update_dto in update_dtos.items():
+            update_data = update_dto.model_dump(exclude_unset=True, mode="json")
+            db.query(self.model).filter(self.model.id == uuid).update(update_data)
+        db.commit()
+        return len(update_dtos)
+
     def remove(self, db: Session, *, uuid: str) -> PreprocessingJobPayloadORM:
         db_obj = self.read(db=db, uuid=uuid)
         db.delete(db_obj)
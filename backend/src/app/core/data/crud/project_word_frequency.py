@@ -0,0 +1,187 @@
+from collections import Counter
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.data.crud.crud_base import CRUDBase, UpdateNotAllowed
+from app.core.data.orm.project_word_frequency import (
+    ProjectWordFrequencyORM,
+    ProjectWordFrequencyStatsORM,
+)
+from app.core.data.orm.source_document import SourceDocumentORM
+from app.core.data.orm.word_frequency import WordFrequencyORM
+
+
+class CrudProjectWordFrequency(
+    CRUDBase[
+        ProjectWordFrequencyORM,
+        UpdateNotAllowed,
+        UpdateNotAllowed,
+    ]
+):
+    """
+    Maintains the per-project word frequency aggregates. The methods do not commit,
+    so that the aggregates are updated in the same transaction as the word frequencies.
+    """
+
+    def read_stats(
+        self, db: Session, *, project_id: int
+    ) -> Optional[ProjectWordFrequencyStatsORM]:
+        return (
+            db.query(ProjectWordFrequencyStatsORM)
+            .filter(ProjectWordFrequencyStatsORM.project_id == project_id)
+            .first()
+        )
+
+    def add_sdoc_word_frequencies(
+        self,
+        db: Session,
+        *,
+        project_id: int,
+        word_freqs: List[Dict[str, int]],
+        batch_size: int = 5000,
+    ) -> None:
+        word_counts: Counter[str] = Counter()
+        word_sdoc_counts: Counter[str] = Counter()
+        for sdoc_word_freqs in word_freqs:
+            word_counts.update(sdoc_word_freqs)
+            word_sdoc_counts.update(sdoc_word_freqs.keys())
+        if len(word_counts) == 0:
+            return
+
+        # sorted, so that concurrent transactions lock the rows in the same order
+        words = sorted(word_counts.keys())
+        for start in range(0, len(words), batch_size):
+            insert_stmt = insert(ProjectWordFrequencyORM).values(
+                [
+                    {
+                        "project_id": project_id,
+                        "word": word,
+                        "count": word_counts[word],
+                        "sdoc_count": word_sdoc_counts[word],
+                    }
+                    for word in words[start : start + batch_size]
+                ]
+            )
+            insert_stmt = insert_stmt.on_conflict_do_update(
+                index_elements=[
+                    ProjectWordFrequencyORM.project_id,
+                    ProjectWordFrequencyORM.word,
+                ],
+                set_={
+                    "count": ProjectWordFrequencyORM.count + insert_stmt.excluded.count,
+                    "sdoc_count": ProjectWordFrequencyORM.sdoc_count
+                    + insert_stmt.excluded.sdoc_count,
+                },
+            )
+            db.execute(insert_stmt)
+
+        insert_stmt = insert(ProjectWordFrequencyStatsORM).values(
+            project_id=project_id,
+            word_count=sum(word_counts.values()),
+            sdoc_count=sum(1 for wfs in word_freqs if len(wfs) > 0),
+            version=1,
+        )
+        insert_stmt = insert_stmt.on_conflict_do_update(
+            index_elements=[ProjectWordFrequencyStatsORM.project_id],
+            set_={
+                "word_count": ProjectWordFrequencyStatsORM.word_count
+                + insert_stmt.excluded.word_count,
+                "sdoc_count": ProjectWordFrequencyStatsORM.sdoc_count
+                + insert_stmt.excluded.sdoc_count,
+                "version": ProjectWordFrequencyStatsORM.version + 1,
+            },
+        )
+        db.execute(insert_stmt)
+
+    def remove_sdoc_word_frequencies(self, db: Session, *, sdoc_ids: List[int]) -> None:
+        """
+        Subtracts the word frequencies of the SourceDocuments from the aggregates.
+        Has to be called before the word frequencies are deleted.
+        """
+        if len(sdoc_ids) == 0:
+            return
+
+        sdoc_wfs = (
+            select(
+                SourceDocumentORM.project_id,
+                WordFrequencyORM.word,
+                func.sum(WordFrequencyORM.count).label("count"),
+                func.count(WordFrequencyORM.sdoc_id).label("sdoc_count"),
+            )
+            .join(WordFrequencyORM.source_document)
+            .where(WordFrequencyORM.sdoc_id.in_(sdoc_ids))
+            .group_by(SourceDocumentORM.project_id, WordFrequencyORM.word)
+            .subquery()
+        )
+        db.execute(
+            update(ProjectWordFrequencyORM)
+            .where(
+                ProjectWordFrequencyORM.project_id == sdoc_wfs.c.project_id,
+                ProjectWordFrequencyORM.word == sdoc_wfs.c.word,
+            )
+            .values(
+                count=ProjectWordFrequencyORM.count - sdoc_wfs.c.count,
+                sdoc_count=ProjectWordFrequencyORM.sdoc_count - sdoc_wfs.c.sdoc_count,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+        sdoc_stats = (
+            select(
+                SourceDocumentORM.project_id,
+                func.sum(WordFrequencyORM.count).label("word_count"),
+                func.count(func.distinct(WordFrequencyORM.sdoc_id)).label("sdoc_count"),
+            )
+            .join(WordFrequencyORM.source_document)
+            .where(WordFrequencyORM.sdoc_id.in_(sdoc_ids))
+            .group_by(SourceDocumentORM.project_id)
+            .subquery()
+        )
+        db.execute(
+            update(ProjectWordFrequencyStatsORM)
+            .where(ProjectWordFrequencyStatsORM.project_id == sdoc_stats.c.project_id)
+            .values(
+                word_count=ProjectWordFrequencyStatsORM.word_count
+                - sdoc_stats.c.word_count,
+                sdoc_count=ProjectWordFrequencyStatsORM.sdoc_count
+                - sdoc_stats.c.sdoc_count,
+                version=ProjectWordFrequencyStatsORM.version + 1,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+        project_ids = select(SourceDocumentORM.project_id).where(
+            SourceDocumentORM.id.in_(sdoc_ids)
+        )
+        db.execute(
+            delete(ProjectWordFrequencyORM)
+            .where(
+                ProjectWordFrequencyORM.project_id.in_(project_ids),
+                ProjectWordFrequencyORM.sdoc_count <= 0,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    def remove_by_project(self, db: Session, *, project_id: int) -> None:
+        db.execute(
+            delete(ProjectWordFrequencyORM)
+            .where(ProjectWordFrequencyORM.project_id == project_id)
+            .execution_options(synchronize_session=False)
+        )
+        # the stats are kept, so that the version keeps increasing
+        db.execute(
+            update(ProjectWordFrequencyStatsORM)
+            .where(ProjectWordFrequencyStatsORM.project_id == project_id)
+            .values(
+                word_count=0,
+                sdoc_count=0,
+                version=ProjectWordFrequencyStatsORM.version + 1,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+
+crud_project_word_frequency = CrudProjectWordFrequency(ProjectWordFrequencyORM)
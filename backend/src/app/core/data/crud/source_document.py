@@ -1,20 +1,28 @@
+from datetime import datetime
 from typing import List, Optional
 
 from sqlalchemy import and_, desc, func, or_
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 
 from app.core.data.crud.crud_base import CRUDBase, NoSuchElementError
+from app.core.data.crud.duplicate_signature import crud_duplicate_signature
+from app.core.data.crud.project_word_frequency import crud_project_word_frequency
 from app.core.data.dto.source_document import (
     SDocStatus,
     SourceDocumentCreate,
     SourceDocumentRead,
     SourceDocumentUpdate,
 )
-from app.core.data.dto.source_document_data import SourceDocumentDataRead
+from app.core.data.dto.source_document_data import (
+    SourceDocumentDataRange,
+    SourceDocumentDataRangeUnit,
+    SourceDocumentDataRead,
+)
 from app.core.data.orm.document_tag import DocumentTagORM
 from app.core.data.orm.source_document import SourceDocumentORM
 from app.core.data.orm.source_document_data import SourceDocumentDataORM
 from app.core.data.orm.source_document_link import SourceDocumentLinkORM
+from app.core.data.orm.source_document_metadata import SourceDocumentMetadataORM
 from app.core.data.repo.repo_service import RepoService
 from app.core.db.elasticsearch_service import ElasticSearchService
 
@@ -49,7 +57,9 @@ class CRUDSourceDocument(
             raise SourceDocumentPreprocessingUnfinishedError(sdoc_id=sdoc_id)
         return status
 
-    def read_data(self, db: Session, *, id: int) -> SourceDocumentDataRead:
+    def read_data(
+        self, db: Session, *, id: int, with_markup: bool = False
+    ) -> SourceDocumentDataRead:
         db_obj = (
             db.query(SourceDocumentDataORM)
             .filter(SourceDocumentDataORM.id == id)
@@ -57,7 +67,22 @@ class CRUDSourceDocument(
         )
         if db_obj is None:
             raise NoSuchElementError(self.model, id=id)
-        return SourceDocumentDataRead.model_validate(db_obj)
+        if with_markup or db_obj.token_html_starts is None:
+            return SourceDocumentDataRead.model_validate(db_obj)
+        # the client renders the markup with the html offsets of the tokens
+        return SourceDocumentDataRead(
+            id=db_obj.id,
+            project_id=db_obj.project_id,
+            repo_url=db_obj.repo_url,
+            html=db_obj.html,
+            html_token_starts=db_obj.token_html_starts,
+            html_token_ends=db_obj.token_html_ends,
+            sentence_character_offsets=db_obj.sentence_character_offsets,
+            tokens=db_obj.tokens,
+            token_character_offsets=db_obj.token_character_offsets,
+            sentences=db_obj.sentences,
+            word_level_transcriptions=db_obj.word_level_transcriptions,
+        )
 
     def read_data_batch(
         self, db: Session, *, ids: List[int]
@@ -71,16 +96,159 @@ class CRUDSourceDocument(
         id2data = {db_obj.id: db_obj for db_obj in db_objs}
         return [id2data.get(id) for id in ids]
 
-    def remove(self, db: Session, *, id: int) -> SourceDocumentORM:
+    def read_data_range(
+        self,
+        db: Session,
+        *,
+        id: int,
+        unit: SourceDocumentDataRangeUnit,
+        start: int,
+        end: int,
+    ) -> SourceDocumentDataRange:
+        """
+        Reads the tokens start to end (exclusive) or the sentences start to end
+        (exclusive) with the overlapping sentences or tokens of the SourceDocumentData.
+        Only the slices of the offset arrays and the covered substring of the content
+        are transferred, the ranges are resolved with a binary search (width_bucket)
+        on the sorted offset arrays in the database.
+        """
+        data = SourceDocumentDataORM
+        num_tokens = func.cardinality(data.token_starts)
+        num_sentences = func.cardinality(data.sentence_starts)
+        if unit == SourceDocumentDataRangeUnit.TOKEN:
+            token_start = func.least(start, num_tokens)
+            token_end = func.least(end, num_tokens)
+            # sentences ending after the start of the first token
+            sentence_start = func.width_bucket(
+                data.token_starts[token_start + 1], data.sentence_ends
+            )
+            # sentences starting before the end of the last token
+            sentence_end = func.width_bucket(
+                data.token_ends[func.nullif(token_end, token_start)] - 1,
+                data.sentence_starts,
+            )
+        else:
+            sentence_start = func.least(start, num_sentences)
+            sentence_end = func.least(end, num_sentences)
+            # tokens starting in the first to the last sentence
+            token_start = func.width_bucket(
+                data.sentence_starts[sentence_start + 1] - 1, data.token_starts
+            )
+            token_end = func.width_bucket(
+                data.sentence_ends[func.nullif(sentence_end, sentence_start)] - 1,
+                data.token_starts,
+            )
+        content_start = func.least(
+            data.token_starts[token_start + 1], data.sentence_starts[sentence_start + 1]
+        )
+        content_end = func.greatest(
+            data.token_ends[token_end], data.sentence_ends[sentence_end]
+        )
+
+        row = (
+            db.query(
+                num_tokens.label("num_tokens"),
+                num_sentences.label("num_sentences"),
+                token_start.label("token_start"),
+                sentence_start.label("sentence_start"),
+                data.token_starts[token_start + 1 : token_end].label("token_starts"),
+                data.token_ends[token_start + 1 : token_end].label("token_ends"),
+                data.sentence_starts[sentence_start + 1 : sentence_end].label(
+                    "sentence_starts"
+                ),
+                data.sentence_ends[sentence_start + 1 : sentence_end].label(
+                    "sentence_ends"
+                ),
+                content_start.label("content_start"),
+                # empty ranges end before they start
+                func.substr(
+                    data.content,
+                    content_start + 1,
+                    func.greatest(content_end - content_start, 0),
+                ).label("content"),
+            )
+            .filter(data.id == id)
+            .one_or_none()
+        )
+        if row is None:
+            raise NoSuchElementError(SourceDocumentDataORM, id=id)
+
+        # the bounds are NULL if the range is empty or starts after the last token or
+        # sentence
+        token_offsets = list(zip(row.token_starts or [], row.token_ends or []))
+        sentence_offsets = list(zip(row.sentence_starts or [], row.sentence_ends or []))
+        token_start_id = (
+            row.token_start if row.token_start is not None else row.num_tokens
+        )
+        sentence_start_id = (
+            row.sentence_start if row.sentence_start is not None else row.num_sentences
+        )
+        if len(token_offsets) == 0 and len(sentence_offsets) == 0:
+            content_start_offset, content = 0, ""
+        else:
+            content_start_offset, content = row.content_start, row.content
+        return SourceDocumentDataRange(
+            id=id,
+            num_tokens=row.num_tokens,
+            num_sentences=row.num_sentences,
+            token_start=token_start_id,
+            token_end=token_start_id + len(token_offsets),
+            sentence_start=sentence_start_id,
+            sentence_end=sentence_start_id + len(sentence_offsets),
+            content_start=content_start_offset,
+            content=content,
+            tokens=[
+                content[s - content_start_offset : e - content_start_offset]
+                for s, e in token_offsets
+            ],
+            token_character_offsets=token_offsets,
+            sentences=[
+                content[s - content_start_offset : e - content_start_offset]
+                for s, e in sentence_offsets
+            ],
+            sentence_character_offsets=sentence_offsets,
+        )
+
+    def read_updated(self, db: Session, *, id: int) -> datetime:
+        updated = db.query(self.model.updated).filter(self.model.id == id).scalar()
+        if updated is None:
+            raise NoSuchElementError(self.model, id=id)
+        return updated
+
+    def read_batch_with_tags_and_metadata(
+        self, db: Session, *, ids: List[int]
+    ) -> List[Optional[SourceDocumentORM]]:
+        # eagerly load the tags and metadata of all sdocs at once
+        db_objs = (
+            db.query(self.model)
+            .filter(self.model.id.in_(ids))
+            .options(
+                selectinload(self.model.document_tags),
+                selectinload(self.model.metadata_).joinedload(
+                    SourceDocumentMetadataORM.project_metadata
+                ),
+            )
+            .all()
+        )
+        id2sdoc = {db_obj.id: db_obj for db_obj in db_objs}
+        return [id2sdoc.get(id) for id in ids]
+
+    def remove(
+        self, db: Session, *, id: int, remove_file: bool = True
+    ) -> SourceDocumentORM:
         # Import SimSearchService here to prevent a cyclic dependency
         from app.core.db.simsearch_service import SimSearchService
 
+        # removed together with the sdoc (and its word frequencies)
+        crud_project_word_frequency.remove_sdoc_word_frequencies(db=db, sdoc_ids=[id])
+        crud_duplicate_signature.remove_duplicate_pairs(db=db, sdoc_ids=[id])
         sdoc_db_obj = super().remove(db=db, id=id)
 
         # remove file from repo
-        RepoService().remove_sdoc_file(
-            sdoc=SourceDocumentRead.model_validate(sdoc_db_obj)
-        )
+        if remove_file:
+            RepoService().remove_sdoc_file(
+                sdoc=SourceDocumentRead.model_validate(sdoc_db_obj)
+            )
 
         # remove from elasticsearch
         ElasticSearchService().delete_document_from_index(
@@ -114,6 +282,7 @@ class CRUDSourceDocument(
         ids = [removed_orm.id for removed_orm in removed_orms]
 
         # delete the sdocs
+        crud_project_word_frequency.remove_by_project(db=db, project_id=proj_id)
         query.delete()
         db.commit()
 
@@ -1,4 +1,4 @@
-from typing import List
+from typing import Iterator, List, Optional, Tuple
 
 from sqlalchemy.orm import Session
 
@@ -33,5 +33,91 @@ class CrudWordFrequency(
         )
         return [WordFrequencyRead.model_validate(wf) for wf in wf_orms]
 
+    def stream_by_project_and_doctype(
+        self,
+        db: Session,
+        *,
+        project_id: int,
+        doctype: DocType,
+        batch_size: int = 10000,
+    ) -> Iterator[Tuple[int, str, int]]:
+        # yields raw (sdoc_id, word, count) rows ordered by sdoc_id without
+        # materializing ORM objects or DTOs for the whole project at once
+        query = (
+            db.query(
+                WordFrequencyORM.sdoc_id,
+                WordFrequencyORM.word,
+                WordFrequencyORM.count,
+            )
+            .join(WordFrequencyORM.source_document)
+            .filter(
+                SourceDocumentORM.project_id == project_id,
+                SourceDocumentORM.doctype == doctype,
+            )
+            .order_by(WordFrequencyORM.sdoc_id)
+            .execution_options(yield_per=batch_size)
+        )
+        for sdoc_id, word, count in query:
+            yield sdoc_id, word, count
+
+    def stream_by_project(
+        self,
+        db: Session,
+        *,
+        project_id: int,
+        after_sdoc_id: Optional[int] = None,
+        batch_size: int = 10000,
+    ) -> Iterator[Tuple[int, str, int]]:
+        # like stream_by_project_and_doctype, but for the documents of all doctypes,
+        # optionally only for the documents with an id greater than after_sdoc_id
+        query = (
+            db.query(
+                WordFrequencyORM.sdoc_id,
+                WordFrequencyORM.word,
+                WordFrequencyORM.count,
+            )
+            .join(WordFrequencyORM.source_document)
+            .filter(SourceDocumentORM.project_id == project_id)
+        )
+        if after_sdoc_id is not None:
+            query = query.filter(WordFrequencyORM.sdoc_id > after_sdoc_id)
+        query = query.order_by(WordFrequencyORM.sdoc_id).execution_options(
+            yield_per=batch_size
+        )
+        for sdoc_id, word, count in query:
+            yield sdoc_id, word, count
+
+    def read_sdoc_ids_by_project(
+        self, db: Session, *, project_id: int, max_sdoc_id: int
+    ) -> List[int]:
+        # ordered ids of the documents with word frequencies up to max_sdoc_id
+        query = (
+            db.query(WordFrequencyORM.sdoc_id)
+            .join(WordFrequencyORM.source_document)
+            .filter(
+                SourceDocumentORM.project_id == project_id,
+                WordFrequencyORM.sdoc_id <= max_sdoc_id,
+            )
+            .distinct()
+            .order_by(WordFrequencyORM.sdoc_id)
+        )
+        return [row[0] for row in query]
+
+    def stream_by_sdoc_ids(
+        self, db: Session, *, sdoc_ids: List[int], batch_size: int = 10000
+    ) -> Iterator[Tuple[int, str, int]]:
+        query = (
+            db.query(
+                WordFrequencyORM.sdoc_id,
+                WordFrequencyORM.word,
+                WordFrequencyORM.count,
+            )
+            .filter(WordFrequencyORM.sdoc_id.in_(sdoc_ids))
+            .order_by(WordFrequencyORM.sdoc_id)
+            .execution_options(yield_per=batch_size)
+        )
+        for sdoc_id, word, count in query:
+            yield sdoc_id, word, count
+
 
 crud_word_frequency = CrudWordFrequency(WordFrequencyORM)
@@ -0,0 +1,17 @@
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class DuplicatePairBase(BaseModel):
+    sdoc_id: int = Field(description="Smaller ID of the two SourceDocuments")
+    duplicate_sdoc_id: int = Field(description="Larger ID of the two SourceDocuments")
+    project_id: int = Field(description="ID of the Project")
+    distance: int = Field(description="L1 distance of the word frequencies")
+
+
+class DuplicatePairRead(DuplicatePairBase):
+    model_config = ConfigDict(from_attributes=True)
+
+
+# Properties for creation
+class DuplicatePairCreate(DuplicatePairBase):
+    pass
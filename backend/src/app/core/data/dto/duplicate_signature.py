@@ -0,0 +1,22 @@
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class DuplicateSignatureBase(BaseModel):
+    sdoc_id: int = Field(description="ID of the SourceDocument")
+    project_id: int = Field(description="ID of the Project")
+    num_words: int = Field(description="Total number of words of the SourceDocument")
+    signature: bytes = Field(description="MinHash signature of the SourceDocument")
+
+
+class DuplicateSignatureRead(DuplicateSignatureBase):
+    checked_max_different_words: Optional[int] = Field(
+        description="Largest max_different_words the SourceDocument has been checked with"
+    )
+    model_config = ConfigDict(from_attributes=True)
+
+
+# Properties for creation
+class DuplicateSignatureCreate(DuplicateSignatureBase):
+    pass
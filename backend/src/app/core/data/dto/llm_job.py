@@ -220,6 +220,10 @@ class LLMJobResult(BaseModel):
         description="Specific result for the LLMJob w.r.t it's type",
         discriminator="llm_job_type",
     )
+    num_cached_responses: int = Field(
+        default=0,
+        description="Number of responses that were served from the LLM response cache",
+    )
 
 
 # --- END RESULTS ---
@@ -99,6 +99,10 @@ class PaginatedElasticSearchDocumentHits(BaseModel):
     total_results: int = Field(
         description="The total number of hits. Used for pagination."
     )
+    next_cursor: Optional[str] = Field(
+        description="Cursor to request the next page, None if this is the last page.",
+        default=None,
+    )
 
 
 class SimSearchHit(BaseModel):
@@ -1,6 +1,7 @@
+from enum import Enum
 from typing import List, Optional, Tuple
 
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field
 
 
 class WordLevelTranscription(BaseModel):
@@ -15,7 +16,9 @@ class SourceDocumentDataBase(BaseModel):
     repo_url: str = Field(
         description="Relative ppath to the the SourceDocument in the repository"
     )
-    html: str = Field(description="Processed HTML of the SourceDocument")
+    html: str = Field(
+        description="Processed HTML of the SourceDocument (without the token markup)"
+    )
     token_starts: List[int] = Field(
         description="Start of each token in character offsets in content"
     )
@@ -28,6 +31,12 @@ class SourceDocumentDataBase(BaseModel):
     sentence_ends: List[int] = Field(
         description="End of each sentence in character offsets in content"
     )
+    token_html_starts: Optional[List[int]] = Field(
+        description="Start of each token in character offsets in html", default=None
+    )
+    token_html_ends: Optional[List[int]] = Field(
+        description="End of each token in character offsets in html", default=None
+    )
     token_time_starts: Optional[List[int]] = Field(
         description="Start times of each token in transcript", default=None
     )
@@ -44,7 +53,34 @@ class SourceDocumentDataRead(BaseModel):
     repo_url: str = Field(
         description="Relative path to the SourceDocument in the repository"
     )
-    html: str = Field(description="Processed HTML of the SourceDocument")
+    html: str = Field(
+        description=(
+            "Processed HTML of the SourceDocument, every token is wrapped in a <t> "
+            "and every sentence in a <sent> tag unless requested without markup"
+        ),
+        validation_alias=AliasChoices("tagged_html", "html"),
+    )
+    html_token_starts: Optional[List[int]] = Field(
+        description=(
+            "Start of each token in character offsets in the html, only if "
+            "requested without markup and the html does not contain the markup"
+        ),
+        default=None,
+    )
+    html_token_ends: Optional[List[int]] = Field(
+        description=(
+            "End of each token in character offsets in the html, only if "
+            "requested without markup and the html does not contain the markup"
+        ),
+        default=None,
+    )
+    sentence_character_offsets: Optional[List[Tuple[int, int]]] = Field(
+        description=(
+            "List of character offsets of each sentence, only if requested without "
+            "markup and the html does not contain the markup"
+        ),
+        default=None,
+    )
     tokens: List[str] = Field(description="List of tokens in the SourceDocument")
     token_character_offsets: List[Tuple[int, int]] = Field(
         description="List of character offsets of each token"
@@ -57,6 +93,39 @@ class SourceDocumentDataRead(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class SourceDocumentDataRangeUnit(str, Enum):
+    TOKEN = "token"
+    SENTENCE = "sentence"
+
+
+class SourceDocumentDataRange(BaseModel):
+    id: int = Field(description="ID of the SourceDocument")
+    num_tokens: int = Field(description="Number of tokens in the SourceDocument")
+    num_sentences: int = Field(description="Number of sentences in the SourceDocument")
+    token_start: int = Field(description="ID of the first token in the range")
+    token_end: int = Field(description="ID after the last token in the range")
+    sentence_start: int = Field(
+        description="ID of the first sentence (partially) in the range"
+    )
+    sentence_end: int = Field(
+        description="ID after the last sentence (partially) in the range"
+    )
+    content_start: int = Field(
+        description="Character offset of the content of the range in the SourceDocument"
+    )
+    content: str = Field(
+        description="Content of the SourceDocument covering the tokens and sentences"
+    )
+    tokens: List[str] = Field(description="List of tokens in the range")
+    token_character_offsets: List[Tuple[int, int]] = Field(
+        description="List of character offsets of each token in the SourceDocument"
+    )
+    sentences: List[str] = Field(description="List of sentences in the range")
+    sentence_character_offsets: List[Tuple[int, int]] = Field(
+        description="List of character offsets of each sentence in the SourceDocument"
+    )
+
+
 # Properties for creation
 class SourceDocumentDataCreate(SourceDocumentDataBase):
     pass
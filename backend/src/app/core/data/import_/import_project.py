@@ -14,7 +14,7 @@ from typing import (
 
 import numpy as np
 import pandas as pd
-from celery import Task, group
+from celery import Task
 from loguru import logger
 from sqlalchemy.orm import Session
 
@@ -45,6 +45,7 @@ from app.core.data.repo.repo_service import (
 from app.preprocessing.pipeline.model.image.autobbox import AutoBBox
 from app.preprocessing.pipeline.model.text.autosentanno import AutoSentAnno
 from app.preprocessing.pipeline.model.text.autospan import AutoSpan
+from config import conf
 
 
 class ImportSDocFileMissingException(Exception):
@@ -389,17 +390,20 @@ def import_project(
         from app.celery.background_jobs.tasks import (
             execute_audio_preprocessing_pipeline_task,
             execute_image_preprocessing_pipeline_task,
-            execute_text_preprocessing_pipeline_task,
+            execute_text_preprocessing_pipeline_batch_task,
             execute_video_preprocessing_pipeline_task,
         )
 
         assert isinstance(
-            execute_text_preprocessing_pipeline_task, Task
+            execute_text_preprocessing_pipeline_batch_task, Task
         ), "Not a Celery Task"
 
+        text_batch_size = int(conf.celery.preprocessing.text_batch_size)
         tasks = [
-            execute_text_preprocessing_pipeline_task.s(cargo, is_init=False)
-            for cargo in cargos[DocType.text]
+            execute_text_preprocessing_pipeline_batch_task.s(
+                cargos[DocType.text][start : start + text_batch_size], is_init=False
+            )
+            for start in range(0, len(cargos[DocType.text]), text_batch_size)
         ]
 
         # 5. init image pipelines
@@ -438,7 +442,14 @@ def import_project(
             update_dto=PreprocessingJobUpdate(status=BackgroundJobStatus.RUNNING),
         )
         logger.info(f"Starting {len(tasks)} tasks on ppj {ppj.id}")
-        gr = group(*tasks)()
+        from app.celery.background_jobs import apply_preprocessing_tasks_async
+
+        gr = apply_preprocessing_tasks_async(
+            tasks,
+            proj_id=proj_id,
+            num_docs=sum(len(doc_type_cargos) for doc_type_cargos in cargos.values()),
+            num_text_docs=len(cargos[DocType.text]),
+        )
         logger.info(f"-------------{gr}")
 
     except Exception as e:
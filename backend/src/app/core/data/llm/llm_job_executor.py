@@ -0,0 +1,154 @@
+import threading
+import time
+import weakref
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple, TypeVar
+
+from loguru import logger
+
+from app.core.data.dto.llm_job import LLMJobUpdate
+from app.core.db.redis_service import RedisService
+
+InputT = TypeVar("InputT")
+OutputT = TypeVar("OutputT")
+
+# (project id, max. concurrent requests) -> semaphore shared by the executors of this
+# process. A semaphore is dropped as soon as no executor uses it anymore.
+_project_semaphores: weakref.WeakValueDictionary[
+    Tuple[int, int], threading.BoundedSemaphore
+] = weakref.WeakValueDictionary()
+_project_semaphores_lock = threading.Lock()
+
+
+def _get_project_semaphore(
+    project_id: int, max_concurrent_requests: int
+) -> threading.BoundedSemaphore:
+    with _project_semaphores_lock:
+        key = (project_id, max_concurrent_requests)
+        semaphore = _project_semaphores.get(key)
+        if semaphore is None:
+            semaphore = threading.BoundedSemaphore(max_concurrent_requests)
+            _project_semaphores[key] = semaphore
+        return semaphore
+
+
+class LLMRequestExecutor:
+    """
+    Executes the requests of an LLMJob concurrently, so that the model server is kept
+    busy instead of idling while the results of the previous request are processed.
+    At most max_in_flight requests of a job are submitted at a time, and all jobs of a
+    project share max_concurrent_requests_per_project slots, so that a single large
+    job cannot occupy the model server on its own. The slots are shared by the jobs
+    of a single (celery worker) process only, jobs of other processes are not limited.
+    """
+
+    def __init__(
+        self,
+        project_id: int,
+        max_in_flight: int,
+        max_concurrent_requests_per_project: int,
+    ):
+        self.project_id = project_id
+        self.max_in_flight = max(1, max_in_flight)
+        self.project_semaphore = _get_project_semaphore(
+            project_id, max(1, max_concurrent_requests_per_project)
+        )
+
+    def _run(self, fn: Callable[[InputT], OutputT], item: InputT) -> OutputT:
+        with self.project_semaphore:
+            return fn(item)
+
+    def map_unordered(
+        self, fn: Callable[[InputT], OutputT], items: List[InputT]
+    ) -> Iterator[Tuple[int, Optional[OutputT], Optional[Exception]]]:
+        """
+        Applies fn to all items and yields (index of the item, result, error) as soon
+        as a request is finished. The results are yielded in the calling thread, so
+        they can be processed with non thread-safe resources like a DB session.
+        """
+        if len(items) == 0:
+            return
+
+        with ThreadPoolExecutor(
+            max_workers=self.max_in_flight, thread_name_prefix="llm-request"
+        ) as executor:
+            next_idx = 0
+            in_flight: Dict[Future, int] = dict()
+            try:
+                while next_idx < len(items) or len(in_flight) > 0:
+                    # refill the window
+                    while next_idx < len(items) and len(in_flight) < self.max_in_flight:
+                        future = executor.submit(self._run, fn, items[next_idx])
+                        in_flight[future] = next_idx
+                        next_idx += 1
+
+                    done: Set[Future]
+                    done, _ = wait(in_flight.keys(), return_when=FIRST_COMPLETED)
+                    for future in done:
+                        idx = in_flight.pop(future)
+                        error = future.exception()
+                        if error is not None and not isinstance(error, Exception):
+                            raise error
+                        if error is not None:
+                            yield idx, None, error
+                        else:
+                            yield idx, future.result(), None
+            finally:
+                # do not start any more requests if the consumer stopped early
+                for future in in_flight:
+                    future.cancel()
+
+
+class LLMJobProgress:
+    """
+    Batches the step updates of an LLMJob. Instead of a Redis round trip per processed
+    document, the progress is written every flush_steps steps or flush_interval seconds.
+    """
+
+    def __init__(
+        self,
+        llm_job_id: str,
+        flush_steps: int,
+        flush_interval: float,
+    ):
+        self.llm_job_id = llm_job_id
+        self.flush_steps = max(1, flush_steps)
+        self.flush_interval = flush_interval
+        self.redis: RedisService = RedisService()
+
+        self._current_step = self.redis.load_llm_job(key=llm_job_id).current_step
+        self._pending_steps = 0
+        self._description = ""
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def step(self, description: str) -> None:
+        with self._lock:
+            self._pending_steps += 1
+            self._description = description
+            if (
+                self._pending_steps >= self.flush_steps
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            ):
+                self._flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._pending_steps > 0:
+                self._flush()
+
+    def _flush(self) -> None:
+        self._current_step += self._pending_steps
+        self._pending_steps = 0
+        self._last_flush = time.monotonic()
+        try:
+            self.redis.update_llm_job(
+                key=self.llm_job_id,
+                update=LLMJobUpdate(
+                    current_step=self._current_step,
+                    current_step_description=self._description,
+                ),
+            )
+        except Exception as e:
+            # progress updates are informative only and must not fail the job
+            logger.warning(f"Cannot update progress of LLMJob {self.llm_job_id}: {e}")
@@ -0,0 +1,52 @@
+import hashlib
+import json
+from typing import Optional, Type
+
+from loguru import logger
+from pydantic import BaseModel
+
+from app.core.db.redis_service import RedisService
+
+
+class LLMResponseCache:
+    """
+    Content-addressed cache of LLM responses. A response is identified by the model,
+    the system prompt, the user prompt and the response schema, so re-running a job
+    with unchanged prompts on (partly) the same documents does not prompt the model
+    again. The responses are stored in Redis, the least recently used responses are
+    evicted once the cache exceeds max_bytes.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(
+        model: str,
+        system_prompt: str,
+        user_prompt: str,
+        response_model: Type[BaseModel],
+    ) -> str:
+        schema = json.dumps(response_model.model_json_schema(), sort_keys=True)
+        schema_hash = hashlib.sha256(schema.encode("utf-8")).hexdigest()
+        h = hashlib.sha256()
+        for part in (model, system_prompt, user_prompt, schema_hash):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            response = RedisService().load_llm_response(key)
+        except Exception as e:
+            logger.warning(f"Cannot load cached LLM response: {e}")
+            return None
+        return response.decode("utf-8") if response is not None else None
+
+    def put(self, key: str, response: str) -> None:
+        try:
+            RedisService().store_llm_response(
+                key, response.encode("utf-8"), max_bytes=self.max_bytes
+            )
+        except Exception as e:
+            logger.warning(f"Cannot cache LLM response: {e}")
@@ -1,13 +1,13 @@
 from datetime import datetime
-from typing import Callable, Dict, List, Type, Union
+from typing import Callable, Dict, List, Optional, Tuple, Type, TypeVar, Union
 
 from loguru import logger
+from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from app.core.data.crud.code import crud_code
 from app.core.data.crud.sentence_annotation import crud_sentence_anno
 from app.core.data.crud.source_document import crud_sdoc
-from app.core.data.crud.source_document_metadata import crud_sdoc_meta
 from app.core.data.crud.user import (
     ASSISTANT_FEWSHOT_ID,
     ASSISTANT_TRAINED_ID,
@@ -51,6 +51,7 @@ from app.core.data.dto.source_document_metadata import (
     SourceDocumentMetadataReadResolved,
 )
 from app.core.data.dto.span_annotation import SpanAnnotationRead
+from app.core.data.llm.llm_job_executor import LLMJobProgress, LLMRequestExecutor
 from app.core.data.llm.ollama_service import OllamaService
 from app.core.data.llm.prompts.annotation_prompt_builder import (
     AnnotationPromptBuilder,
@@ -70,6 +71,7 @@ from app.core.data.llm.prompts.tagging_prompt_builder import (
     TaggingPromptBuilder,
 )
 from app.core.data.orm.sentence_annotation import SentenceAnnotationORM
+from app.core.data.orm.source_document import SourceDocumentORM
 from app.core.data.repo.repo_service import RepoService
 from app.core.db.redis_service import RedisService
 from app.core.db.sql_service import SQLService
@@ -84,6 +86,9 @@ from config import conf
 
 lac = conf.llm_assistant
 
+T = TypeVar("T", bound=BaseModel)
+R = TypeVar("R")
+
 SYSTEM_USER_IDS = [
     SYSTEM_USER_ID,
     ASSISTANT_ZEROSHOT_ID,
@@ -438,6 +443,83 @@ class LLMService(metaclass=SingletonMeta):
             }
         return prompt_dict
 
+    def _get_language(self, sdoc: Optional[SourceDocumentORM]) -> Optional[str]:
+        if sdoc is None:
+            return None
+        for metadata in sdoc.metadata_:
+            if metadata.project_metadata.key == "language":
+                return metadata.str_value
+        return None
+
+    def _execute_llm_requests(
+        self,
+        *,
+        llm_job_id: str,
+        project_id: int,
+        sdoc_ids: List[int],
+        build_prompts: Callable[[int], Tuple[str, str]],
+        response_model: Type[T],
+        handle_response: Callable[[int, T], R],
+        handle_error: Callable[[int, Exception], R],
+    ) -> Tuple[List[R], int]:
+        """
+        Prompts the model for every sdoc and returns the handled responses in the order
+        of the sdoc_ids, as well as the number of responses served from the cache.
+        Only the requests to the model are executed concurrently, the prompts are built
+        and the responses are handled in the calling thread.
+        """
+        progress = LLMJobProgress(
+            llm_job_id=llm_job_id,
+            flush_steps=int(lac.progress.flush_steps),
+            flush_interval=float(lac.progress.flush_interval),
+        )
+        results: Dict[int, R] = dict()
+        num_cached_responses = 0
+
+        # build the prompts
+        requests: List[Tuple[int, str, str]] = []
+        for idx, sdoc_id in enumerate(sdoc_ids):
+            try:
+                system_prompt, user_prompt = build_prompts(sdoc_id)
+                requests.append((idx, system_prompt, user_prompt))
+            except Exception as e:
+                results[idx] = handle_error(sdoc_id, e)
+                progress.step(f"Processed SDOC id={sdoc_id}")
+
+        # prompt the model
+        executor = LLMRequestExecutor(
+            project_id=project_id,
+            max_in_flight=int(lac.concurrency.max_in_flight),
+            max_concurrent_requests_per_project=int(lac.concurrency.max_per_project),
+        )
+        for request_idx, response, error in executor.map_unordered(
+            lambda request: self.ollamas.cached_chat(
+                system_prompt=request[1],
+                user_prompt=request[2],
+                response_model=response_model,
+            ),
+            requests,
+        ):
+            idx = requests[request_idx][0]
+            sdoc_id = sdoc_ids[idx]
+            try:
+                if error is not None:
+                    raise error
+                assert response is not None
+                chat_response, is_cached = response
+                if is_cached:
+                    num_cached_responses += 1
+                    logger.info(f"Using cached chat response for SDOC id={sdoc_id}")
+                results[idx] = handle_response(sdoc_id, chat_response)
+            except Exception as e:
+                results[idx] = handle_error(sdoc_id, e)
+            progress.step(
+                f"Processed SDOC id={sdoc_id} ({num_cached_responses} cached responses)"
+            )
+        progress.flush()
+
+        return [results[idx] for idx in range(len(sdoc_ids))], num_cached_responses
+
     def _llm_document_tagging(
         self,
         *,
@@ -472,95 +554,89 @@ class LLMService(metaclass=SingletonMeta):
             prompts=approach_parameters.prompts, prompt_builder=prompt_builder
         )
 
-        # read sdocs
-        sdoc_datas = crud_sdoc.read_data_batch(db=db, ids=task_parameters.sdoc_ids)
+        # read sdocs together with their tags and metadata
+        sdoc_ids = task_parameters.sdoc_ids
+        id2data = dict(zip(sdoc_ids, crud_sdoc.read_data_batch(db=db, ids=sdoc_ids)))
+        id2sdoc = dict(
+            zip(
+                sdoc_ids,
+                crud_sdoc.read_batch_with_tags_and_metadata(db=db, ids=sdoc_ids),
+            )
+        )
 
-        # automatic document tagging
-        result: List[DocumentTaggingResult] = []
-        for idx, (sdoc_id, sdoc_data) in enumerate(
-            zip(task_parameters.sdoc_ids, sdoc_datas)
-        ):
-            try:
-                # update job status
-                msg = f"Processing SDOC id={sdoc_id}"
-                self._next_llm_job_step(
-                    llm_job_id=llm_job_id,
-                    description=msg,
+        def build_prompts(sdoc_id: int) -> Tuple[str, str]:
+            sdoc_data = id2data[sdoc_id]
+            if sdoc_data is None:
+                raise ValueError(
+                    f"Could not find SourceDocumentDataORM for sdoc_id {sdoc_id}!"
                 )
-                logger.info(msg)
-
-                if sdoc_data is None:
-                    raise ValueError(
-                        f"Could not find SourceDocumentDataORM for sdoc_id {sdoc_id}!"
-                    )
 
-                # get current tag ids
-                current_tag_ids = [
-                    tag.id
-                    for tag in crud_sdoc.read(db=db, id=sdoc_data.id).document_tags
-                ]
+            language = self._get_language(id2sdoc[sdoc_id])
+            if language is None or language not in prompt_builder.supported_languages:
+                raise ValueError("Language not supported")
 
-                # get language
-                language = crud_sdoc_meta.read_by_sdoc_and_key(
-                    db=db, sdoc_id=sdoc_data.id, key="language"
-                ).str_value
+            # construct prompts
+            system_prompt = prompt_builder.build_system_prompt(
+                system_prompt_template=prompt_dict[language]["system_prompt"]
+            )
+            user_prompt = prompt_builder.build_user_prompt(
+                user_prompt_template=prompt_dict[language]["user_prompt"],
+                document=sdoc_data.content,
+            )
+            return system_prompt, user_prompt
 
-                if (
-                    language is None
-                    or language not in prompt_builder.supported_languages
-                ):
-                    raise ValueError("Language not supported")
+        def handle_response(
+            sdoc_id: int, response: OllamaDocumentTaggingResult
+        ) -> DocumentTaggingResult:
+            logger.info(
+                f"Got chat response! Tags={response.categories}, Reason={response.reasoning}"
+            )
 
-                # construct prompts
-                system_prompt = prompt_builder.build_system_prompt(
-                    system_prompt_template=prompt_dict[language]["system_prompt"]
-                )
-                user_prompt = prompt_builder.build_user_prompt(
-                    user_prompt_template=prompt_dict[language]["user_prompt"],
-                    document=sdoc_data.content,
-                )
+            # get current tag ids
+            sdoc = id2sdoc[sdoc_id]
+            current_tag_ids = (
+                [tag.id for tag in sdoc.document_tags] if sdoc is not None else []
+            )
 
-                # prompt the model
-                response = self.ollamas.chat(
-                    system_prompt=system_prompt,
-                    user_prompt=user_prompt,
-                    response_model=OllamaDocumentTaggingResult,
-                )
-                logger.info(
-                    f"Got chat response! Tags={response.categories}, Reason={response.reasoning}"
-                )
+            # parse result
+            parsed_result = prompt_builder.parse_result(result=response)
 
-                # parse result
-                parsed_result = prompt_builder.parse_result(result=response)
+            return DocumentTaggingResult(
+                status=BackgroundJobStatus.FINISHED,
+                status_message="Document tagging successful",
+                sdoc_id=sdoc_id,
+                suggested_tag_ids=parsed_result.tag_ids,
+                current_tag_ids=current_tag_ids,
+                reasoning=parsed_result.reasoning,
+            )
 
-                result.append(
-                    DocumentTaggingResult(
-                        status=BackgroundJobStatus.FINISHED,
-                        status_message="Document tagging successful",
-                        sdoc_id=sdoc_data.id,
-                        suggested_tag_ids=parsed_result.tag_ids,
-                        current_tag_ids=current_tag_ids,
-                        reasoning=parsed_result.reasoning,
-                    )
-                )
+        def handle_error(sdoc_id: int, e: Exception) -> DocumentTaggingResult:
+            return DocumentTaggingResult(
+                status=BackgroundJobStatus.ERROR,
+                status_message=str(e),
+                sdoc_id=sdoc_id,
+                suggested_tag_ids=[],
+                current_tag_ids=[],
+                reasoning="An error occurred!",
+            )
 
-            except Exception as e:
-                result.append(
-                    DocumentTaggingResult(
-                        status=BackgroundJobStatus.ERROR,
-                        status_message=str(e),
-                        sdoc_id=sdoc_id,
-                        suggested_tag_ids=[],
-                        current_tag_ids=[],
-                        reasoning="An error occurred!",
-                    )
-                )
+        # automatic document tagging
+        result, num_cached_responses = self._execute_llm_requests(
+            llm_job_id=llm_job_id,
+            project_id=project_id,
+            sdoc_ids=sdoc_ids,
+            build_prompts=build_prompts,
+            response_model=OllamaDocumentTaggingResult,
+            handle_response=handle_response,
+            handle_error=handle_error,
+        )
 
         return LLMJobResult(
             llm_job_type=TaskType.DOCUMENT_TAGGING,
             specific_task_result=DocumentTaggingLLMJobResult(
                 llm_job_type=TaskType.DOCUMENT_TAGGING, results=result
             ),
+            num_cached_responses=num_cached_responses,
         )
 
     def _llm_metadata_extraction(
@@ -597,117 +673,108 @@ class LLMService(metaclass=SingletonMeta):
             prompts=approach_parameters.prompts, prompt_builder=prompt_builder
         )
 
-        # read sdocs
-        sdoc_datas = crud_sdoc.read_data_batch(db=db, ids=task_parameters.sdoc_ids)
+        # read sdocs together with their tags and metadata
+        sdoc_ids = task_parameters.sdoc_ids
+        id2data = dict(zip(sdoc_ids, crud_sdoc.read_data_batch(db=db, ids=sdoc_ids)))
+        id2sdoc = dict(
+            zip(
+                sdoc_ids,
+                crud_sdoc.read_batch_with_tags_and_metadata(db=db, ids=sdoc_ids),
+            )
+        )
 
-        # automatic metadata extraction
-        result: List[MetadataExtractionResult] = []
-        for idx, (sdoc_id, sdoc_data) in enumerate(
-            zip(task_parameters.sdoc_ids, sdoc_datas)
-        ):
-            try:
-                # update job status
-                msg = f"Processing SDOC id={sdoc_id}"
-                self._next_llm_job_step(
-                    llm_job_id=llm_job_id,
-                    description=msg,
+        def build_prompts(sdoc_id: int) -> Tuple[str, str]:
+            sdoc_data = id2data[sdoc_id]
+            if sdoc_data is None:
+                raise ValueError(
+                    f"Could not find SourceDocumentDataORM for sdoc_id {sdoc_id}!"
                 )
-                logger.info(msg)
 
-                if sdoc_data is None:
-                    raise ValueError(
-                        f"Could not find SourceDocumentDataORM for sdoc_id {sdoc_id}!"
-                    )
+            language = self._get_language(id2sdoc[sdoc_id])
+            if language is None or language not in prompt_builder.supported_languages:
+                raise ValueError("Language not supported")
 
-                # get current metadata values
-                current_metadata = [
-                    SourceDocumentMetadataReadResolved.model_validate(metadata)
-                    for metadata in crud_sdoc.read(db=db, id=sdoc_data.id).metadata_
-                    if metadata.project_metadata_id
-                    in task_parameters.project_metadata_ids
-                ]
-                current_metadata_dict = {
-                    metadata.project_metadata.id: metadata
-                    for metadata in current_metadata
-                }
-
-                # get language
-                language = crud_sdoc_meta.read_by_sdoc_and_key(
-                    db=db, sdoc_id=sdoc_data.id, key="language"
-                ).str_value
+            # construct prompts
+            system_prompt = prompt_builder.build_system_prompt(
+                system_prompt_template=prompt_dict[language]["system_prompt"]
+            )
+            user_prompt = prompt_builder.build_user_prompt(
+                user_prompt_template=prompt_dict[language]["user_prompt"],
+                document=sdoc_data.content,
+            )
+            return system_prompt, user_prompt
+
+        def handle_response(
+            sdoc_id: int, response: OllamaMetadataExtractionResults
+        ) -> MetadataExtractionResult:
+            logger.info(f"Got chat response! Response={response.data}")
+
+            # get current metadata values
+            sdoc = id2sdoc[sdoc_id]
+            current_metadata = [
+                SourceDocumentMetadataReadResolved.model_validate(metadata)
+                for metadata in (sdoc.metadata_ if sdoc is not None else [])
+                if metadata.project_metadata_id in task_parameters.project_metadata_ids
+            ]
+            current_metadata_dict = {
+                metadata.project_metadata.id: metadata for metadata in current_metadata
+            }
 
-                if (
-                    language is None
-                    or language not in prompt_builder.supported_languages
-                ):
-                    raise ValueError("Language not supported")
+            # transform the response
+            parsed_response = prompt_builder.parse_result(result=response)
 
-                # construct prompts
-                system_prompt = prompt_builder.build_system_prompt(
-                    system_prompt_template=prompt_dict[language]["system_prompt"]
-                )
-                user_prompt = prompt_builder.build_user_prompt(
-                    user_prompt_template=prompt_dict[language]["user_prompt"],
-                    document=sdoc_data.content,
-                )
+            # create correct suggested metadata (map the parsed response to the current metadata)
+            suggested_metadata = []
+            for project_metadata_id in task_parameters.project_metadata_ids:
+                current = current_metadata_dict.get(project_metadata_id)
+                suggestion = parsed_response.get(project_metadata_id)
+                if current is None or suggestion is None:
+                    continue
 
-                # prompt the model
-                response = self.ollamas.chat(
-                    system_prompt=system_prompt,
-                    user_prompt=user_prompt,
-                    response_model=OllamaMetadataExtractionResults,
-                )
-                logger.info(f"Got chat response! Response={response.data}")
-
-                # transform the response
-                parsed_response = prompt_builder.parse_result(result=response)
-
-                # create correct suggested metadata (map the parsed response to the current metadata)
-                suggested_metadata = []
-                for project_metadata_id in task_parameters.project_metadata_ids:
-                    current = current_metadata_dict.get(project_metadata_id)
-                    suggestion = parsed_response.get(project_metadata_id)
-                    if current is None or suggestion is None:
-                        continue
-
-                    suggested_metadata.append(
-                        SourceDocumentMetadataReadResolved.with_value(
-                            sdoc_metadata_id=current.id,
-                            source_document_id=current.source_document_id,
-                            project_metadata=current.project_metadata,
-                            value=suggestion,
-                        )
+                suggested_metadata.append(
+                    SourceDocumentMetadataReadResolved.with_value(
+                        sdoc_metadata_id=current.id,
+                        source_document_id=current.source_document_id,
+                        project_metadata=current.project_metadata,
+                        value=suggestion,
                     )
-                logger.info(
-                    f"Parsed the response! suggested metadata={suggested_metadata}"
                 )
+            logger.info(f"Parsed the response! suggested metadata={suggested_metadata}")
+
+            return MetadataExtractionResult(
+                status=BackgroundJobStatus.FINISHED,
+                status_message="Metadata extraction successful",
+                sdoc_id=sdoc_id,
+                current_metadata=current_metadata,
+                suggested_metadata=suggested_metadata,
+            )
 
-                result.append(
-                    MetadataExtractionResult(
-                        status=BackgroundJobStatus.FINISHED,
-                        status_message="Metadata extraction successful",
-                        sdoc_id=sdoc_data.id,
-                        current_metadata=current_metadata,
-                        suggested_metadata=suggested_metadata,
-                    )
-                )
+        def handle_error(sdoc_id: int, e: Exception) -> MetadataExtractionResult:
+            return MetadataExtractionResult(
+                status=BackgroundJobStatus.ERROR,
+                status_message=str(e),
+                sdoc_id=sdoc_id,
+                current_metadata=[],
+                suggested_metadata=[],
+            )
 
-            except Exception as e:
-                result.append(
-                    MetadataExtractionResult(
-                        status=BackgroundJobStatus.ERROR,
-                        status_message=str(e),
-                        sdoc_id=sdoc_id,
-                        current_metadata=[],
-                        suggested_metadata=[],
-                    )
-                )
+        # automatic metadata extraction
+        result, num_cached_responses = self._execute_llm_requests(
+            llm_job_id=llm_job_id,
+            project_id=project_id,
+            sdoc_ids=sdoc_ids,
+            build_prompts=build_prompts,
+            response_model=OllamaMetadataExtractionResults,
+            handle_response=handle_response,
+            handle_error=handle_error,
+        )
 
         return LLMJobResult(
             llm_job_type=TaskType.METADATA_EXTRACTION,
             specific_task_result=MetadataExtractionLLMJobResult(
                 llm_job_type=TaskType.METADATA_EXTRACTION, results=result
             ),
+            num_cached_responses=num_cached_responses,
         )
 
     def _llm_annotation(
@@ -743,138 +810,130 @@ class LLMService(metaclass=SingletonMeta):
             prompts=approach_parameters.prompts, prompt_builder=prompt_builder
         )
 
-        # read sdocs
-        sdoc_datas = crud_sdoc.read_data_batch(db=db, ids=task_parameters.sdoc_ids)
+        # read sdocs together with their metadata
+        sdoc_ids = task_parameters.sdoc_ids
+        id2data = dict(zip(sdoc_ids, crud_sdoc.read_data_batch(db=db, ids=sdoc_ids)))
+        id2sdoc = dict(
+            zip(
+                sdoc_ids,
+                crud_sdoc.read_batch_with_tags_and_metadata(db=db, ids=sdoc_ids),
+            )
+        )
 
-        # automatic annotation
-        annotation_id = 0
-        result: List[AnnotationResult] = []
-        for idx, (sdoc_id, sdoc_data) in enumerate(
-            zip(task_parameters.sdoc_ids, sdoc_datas)
-        ):
-            try:
-                # update job status
-                msg = f"Processing SDOC id={sdoc_id}"
-                self._next_llm_job_step(
-                    llm_job_id=llm_job_id,
-                    description=msg,
+        def build_prompts(sdoc_id: int) -> Tuple[str, str]:
+            sdoc_data = id2data[sdoc_id]
+            if sdoc_data is None:
+                raise ValueError(
+                    f"Could not find SourceDocumentDataORM for sdoc_id {sdoc_id}!"
                 )
-                logger.info(msg)
 
-                if sdoc_data is None:
-                    raise ValueError(
-                        f"Could not find SourceDocumentDataORM for sdoc_id {sdoc_id}!"
-                    )
+            language = self._get_language(id2sdoc[sdoc_id])
+            if language is None or language not in prompt_builder.supported_languages:
+                raise ValueError("Language not supported")
 
-                # get language
-                language = crud_sdoc_meta.read_by_sdoc_and_key(
-                    db=db, sdoc_id=sdoc_data.id, key="language"
-                ).str_value
+            # construct prompts
+            system_prompt = prompt_builder.build_system_prompt(
+                system_prompt_template=prompt_dict[language]["system_prompt"]
+            )
+            user_prompt = prompt_builder.build_user_prompt(
+                user_prompt_template=prompt_dict[language]["user_prompt"],
+                document=sdoc_data.content,
+            )
+            return system_prompt, user_prompt
 
-                if (
-                    language is None
-                    or language not in prompt_builder.supported_languages
-                ):
-                    raise ValueError("Language not supported")
+        # responses are handled one after another in this thread
+        annotation_id = 0
 
-                # construct prompts
-                system_prompt = prompt_builder.build_system_prompt(
-                    system_prompt_template=prompt_dict[language]["system_prompt"]
-                )
-                user_prompt = prompt_builder.build_user_prompt(
-                    user_prompt_template=prompt_dict[language]["user_prompt"],
-                    document=sdoc_data.content,
-                )
+        def handle_response(
+            sdoc_id: int, response: OllamaAnnotationResults
+        ) -> AnnotationResult:
+            nonlocal annotation_id
+            logger.info(f"Got chat response! Response={response}")
+            sdoc_data = id2data[sdoc_id]
+            assert sdoc_data is not None
+
+            # parse the response
+            parsed_response = prompt_builder.parse_result(result=response)
+
+            # validate the response and create the suggested annotation
+            suggested_annotations: List[SpanAnnotationRead] = []
+            for x in parsed_response:
+                code_id = x.code_id
+                span_text = x.text
+
+                # check if the code_id is valid
+                if code_id not in project_codes:
+                    continue
 
-                # prompt the model
-                response = self.ollamas.chat(
-                    system_prompt=system_prompt,
-                    user_prompt=user_prompt,
-                    response_model=OllamaAnnotationResults,
-                )
-                logger.info(f"Got chat response! Response={response}")
-
-                # parse the response
-                parsed_response = prompt_builder.parse_result(result=response)
-
-                # validate the response and create the suggested annotation
-                suggested_annotations: List[SpanAnnotationRead] = []
-                for x in parsed_response:
-                    code_id = x.code_id
-                    span_text = x.text
-
-                    # check if the code_id is valid
-                    if code_id not in project_codes:
-                        continue
-
-                    document_text = sdoc_data.content.lower()
-                    annotation_text = span_text.lower()
-
-                    # find start and end character of the annotation_text in the document_text
-                    start = document_text.find(annotation_text)
-                    end = start + len(annotation_text)
-                    if start == -1:
-                        continue
-
-                    # find start and end token of the annotation_text in the document_tokens
-                    # create a map of character offsets to token ids
-                    document_token_map = {}  # character offset -> token id
-                    last_character_offset = 0
-                    for token_id, token_end in enumerate(sdoc_data.token_ends):
-                        for i in range(last_character_offset, token_end):
-                            document_token_map[i] = token_id
-                        last_character_offset = token_end
-
-                    begin_token = document_token_map.get(start, -1)
-                    end_token = document_token_map.get(end, -1)
-                    if begin_token == -1 or end_token == -1:
-                        continue
-
-                    # create the suggested annotation
-                    suggested_annotations.append(
-                        SpanAnnotationRead(
-                            id=annotation_id,
-                            sdoc_id=sdoc_data.id,
-                            user_id=ASSISTANT_ZEROSHOT_ID,
-                            begin=start,
-                            end=end,
-                            begin_token=begin_token,
-                            end_token=end_token,
-                            text=span_text,
-                            code_id=code_id,
-                            created=datetime.now(),
-                            updated=datetime.now(),
-                        )
-                    )
-                    annotation_id += 1
-                logger.info(
-                    f"Parsed the response! suggested annotations={suggested_annotations}"
+                document_text = sdoc_data.content.lower()
+                annotation_text = span_text.lower()
+
+                # find start and end character of the annotation_text in the document_text
+                start = document_text.find(annotation_text)
+                end = start + len(annotation_text)
+                if start == -1:
+                    continue
+
+                # find start and end token of the annotation_text in the document_tokens
+                begin_token, end_token = sdoc_data.token_index.char_range_to_span_range(
+                    start, end
                 )
+                if begin_token == -1 or end_token == -1:
+                    continue
 
-                result.append(
-                    AnnotationResult(
-                        status=BackgroundJobStatus.FINISHED,
-                        status_message="Annotation successful",
+                # create the suggested annotation
+                suggested_annotations.append(
+                    SpanAnnotationRead(
+                        id=annotation_id,
                         sdoc_id=sdoc_data.id,
-                        suggested_annotations=suggested_annotations,
+                        user_id=ASSISTANT_ZEROSHOT_ID,
+                        begin=start,
+                        end=end,
+                        begin_token=begin_token,
+                        end_token=end_token,
+                        text=span_text,
+                        code_id=code_id,
+                        created=datetime.now(),
+                        updated=datetime.now(),
                     )
                 )
+                annotation_id += 1
+            logger.info(
+                f"Parsed the response! suggested annotations={suggested_annotations}"
+            )
 
-            except Exception as e:
-                result.append(
-                    AnnotationResult(
-                        status=BackgroundJobStatus.ERROR,
-                        status_message=str(e),
-                        sdoc_id=sdoc_id,
-                        suggested_annotations=[],
-                    )
-                )
+            return AnnotationResult(
+                status=BackgroundJobStatus.FINISHED,
+                status_message="Annotation successful",
+                sdoc_id=sdoc_data.id,
+                suggested_annotations=suggested_annotations,
+            )
+
+        def handle_error(sdoc_id: int, e: Exception) -> AnnotationResult:
+            return AnnotationResult(
+                status=BackgroundJobStatus.ERROR,
+                status_message=str(e),
+                sdoc_id=sdoc_id,
+                suggested_annotations=[],
+            )
+
+        # automatic annotation
+        result, num_cached_responses = self._execute_llm_requests(
+            llm_job_id=llm_job_id,
+            project_id=project_id,
+            sdoc_ids=sdoc_ids,
+            build_prompts=build_prompts,
+            response_model=OllamaAnnotationResults,
+            handle_response=handle_response,
+            handle_error=handle_error,
+        )
 
         return LLMJobResult(
             llm_job_type=TaskType.ANNOTATION,
             specific_task_result=AnnotationLLMJobResult(
                 llm_job_type=TaskType.ANNOTATION, results=result
             ),
+            num_cached_responses=num_cached_responses,
         )
 
     def _llm_sentence_annotation(
@@ -913,8 +972,15 @@ class LLMService(metaclass=SingletonMeta):
             prompts=approach_parameters.prompts, prompt_builder=prompt_builder
         )
 
-        # read sdocs
-        sdoc_datas = crud_sdoc.read_data_batch(db=db, ids=task_parameters.sdoc_ids)
+        # read sdocs together with their metadata
+        sdoc_ids = task_parameters.sdoc_ids
+        id2data = dict(zip(sdoc_ids, crud_sdoc.read_data_batch(db=db, ids=sdoc_ids)))
+        id2sdoc = dict(
+            zip(
+                sdoc_ids,
+                crud_sdoc.read_batch_with_tags_and_metadata(db=db, ids=sdoc_ids),
+            )
+        )
 
         # Delete all existing sentence annotations for the sdocs
         previous_annotations = crud_sentence_anno.read_by_user_sdocs_codes(
@@ -931,164 +997,148 @@ class LLMService(metaclass=SingletonMeta):
             db=db, ids=[sa.id for sa in previous_annotations]
         )
 
-        # automatic annotation
-        annotation_id = 0
-        results: List[SentenceAnnotationResult] = []
-        for idx, (sdoc_id, sdoc_data) in enumerate(
-            zip(task_parameters.sdoc_ids, sdoc_datas)
-        ):
-            try:
-                # update job status
-                msg = f"Processing SDOC id={sdoc_id}"
-                self._next_llm_job_step(
-                    llm_job_id=llm_job_id,
-                    description=msg,
+        def build_prompts(sdoc_id: int) -> Tuple[str, str]:
+            sdoc_data = id2data[sdoc_id]
+            if sdoc_data is None:
+                raise ValueError(
+                    f"Could not find SourceDocumentDataORM for sdoc_id {sdoc_id}!"
                 )
-                logger.info(msg)
 
-                if sdoc_data is None:
-                    raise ValueError(
-                        f"Could not find SourceDocumentDataORM for sdoc_id {sdoc_id}!"
-                    )
-
-                # get language
-                language = crud_sdoc_meta.read_by_sdoc_and_key(
-                    db=db, sdoc_id=sdoc_data.id, key="language"
-                ).str_value
+            language = self._get_language(id2sdoc[sdoc_id])
+            if language is None or language not in prompt_builder.supported_languages:
+                raise ValueError("Language not supported")
 
-                if (
-                    language is None
-                    or language not in prompt_builder.supported_languages
-                ):
-                    raise ValueError("Language not supported")
-
-                # construct prompts
-                system_prompt = prompt_builder.build_system_prompt(
-                    system_prompt_template=prompt_dict[language]["system_prompt"]
-                )
-                # we need to provide documents entence by sentence for sentence annotation
-                document_sentences = "\n".join(
-                    [
-                        f"{idx + 1}: {sentence}"
-                        for idx, sentence in enumerate(sdoc_data.sentences)
-                    ]
-                )
-                num_sentences = len(sdoc_data.sentences)
-                user_prompt = prompt_builder.build_user_prompt(
-                    user_prompt_template=prompt_dict[language]["user_prompt"],
-                    document=document_sentences,
-                )
-
-                # prompt the model
-                response = self.ollamas.chat(
-                    system_prompt=system_prompt,
-                    user_prompt=user_prompt,
-                    response_model=OllamaSentenceAnnotationResults,
-                )
-                logger.info(f"Got chat response! Response={response}")
-
-                # parse the response
-                parsed_response = prompt_builder.parse_result(result=response)
-
-                # validate the response
-                # code ids should be valid and sentence ids should be valid
-                parsed_items = [
-                    (
-                        annotation.sent_id - 1,
-                        annotation.code_id,
-                    )  # LLM starts from 1, we start from 0
-                    for annotation in parsed_response
-                    if annotation.code_id in project_codes
-                    and annotation.sent_id > 0
-                    and annotation.sent_id <= num_sentences
+            # construct prompts
+            system_prompt = prompt_builder.build_system_prompt(
+                system_prompt_template=prompt_dict[language]["system_prompt"]
+            )
+            # we need to provide documents entence by sentence for sentence annotation
+            document_sentences = "\n".join(
+                [
+                    f"{idx + 1}: {sentence}"
+                    for idx, sentence in enumerate(sdoc_data.sentences)
                 ]
+            )
+            user_prompt = prompt_builder.build_user_prompt(
+                user_prompt_template=prompt_dict[language]["user_prompt"],
+                document=document_sentences,
+            )
+            return system_prompt, user_prompt
+
+        def handle_response(
+            sdoc_id: int, response: OllamaSentenceAnnotationResults
+        ) -> SentenceAnnotationResult:
+            logger.info(f"Got chat response! Response={response}")
+            sdoc_data = id2data[sdoc_id]
+            assert sdoc_data is not None
+            num_sentences = len(sdoc_data.sentences)
+
+            # parse the response
+            parsed_response = prompt_builder.parse_result(result=response)
+
+            # validate the response
+            # code ids should be valid and sentence ids should be valid
+            parsed_items = [
+                (
+                    annotation.sent_id - 1,
+                    annotation.code_id,
+                )  # LLM starts from 1, we start from 0
+                for annotation in parsed_response
+                if annotation.code_id in project_codes
+                and annotation.sent_id > 0
+                and annotation.sent_id <= num_sentences
+            ]
 
-                # create the suggested annotation
-                suggested_annotations: List[SentenceAnnotationCreate] = []
-                start = parsed_items[0][0]
-                previous_sentence_id = parsed_items[0][0]
-                previous_code_id = parsed_items[0][1]
-
-                if len(parsed_items) > 1:
-                    for sentence_id, code_id in parsed_items[1:]:
-                        # create annotation if sentence ids mismatch
-                        if previous_sentence_id != sentence_id - 1:
-                            suggested_annotations.append(
-                                SentenceAnnotationCreate(
-                                    sdoc_id=sdoc_data.id,
-                                    sentence_id_start=start,
-                                    sentence_id_end=previous_sentence_id,
-                                    code_id=previous_code_id,
-                                )
+            # create the suggested annotation
+            suggested_annotations: List[SentenceAnnotationCreate] = []
+            start = parsed_items[0][0]
+            previous_sentence_id = parsed_items[0][0]
+            previous_code_id = parsed_items[0][1]
+
+            if len(parsed_items) > 1:
+                for sentence_id, code_id in parsed_items[1:]:
+                    # create annotation if sentence ids mismatch
+                    if previous_sentence_id != sentence_id - 1:
+                        suggested_annotations.append(
+                            SentenceAnnotationCreate(
+                                sdoc_id=sdoc_data.id,
+                                sentence_id_start=start,
+                                sentence_id_end=previous_sentence_id,
+                                code_id=previous_code_id,
                             )
-                            annotation_id += 1
-                            start = sentence_id
-
-                        # create annotation if code ids mismatch
-                        if previous_code_id != code_id:
-                            suggested_annotations.append(
-                                SentenceAnnotationCreate(
-                                    sdoc_id=sdoc_data.id,
-                                    sentence_id_start=start,
-                                    sentence_id_end=previous_sentence_id,
-                                    code_id=previous_code_id,
-                                )
+                        )
+                        start = sentence_id
+
+                    # create annotation if code ids mismatch
+                    if previous_code_id != code_id:
+                        suggested_annotations.append(
+                            SentenceAnnotationCreate(
+                                sdoc_id=sdoc_data.id,
+                                sentence_id_start=start,
+                                sentence_id_end=previous_sentence_id,
+                                code_id=previous_code_id,
                             )
-                            annotation_id += 1
-                            start = sentence_id
-
-                        previous_sentence_id = sentence_id
-                        previous_code_id = code_id
-
-                # create the last annotation
-                suggested_annotations.append(
-                    SentenceAnnotationCreate(
-                        sdoc_id=sdoc_data.id,
-                        sentence_id_start=start,
-                        sentence_id_end=previous_sentence_id,
-                        code_id=previous_code_id,
-                    )
-                )
-                logger.info(
-                    f"Parsed the response! suggested sentence annotations={suggested_annotations}"
+                        )
+                        start = sentence_id
+
+                    previous_sentence_id = sentence_id
+                    previous_code_id = code_id
+
+            # create the last annotation
+            suggested_annotations.append(
+                SentenceAnnotationCreate(
+                    sdoc_id=sdoc_data.id,
+                    sentence_id_start=start,
+                    sentence_id_end=previous_sentence_id,
+                    code_id=previous_code_id,
                 )
+            )
+            logger.info(
+                f"Parsed the response! suggested sentence annotations={suggested_annotations}"
+            )
 
-                # create the suggested annotations
-                created_annos = crud_sentence_anno.create_bulk(
-                    db=db,
-                    user_id=ASSISTANT_FEWSHOT_ID
-                    if is_fewshot
-                    else ASSISTANT_ZEROSHOT_ID,
-                    create_dtos=suggested_annotations,
-                )
+            # create the suggested annotations
+            created_annos = crud_sentence_anno.create_bulk(
+                db=db,
+                user_id=ASSISTANT_FEWSHOT_ID if is_fewshot else ASSISTANT_ZEROSHOT_ID,
+                create_dtos=suggested_annotations,
+            )
 
-                results.append(
-                    SentenceAnnotationResult(
-                        status=BackgroundJobStatus.FINISHED,
-                        status_message="Sentence annotation successful",
-                        sdoc_id=sdoc_data.id,
-                        suggested_annotations=[
-                            SentenceAnnotationRead.model_validate(anno)
-                            for anno in created_annos
-                        ],
-                    )
-                )
+            return SentenceAnnotationResult(
+                status=BackgroundJobStatus.FINISHED,
+                status_message="Sentence annotation successful",
+                sdoc_id=sdoc_data.id,
+                suggested_annotations=[
+                    SentenceAnnotationRead.model_validate(anno)
+                    for anno in created_annos
+                ],
+            )
 
-            except Exception as e:
-                results.append(
-                    SentenceAnnotationResult(
-                        status=BackgroundJobStatus.ERROR,
-                        status_message=str(e),
-                        sdoc_id=sdoc_id,
-                        suggested_annotations=[],
-                    )
-                )
+        def handle_error(sdoc_id: int, e: Exception) -> SentenceAnnotationResult:
+            return SentenceAnnotationResult(
+                status=BackgroundJobStatus.ERROR,
+                status_message=str(e),
+                sdoc_id=sdoc_id,
+                suggested_annotations=[],
+            )
+
+        # automatic annotation
+        results, num_cached_responses = self._execute_llm_requests(
+            llm_job_id=llm_job_id,
+            project_id=project_id,
+            sdoc_ids=sdoc_ids,
+            build_prompts=build_prompts,
+            response_model=OllamaSentenceAnnotationResults,
+            handle_response=handle_response,
+            handle_error=handle_error,
+        )
 
         return LLMJobResult(
             llm_job_type=TaskType.SENTENCE_ANNOTATION,
             specific_task_result=SentenceAnnotationLLMJobResult(
                 llm_job_type=TaskType.SENTENCE_ANNOTATION, results=results
             ),
+            num_cached_responses=num_cached_responses,
         )
 
     def _ray_sentence_annotation(
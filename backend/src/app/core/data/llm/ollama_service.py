@@ -1,9 +1,10 @@
-from typing import Type, TypeVar
+from typing import Optional, Tuple, Type, TypeVar
 
 from loguru import logger
 from ollama import Client
 from pydantic import BaseModel
 
+from app.core.data.llm.llm_response_cache import LLMResponseCache
 from app.util.singleton_meta import SingletonMeta
 from config import conf
 
@@ -46,6 +47,13 @@ class OllamaService(metaclass=SingletonMeta):
 
             cls.__model = model
             cls.__client = ollamac
+            cls.__cache: Optional[LLMResponseCache] = (
+                LLMResponseCache(
+                    max_bytes=int(conf.ollama.response_cache.max_size_mb) * 1024 * 1024
+                )
+                if conf.ollama.response_cache.enabled
+                else None
+            )
 
         except Exception as e:
             msg = f"Cannot instantiate OllamaService - Error '{e}'"
@@ -57,16 +65,47 @@ class OllamaService(metaclass=SingletonMeta):
         return super(OllamaService, cls).__new__(cls)
 
     def chat(self, system_prompt: str, user_prompt: str, response_model: Type[T]) -> T:
+        response, _ = self.cached_chat(
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            response_model=response_model,
+        )
+        return response
+
+    def cached_chat(
+        self, system_prompt: str, user_prompt: str, response_model: Type[T]
+    ) -> Tuple[T, bool]:
+        """
+        Returns the response and whether it was served from the response cache.
+        """
+        system_prompt = system_prompt.strip()
+        user_prompt = user_prompt.strip()
+
+        cache_key = None
+        if self.__cache is not None:
+            cache_key = LLMResponseCache.key(
+                model=self.__model,
+                system_prompt=system_prompt,
+                user_prompt=user_prompt,
+                response_model=response_model,
+            )
+            content = self.__cache.get(cache_key)
+            if content is not None:
+                try:
+                    return response_model.model_validate_json(content), True
+                except ValueError as e:
+                    logger.warning(f"Ignoring invalid cached LLM response: {e}")
+
         response = self.__client.chat(
             model=self.__model,
             messages=[
                 {
                     "role": "system",
-                    "content": system_prompt.strip(),
+                    "content": system_prompt,
                 },
                 {
                     "role": "user",
-                    "content": user_prompt.strip(),
+                    "content": user_prompt,
                 },
             ],
             format=response_model.model_json_schema(),
@@ -74,4 +113,8 @@ class OllamaService(metaclass=SingletonMeta):
         if response.message.content is None:
             raise Exception(f"Ollama response is None: {response}")
 
-        return response_model.model_validate_json(response.message.content)
+        result = response_model.model_validate_json(response.message.content)
+        # only valid responses are cached
+        if self.__cache is not None and cache_key is not None:
+            self.__cache.put(cache_key, response.message.content)
+        return result, False
@@ -0,0 +1,30 @@
+from sqlalchemy import ForeignKey, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.data.orm.orm_base import ORMBase
+
+
+class DuplicatePairORM(ORMBase):
+    # the smaller sdoc id of the pair
+    sdoc_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("sourcedocument.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True,
+    )
+    # the larger sdoc id of the pair
+    duplicate_sdoc_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("sourcedocument.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True,
+    )
+    project_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("project.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+
+    # L1 distance of the word frequency vectors of both documents
+    distance: Mapped[int] = mapped_column(Integer, nullable=False)
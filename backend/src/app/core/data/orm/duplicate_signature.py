@@ -0,0 +1,36 @@
+from typing import TYPE_CHECKING, Optional
+
+from sqlalchemy import ForeignKey, Integer, LargeBinary
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.core.data.orm.orm_base import ORMBase
+
+if TYPE_CHECKING:
+    from app.core.data.orm.source_document import SourceDocumentORM
+
+
+class DuplicateSignatureORM(ORMBase):
+    sdoc_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("sourcedocument.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True,
+    )
+    source_document: Mapped["SourceDocumentORM"] = relationship("SourceDocumentORM")
+
+    project_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("project.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+
+    # total number of words, i.e., the sum of the document's word frequencies
+    num_words: Mapped[int] = mapped_column(Integer, nullable=False)
+    # MinHash signature as raw uint32 bytes
+    signature: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    # the largest max_different_words this document has been compared with all other
+    # documents of the project, None if it has not been compared yet
+    checked_max_different_words: Mapped[Optional[int]] = mapped_column(
+        Integer, nullable=True
+    )
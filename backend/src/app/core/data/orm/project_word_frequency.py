@@ -0,0 +1,29 @@
+from sqlalchemy import BigInteger, ForeignKey, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.data.orm.orm_base import ORMBase
+
+
+class ProjectWordFrequencyORM(ORMBase):
+    """The word frequencies of all SourceDocuments of a project, summed up per word."""
+
+    project_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("project.id", ondelete="CASCADE"), primary_key=True
+    )
+    word: Mapped[str] = mapped_column(String, primary_key=True)
+    # total number of occurrences of the word in the project
+    count: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    # number of SourceDocuments of the project containing the word
+    sdoc_count: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+class ProjectWordFrequencyStatsORM(ORMBase):
+    project_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("project.id", ondelete="CASCADE"), primary_key=True
+    )
+    # total number of words of all SourceDocuments of the project
+    word_count: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    # number of SourceDocuments of the project with word frequencies
+    sdoc_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    # incremented whenever the word frequencies of the project change
+    version: Mapped[int] = mapped_column(Integer, nullable=False)
@@ -1,3 +1,4 @@
+from functools import cached_property
 from typing import TYPE_CHECKING, List, Optional
 
 from sqlalchemy import ForeignKey, Integer, String
@@ -6,6 +7,8 @@ from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.core.data.dto.source_document_data import WordLevelTranscription
 from app.core.data.orm.orm_base import ORMBase
+from app.util.offset_index import OffsetIndex
+from app.util.token_markup import render_token_markup
 
 if TYPE_CHECKING:
     from app.core.data.orm.source_document import SourceDocumentORM
@@ -37,6 +40,14 @@ class SourceDocumentDataORM(ORMBase):
     sentence_ends: Mapped[List[int]] = mapped_column(
         ARRAY(Integer), nullable=False, index=False
     )
+    # character offsets of the tokens in the html, used to render the <t> and <sent>
+    # tags on demand (None if the html already contains the tags)
+    token_html_starts: Mapped[Optional[List[int]]] = mapped_column(
+        ARRAY(Integer), nullable=True, index=False
+    )
+    token_html_ends: Mapped[Optional[List[int]]] = mapped_column(
+        ARRAY(Integer), nullable=True, index=False
+    )
     token_time_starts: Mapped[List[int]] = mapped_column(
         ARRAY(Integer), nullable=True, index=False
     )
@@ -48,6 +59,20 @@ class SourceDocumentDataORM(ORMBase):
     def project_id(self) -> int:
         return self.source_document.project_id
 
+    @property
+    def tagged_html(self) -> str:
+        if self.token_html_starts is None or self.token_html_ends is None:
+            return self.html
+        return render_token_markup(
+            html=self.html,
+            token_starts=self.token_starts,
+            token_ends=self.token_ends,
+            token_html_starts=self.token_html_starts,
+            token_html_ends=self.token_html_ends,
+            sentence_starts=self.sentence_starts,
+            sentence_ends=self.sentence_ends,
+        )
+
     @property
     def tokens(self):
         return [self.content[s:e] for s, e in zip(self.token_starts, self.token_ends)]
@@ -66,15 +91,22 @@ class SourceDocumentDataORM(ORMBase):
     def sentence_character_offsets(self):
         return [(s, e) for s, e in zip(self.sentence_starts, self.sentence_ends)]
 
+    @cached_property
+    def token_index(self) -> OffsetIndex:
+        # cached per instance, i.e., built once per sdoc and session
+        return OffsetIndex(self.token_starts, self.token_ends)
+
+    @cached_property
+    def sentence_index(self) -> OffsetIndex:
+        return OffsetIndex(self.sentence_starts, self.sentence_ends)
+
     @property
-    def sentence_token_starts(self):
-        char2tok = {c: i for i, c in enumerate(self.token_starts)}
-        return [char2tok[s] for s in self.sentence_starts]
+    def sentence_token_starts(self) -> List[int]:
+        return self.token_index.span_starting_at(self.sentence_index.starts).tolist()
 
     @property
-    def sentence_token_ends(self):
-        char2tok = {c: i for i, c in enumerate(self.token_ends)}
-        return [char2tok[e] for e in self.sentence_ends]
+    def sentence_token_ends(self) -> List[int]:
+        return self.token_index.span_ending_at(self.sentence_index.ends).tolist()
 
     @property
     def word_level_transcriptions(self) -> Optional[List[WordLevelTranscription]]:
@@ -1,3 +1,5 @@
+import json
+import time
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Set, Union
 
@@ -13,9 +15,13 @@ from app.core.data.dto.search import (
     ElasticSearchMemoUpdate,
     PaginatedElasticSearchDocumentHits,
 )
+from app.core.db.redis_service import RedisService
 from app.util.singleton_meta import SingletonMeta
 from config import conf
 
+# statuses of bulk items that are worth retrying, connection errors have no status
+_TRANSIENT_BULK_STATUSES = {429, 502, 503, 504, "N/A"}
+
 
 class NoSuchMemoInElasticSearchError(Exception):
     def __init__(self, proj_id: int, memo_id: int):
@@ -216,6 +222,142 @@ class ElasticSearchService(metaclass=SingletonMeta):
         )
         return res["_id"]
 
+    def add_documents_to_index(
+        self, *, proj_id: int, esdocs: List[ElasticSearchDocumentCreate]
+    ) -> List[int]:
+        """
+        Adds the documents to the index with a single bulk request.
+        :return: The IDs of the documents that have been added successfully
+        :rtype: List[int]
+        """
+        index = self.__get_index_name(proj_id=proj_id, index_type="doc")
+        failed_ids = self.__bulk(
+            index=index,
+            actions=[
+                {
+                    "_index": index,
+                    "_id": str(esdoc.sdoc_id),
+                    "_source": esdoc.model_dump(mode="json"),
+                }
+                for esdoc in esdocs
+            ],
+        )
+        logger.debug(
+            f"Added {len(esdocs) - len(failed_ids)} Documents to Index '{index}'!"
+        )
+        return [
+            esdoc.sdoc_id for esdoc in esdocs if str(esdoc.sdoc_id) not in failed_ids
+        ]
+
+    def __bulk(self, *, index: str, actions: List[Dict[str, Any]]) -> Set[str]:
+        """
+        Indexes the actions with streaming bulk requests of chunk_size actions. Actions
+        that fail with a transient error (e.g. 429 or 503) are retried max_retries
+        times with exponential backoff.
+        :return: The IDs of the actions that failed
+        :rtype: Set[str]
+        """
+        bc = conf.elasticsearch.bulk
+        max_retries = int(bc.max_retries)
+        initial_backoff = float(bc.initial_backoff)
+
+        failed: Dict[str, Dict[str, Any]] = dict()
+        for attempt in range(max_retries + 1):
+            errors: Dict[str, Dict[str, Any]] = dict()
+            for _, item in helpers.streaming_bulk(
+                self.__client,
+                actions,
+                chunk_size=int(bc.chunk_size),
+                max_chunk_bytes=int(bc.max_chunk_bytes),
+                raise_on_error=False,
+                raise_on_exception=False,
+                # rejected (429) actions are already retried by streaming_bulk
+                max_retries=max_retries,
+                initial_backoff=initial_backoff,
+                yield_ok=False,
+            ):
+                error = next(iter(item.values()))
+                errors[str(error["_id"])] = error
+
+            retry_ids = {
+                id
+                for id, error in errors.items()
+                if error.get("status") in _TRANSIENT_BULK_STATUSES
+            }
+            failed.update(
+                {id: error for id, error in errors.items() if id not in retry_ids}
+            )
+            if len(retry_ids) == 0 or attempt == max_retries:
+                failed.update({id: errors[id] for id in retry_ids})
+                break
+
+            actions = [action for action in actions if action["_id"] in retry_ids]
+            backoff = initial_backoff * 2**attempt
+            logger.warning(
+                f"Retrying {len(actions)} failed actions on Index '{index}' "
+                f"in {backoff}s ..."
+            )
+            time.sleep(backoff)
+
+        for error in failed.values():
+            logger.error(f"Cannot index Document in Index '{index}': {error}")
+        return set(failed.keys())
+
+    def begin_bulk_indexing(self, *, proj_id: int, job_id: str) -> None:
+        """
+        Prepares the document index of the project for a large import: the refresh is
+        disabled (or set to the configured refresh_interval) and the replicas are
+        removed until end_bulk_indexing is called with the same job_id. Concurrent
+        imports are tracked by their job ids, so the original settings are restored
+        after the last import.
+        """
+        index = self.__get_index_name(proj_id=proj_id, index_type="doc")
+        rs = RedisService()
+        if rs.acquire_bulk_indexing(index, job_id):
+            settings = self.__client.indices.get_settings(
+                index=index,
+                name="index.refresh_interval,index.number_of_replicas",
+                flat_settings=True,
+            )[index]["settings"]
+            rs.store_bulk_indexing_settings(index, json.dumps(settings))
+            logger.info(f"Stored the settings of Index '{index}': {settings}")
+        # also if other imports are running, their settings may be being restored
+        self.__client.indices.put_settings(
+            index=index,
+            body={
+                "index.refresh_interval": str(conf.elasticsearch.bulk.refresh_interval),
+                "index.number_of_replicas": 0,
+            },
+        )
+        logger.info(f"Started bulk indexing job {job_id} on Index '{index}'")
+
+    def end_bulk_indexing(self, *, proj_id: int, job_id: str) -> None:
+        """
+        Restores the settings of the document index that were changed by
+        begin_bulk_indexing after the last concurrent import and refreshes the index.
+        Ending a job again has no effect.
+        """
+        index = self.__get_index_name(proj_id=proj_id, index_type="doc")
+        rs = RedisService()
+        settings = rs.release_bulk_indexing(index, job_id)
+        if settings is None:
+            return
+        settings = json.loads(settings)
+        if self.__client.indices.exists(index=index):
+            self.__client.indices.put_settings(
+                index=index,
+                body={
+                    # settings that were not set explicitly are reset to their default
+                    "index.refresh_interval": settings.get("index.refresh_interval"),
+                    "index.number_of_replicas": settings.get(
+                        "index.number_of_replicas"
+                    ),
+                },
+            )
+            self.__client.indices.refresh(index=index)
+        rs.restored_bulk_indexing(index)
+        logger.info(f"Finished bulk indexing on Index '{index}' (restored {settings})")
+
     def delete_document_from_index(self, proj_id: int, sdoc_id: int) -> None:
         self.__client.delete(
             index=self.__get_index_name(proj_id=proj_id, index_type="doc"),
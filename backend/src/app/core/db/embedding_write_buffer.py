@@ -0,0 +1,132 @@
+import pickle
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+from app.core.db.index_type import IndexType
+from app.core.db.redis_service import RedisService
+from app.core.db.vector_index_service import VectorIndexService
+
+
+class EmbeddingWriteBuffer:
+    """
+    Collects the embeddings of many SDocs, pushed by many pipeline executions in any
+    worker, in Redis and writes them to the vector index in bulk, once flush_size
+    SDocs are pending or the oldest pending SDoc waits for flush_interval seconds.
+    The state of every SDoc is tracked in Redis: a flush claims the pending
+    embeddings and acknowledges them after writing them, embeddings of a failed (or
+    crashed) flush are released and written again. Writing the embeddings of an SDoc
+    again replaces them, so they are neither lost nor duplicated. Embeddings that
+    were discarded while they were written are removed from the index again.
+    Buffered embeddings are not searchable until they are flushed, i.e., for up to
+    flush_interval seconds (or longer if the flush is delayed by other flushes).
+    """
+
+    def __init__(
+        self,
+        index: VectorIndexService,
+        flush_size: int,
+        flush_interval: float,
+        claim_timeout: float,
+        schedule_flush: Optional[Callable[[float], None]] = None,
+    ):
+        self.index = index
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.claim_timeout = claim_timeout
+        # schedules a flush after the given delay, e.g. as a celery task
+        self.schedule_flush = schedule_flush
+
+    @staticmethod
+    def _key(proj_id: int, sdoc_id: int) -> str:
+        return f"{proj_id}:{sdoc_id}"
+
+    def push(
+        self, proj_id: int, sdoc_id: int, embeddings: Dict[IndexType, np.ndarray]
+    ) -> None:
+        payload = pickle.dumps(
+            {
+                type: np.asarray(embs, dtype=np.float32)
+                for type, embs in embeddings.items()
+            },
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+        # the pushing pipeline flushes after its execution if a flush is due (see
+        # flush), so the write is not part of its steps
+        RedisService().push_embeddings(self._key(proj_id, sdoc_id), payload)
+        if self.schedule_flush is not None and (
+            RedisService().schedule_embedding_buffer_flush(self.flush_interval)
+        ):
+            # makes sure that the last embeddings of an import are flushed, too
+            self.schedule_flush(self.flush_interval)
+
+    def discard_sdoc(self, sdoc_id: int) -> None:
+        RedisService().discard_embeddings(f"*:{sdoc_id}")
+
+    def discard_project(self, proj_id: int) -> None:
+        RedisService().discard_embeddings(f"{proj_id}:*")
+
+    def _is_due(self, force: bool) -> bool:
+        num_pending, _, oldest_push, oldest_claim = (
+            RedisService().get_embedding_buffer_state()
+        )
+        now = time.time()
+        # claims of crashed flushes are released by the next claim
+        if oldest_claim is not None and now - oldest_claim >= self.claim_timeout:
+            return True
+        if num_pending == 0:
+            return False
+        return (
+            force
+            or num_pending >= self.flush_size
+            or (oldest_push is not None and now - oldest_push >= self.flush_interval)
+        )
+
+    def flush(self, force: bool = False) -> int:
+        """
+        Writes the pending embeddings in batches of flush_size SDocs as long as a
+        flush is due (or, if force is set, any embeddings are pending). Returns the
+        number of written SDocs.
+        """
+        rs = RedisService()
+        num_flushed = 0
+        while self._is_due(force):
+            claimed = rs.claim_embeddings(self.flush_size, self.claim_timeout)
+            if len(claimed) == 0:
+                # the pending embeddings are claimed by other flushes
+                break
+            keys = [key for key, _ in claimed]
+            try:
+                type2entries: Dict[IndexType, List[Tuple[int, int, np.ndarray]]] = (
+                    dict()
+                )
+                for key, payload in claimed:
+                    proj_id, sdoc_id = map(int, key.split(":"))
+                    for type, embs in pickle.loads(payload).items():
+                        type2entries.setdefault(type, []).append(
+                            (proj_id, sdoc_id, embs)
+                        )
+                for type, entries in type2entries.items():
+                    self.index.add_embeddings_to_index_batch(type, entries)
+            except Exception:
+                rs.release_embeddings(keys)
+                raise
+            discarded = set(rs.ack_embeddings(keys))
+            if len(discarded) > 0:
+                # the SDocs were removed meanwhile, possibly before they were written
+                for type, entries in type2entries.items():
+                    for proj_id, sdoc_id, _ in entries:
+                        if self._key(proj_id, sdoc_id) in discarded:
+                            self.index.remove_embeddings_from_index(type, sdoc_id)
+                logger.debug(
+                    f"Removed the embeddings of {len(discarded)} discarded SDocs"
+                )
+            num_flushed += len(keys)
+            logger.debug(f"Flushed the embeddings of {len(keys)} SDocs to the Index")
+
+        if self.schedule_flush is not None and rs.get_embedding_buffer_state()[1] > 0:
+            # other flushes are running, check again once their claims would expire
+            self.schedule_flush(self.claim_timeout)
+        return num_flushed
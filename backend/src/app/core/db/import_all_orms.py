@@ -7,6 +7,8 @@ from app.core.data.orm.bbox_annotation import BBoxAnnotationORM
 from app.core.data.orm.code import CodeORM
 from app.core.data.orm.concept_over_time_analysis import ConceptOverTimeAnalysisORM
 from app.core.data.orm.document_tag import DocumentTagORM
+from app.core.data.orm.duplicate_pair import DuplicatePairORM
+from app.core.data.orm.duplicate_signature import DuplicateSignatureORM
 from app.core.data.orm.memo import MemoORM
 from app.core.data.orm.object_handle import ObjectHandleORM
 from app.core.data.orm.orm_base import ORMBase
@@ -14,6 +16,10 @@ from app.core.data.orm.preprocessing_job import PreprocessingJobORM
 from app.core.data.orm.preprocessing_job_payload import PreprocessingJobPayloadORM
 from app.core.data.orm.project import ProjectORM, ProjectUserLinkTable
 from app.core.data.orm.project_metadata import ProjectMetadataORM
+from app.core.data.orm.project_word_frequency import (
+    ProjectWordFrequencyORM,
+    ProjectWordFrequencyStatsORM,
+)
 from app.core.data.orm.refresh_token import RefreshTokenORM
 from app.core.data.orm.sentence_annotation import SentenceAnnotationORM
 from app.core.data.orm.source_document import SourceDocumentORM
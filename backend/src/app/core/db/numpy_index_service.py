@@ -0,0 +1,575 @@
+import fcntl
+import os
+import shutil
+import threading
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+from app.core.data.dto.search import SimSearchImageHit, SimSearchSentenceHit
+from app.core.db.index_type import IndexType
+from app.core.db.vector_index_service import VectorIndexService
+from app.core.db.vector_quantization import Int8Quantizer
+from config import conf
+
+nc = conf.vector_index.numpy
+qc = conf.vector_index.quantization
+
+
+class _IVF:
+    """
+    Inverted file index: the rows are clustered with k-means and a query only
+    searches the rows of its nprobe closest clusters. Rows that were appended
+    after the index was built are always searched exhaustively. The index is built
+    when the records are written, never when they are searched.
+    """
+
+    def __init__(self, centroids: np.ndarray, assignments: np.ndarray, ino: int):
+        self.centroids = centroids
+        self.assignments = assignments
+        self.ino = ino
+
+    @property
+    def num_rows(self) -> int:
+        return len(self.assignments)
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, ino: int, chunk_size: int) -> "_IVF":
+        n = len(vectors)
+        num_lists = max(1, int(np.sqrt(n)))
+        rng = np.random.default_rng(0)
+        sample = np.asarray(
+            vectors[np.sort(rng.choice(n, size=min(n, 64 * num_lists), replace=False))],
+            dtype=np.float32,
+        )
+        centroids = sample[rng.choice(len(sample), size=num_lists, replace=False)]
+        for _ in range(10):
+            labels = (sample @ centroids.T).argmax(axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=num_lists)[:, None]
+            # empty clusters keep their centroid
+            centroids = np.where(counts > 0, sums / np.maximum(counts, 1), centroids)
+            centroids /= np.maximum(
+                np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12
+            )
+
+        assignments = np.empty(n, dtype=np.int32)
+        for start in range(0, n, chunk_size):
+            chunk = np.asarray(vectors[start : start + chunk_size], dtype=np.float32)
+            assignments[start : start + chunk_size] = (chunk @ centroids.T).argmax(
+                axis=1
+            )
+        return cls(centroids=centroids, assignments=assignments, ino=ino)
+
+    def save(self, path: Path) -> None:
+        tmp_path = path.with_name(f"{path.name}.{uuid.uuid4()}.tmp.npz")
+        np.savez(
+            tmp_path,
+            centroids=self.centroids,
+            assignments=self.assignments,
+            ino=np.asarray(self.ino),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "_IVF":
+        with np.load(path) as data:
+            return cls(
+                centroids=data["centroids"],
+                assignments=data["assignments"],
+                ino=int(data["ino"]),
+            )
+
+    def candidate_rows(self, query_emb: np.ndarray, nprobe: int, n: int) -> np.ndarray:
+        probes = np.argsort(-(self.centroids @ query_emb))[:nprobe]
+        # the index may contain rows that were appended after the records were mapped
+        rows = np.flatnonzero(np.isin(self.assignments[:n], probes))
+        # rows appended after the index was built
+        return np.concatenate([rows, np.arange(self.num_rows, n)])
+
+
+class NumpyIndexService(VectorIndexService):
+    """
+    Embedded vector index without a separate vector DB. The embeddings of every
+    project and index type are stored in an append-only file of (sdoc_id,
+    sentence_id, vector) records in the repo, which is memory-mapped for search.
+    Searches are exact (batched matrix products and argpartition), large indices can
+    optionally be searched approximately with an inverted file index (IVF). With int8
+    quantization, the candidates are found with the quantized embeddings (a sidecar
+    file of the records) and re-ranked with the full-precision embeddings.
+    """
+
+    def __new__(cls, *args, **kwargs):
+        cls._root = Path(conf.repo.root_directory) / "vector_index"
+        cls._dim = int(nc.dim)
+        cls._dtype = np.dtype(nc.dtype)
+        cls._record_dtype = np.dtype(
+            [
+                ("sdoc_id", "<i4"),
+                ("sentence_id", "<i4"),
+                ("vec", cls._dtype, (cls._dim,)),
+            ]
+        )
+        cls._chunk_size = int(nc.chunk_size)
+        cls._ivf_min_size = int(nc.ivf.min_size)
+        cls._ivf_nprobe = int(nc.ivf.nprobe)
+        cls._quantizer: Optional[Int8Quantizer] = None
+        match qc.type:
+            case "none":
+                pass
+            case "int8":
+                cls._quantizer = Int8Quantizer(cls._dim)
+            case _:
+                msg = f"Unknown vector index quantization: {qc.type}"
+                logger.error(msg)
+                raise SystemExit(msg)
+        cls._oversampling = int(qc.oversampling)
+
+        # path -> (inode, size, memory-mapped records)
+        cls._mmaps: Dict[Path, Tuple[int, int, np.ndarray]] = dict()
+        # path -> (inode, size, sorted (sdoc_id, sentence_id) keys, sorting order)
+        cls._sorted_keys: Dict[Path, Tuple[int, int, np.ndarray, np.ndarray]] = dict()
+        # path -> (inode of the IVF file, IVF)
+        cls._ivfs: Dict[Path, Tuple[int, _IVF]] = dict()
+        cls._lock = threading.Lock()
+
+        try:
+            if kwargs["flush"] if "flush" in kwargs else False:
+                logger.warning("Flushing DATS Numpy Vector Index!")
+                shutil.rmtree(cls._root, ignore_errors=True)
+            cls._root.mkdir(parents=True, exist_ok=True)
+        except Exception as e:
+            msg = f"Cannot initialize the Numpy Vector Index - Error '{e}'"
+            logger.error(msg)
+            raise SystemExit(msg)
+
+        return super(NumpyIndexService, cls).__new__(cls)
+
+    def _path(self, type: IndexType, proj_id: int) -> Path:
+        return self._root / f"project_{proj_id}" / f"{type}.bin"
+
+    @contextmanager
+    def _write_lock(self, path: Path) -> Iterator[None]:
+        # serializes the writes of all processes
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path.with_suffix(".lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _records(self, path: Path) -> Optional[np.ndarray]:
+        """
+        Returns the memory-mapped records of the file, or None if there are none.
+        """
+        entry = self._mmap(path, self._record_dtype)
+        return entry[1] if entry is not None else None
+
+    def _mmap(self, path: Path, dtype: np.dtype) -> Optional[Tuple[int, np.ndarray]]:
+        """
+        Returns the inode and the memory-mapped records of the file, or None if there
+        are no records.
+        """
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        # ignore a partially appended record
+        num_records = stat.st_size // dtype.itemsize
+        if num_records == 0:
+            return None
+        with self._lock:
+            cached = self._mmaps.get(path)
+            if (
+                cached is not None
+                and cached[0] == stat.st_ino
+                and cached[1] == num_records
+            ):
+                return cached[0], cached[2]
+            records = np.memmap(path, dtype=dtype, mode="r", shape=(num_records,))
+            self._mmaps[path] = (stat.st_ino, num_records, records)
+            return stat.st_ino, records
+
+    def _normalize(self, embs: np.ndarray) -> np.ndarray:
+        embs = np.asarray(embs, dtype=np.float32)
+        norms = np.linalg.norm(embs, axis=-1, keepdims=True)
+        return embs / np.maximum(norms, 1e-12)
+
+    def _rewrite_without(self, path: Path, remove: np.ndarray) -> None:
+        """
+        Rewrites the file without the records where remove is True. Must hold the lock.
+        """
+        records = np.fromfile(path, dtype=self._record_dtype)[: len(remove)]
+        tmp_path = path.with_name(f"{path.name}.{uuid.uuid4()}.tmp")
+        records[~remove].tofile(tmp_path)
+        # readers keep using the old file (mapping) until they notice the new inode
+        os.replace(tmp_path, path)
+        for quantized_path in path.parent.glob(f"{path.stem}.*.int8"):
+            quantized_path.unlink(missing_ok=True)
+
+    def _get_quantized(self, path: Path, ino: int, records: np.ndarray) -> np.ndarray:
+        """
+        Returns the quantized embeddings of the records. They are stored in a sidecar
+        file per version (inode) of the records file, which is extended on demand.
+        """
+        assert self._quantizer is not None
+        dtype = self._quantizer.dtype
+        quantized_path = path.with_name(f"{path.stem}.{ino}.int8")
+        entry = self._mmap(quantized_path, dtype)
+        if entry is None or len(entry[1]) < len(records):
+            with self._write_lock(path):
+                # another process may have encoded (some of) the records meanwhile
+                num_encoded = (
+                    os.path.getsize(quantized_path) // dtype.itemsize
+                    if quantized_path.exists()
+                    else 0
+                )
+                with open(quantized_path, "ab") as f:
+                    f.truncate(num_encoded * dtype.itemsize)
+                    for start in range(num_encoded, len(records), self._chunk_size):
+                        end = min(start + self._chunk_size, len(records))
+                        encoded = self._quantizer.encode(records["vec"][start:end])
+                        f.write(encoded.tobytes())
+            entry = self._mmap(quantized_path, dtype)
+            assert entry is not None
+        return entry[1][: len(records)]
+
+    def add_embeddings_to_index(
+        self, type: IndexType, proj_id: int, sdoc_id: int, embeddings: List[np.ndarray]
+    ):
+        logger.debug(f"Adding {type} SDoc {sdoc_id} in Project {proj_id} to Index ...")
+        self.add_embeddings_to_index_batch(
+            type, [(proj_id, sdoc_id, np.stack(embeddings))]
+        )
+
+    def add_embeddings_to_index_batch(
+        self,
+        type: IndexType,
+        entries: List[Tuple[int, int, np.ndarray]],
+    ) -> None:
+        proj_id2records: Dict[int, List[np.ndarray]] = dict()
+        for proj_id, sdoc_id, embeddings in entries:
+            embs = self._normalize(embeddings).reshape(-1, self._dim)
+            new_records = np.zeros(len(embs), dtype=self._record_dtype)
+            new_records["sdoc_id"] = sdoc_id
+            new_records["sentence_id"] = np.arange(len(embs))
+            new_records["vec"] = embs
+            proj_id2records.setdefault(proj_id, []).append(new_records)
+
+        for proj_id, records_list in proj_id2records.items():
+            new_records = np.concatenate(records_list)
+            path = self._path(type, proj_id)
+            with self._write_lock(path):
+                # adding a document again replaces its embeddings
+                records = self._records(path)
+                if records is not None:
+                    existing = np.isin(records["sdoc_id"], new_records["sdoc_id"])
+                    if existing.any():
+                        self._rewrite_without(path, existing)
+                with open(path, "ab") as f:
+                    f.write(new_records.tobytes())
+                self._refresh_ivf(path)
+
+    def remove_embeddings_from_index(self, type: IndexType, sdoc_id: int):
+        # the project of the sdoc is unknown, so all projects are checked
+        for path in self._root.glob(f"project_*/{type}.bin"):
+            records = self._records(path)
+            if records is None or not (records["sdoc_id"] == sdoc_id).any():
+                continue
+            with self._write_lock(path):
+                records = self._records(path)
+                if records is not None:
+                    self._rewrite_without(path, records["sdoc_id"] == sdoc_id)
+                    self._refresh_ivf(path)
+
+    def remove_project_from_index(self, proj_id: int):
+        logger.debug(f"Removing all embeddings of Project {proj_id}!")
+        shutil.rmtree(self._root / f"project_{proj_id}", ignore_errors=True)
+
+    def get_embeddings(
+        self, proj_id: int, index_type: IndexType
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns the sdoc ids, sentence ids and embeddings of the index without copying
+        them. The returned arrays are read-only views of the memory-mapped file.
+        """
+        records = self._records(self._path(index_type, proj_id))
+        if records is None:
+            return (
+                np.zeros(0, dtype=np.int32),
+                np.zeros(0, dtype=np.int32),
+                np.zeros((0, self._dim), dtype=self._dtype),
+            )
+        return records["sdoc_id"], records["sentence_id"], records["vec"]
+
+    def _load_ivf(self, path: Path) -> Optional[_IVF]:
+        """
+        Returns the IVF of the file, which is reloaded if another process rebuilt it.
+        """
+        ivf_path = path.with_suffix(".ivf.npz")
+        try:
+            ivf_ino = os.stat(ivf_path).st_ino
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            cached = self._ivfs.get(path)
+        if cached is not None and cached[0] == ivf_ino:
+            return cached[1]
+        ivf = _IVF.load(ivf_path)
+        with self._lock:
+            self._ivfs[path] = (ivf_ino, ivf)
+        return ivf
+
+    def _refresh_ivf(self, path: Path) -> None:
+        """
+        Rebuilds the IVF of the file if the file was rewritten or too many rows were
+        appended since it was built. Must hold the lock.
+        """
+        entry = self._mmap(path, self._record_dtype)
+        if entry is None or len(entry[1]) < self._ivf_min_size:
+            path.with_suffix(".ivf.npz").unlink(missing_ok=True)
+            return
+        ino, records = entry
+        ivf = self._load_ivf(path)
+        if ivf is not None and ivf.ino == ino and ivf.num_rows >= 0.8 * len(records):
+            return
+        logger.info(f"Building IVF index for {path} with {len(records)} rows ...")
+        ivf = _IVF.build(records["vec"], ino=ino, chunk_size=self._chunk_size)
+        ivf.save(path.with_suffix(".ivf.npz"))
+
+    def _get_ivf(self, path: Path, ino: int, records: np.ndarray) -> Optional[_IVF]:
+        if len(records) < self._ivf_min_size:
+            return None
+        ivf = self._load_ivf(path)
+        # the IVF of a rewritten file is outdated until the writer rebuilt it
+        if ivf is None or ivf.ino != ino:
+            return None
+        return ivf
+
+    def _get_sorted_keys(
+        self, path: Path
+    ) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Returns the records of the file, their sorted (sdoc_id, sentence_id) keys and
+        the order that sorts them. The keys are sorted once per version of the file.
+        """
+        entry = self._mmap(path, self._record_dtype)
+        if entry is None:
+            return None
+        ino, records = entry
+        with self._lock:
+            cached = self._sorted_keys.get(path)
+        if cached is not None and cached[0] == ino and cached[1] == len(records):
+            return records, cached[2], cached[3]
+        keys = (records["sdoc_id"].astype(np.int64) << 32) | records["sentence_id"]
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        with self._lock:
+            self._sorted_keys[path] = (ino, len(records), sorted_keys, order)
+        return records, sorted_keys, order
+
+    def _search(
+        self,
+        path: Path,
+        query_embs: np.ndarray,
+        sdoc_ids_to_search: Optional[List[int]],
+        top_k: int,
+        threshold: float,
+    ) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Returns the rows of the top_k records of every query, their scores and the
+        records themselves, sorted by descending score.
+        """
+        entry = self._mmap(path, self._record_dtype)
+        if entry is None or top_k <= 0:
+            empty = np.zeros(0, dtype=self._record_dtype)
+            return [
+                (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32), empty)
+                for _ in query_embs
+            ]
+        ino, records = entry
+        query_embs = self._normalize(query_embs).reshape(-1, self._dim)
+        allowed = (
+            np.isin(records["sdoc_id"], sdoc_ids_to_search)
+            if sdoc_ids_to_search is not None
+            else None
+        )
+
+        # with quantization, the top_k * oversampling candidates are re-ranked
+        quantized = (
+            self._get_quantized(path, ino, records)
+            if self._quantizer is not None
+            else None
+        )
+        num_candidates = top_k * self._oversampling if quantized is not None else top_k
+
+        def scores(query_embs: np.ndarray, rows: slice | np.ndarray) -> np.ndarray:
+            if quantized is not None:
+                return self._quantizer.scores(quantized[rows], query_embs)  # type: ignore
+            return query_embs @ np.asarray(records["vec"][rows], dtype=np.float32).T
+
+        candidates: List[Tuple[np.ndarray, np.ndarray]] = []
+        ivf = self._get_ivf(path, ino, records)
+        if ivf is not None:
+            # approximate search, one query at a time
+            for query_emb in query_embs:
+                rows = ivf.candidate_rows(query_emb, self._ivf_nprobe, len(records))
+                if allowed is not None:
+                    rows = rows[allowed[rows]]
+                candidates.append(
+                    self._top(rows, scores(query_emb[None], rows)[0], num_candidates)
+                )
+        else:
+            # exact search with batched matrix products over chunks of the records
+            best_rows = [np.zeros(0, dtype=np.int64) for _ in query_embs]
+            best_scores = [np.zeros(0, dtype=np.float32) for _ in query_embs]
+            for start in range(0, len(records), self._chunk_size):
+                chunk = slice(start, start + self._chunk_size)
+                chunk_scores = scores(query_embs, chunk)
+                if allowed is not None:
+                    chunk_scores[:, ~allowed[chunk]] = -np.inf
+                k = min(num_candidates, chunk_scores.shape[1])
+                top = np.argpartition(-chunk_scores, k - 1, axis=1)[:, :k]
+                for q in range(len(query_embs)):
+                    best_rows[q] = np.concatenate([best_rows[q], top[q] + start])
+                    best_scores[q] = np.concatenate(
+                        [best_scores[q], chunk_scores[q, top[q]]]
+                    )
+            candidates = [
+                self._top(rows, row_scores, num_candidates)
+                for rows, row_scores in zip(best_rows, best_scores)
+            ]
+
+        results = []
+        for query_emb, (rows, row_scores) in zip(query_embs, candidates):
+            if quantized is not None:
+                # re-rank with the full-precision embeddings
+                row_scores = (
+                    np.asarray(records["vec"][rows], dtype=np.float32) @ query_emb
+                )
+            results.append(self._select(rows, row_scores, top_k, threshold, records))
+        return results
+
+    def _top(
+        self, rows: np.ndarray, scores: np.ndarray, k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        # -inf marks the records that must not be returned
+        keep = np.isfinite(scores)
+        rows, scores = rows[keep], scores[keep]
+        if len(rows) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            rows, scores = rows[top], scores[top]
+        return rows, scores
+
+    def _select(
+        self,
+        rows: np.ndarray,
+        scores: np.ndarray,
+        top_k: int,
+        threshold: float,
+        records: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        keep = scores >= threshold
+        rows, scores = self._top(rows[keep], scores[keep], top_k)
+        order = np.argsort(-scores, kind="stable")
+        rows, scores = rows[order], scores[order]
+        return rows, scores, records[rows]
+
+    def search_index(
+        self,
+        proj_id: int,
+        index_type: IndexType,
+        query_emb: np.ndarray,
+        sdoc_ids_to_search: List[int] | None,
+        top_k: int = 10,
+        threshold: float = 0.0,
+    ) -> List[SimSearchSentenceHit] | List[SimSearchImageHit]:
+        _, scores, records = self._search(
+            self._path(index_type, proj_id),
+            query_emb.reshape(1, -1),
+            sdoc_ids_to_search,
+            top_k,
+            threshold,
+        )[0]
+        if index_type == IndexType.IMAGE:
+            return [
+                SimSearchImageHit(sdoc_id=int(r["sdoc_id"]), score=float(s))
+                for r, s in zip(records, scores)
+            ]
+        else:
+            return [
+                SimSearchSentenceHit(
+                    sdoc_id=int(r["sdoc_id"]),
+                    sentence_id=int(r["sentence_id"]),
+                    score=float(s),
+                )
+                for r, s in zip(records, scores)
+            ]
+
+    def search_sentences_batch(
+        self,
+        proj_id: int,
+        query_embs: np.ndarray,
+        top_k: int,
+    ) -> List[Tuple[List[SimSearchSentenceHit], np.ndarray]]:
+        results = self._search(
+            self._path(IndexType.SENTENCE, proj_id),
+            query_embs,
+            None,
+            top_k,
+            threshold=-np.inf,
+        )
+        return [
+            (
+                [
+                    SimSearchSentenceHit(
+                        sdoc_id=int(r["sdoc_id"]),
+                        sentence_id=int(r["sentence_id"]),
+                        score=float(s),
+                    )
+                    for r, s in zip(records, scores)
+                ],
+                np.asarray(records["vec"], dtype=np.float32).reshape(-1, self._dim),
+            )
+            for _, scores, records in results
+        ]
+
+    def get_sentence_embeddings(
+        self, search_tuples: List[Tuple[int, int]]
+    ) -> np.ndarray:
+        # (sentence_id, sdoc_id) -> key
+        keys = np.asarray(
+            [(sdoc_id << 32) | sent_id for sent_id, sdoc_id in search_tuples],
+            dtype=np.int64,
+        )
+        # missing embeddings, e.g. of buffered embeddings, are rows of NaN
+        result = np.full((len(keys), self._dim), np.nan, dtype=np.float32)
+        found = np.zeros(len(keys), dtype=bool)
+        # the projects of the sdocs are unknown, so all projects are checked
+        for path in self._root.glob(f"project_*/{IndexType.SENTENCE}.bin"):
+            entry = self._get_sorted_keys(path)
+            if entry is None:
+                continue
+            records, sorted_keys, order = entry
+            pos = np.minimum(np.searchsorted(sorted_keys, keys), len(order) - 1)
+            match = ~found & (sorted_keys[pos] == keys)
+            result[match] = records["vec"][order[pos[match]]]
+            found |= match
+            if found.all():
+                break
+        return result
+
+    def drop_indices(self) -> None:
+        logger.warning("Dropping all Numpy vector indices!")
+        shutil.rmtree(self._root, ignore_errors=True)
+        self._root.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            self._mmaps.clear()
+            self._sorted_keys.clear()
+            self._ivfs.clear()
@@ -1,5 +1,5 @@
 import uuid
-from typing import List, Tuple
+from typing import Iterable, List, Tuple
 
 import numpy as np
 from loguru import logger
@@ -13,7 +13,12 @@ from qdrant_client.models import (
     MatchAny,
     MatchValue,
     PointIdsList,
-    RecommendRequest,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    SearchRequest,
 )
 
 from app.core.data.dto.search import SimSearchImageHit, SimSearchSentenceHit
@@ -25,6 +30,31 @@ from config import conf
 class QdrantService(VectorIndexService):
     def __new__(cls, *args, **kwargs):
         cls._colletions = list(IndexType)
+        cls._dim = 512
+
+        # with quantization, the int8 embeddings are kept in RAM and the original
+        # embeddings on disk, the best matches are re-scored with the originals
+        qc = conf.vector_index.quantization
+        cls._quantization_config = None
+        cls._search_params = None
+        match qc.type:
+            case "none":
+                pass
+            case "int8":
+                cls._quantization_config = ScalarQuantization(
+                    scalar=ScalarQuantizationConfig(
+                        type=ScalarType.INT8, quantile=0.99, always_ram=True
+                    )
+                )
+                cls._search_params = SearchParams(
+                    quantization=QuantizationSearchParams(
+                        rescore=True, oversampling=float(qc.oversampling)
+                    )
+                )
+            case _:
+                msg = f"Unknown vector index quantization: {qc.type}"
+                logger.error(msg)
+                raise SystemExit(msg)
 
         try:
             cls._client = QdrantClient(
@@ -42,9 +72,19 @@ class QdrantService(VectorIndexService):
                 if name not in collections:
                     res = cls._client.create_collection(
                         name,
-                        vectors_config=VectorParams(size=512, distance=Distance.COSINE),
+                        vectors_config=VectorParams(
+                            size=cls._dim,
+                            distance=Distance.COSINE,
+                            on_disk=cls._quantization_config is not None,
+                        ),
+                        quantization_config=cls._quantization_config,
                     )
                     print(res)
+                elif cls._quantization_config is not None:
+                    # quantize existing collections, too
+                    cls._client.update_collection(
+                        name, quantization_config=cls._quantization_config
+                    )
 
         except Exception as e:
             msg = f"Cannot connect or initialize to Qdrant DB - Error '{e}'"
@@ -56,8 +96,30 @@ class QdrantService(VectorIndexService):
         self, type: IndexType, proj_id: int, sdoc_id: int, embeddings: List[np.ndarray]
     ):
         logger.debug(f"Adding {type} SDoc {sdoc_id} in Project {proj_id} to Qdrant ...")
+        self._client.upsert(type, self._points(type, proj_id, sdoc_id, embeddings))  # type: ignore
 
+    def add_embeddings_to_index_batch(
+        self,
+        type: IndexType,
+        entries: List[Tuple[int, int, np.ndarray]],
+    ) -> None:
+        logger.debug(f"Adding {type} of {len(entries)} SDocs to Qdrant ...")
         points = [
+            point
+            for proj_id, sdoc_id, embeddings in entries
+            for point in self._points(type, proj_id, sdoc_id, embeddings)
+        ]
+        self._client.upsert(type, points)  # type: ignore
+
+    def _points(
+        self,
+        type: IndexType,
+        proj_id: int,
+        sdoc_id: int,
+        embeddings: Iterable[np.ndarray],
+    ) -> List[PointStruct]:
+        # the ids are deterministic, so adding an SDoc again replaces its points
+        return [
             PointStruct(
                 id=(
                     self._sentence_uuid(sdoc_id, id)
@@ -73,7 +135,6 @@ class QdrantService(VectorIndexService):
             )
             for id, emb in enumerate(embeddings)
         ]
-        self._client.upsert(type, points)  # type: ignore
 
     def remove_embeddings_from_index(self, type: IndexType, sdoc_id: int):
         selector = (
@@ -97,7 +158,7 @@ class QdrantService(VectorIndexService):
                     filter=Filter(
                         must=[
                             FieldCondition(
-                                key="proj_id", match=MatchValue(value=proj_id)
+                                key="project_id", match=MatchValue(value=proj_id)
                             )
                         ]
                     )
@@ -109,16 +170,16 @@ class QdrantService(VectorIndexService):
         proj_id: int,
         index_type: IndexType,
         query_emb: np.ndarray,
-        sdoc_ids_to_search: List[int],
+        sdoc_ids_to_search: List[int] | None,
         top_k: int = 10,
         threshold: float = 0.0,
     ) -> List[SimSearchSentenceHit] | List[SimSearchImageHit]:
-        filter = Filter(
-            must=[
-                FieldCondition(key="proj_id", match=MatchValue(value=proj_id)),
-                FieldCondition(key="sdoc_id", match=MatchAny(any=sdoc_ids_to_search)),
-            ]
-        )
+        conditions = [FieldCondition(key="project_id", match=MatchValue(value=proj_id))]
+        if sdoc_ids_to_search is not None:
+            conditions.append(
+                FieldCondition(key="sdoc_id", match=MatchAny(any=sdoc_ids_to_search))
+            )
+        filter = Filter(must=conditions)
         res = self._client.search(
             index_type,
             query_vector=query_emb,
@@ -126,6 +187,7 @@ class QdrantService(VectorIndexService):
             score_threshold=threshold,
             limit=top_k,
             with_payload=True,
+            search_params=self._search_params,
         )
         if index_type == IndexType.IMAGE:
             return [
@@ -145,39 +207,60 @@ class QdrantService(VectorIndexService):
                 for hit in res
             ]
 
-    def suggest(
+    def search_sentences_batch(
         self,
-        index_type: IndexType,
         proj_id: int,
-        sdoc_sent_ids: List[Tuple[int, int]],
-    ) -> List[SimSearchSentenceHit]:
+        query_embs: np.ndarray,
+        top_k: int,
+    ) -> List[Tuple[List[SimSearchSentenceHit], np.ndarray]]:
         filter = Filter(
-            must=[FieldCondition(key="proj_id", match=MatchValue(value=proj_id))]
+            must=[FieldCondition(key="project_id", match=MatchValue(value=proj_id))]
         )
-        # TODO check if directly providing multiple points to a single request works as well
-        req = [
-            RecommendRequest(
+        requests = [
+            SearchRequest(
+                vector=query_emb.tolist(),
                 filter=filter,
-                limit=1,
+                limit=top_k,
                 with_payload=True,
-                positive=[self._sentence_uuid(sdoc_id, sent_id)],
+                with_vector=True,
+                params=self._search_params,
             )
-            for sdoc_id, sent_id in sdoc_sent_ids
+            for query_emb in query_embs
         ]
-        res = self._client.recommend_batch(index_type, req)
+        res = self._client.search_batch(IndexType.SENTENCE, requests=requests)
 
         return [
-            SimSearchSentenceHit(
-                sdoc_id=r[0].payload.sdoc_id,  # type: ignore
-                score=r[0].score,
-                sentence_id=r[0].payload.sentence_id,  # type: ignore
+            (
+                [
+                    SimSearchSentenceHit(
+                        sdoc_id=hit.payload["sdoc_id"],  # type: ignore
+                        sentence_id=hit.payload["sentence_id"],  # type: ignore
+                        score=hit.score,
+                    )
+                    for hit in hits
+                ],
+                np.asarray([hit.vector for hit in hits], dtype=np.float32).reshape(
+                    len(hits), -1
+                ),
             )
-            for r in res
+            for hits in res
         ]
 
-    def get_sentence_embeddings(self, search_tuples: List[Tuple[int]]) -> np.ndarray:
-        # TODO implement
-        raise NotImplementedError("get_sentence_embeddings not implemented for qdrant")
+    def get_sentence_embeddings(
+        self, search_tuples: List[Tuple[int, int]]
+    ) -> np.ndarray:
+        ids = [
+            self._sentence_uuid(sdoc_id, sent_id) for sent_id, sdoc_id in search_tuples
+        ]
+        points = self._client.retrieve(IndexType.SENTENCE, ids=ids, with_vectors=True)
+        id2vector = {str(point.id): point.vector for point in points}
+        # missing points, e.g. of buffered embeddings, are rows of NaN
+        result = np.full((len(ids), self._dim), np.nan, dtype=np.float32)
+        for i, id in enumerate(ids):
+            vector = id2vector.get(id)
+            if vector is not None:
+                result[i] = vector
+        return result
 
     def drop_indices(self) -> None:
         # TODO implement
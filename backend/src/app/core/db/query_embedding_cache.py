@@ -0,0 +1,117 @@
+import hashlib
+import io
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+from app.core.db.redis_service import RedisService
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded LRU cache for the embeddings of sim search queries. Entries expire after
+    ttl seconds. If use_redis is set, embeddings are additionally shared between all
+    processes via Redis, so e.g. the API and the celery workers only encode a query once.
+    """
+
+    def __init__(self, max_size: int, ttl: float, use_redis: bool = False):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.use_redis = use_redis
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+        # key -> (embedding, time of insertion)
+        self._entries: OrderedDict[str, Tuple[np.ndarray, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def text_key(model: str, text: str) -> str:
+        # queries that only differ in whitespace are encoded the same way
+        normalized = " ".join(text.split())
+        digest = hashlib.sha256(f"{model}\0{normalized}".encode("utf-8")).hexdigest()
+        return f"text:{digest}"
+
+    @staticmethod
+    def image_key(model: str, sdoc_id: int, mtime: float) -> str:
+        return f"image:{model}:{sdoc_id}:{mtime}"
+
+    def get_or_compute(self, key: str, compute: Callable[[], np.ndarray]) -> np.ndarray:
+        emb = self.get(key)
+        if emb is None:
+            emb = compute()
+            self.put(key, emb)
+        # the cached array is shared, so callers must not modify it in place
+        return emb.copy()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            elif entry is not None:
+                del self._entries[key]
+
+        if self.use_redis:
+            emb = self._load_from_redis(key)
+            if emb is not None:
+                self._put_local(key, emb)
+                with self._lock:
+                    self.redis_hits += 1
+                return emb
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, emb: np.ndarray) -> None:
+        self._put_local(key, emb)
+        if self.use_redis:
+            self._store_in_redis(key, emb)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "redis_hits": self.redis_hits,
+                "misses": self.misses,
+            }
+
+    def _put_local(self, key: str, emb: np.ndarray) -> None:
+        with self._lock:
+            self._entries[key] = (emb, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _load_from_redis(self, key: str) -> Optional[np.ndarray]:
+        try:
+            data = RedisService().load_query_embedding(key)
+        except Exception as e:
+            logger.warning(f"Cannot load query embedding from Redis: {e}")
+            return None
+        if data is None:
+            return None
+        return np.load(io.BytesIO(data), allow_pickle=False)
+
+    def _store_in_redis(self, key: str, emb: np.ndarray) -> None:
+        buffer = io.BytesIO()
+        np.save(buffer, emb, allow_pickle=False)
+        try:
+            RedisService().store_query_embedding(
+                key, buffer.getvalue(), ttl=int(self.ttl)
+            )
+        except Exception as e:
+            logger.warning(f"Cannot store query embedding in Redis: {e}")
@@ -1,6 +1,7 @@
+import time
 import uuid
 from datetime import datetime
-from typing import List, Optional, Union
+from typing import List, Optional, Tuple, Union
 
 import redis
 from loguru import logger
@@ -29,6 +30,164 @@ from app.core.data.dto.trainer_job import (
 from app.util.singleton_meta import SingletonMeta
 from config import conf
 
+# keys of the LLM response cache: a hash key -> response, a zset key -> last access
+# and the total size of the responses. They share a hash tag, i.e., a cluster slot.
+_LLM_RESPONSE_KEYS = [
+    "{llm_cache}:responses",
+    "{llm_cache}:last_access",
+    "{llm_cache}:total_size",
+]
+
+# stores an LLM response and evicts the least recently used responses until the total
+# size of the cached responses is below the limit.
+# KEYS: _LLM_RESPONSE_KEYS, ARGV: key, response, now, max_bytes
+_STORE_LLM_RESPONSE_SCRIPT = """
+local old_size = redis.call('HSTRLEN', KEYS[1], ARGV[1])
+local size = string.len(ARGV[2])
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+redis.call('ZADD', KEYS[2], ARGV[3], ARGV[1])
+local total = redis.call('INCRBY', KEYS[3], size - old_size)
+local evicted = 0
+while total > tonumber(ARGV[4]) do
+    local oldest = redis.call('ZRANGE', KEYS[2], 0, 0)[1]
+    if not oldest or oldest == ARGV[1] then
+        break
+    end
+    total = redis.call('DECRBY', KEYS[3], redis.call('HSTRLEN', KEYS[1], oldest))
+    redis.call('HDEL', KEYS[1], oldest)
+    redis.call('ZREM', KEYS[2], oldest)
+    evicted = evicted + 1
+end
+return evicted
+"""
+
+# the embedding write buffer keeps the embeddings of every SDoc in one of two states:
+# 'pending' (hash sdoc_id -> embeddings, zset 'enqueued' sdoc_id -> push time) until
+# a flush claims them, and 'flushing' (hash sdoc_id -> embeddings, zset 'claimed'
+# sdoc_id -> claim time) until the flush acknowledges them. The keys share a hash tag.
+_EMBEDDING_BUFFER_KEYS = [
+    "{embedding_buffer}:pending",
+    "{embedding_buffer}:enqueued",
+    "{embedding_buffer}:flushing",
+    "{embedding_buffer}:claimed",
+]
+
+# moves claimed embeddings back to the pending embeddings, unless the SDoc was pushed
+# again meanwhile. Must be prepended to a script that defines release_ids.
+_RELEASE_EMBEDDINGS_SCRIPT = """
+for _, id in ipairs(release_ids) do
+    local payload = redis.call('HGET', KEYS[3], id)
+    if payload and redis.call('HEXISTS', KEYS[1], id) == 0 then
+        redis.call('HSET', KEYS[1], id, payload)
+        -- released embeddings are flushed as soon as possible
+        redis.call('ZADD', KEYS[2], 0, id)
+    end
+    redis.call('HDEL', KEYS[3], id)
+    redis.call('ZREM', KEYS[4], id)
+end
+"""
+
+# claims up to max pending embeddings (oldest first) for a flush and returns a flat
+# list of sdoc ids and embeddings. Claims older than the timeout belong to crashed
+# flushes and are released first. SDocs that are being flushed are skipped, so that
+# an older version of the embeddings never overwrites a newer one.
+# KEYS: _EMBEDDING_BUFFER_KEYS, ARGV: max, now, claim_timeout
+_CLAIM_EMBEDDINGS_SCRIPT = (
+    """
+local max = tonumber(ARGV[1])
+local now = tonumber(ARGV[2])
+local release_ids = redis.call(
+    'ZRANGEBYSCORE', KEYS[4], '-inf', now - tonumber(ARGV[3])
+)
+"""
+    + _RELEASE_EMBEDDINGS_SCRIPT
+    + """
+local result = {}
+local count = 0
+local start = 0
+while count < max do
+    local ids = redis.call('ZRANGE', KEYS[2], start, start + max - 1)
+    if #ids == 0 then
+        break
+    end
+    local skipped = 0
+    for _, id in ipairs(ids) do
+        local payload = redis.call('HGET', KEYS[1], id)
+        if count >= max or (payload and redis.call('HEXISTS', KEYS[3], id) == 1) then
+            skipped = skipped + 1
+        else
+            redis.call('ZREM', KEYS[2], id)
+            if payload then
+                redis.call('HDEL', KEYS[1], id)
+                redis.call('HSET', KEYS[3], id, payload)
+                redis.call('ZADD', KEYS[4], now, id)
+                table.insert(result, id)
+                table.insert(result, payload)
+                count = count + 1
+            end
+        end
+    end
+    start = start + skipped
+end
+return result
+"""
+)
+
+# releases the claimed embeddings of a failed flush.
+# KEYS: _EMBEDDING_BUFFER_KEYS, ARGV: sdoc ids
+_RELEASE_CLAIMED_EMBEDDINGS_SCRIPT = "local release_ids = ARGV\n" + (
+    _RELEASE_EMBEDDINGS_SCRIPT
+)
+
+# acknowledges the written embeddings of a flush and returns the sdoc ids that were
+# discarded during the flush, i.e., that are neither flushing nor pending anymore.
+# KEYS: _EMBEDDING_BUFFER_KEYS, ARGV: sdoc ids
+_ACK_EMBEDDINGS_SCRIPT = """
+local discarded = {}
+for _, id in ipairs(ARGV) do
+    if redis.call('HDEL', KEYS[3], id) == 0 and redis.call('HEXISTS', KEYS[1], id) == 0 then
+        table.insert(discarded, id)
+    end
+    redis.call('ZREM', KEYS[4], id)
+end
+return discarded
+"""
+
+# the bulk indexing of an index is tracked by a set of the ids of the running jobs
+# and the original settings of the index. The settings are kept until they were
+# restored after the last job, so that a job that starts meanwhile never takes the
+# bulk indexing settings for the original ones.
+
+# adds a job and returns 1 if the original settings are not stored, i.e., the caller
+# has to store them. KEYS: jobs, settings, ARGV: job id
+_ACQUIRE_BULK_INDEXING_SCRIPT = """
+redis.call('SADD', KEYS[1], ARGV[1])
+if redis.call('EXISTS', KEYS[2]) == 0 then
+    return 1
+end
+return 0
+"""
+
+# removes a job and returns the original settings if no job is running anymore,
+# i.e., the caller has to restore them. Releasing a job again has no effect, except
+# that the settings are returned again until they were restored.
+# KEYS: jobs, settings, ARGV: job id
+_RELEASE_BULK_INDEXING_SCRIPT = """
+redis.call('SREM', KEYS[1], ARGV[1])
+if redis.call('SCARD', KEYS[1]) > 0 then
+    return false
+end
+return redis.call('GET', KEYS[2])
+"""
+
+# removes the restored original settings, unless a job started meanwhile.
+# KEYS: jobs, settings
+_RESTORED_BULK_INDEXING_SCRIPT = """
+if redis.call('SCARD', KEYS[1]) == 0 then
+    redis.call('DEL', KEYS[2])
+end
+"""
+
 
 class RedisService(metaclass=SingletonMeta):
     def __new__(cls, *args, **kwargs):
@@ -52,6 +211,30 @@ class RedisService(metaclass=SingletonMeta):
                     f"Successfully connected to Redis {str(client)} DB #{db_idx}"
                 )
             cls.__clients = clients
+            # scripts are sent once, afterwards they are run by their SHA1 digest
+            cls.__store_llm_response_script = clients["llm_cache"].register_script(
+                _STORE_LLM_RESPONSE_SCRIPT
+            )
+            search_client = clients["search"]
+            cls.__acquire_bulk_indexing_script = search_client.register_script(
+                _ACQUIRE_BULK_INDEXING_SCRIPT
+            )
+            cls.__release_bulk_indexing_script = search_client.register_script(
+                _RELEASE_BULK_INDEXING_SCRIPT
+            )
+            cls.__restored_bulk_indexing_script = search_client.register_script(
+                _RESTORED_BULK_INDEXING_SCRIPT
+            )
+            buffer_client = clients["embedding_buffer"]
+            cls.__claim_embeddings_script = buffer_client.register_script(
+                _CLAIM_EMBEDDINGS_SCRIPT
+            )
+            cls.__release_embeddings_script = buffer_client.register_script(
+                _RELEASE_CLAIMED_EMBEDDINGS_SCRIPT
+            )
+            cls.__ack_embeddings_script = buffer_client.register_script(
+                _ACK_EMBEDDINGS_SCRIPT
+            )
         except Exception as e:
             msg = f"Cannot connect to Redis DB - Error '{e}'"
             logger.error(msg)
@@ -496,3 +679,242 @@ class RedisService(metaclass=SingletonMeta):
             raise RuntimeError(msg)
         logger.debug(f"Deleted LLMJob {key}")
         return llmj
+
+    def store_query_embedding(self, key: str, embedding: bytes, ttl: int) -> None:
+        client = self._get_client("simsearch")
+        if client.set(key.encode("utf-8"), embedding, ex=ttl) != 1:
+            msg = f"Cannot store query embedding {key}!"
+            logger.error(msg)
+            raise RuntimeError(msg)
+
+    def load_query_embedding(self, key: str) -> Optional[bytes]:
+        client = self._get_client("simsearch")
+        return client.get(key.encode("utf-8"))
+
+    def get_search_result_generations(self, project_id: int) -> Tuple[int, int]:
+        client = self._get_client("search")
+        global_gen, project_gen = client.mget(
+            ["generation:global", f"generation:{project_id}"]
+        )
+        return int(global_gen or 0), int(project_gen or 0)
+
+    def increment_search_result_generation(self, project_id: Optional[int]) -> None:
+        client = self._get_client("search")
+        key = "generation:global" if project_id is None else f"generation:{project_id}"
+        client.incr(key)
+
+    @staticmethod
+    def _bulk_indexing_keys(index: str) -> List[str]:
+        # the keys of an index share a hash tag
+        return [
+            f"bulk_indexing:{{{index}}}:jobs",
+            f"bulk_indexing:{{{index}}}:settings",
+        ]
+
+    def acquire_bulk_indexing(self, index: str, job_id: str) -> bool:
+        """
+        Registers the bulk indexing job on the index. Returns True if the original
+        settings of the index are not stored, i.e., the caller has to store them.
+        """
+        return (
+            self.__acquire_bulk_indexing_script(
+                keys=self._bulk_indexing_keys(index), args=[job_id]
+            )
+            == 1
+        )
+
+    def store_bulk_indexing_settings(self, index: str, settings: str) -> None:
+        client = self._get_client("search")
+        # settings stored by a concurrent job are the original ones, too
+        client.set(self._bulk_indexing_keys(index)[1], settings, nx=True)
+
+    def release_bulk_indexing(self, index: str, job_id: str) -> Optional[str]:
+        """
+        Unregisters the bulk indexing job. Returns the original settings of the index
+        if no other job is running, i.e., the caller has to restore them and call
+        restored_bulk_indexing afterwards.
+        """
+        settings = self.__release_bulk_indexing_script(
+            keys=self._bulk_indexing_keys(index), args=[job_id]
+        )
+        return settings.decode("utf-8") if settings is not None else None
+
+    def restored_bulk_indexing(self, index: str) -> None:
+        self.__restored_bulk_indexing_script(keys=self._bulk_indexing_keys(index))
+
+    def add_preprocessing_backlog(self, proj_id: int, num_docs: int, ttl: int) -> int:
+        """
+        Adds num_docs documents to the queued preprocessing documents of the project
+        and returns their number. The backlog expires ttl seconds after the last
+        upload, e.g., if documents of crashed workers were never released.
+        """
+        client = self._get_client("scheduling")
+        pipe = client.pipeline()
+        pipe.incrby(f"prepro_backlog:{proj_id}", num_docs)
+        pipe.expire(f"prepro_backlog:{proj_id}", ttl)
+        return pipe.execute()[0]
+
+    def remove_preprocessing_backlog(self, proj_id: int, num_docs: int) -> None:
+        client = self._get_client("scheduling")
+        if client.decrby(f"prepro_backlog:{proj_id}", num_docs) <= 0:
+            client.delete(f"prepro_backlog:{proj_id}")
+
+    def store_pipeline_checkpoint(self, key: str, checkpoint: bytes, ttl: int) -> None:
+        client = self._get_client("checkpoints")
+        if client.set(key.encode("utf-8"), checkpoint, ex=ttl) != 1:
+            msg = f"Cannot store pipeline checkpoint {key}!"
+            logger.error(msg)
+            raise RuntimeError(msg)
+
+    def load_pipeline_checkpoint(self, key: str) -> Optional[bytes]:
+        client = self._get_client("checkpoints")
+        return client.get(key.encode("utf-8"))
+
+    def store_search_result(
+        self, key: str, sdoc_ids: bytes, scores: Optional[bytes], ttl: int
+    ) -> None:
+        client = self._get_client("search")
+        pipe = client.pipeline()
+        pipe.set(f"{key}:ids", sdoc_ids, ex=ttl)
+        if scores is not None:
+            pipe.set(f"{key}:scores", scores, ex=ttl)
+        pipe.execute()
+        logger.debug(f"Successfully stored search result {key}")
+
+    def load_search_result_range(
+        self, key: str, start: int, end: int, with_scores: bool
+    ) -> Optional[Tuple[int, bytes, Optional[bytes]]]:
+        """
+        Returns the total size of the search result and the bytes [start, end) of the
+        sdoc ids and scores, or None if the search result does not exist (anymore).
+        """
+        client = self._get_client("search")
+        pipe = client.pipeline()
+        pipe.exists(f"{key}:ids")
+        pipe.strlen(f"{key}:ids")
+        # GETRANGE treats negative offsets as relative to the end of the value
+        if end > start:
+            pipe.getrange(f"{key}:ids", start, end - 1)
+            if with_scores:
+                pipe.getrange(f"{key}:scores", start, end - 1)
+        res = pipe.execute()
+        if res[0] == 0:
+            return None
+        sdoc_ids = res[2] if end > start else b""
+        scores = (res[3] if end > start else b"") if with_scores else None
+        return res[1], sdoc_ids, scores
+
+    def load_llm_response(self, key: str) -> Optional[bytes]:
+        client = self._get_client("llm_cache")
+        responses, last_access, _ = _LLM_RESPONSE_KEYS
+        pipe = client.pipeline()
+        pipe.hget(responses, key)
+        # only update the access time of existing responses
+        pipe.zadd(last_access, {key: time.time()}, xx=True)
+        return pipe.execute()[0]
+
+    def store_llm_response(self, key: str, response: bytes, max_bytes: int) -> int:
+        """
+        Stores the response and returns the number of evicted responses.
+        """
+        num_evicted = self.__store_llm_response_script(
+            keys=_LLM_RESPONSE_KEYS, args=[key, response, time.time(), max_bytes]
+        )
+        if num_evicted > 0:
+            logger.debug(f"Evicted {num_evicted} cached LLM responses")
+        return num_evicted
+
+    def push_embeddings(self, key: str, embeddings: bytes) -> int:
+        """
+        Adds the embeddings to the write buffer, replacing pending embeddings with the
+        same key. Returns the number of pending keys.
+        """
+        client = self._get_client("embedding_buffer")
+        pending, enqueued, _, _ = _EMBEDDING_BUFFER_KEYS
+        pipe = client.pipeline()
+        pipe.hset(pending, key, embeddings)
+        # keep the time of the first push, so that the buffer is flushed in time
+        pipe.zadd(enqueued, {key: time.time()}, nx=True)
+        pipe.hlen(pending)
+        return pipe.execute()[-1]
+
+    def claim_embeddings(
+        self, max_keys: int, claim_timeout: float
+    ) -> List[Tuple[str, bytes]]:
+        """
+        Claims the embeddings of up to max_keys keys of the write buffer for a flush.
+        The flush must acknowledge or release them.
+        """
+        res = self.__claim_embeddings_script(
+            keys=_EMBEDDING_BUFFER_KEYS, args=[max_keys, time.time(), claim_timeout]
+        )
+        return [(res[i].decode("utf-8"), res[i + 1]) for i in range(0, len(res), 2)]
+
+    def ack_embeddings(self, keys: List[str]) -> List[str]:
+        """
+        Acknowledges the written embeddings. Returns the keys that were discarded
+        while they were written, i.e., whose embeddings must be removed again.
+        """
+        if len(keys) == 0:
+            return []
+        res = self.__ack_embeddings_script(keys=_EMBEDDING_BUFFER_KEYS, args=keys)
+        return [key.decode("utf-8") for key in res]
+
+    def release_embeddings(self, keys: List[str]) -> None:
+        if len(keys) == 0:
+            return
+        self.__release_embeddings_script(keys=_EMBEDDING_BUFFER_KEYS, args=keys)
+
+    def discard_embeddings(self, pattern: str) -> int:
+        """
+        Removes all (pending or flushing) embeddings with keys matching the pattern
+        from the write buffer. Returns the number of removed keys.
+        """
+        client = self._get_client("embedding_buffer")
+        pending, enqueued, flushing, claimed = _EMBEDDING_BUFFER_KEYS
+        keys = list(
+            {
+                key
+                for name in (pending, flushing)
+                for key, _ in client.hscan_iter(name, match=pattern, count=1000)
+            }
+        )
+        if len(keys) == 0:
+            return 0
+        pipe = client.pipeline()
+        pipe.hdel(pending, *keys)
+        pipe.zrem(enqueued, *keys)
+        pipe.hdel(flushing, *keys)
+        pipe.zrem(claimed, *keys)
+        pipe.execute()
+        return len(keys)
+
+    def get_embedding_buffer_state(
+        self,
+    ) -> Tuple[int, int, Optional[float], Optional[float]]:
+        """
+        Returns the number of pending and flushing keys of the write buffer, the time
+        of the oldest pending push and the time of the oldest claim.
+        """
+        client = self._get_client("embedding_buffer")
+        pending, enqueued, flushing, claimed = _EMBEDDING_BUFFER_KEYS
+        pipe = client.pipeline()
+        pipe.hlen(pending)
+        pipe.hlen(flushing)
+        pipe.zrange(enqueued, 0, 0, withscores=True)
+        pipe.zrange(claimed, 0, 0, withscores=True)
+        num_pending, num_flushing, oldest_push, oldest_claim = pipe.execute()
+        return (
+            num_pending,
+            num_flushing,
+            oldest_push[0][1] if len(oldest_push) > 0 else None,
+            oldest_claim[0][1] if len(oldest_claim) > 0 else None,
+        )
+
+    def schedule_embedding_buffer_flush(self, delay: float) -> bool:
+        """
+        Returns True if no flush of the write buffer is scheduled in the next delay
+        seconds, i.e., the caller has to schedule one.
+        """
+        client = self._get_client("embedding_buffer")
+        return bool(client.set("flush_scheduled", 1, nx=True, px=int(delay * 1000)))
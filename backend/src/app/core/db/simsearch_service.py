@@ -1,4 +1,4 @@
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 import numpy as np
 from loguru import logger
@@ -8,7 +8,9 @@ from app.core.data.doc_type import DocType
 from app.core.data.dto.search import SimSearchImageHit, SimSearchSentenceHit
 from app.core.data.dto.source_document import SourceDocumentRead
 from app.core.data.repo.repo_service import RepoService
+from app.core.db.embedding_write_buffer import EmbeddingWriteBuffer
 from app.core.db.index_type import IndexType
+from app.core.db.query_embedding_cache import QueryEmbeddingCache
 from app.core.db.sql_service import SQLService
 from app.core.db.vector_index_service import VectorIndexService
 from app.preprocessing.ray_model_service import RayModelService
@@ -20,6 +22,12 @@ from app.util.singleton_meta import SingletonMeta
 from config import conf
 
 
+def _schedule_write_buffer_flush(delay: float) -> None:
+    from app.celery.background_jobs import flush_embedding_write_buffer_apply_async
+
+    flush_embedding_write_buffer_apply_async(countdown=delay)
+
+
 class SimSearchService(metaclass=SingletonMeta):
     def __new__(cls, reset_vector_index=False):
         index_name: str = conf.vector_index.service
@@ -43,6 +51,13 @@ class SimSearchService(metaclass=SingletonMeta):
                 cls._index: VectorIndexService = WeaviateService(
                     flush=reset_vector_index
                 )
+            case "numpy":
+                # import and init NumpyIndexService
+                from app.core.db.numpy_index_service import NumpyIndexService
+
+                cls._index: VectorIndexService = NumpyIndexService(
+                    flush=reset_vector_index
+                )
             case _:
                 msg = (
                     f"VECTOR_INDEX environment variable not correctly set: {index_name}"
@@ -52,6 +67,26 @@ class SimSearchService(metaclass=SingletonMeta):
         cls.rms = RayModelService()
         cls.repo = RepoService()
         cls.sqls = SQLService()
+
+        qc = conf.simsearch.query_cache
+        cls._query_cache: Optional[QueryEmbeddingCache] = None
+        if qc.enabled:
+            cls._query_cache = QueryEmbeddingCache(
+                max_size=int(qc.max_size),
+                ttl=float(qc.ttl),
+                use_redis=str(qc.use_redis).lower() == "true",
+            )
+
+        wb = conf.simsearch.write_buffer
+        cls._write_buffer: Optional[EmbeddingWriteBuffer] = None
+        if str(wb.enabled).lower() == "true":
+            cls._write_buffer = EmbeddingWriteBuffer(
+                index=cls._index,
+                flush_size=int(wb.flush_size),
+                flush_interval=float(wb.flush_interval),
+                claim_timeout=float(wb.claim_timeout),
+                schedule_flush=_schedule_write_buffer_flush,
+            )
         return super(SimSearchService, cls).__new__(cls)
 
     def _encode_text(self, text: List[str], return_avg_emb: bool = False) -> np.ndarray:
@@ -90,38 +125,82 @@ class SimSearchService(metaclass=SingletonMeta):
         sdoc_id: int,
         sentences: List[str],
     ) -> None:
+        self.add_text_sdocs_to_index(
+            proj_id=proj_id, sdoc_id2sentences={sdoc_id: sentences}
+        )
+
+    def add_text_sdocs_to_index(
+        self,
+        proj_id: int,
+        sdoc_id2sentences: Dict[int, List[str]],
+    ) -> None:
+        """
+        Adds the sentences of the SourceDocuments to the index. The sentences of all
+        SourceDocuments are embedded with a single request to the CLIP model.
+        """
+        sdoc_id2sentences = {
+            sdoc_id: sentences
+            for sdoc_id, sentences in sdoc_id2sentences.items()
+            if len(sentences) > 0
+        }
+        if len(sdoc_id2sentences) == 0:
+            return
+        sentences = [s for sents in sdoc_id2sentences.values() for s in sents]
         sentence_embs = self.rms.clip_text_embedding(
             ClipTextEmbeddingInput(text=sentences)
         )
         if len(sentence_embs.embeddings) != len(sentences):
             raise ValueError(
-                f"Embedding/Sentence mismatch for sdoc {sdoc_id}! Input: {len(sentences)} sentences, Output: {len(sentence_embs.embeddings)} embeddings"
+                f"Embedding/Sentence mismatch for sdocs {list(sdoc_id2sentences.keys())}! Input: {len(sentences)} sentences, Output: {len(sentence_embs.embeddings)} embeddings"
             )
         sentence_embs = sentence_embs.numpy()
 
-        # create cheap&easy (but suboptimal) document embeddings for now
-        doc_emb = sentence_embs.sum(axis=0)
-        doc_emb /= np.linalg.norm(doc_emb)
+        offset = 0
+        for sdoc_id, sdoc_sentences in sdoc_id2sentences.items():
+            sdoc_sentence_embs = sentence_embs[offset : offset + len(sdoc_sentences)]
+            offset += len(sdoc_sentences)
 
-        logger.debug(
-            f"Adding {len(sentence_embs)} sentences "
-            f"from SDoc {sdoc_id} in Project {proj_id} to Weaviate ..."
-        )
-        self._index.add_embeddings_to_index(
-            IndexType.DOCUMENT, proj_id, sdoc_id, [doc_emb]
-        )
-        self._index.add_embeddings_to_index(
-            IndexType.SENTENCE, proj_id, sdoc_id, sentence_embs
-        )
+            # create cheap&easy (but suboptimal) document embeddings for now
+            doc_emb = sdoc_sentence_embs.sum(axis=0)
+            doc_emb /= np.linalg.norm(doc_emb)
+
+            logger.debug(
+                f"Adding {len(sdoc_sentence_embs)} sentences "
+                f"from SDoc {sdoc_id} in Project {proj_id} to Weaviate ..."
+            )
+            self.__add_embeddings(
+                proj_id,
+                sdoc_id,
+                {
+                    IndexType.DOCUMENT: doc_emb[None],
+                    IndexType.SENTENCE: sdoc_sentence_embs,
+                },
+            )
 
     def add_image_sdoc_to_index(self, proj_id: int, sdoc_id: int) -> None:
         image_emb = self._encode_image(image_sdoc_id=sdoc_id)
         logger.debug(
             f"Adding image SDoc {sdoc_id} in Project {proj_id} to Weaviate ..."
         )
-        self._index.add_embeddings_to_index(
-            IndexType.IMAGE, proj_id, sdoc_id, [image_emb]
-        )
+        self.__add_embeddings(proj_id, sdoc_id, {IndexType.IMAGE: image_emb[None]})
+
+    def __add_embeddings(
+        self, proj_id: int, sdoc_id: int, embeddings: Dict[IndexType, np.ndarray]
+    ) -> None:
+        if self._write_buffer is not None:
+            self._write_buffer.push(proj_id, sdoc_id, embeddings)
+            return
+        for type, embs in embeddings.items():
+            self._index.add_embeddings_to_index(type, proj_id, sdoc_id, list(embs))
+
+    def flush_write_buffer(self, force: bool = True) -> int:
+        """
+        Writes the embeddings of the write buffer to the index. Returns the number of
+        written SDocs.
+        """
+        if self._write_buffer is None:
+            return 0
+        return self._write_buffer.flush(force=force)
 
     def remove_sdoc_from_index(self, doctype: str, sdoc_id: int):
         match doctype:
@@ -135,10 +214,14 @@ class SimSearchService(metaclass=SingletonMeta):
 
     def remove_image_sdoc_from_index(self, sdoc_id: int) -> None:
         logger.debug(f"Removing image SDoc {sdoc_id} from Index!")
+        if self._write_buffer is not None:
+            self._write_buffer.discard_sdoc(sdoc_id)
         self._index.remove_embeddings_from_index(IndexType.IMAGE, sdoc_id)
 
     def remove_text_sdoc_from_index(self, sdoc_id: int) -> None:
         logger.debug(f"Removing text SDoc {sdoc_id} from Index!")
+        if self._write_buffer is not None:
+            self._write_buffer.discard_sdoc(sdoc_id)
         self._index.remove_embeddings_from_index(IndexType.SENTENCE, sdoc_id)
         self._index.remove_embeddings_from_index(IndexType.DOCUMENT, sdoc_id)
 
@@ -146,6 +229,8 @@ class SimSearchService(metaclass=SingletonMeta):
         self,
         proj_id: int,
     ) -> None:
+        if self._write_buffer is not None:
+            self._write_buffer.discard_project(proj_id)
         self._index.remove_project_from_index(proj_id)
 
     def _encode_query(
@@ -163,17 +248,68 @@ class SimSearchService(metaclass=SingletonMeta):
             logger.error(msg)
             raise ValueError(msg)
         elif text_query is not None:
-            query_emb = self._encode_text(
+            query_emb = self._encode_text_query(
                 text=text_query, return_avg_emb=average_text_query
             )
         elif image_query_id is not None:
-            query_emb = self._encode_image(image_sdoc_id=image_query_id)
+            query_emb = self._encode_image_query(image_sdoc_id=image_query_id)
         else:
             msg = "This should never happend! Unknown Error!"
             logger.error(msg)
             raise ValueError(msg)
         return query_emb
 
+    def _encode_text_query(
+        self, text: List[str], return_avg_emb: bool = False
+    ) -> np.ndarray:
+        if self._query_cache is None:
+            return self._encode_text(text=text, return_avg_emb=return_avg_emb)
+        # the texts are cached separately, so they can be reused in other queries
+        model = conf.simsearch.query_cache.text_model
+        keys = [QueryEmbeddingCache.text_key(model, t) for t in text]
+        embs = {key: self._query_cache.get(key) for key in keys}
+        missing = {t: key for t, key in zip(text, keys) if embs[key] is None}
+        if len(missing) > 0:
+            encoded = self._encode_text(text=list(missing.keys())).reshape(
+                len(missing), -1
+            )
+            for key, emb in zip(missing.values(), encoded):
+                self._query_cache.put(key, emb)
+                embs[key] = emb
+
+        encoded_query = np.stack([embs[key] for key in keys])
+        if len(encoded_query) == 1:
+            return encoded_query.squeeze()
+        elif return_avg_emb:
+            # average embeddings
+            query_emb: np.ndarray = encoded_query.mean(axis=0)
+            # normalize averaged embedding
+            query_emb: np.ndarray = query_emb / np.linalg.norm(query_emb)
+            return query_emb
+        else:
+            return encoded_query
+
+    def _encode_image_query(self, image_sdoc_id: int) -> np.ndarray:
+        if self._query_cache is None:
+            return self._encode_image(image_sdoc_id=image_sdoc_id)
+        # the modification time invalidates the cached embedding if the image changes
+        image = self._get_image_name_from_sdoc_id(sdoc_id=image_sdoc_id)
+        image_fp = self.repo.get_path_to_sdoc_file(image)
+        mtime = (
+            image_fp.stat().st_mtime if image_fp.exists() else image.updated.timestamp()
+        )
+        key = QueryEmbeddingCache.image_key(
+            conf.simsearch.query_cache.image_model, image_sdoc_id, mtime
+        )
+        return self._query_cache.get_or_compute(
+            key, lambda: self._encode_image(image_sdoc_id=image_sdoc_id)
+        )
+
+    def get_query_cache_stats(self) -> Dict[str, int]:
+        if self._query_cache is None:
+            return dict()
+        return self._query_cache.stats()
+
     def __parse_query_param(self, query: Union[str, List[str], int]) -> Dict[str, Any]:
         query_params = {
             "text_query": None,
@@ -224,6 +360,8 @@ class SimSearchService(metaclass=SingletonMeta):
         top_k: int,
         threshold: float,
     ) -> List[SimSearchSentenceHit] | List[SimSearchImageHit]:
+        if sdoc_ids_to_search is not None and len(sdoc_ids_to_search) == 0:
+            return []
         query_emb = self._encode_query(
             **self.__parse_query_param(query),
         )
@@ -236,6 +374,61 @@ class SimSearchService(metaclass=SingletonMeta):
             sdoc_ids_to_search=sdoc_ids_to_search,
         )
 
+    def find_similar_post_filtered(
+        self,
+        proj_id: int,
+        index_type: IndexType,
+        query: Union[str, List[str], int],
+        top_k: int,
+        threshold: float,
+        filter_sdoc_ids: Callable[[Optional[List[int]]], List[int]],
+    ) -> List[SimSearchSentenceHit] | List[SimSearchImageHit]:
+        """
+        Like find_similar, but instead of restricting the search to a list of all
+        allowed sdocs, more than top_k hits are fetched and filtered afterwards.
+        filter_sdoc_ids returns the allowed sdoc ids among the given candidates (or
+        among all sdocs of the project if None), so the costs of filtering depend on
+        top_k instead of the size of the project. If the filter is too selective to
+        find top_k hits this way, the search falls back to the list of allowed sdocs.
+        """
+        pf = conf.simsearch.post_filter
+        query_emb = self._encode_query(
+            **self.__parse_query_param(query),
+        )
+
+        fetch_k = top_k * int(pf.overfetch_factor)
+        for _ in range(int(pf.max_rounds)):
+            hits = self._index.search_index(
+                proj_id=proj_id,
+                index_type=index_type,
+                query_emb=query_emb,
+                top_k=fetch_k,
+                threshold=threshold,
+                sdoc_ids_to_search=None,
+            )
+            allowed_sdoc_ids = set(filter_sdoc_ids(list({hit.sdoc_id for hit in hits})))
+            filtered_hits = [hit for hit in hits if hit.sdoc_id in allowed_sdoc_ids]
+            # either enough hits or there are no more hits above the threshold
+            if len(filtered_hits) >= top_k or len(hits) < fetch_k:
+                return filtered_hits[:top_k]  # type: ignore
+            fetch_k *= int(pf.overfetch_factor)
+
+        logger.debug(
+            f"Post-filtering {fetch_k} hits was not sufficient, "
+            "searching the filtered sdocs instead."
+        )
+        sdoc_ids_to_search = filter_sdoc_ids(None)
+        if len(sdoc_ids_to_search) == 0:
+            return []
+        return self._index.search_index(
+            proj_id=proj_id,
+            index_type=index_type,
+            query_emb=query_emb,
+            top_k=top_k,
+            threshold=threshold,
+            sdoc_ids_to_search=sdoc_ids_to_search,
+        )
+
     def suggest_similar_sentences(
         self,
         proj_id: int,
@@ -243,41 +436,108 @@ class SimSearchService(metaclass=SingletonMeta):
         neg_sdoc_sent_ids: List[Tuple[int, int]],
         top_k: int,
     ) -> List[SimSearchSentenceHit]:
-        hits = self._index.suggest(
-            IndexType.SENTENCE, proj_id, pos_sdoc_sent_ids, top_k
+        """
+        Suggests the top_k sentences that are most similar to the positive examples
+        and closer to a positive than to a negative example. Requires two requests
+        to the vector index, independent of the number of examples: one to fetch the
+        embeddings of all examples, and one batched kNN search that also returns the
+        embeddings of the candidates, which are then scored in a vectorized way.
+        """
+        if len(pos_sdoc_sent_ids) == 0:
+            return []
+        sc = conf.simsearch.suggest
+
+        # 1. fetch the embeddings of all examples, examples that are not indexed
+        # (yet) are ignored
+        examples = pos_sdoc_sent_ids + neg_sdoc_sent_ids
+        example_embs = self.get_sentence_embeddings(
+            [(sent_id, sdoc_id) for sdoc_id, sent_id in examples]
         )
-        marked_sdoc_sent_ids = {
-            entry for entry in pos_sdoc_sent_ids + neg_sdoc_sent_ids
-        }
+        is_indexed = ~np.isnan(example_embs).any(axis=1)
+        is_pos = np.arange(len(examples)) < len(pos_sdoc_sent_ids)
+        pos_embs = self.__normalize(example_embs[is_pos & is_indexed])
+        neg_embs = self.__normalize(example_embs[~is_pos & is_indexed])
+        if len(pos_embs) == 0:
+            return []
+
+        # 2. batched kNN search, either with the centroid of the positive examples
+        # or with (at most max_queries of) the positive examples
+        marked_sdoc_sent_ids = set(examples)
+        if sc.strategy == "centroid":
+            query_embs = self.__normalize(pos_embs.mean(axis=0, keepdims=True))
+            k = top_k + len(marked_sdoc_sent_ids)
+        else:
+            max_queries = int(sc.max_queries)
+            query_embs = pos_embs
+            if len(query_embs) > max_queries:
+                selected = np.linspace(0, len(query_embs) - 1, max_queries).astype(int)
+                query_embs = query_embs[selected]
+            k = top_k + len(marked_sdoc_sent_ids)
+        results = self._index.search_sentences_batch(proj_id, query_embs, k)
+
+        # 3. collect the unique, unmarked candidates and their embeddings
+        candidates: Dict[Tuple[int, int], SimSearchSentenceHit] = dict()
+        candidate_embs: List[np.ndarray] = []
+        for hits, embs in results:
+            for hit, emb in zip(hits, embs):
+                key = (hit.sdoc_id, hit.sentence_id)
+                if key in marked_sdoc_sent_ids or key in candidates:
+                    continue
+                candidates[key] = hit
+                candidate_embs.append(emb)
+        if len(candidates) == 0:
+            return []
+        cand_embs = self.__normalize(np.stack(candidate_embs))
+
+        # 4. score the candidates by their most similar positive example (or the
+        # centroid) and drop candidates whose nearest example is a negative one.
+        # The cosine similarity is mapped to the certainty scale in [0, 1] that the
+        # suggestions have always been reported in
+        pos_sims = cand_embs @ pos_embs.T
+        if sc.strategy == "centroid":
+            scores = (cand_embs @ query_embs.T)[:, 0]
+        else:
+            scores = pos_sims.max(axis=1)
+        keep = np.ones(len(cand_embs), dtype=bool)
+        if len(neg_embs) > 0:
+            keep = pos_sims.max(axis=1) >= (cand_embs @ neg_embs.T).max(axis=1)
+
         hits = [
-            h for h in hits if (h.sdoc_id, h.sentence_id) not in marked_sdoc_sent_ids
+            SimSearchSentenceHit(
+                sdoc_id=hit.sdoc_id,
+                sentence_id=hit.sentence_id,
+                score=float((1.0 + score) / 2.0),
+            )
+            for hit, score, is_kept in zip(candidates.values(), scores, keep)
+            if is_kept
         ]
-        hits.sort(key=lambda x: (x.sdoc_id, x.sentence_id))
-        hits = self.__unique_consecutive(hits)
-        candidates = [(h.sdoc_id, h.sentence_id) for h in hits]
-        nearest = self._index.suggest(IndexType.SENTENCE, proj_id, candidates, 1)
-        results = []
-        for hit, near in zip(hits, nearest):
-            if (near.sdoc_id, near.sentence_id) not in neg_sdoc_sent_ids:
-                results.append(hit)
-        results.sort(key=lambda x: x.score, reverse=True)
-        return results[0 : min(len(results), top_k)]
-
-    def __unique_consecutive(
-        self, hits: List[SimSearchSentenceHit]
-    ) -> List[SimSearchSentenceHit]:
-        result = []
-        current = SimSearchSentenceHit(sdoc_id=-1, sentence_id=-1, score=0.0)
-        for hit in hits:
-            if hit.sdoc_id != current.sdoc_id or hit.sentence_id != current.sentence_id:
-                current = hit
-                result.append(hit)
-        return result
+        hits.sort(key=lambda x: x.score, reverse=True)
+        return hits[0 : min(len(hits), top_k)]
+
+    def __normalize(self, embs: np.ndarray) -> np.ndarray:
+        embs = np.asarray(embs, dtype=np.float32)
+        norms = np.linalg.norm(embs, axis=-1, keepdims=True)
+        return embs / np.maximum(norms, 1e-12)
 
     def get_sentence_embeddings(
         self, search_tuples: List[Tuple[int, int]]
     ) -> np.ndarray:
-        return self._index.get_sentence_embeddings(search_tuples)
+        """
+        Returns the embeddings of the (sentence_id, sdoc_id) tuples in their order.
+        If embeddings are missing, the write buffer is flushed and they are fetched
+        again. Embeddings that are still missing are returned as rows of NaN.
+        """
+        embs = self._index.get_sentence_embeddings(search_tuples)
+        missing = np.flatnonzero(np.isnan(embs).any(axis=1))
+        if (
+            len(missing) > 0
+            and self._write_buffer is not None
+            and self._write_buffer.flush(force=True) > 0
+        ):
+            embs[missing] = self._index.get_sentence_embeddings(
+                [search_tuples[i] for i in missing]
+            )
+        return embs
 
     def drop_indices(self) -> None:
         logger.warning("Dropping all sim search indices!")
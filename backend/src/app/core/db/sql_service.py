@@ -27,6 +27,13 @@ class SQLService(metaclass=SingletonMeta):
             cls.__engine: Engine = engine
             cls.session_maker = sessionmaker(autoflush=False, bind=engine)
 
+            if conf.search.result_cache.enabled:
+                from app.core.search.search_result_cache import (
+                    register_search_result_invalidation,
+                )
+
+                register_search_result_invalidation(cls.session_maker)
+
             if kwargs.get("reset_database") is True:
                 if database_exists(cls.__engine.url):
                     logger.warning("Dropping existing DB!")
@@ -1,4 +1,4 @@
-from typing import List, Tuple
+from typing import Any, Dict, Iterable, List, Tuple
 
 import numpy as np
 import typesense
@@ -24,8 +24,9 @@ class TypesenseService(VectorIndexService):
             IndexType.DOCUMENT: cls._document_class_name,
         }
 
+        cls._dim = 512
         cls._common_fields = [
-            {"name": "vec", "type": "float[]", "num_dim": 512},
+            {"name": "vec", "type": "float[]", "num_dim": cls._dim},
             {"name": "project_id", "type": "int32"},
             {"name": "sdoc_id", "type": "int32"},
             {"name": "text", "type": "string"},
@@ -90,7 +91,47 @@ class TypesenseService(VectorIndexService):
             f"Adding {len(embeddings)} embeddeddings "
             f"from SDoc {sdoc_id} in Project {proj_id} to Typesense ..."
         )
-        sents = [
+        sents = self._documents(type, proj_id, sdoc_id, embeddings)
+        res = self._client.collections[collection_name].documents.import_(  # type: ignore
+            sents, {"action": "upsert"}
+        )
+        print(res)
+        print("added sentences to TS", len(sents))
+
+    def add_embeddings_to_index_batch(
+        self,
+        type: IndexType,
+        entries: List[Tuple[int, int, np.ndarray]],
+    ) -> None:
+        logger.debug(f"Adding {type} of {len(entries)} SDocs to Typesense ...")
+        documents = [
+            document
+            for proj_id, sdoc_id, embeddings in entries
+            for document in self._documents(type, proj_id, sdoc_id, embeddings)
+        ]
+        results = self._client.collections[self.class_names[type]].documents.import_(  # type: ignore
+            documents, {"action": "upsert"}
+        )
+        # the import reports the result of each document instead of raising, a
+        # failed upsert has to raise, so that the buffered embeddings are retried
+        failed = [result for result in results if not result.get("success", False)]
+        if len(failed) > 0:
+            msg = (
+                f"Cannot add {len(failed)} of {len(documents)} {type} documents to "
+                f"Typesense - Error '{failed[0].get('error')}'"
+            )
+            logger.error(msg)
+            raise RuntimeError(msg)
+
+    def _documents(
+        self,
+        type: IndexType,
+        proj_id: int,
+        sdoc_id: int,
+        embeddings: Iterable[np.ndarray],
+    ) -> List[Dict[str, Any]]:
+        # the ids are deterministic, so adding an SDoc again replaces its documents
+        return [
             {
                 "id": (
                     f"{sdoc_id}-{sent_id}"
@@ -104,11 +145,6 @@ class TypesenseService(VectorIndexService):
             }
             for sent_id, sent_emb in enumerate(embeddings)
         ]
-        res = self._client.collections[collection_name].documents.import_(  # type: ignore
-            sents, {"action": "create"}
-        )
-        print(res)
-        print("added sentences to TS", len(sents))
 
     def remove_embeddings_from_index(self, type: IndexType, sdoc_id: int):
         logger.debug(f"Removing text SDoc {sdoc_id} from Index!")
@@ -130,16 +166,19 @@ class TypesenseService(VectorIndexService):
         proj_id: int,
         index_type: IndexType,
         query_emb: np.ndarray,
-        sdoc_ids_to_search: List[int],
+        sdoc_ids_to_search: List[int] | None,
         top_k: int = 10,
         threshold: float = 0.0,
     ) -> List[SimSearchSentenceHit] | List[SimSearchImageHit]:
+        filter_by = f"project_id:= {proj_id}"
+        if sdoc_ids_to_search is not None:
+            filter_by += f" && sdoc_id:= {sdoc_ids_to_search}"
         results = self._client.collections[
             self.class_names[index_type]
         ].documents.search(  # type: ignore
             {
                 "vector_query": f"vec:({query_emb.tolist()}, k:{top_k})",
-                "filter_by": f"project_id:= {proj_id}",
+                "filter_by": filter_by,
                 "include_fields": "id,sdoc_id,sentence_id",
             }
         )
@@ -162,49 +201,74 @@ class TypesenseService(VectorIndexService):
                 for r in results
             ]
 
-    def suggest(
+    def search_sentences_batch(
         self,
-        index_type: IndexType,
         proj_id: int,
-        sdoc_sent_ids: List[Tuple[int, int]],
-    ) -> List[SimSearchSentenceHit]:
-        candidates: List[SimSearchSentenceHit] = []
-        vc = "vector_query"
-        queries = [
-            {vc: f"vec:([], id: {sdoc_id}-{sent_id}, k:1)"}
-            for sdoc_id, sent_id in sdoc_sent_ids
+        query_embs: np.ndarray,
+        top_k: int,
+    ) -> List[Tuple[List[SimSearchSentenceHit], np.ndarray]]:
+        searches = [
+            {"vector_query": f"vec:({query_emb.tolist()}, k:{top_k})"}
+            for query_emb in query_embs
         ]
-
         res = self._client.multi_search.perform(
-            {"searches": queries},
+            {"searches": searches},
             {
                 "collection": self._sentence_class_name,
                 "q": "*",
                 "filter_by": f"project_id:= {proj_id}",
-                "include_fields": "id,sdoc_id,sentence_id",
+                "include_fields": "id,sdoc_id,sentence_id,vec",
+                "per_page": top_k,
             },
         )
 
+        results: List[Tuple[List[SimSearchSentenceHit], np.ndarray]] = []
         for r in res["results"]:
-            for hit in r["hits"]:
-                candidates.append(
-                    SimSearchSentenceHit(
-                        sdoc_id=hit["document"]["sdoc_id"],
-                        score=hit["vector_distance"],
-                        sentence_id=hit["document"]["sentence_id"],
-                    )
+            hits = r.get("hits", [])
+            results.append(
+                (
+                    [
+                        SimSearchSentenceHit(
+                            sdoc_id=hit["document"]["sdoc_id"],
+                            sentence_id=hit["document"]["sentence_id"],
+                            # the cosine distance is converted to a similarity
+                            score=1.0 - hit["vector_distance"],
+                        )
+                        for hit in hits
+                    ],
+                    np.asarray(
+                        [hit["document"]["vec"] for hit in hits], dtype=np.float32
+                    ).reshape(len(hits), -1),
                 )
-
-        return candidates
+            )
+        return results
 
     def get_sentence_embeddings(
         self,
         search_tuples: List[Tuple[int, int]],
     ) -> np.ndarray:
-        # TODO implement
-        raise NotImplementedError(
-            "get_sentence_embeddings not implemented for typesense"
-        )
+        ids = [f"{sdoc_id}-{sent_id}" for sent_id, sdoc_id in search_tuples]
+        id2vec = {}
+        per_page = 250  # max. page size of typesense
+        for i in range(0, len(ids), per_page):
+            batch = ids[i : i + per_page]
+            res = self._client.collections[self._sentence_class_name].documents.search(  # type: ignore
+                {
+                    "q": "*",
+                    "filter_by": f"id:[{','.join(batch)}]",
+                    "include_fields": "id,vec",
+                    "per_page": per_page,
+                }
+            )
+            for hit in res["hits"]:
+                id2vec[hit["document"]["id"]] = hit["document"]["vec"]
+        # missing documents, e.g. of buffered embeddings, are rows of NaN
+        result = np.full((len(ids), self._dim), np.nan, dtype=np.float32)
+        for i, id in enumerate(ids):
+            vec = id2vec.get(id)
+            if vec is not None:
+                result[i] = vec
+        return result
 
     def drop_indices(self) -> None:
         # TODO implement
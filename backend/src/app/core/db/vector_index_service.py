@@ -19,6 +19,20 @@ class VectorIndexService(ABC, metaclass=SingletonMeta):
     ):
         pass
 
+    def add_embeddings_to_index_batch(
+        self,
+        type: IndexType,
+        entries: List[Tuple[int, int, np.ndarray]],
+    ) -> None:
+        """
+        Adds the embeddings of many (proj_id, sdoc_id, embeddings) entries. Adding
+        the embeddings of an SDoc again must replace them, so that a batch can be
+        written again if writing it failed. Indices should override this with a
+        single bulk upsert.
+        """
+        for proj_id, sdoc_id, embeddings in entries:
+            self.add_embeddings_to_index(type, proj_id, sdoc_id, list(embeddings))
+
     @abstractmethod
     def remove_embeddings_from_index(self, type: IndexType, sdoc_id: int):
         pass
@@ -40,13 +54,16 @@ class VectorIndexService(ABC, metaclass=SingletonMeta):
         pass
 
     @abstractmethod
-    def suggest(
+    def search_sentences_batch(
         self,
-        index_type: IndexType,
         proj_id: int,
-        sdoc_sent_ids: List[Tuple[int, int]],
+        query_embs: np.ndarray,
         top_k: int,
-    ) -> List[SimSearchSentenceHit]:
+    ) -> List[Tuple[List[SimSearchSentenceHit], np.ndarray]]:
+        """
+        Searches the top_k nearest sentences of every query embedding in a single
+        request. Returns the hits of every query together with their embeddings.
+        """
         pass
 
     @abstractmethod
@@ -54,6 +71,11 @@ class VectorIndexService(ABC, metaclass=SingletonMeta):
         self,
         search_tuples: List[Tuple[int, int]],
     ) -> np.ndarray:
+        """
+        Returns the embeddings of the (sentence_id, sdoc_id) tuples in their order.
+        Embeddings that are not in the index (yet), e.g. because they are still in
+        the write buffer, are returned as rows of NaN.
+        """
         pass
 
     @abstractmethod
@@ -1,8 +1,10 @@
-from typing import List, Tuple
+from typing import Iterable, List, Tuple
 
 import numpy as np
 import weaviate
 from loguru import logger
+from weaviate.batch import Batch
+from weaviate.util import generate_uuid5
 
 from app.core.data.dto.search import SimSearchImageHit, SimSearchSentenceHit
 from app.core.db.index_type import IndexType
@@ -165,16 +167,39 @@ class WeaviateService(VectorIndexService):
         )
 
         with self._client.batch as batch:
-            for sent_id, sent_emb in enumerate(embeddings):
-                batch.add_data_object(
-                    data_object={
-                        "project_id": proj_id,
-                        "sdoc_id": sdoc_id,
-                        "sentence_id": sent_id,
-                    },
-                    class_name=self.class_names[type],
-                    vector=sent_emb,  # type: ignore
-                )
+            self._add_data_objects(batch, type, proj_id, sdoc_id, embeddings)
+
+    def add_embeddings_to_index_batch(
+        self,
+        type: IndexType,
+        entries: List[Tuple[int, int, np.ndarray]],
+    ) -> None:
+        logger.debug(f"Adding {type} of {len(entries)} SDocs to Weaviate ...")
+        with self._client.batch as batch:
+            for proj_id, sdoc_id, embeddings in entries:
+                self._add_data_objects(batch, type, proj_id, sdoc_id, embeddings)
+
+    def _add_data_objects(
+        self,
+        batch: Batch,
+        type: IndexType,
+        proj_id: int,
+        sdoc_id: int,
+        embeddings: Iterable[np.ndarray],
+    ) -> None:
+        for sent_id, sent_emb in enumerate(embeddings):
+            batch.add_data_object(
+                data_object={
+                    "project_id": proj_id,
+                    "sdoc_id": sdoc_id,
+                    "sentence_id": sent_id,
+                },
+                class_name=self.class_names[type],
+                # the uuids are deterministic, so adding an SDoc again replaces its
+                # objects instead of duplicating them
+                uuid=generate_uuid5(f"{type}-{sdoc_id}-{sent_id}"),
+                vector=sent_emb,  # type: ignore
+            )
 
     def remove_embeddings_from_index(self, type: IndexType, sdoc_id: int):
         match type:
@@ -339,24 +364,30 @@ class WeaviateService(VectorIndexService):
             logger.error(msg)
             raise ValueError(msg)
 
+        where_filter = project_filter
+        if sdoc_ids_to_search is not None:
+            # with_where replaces the previous filter, so both have to be combined
+            where_filter = {
+                "operator": "And",
+                "operands": [
+                    project_filter,
+                    {
+                        "operator": "ContainsAny",
+                        "path": ["sdoc_id"],
+                        "valueInt": sdoc_ids_to_search,
+                    },
+                ],
+            }
+
         query = (
             query.with_near_vector(
                 {"vector": query_emb.tolist(), "certainty": threshold}
             )
             .with_additional(["certainty"])
-            .with_where(project_filter)
+            .with_where(where_filter)
             .with_limit(top_k)
         )
 
-        if sdoc_ids_to_search is not None and len(sdoc_ids_to_search) > 0:
-            query.with_where(
-                {
-                    "operator": "ContainsAny",
-                    "path": "sdoc_id",
-                    "valueInt": sdoc_ids_to_search,
-                }
-            )
-
         results = query.do()["data"]["Get"][self.class_names[index_type]]
         if results is None:
             results = []
@@ -378,95 +409,51 @@ class WeaviateService(VectorIndexService):
                 for r in results
             ]
 
-    def suggest(
+    def search_sentences_batch(
         self,
-        index_type: IndexType,
         proj_id: int,
-        sdoc_sent_ids: List[Tuple[int, int]],
+        query_embs: np.ndarray,
         top_k: int,
-    ) -> List[SimSearchSentenceHit]:
-        obj_ids = [
-            # TODO weaviate does not support batch/bulk queries.
-            # need some other solution as this is dead-slow for many objects
-            self._get_sentence_object_ids_by_sdoc_id_sentence_id(proj_id, sdoc, sent)
-            for sdoc, sent in sdoc_sent_ids
-        ]
+    ) -> List[Tuple[List[SimSearchSentenceHit], np.ndarray]]:
+        if len(query_embs) == 0:
+            return []
 
         project_filter = {
             "path": ["project_id"],
             "operator": "Equal",
             "valueInt": proj_id,
         }
-
-        hits: List[SimSearchSentenceHit] = []
-
-        for obj in obj_ids:
-            # TODO weaviate does not support batch/bulk queries.
-            # need some other solution as this is dead-slow for many objects
-            query = self._client.query.get(
-                self._sentence_class_name,
-                self._sentence_props,
-            )
-
-            query = (
-                query.with_near_object({"id": obj})
-                # query.with_near_object({"id": obj, "certainty": threshold})
-                .with_additional(["certainty"])
-                .with_where(project_filter)
-                .with_limit(top_k)
-            )
-
-            res = query.do()["data"]["Get"][self._sentence_class_name]
-            for r in res:
-                hits.append(
-                    SimSearchSentenceHit(
-                        sdoc_id=r["sdoc_id"],
-                        sentence_id=r["sentence_id"],
-                        score=r["_additional"]["certainty"],
-                    )
-                )
-        return hits
-
-    def _get_sentence_object_ids_by_sdoc_id_sentence_id(
-        self,
-        proj_id: int,
-        sdoc_id: int,
-        sentence_id: int,
-    ) -> str:
-        id_filter = {
-            "operator": "And",
-            "operands": [
-                {
-                    "path": ["project_id"],
-                    "operator": "Equal",
-                    "valueInt": proj_id,
-                },
-                {
-                    "path": ["sdoc_id"],
-                    "operator": "Equal",
-                    "valueInt": sdoc_id,
-                },
-                {
-                    "path": ["sentence_id"],
-                    "operator": "Equal",
-                    "valueInt": sentence_id,
-                },
-            ],
-        }
-        response = (
-            self._client.query.get(self._sentence_class_name, ["sentence_id"])
-            .with_where(id_filter)
-            .with_additional("id")
-            .do()
-        )
-        if len(response["data"]["Get"][self._sentence_class_name]) == 0:
-            msg = f"No Sentences for SDoc {sdoc_id} found!"
-            logger.error(msg)
-            raise KeyError(msg)
-
-        return response["data"]["Get"][self._sentence_class_name][0]["_additional"][
-            "id"
+        # all queries are sent in one GraphQL request, distinguished by their alias
+        queries = [
+            self._client.query.get(self._sentence_class_name, self._sentence_props)
+            .with_near_vector({"vector": query_emb.tolist()})
+            .with_additional(["certainty", "vector"])
+            .with_where(project_filter)
+            .with_limit(top_k)
+            .with_alias(f"q{idx}")
+            for idx, query_emb in enumerate(query_embs)
         ]
+        res = self._client.query.multi_get(queries).do()["data"]["Get"]
+
+        results: List[Tuple[List[SimSearchSentenceHit], np.ndarray]] = []
+        for idx in range(len(queries)):
+            hits = res.get(f"q{idx}") or []
+            results.append(
+                (
+                    [
+                        SimSearchSentenceHit(
+                            sdoc_id=r["sdoc_id"],
+                            sentence_id=r["sentence_id"],
+                            score=r["_additional"]["certainty"],
+                        )
+                        for r in hits
+                    ],
+                    np.asarray(
+                        [r["_additional"]["vector"] for r in hits], dtype=np.float32
+                    ).reshape(len(hits), -1),
+                )
+            )
+        return results
 
     def get_sentence_embeddings_by_sdoc_id(self, sdoc_id: int) -> np.ndarray:
         query = (
@@ -1,5 +1,6 @@
-from typing import List, Optional, Tuple, Union
+from typing import Dict, List, Optional, Tuple, Union
 
+import numpy as np
 from sqlalchemy.orm import Session
 
 from app.core.data.crud.project_metadata import crud_project_meta
@@ -13,15 +14,23 @@ from app.core.data.dto.search import (
 )
 from app.core.data.orm.source_document import SourceDocumentORM
 from app.core.db.elasticsearch_service import ElasticSearchService
+from app.core.db.index_type import IndexType
 from app.core.db.simsearch_service import SimSearchService
 from app.core.db.sql_service import SQLService
 from app.core.search.column_info import ColumnInfo
 from app.core.search.filtering import (
     Filter,
+    get_columns_affected_by_filter,
 )
 from app.core.search.sdoc_search.sdoc_search_columns import SdocColumns
 from app.core.search.search_builder import SearchBuilder
+from app.core.search.search_result_cache import (
+    SearchResultCache,
+    decode_cursor,
+    encode_cursor,
+)
 from app.core.search.sorting import Sort
+from config import conf
 
 
 def search_info(project_id) -> List[ColumnInfo[SdocColumns]]:
@@ -56,6 +65,46 @@ def search(
     sorts: List[Sort[SdocColumns]],
     page_number: Optional[int] = None,
     page_size: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> PaginatedElasticSearchDocumentHits:
+    if page_size is not None and (page_number is not None or cursor is not None):
+        if conf.search.result_cache.enabled:
+            return _search_cached(
+                project_id=project_id,
+                search_query=search_query,
+                expert_mode=expert_mode,
+                highlight=highlight,
+                filter=filter,
+                sorts=sorts,
+                page_number=page_number or 0,
+                page_size=page_size,
+                cursor=cursor,
+            )
+        elif cursor is not None:
+            _, offset, _ = decode_cursor(cursor)
+            page_number = offset // page_size
+
+    return _search(
+        project_id=project_id,
+        search_query=search_query,
+        expert_mode=expert_mode,
+        highlight=highlight,
+        filter=filter,
+        sorts=sorts,
+        page_number=page_number,
+        page_size=page_size,
+    )
+
+
+def _search(
+    project_id: int,
+    search_query: str,
+    expert_mode: bool,
+    highlight: bool,
+    filter: Filter[SdocColumns],
+    sorts: List[Sort[SdocColumns]],
+    page_number: Optional[int] = None,
+    page_size: Optional[int] = None,
 ) -> PaginatedElasticSearchDocumentHits:
     if search_query.strip() == "":
         with SQLService().db_session() as db:
@@ -101,6 +150,143 @@ def search(
         )
 
 
+def _search_cached(
+    project_id: int,
+    search_query: str,
+    expert_mode: bool,
+    highlight: bool,
+    filter: Filter[SdocColumns],
+    sorts: List[Sort[SdocColumns]],
+    page_number: int,
+    page_size: int,
+    cursor: Optional[str] = None,
+) -> PaginatedElasticSearchDocumentHits:
+    """
+    Like search, but the complete result is cached by the SearchResultCache, so that
+    the pages of a search are only slices of the cached result. The cursor of a page
+    points to the next page and stays valid if the result changes in the meantime.
+    """
+    cache = SearchResultCache()
+    search_query = search_query.strip()
+    is_content_search = search_query != ""
+    fingerprint = cache.fingerprint(
+        project_id=project_id,
+        search_query=search_query,
+        expert_mode=expert_mode if is_content_search else None,
+        filter=filter.model_dump(mode="json"),
+        sorts=[sort.model_dump(mode="json") for sort in sorts],
+    )
+
+    # a result stored after concurrent changes is stored under the outdated key
+    key = cache.result_key(project_id, fingerprint)
+
+    offset = page_number * page_size
+    last_sdoc_id: Optional[int] = None
+    if cursor is not None:
+        cursor_fingerprint, offset, last_sdoc_id = decode_cursor(cursor)
+        if cursor_fingerprint != fingerprint:
+            raise ValueError("The cursor does not belong to this search!")
+
+    # with a cursor, the last sdoc of the previous page is loaded as well to check
+    # that the result did not change
+    start = offset - 1 if last_sdoc_id is not None and offset > 0 else offset
+    page = cache.load_range(
+        key,
+        offset=start,
+        limit=page_size + offset - start,
+        with_scores=is_content_search,
+    )
+    if page is not None and start < offset:
+        if len(page[0]) == 0 or page[0][0] != last_sdoc_id:
+            page = None
+        else:
+            page = (
+                page[0][1:],
+                page[1][1:] if page[1] is not None else None,
+                page[2],
+            )
+
+    if page is not None:
+        sdoc_ids, scores, total_results = page
+    else:
+        all_sdoc_ids, all_scores = _search_all(
+            project_id=project_id,
+            search_query=search_query,
+            expert_mode=expert_mode,
+            filter=filter,
+            sorts=sorts,
+        )
+        cache.store(key, all_sdoc_ids, all_scores)
+        if last_sdoc_id is not None:
+            # continue after the last sdoc of the previous page
+            last_idx = np.nonzero(all_sdoc_ids == last_sdoc_id)[0]
+            if len(last_idx) > 0:
+                offset = int(last_idx[0]) + 1
+        sdoc_ids = all_sdoc_ids[offset : offset + page_size]
+        scores = (
+            all_scores[offset : offset + page_size] if all_scores is not None else None
+        )
+        total_results = len(all_sdoc_ids)
+
+    # highlights are only computed for the documents of the requested page
+    highlights: Dict[int, List[str]] = dict()
+    if highlight and is_content_search and len(sdoc_ids) > 0:
+        highlighted = ElasticSearchService().search_sdocs_by_content_query(
+            proj_id=project_id,
+            query=search_query,
+            sdoc_ids={int(sdoc_id) for sdoc_id in sdoc_ids},
+            use_simple_query=not expert_mode,
+            highlight=True,
+            skip=0,
+            limit=len(sdoc_ids),
+        )
+        highlights = {hit.document_id: hit.highlights for hit in highlighted.hits}
+
+    next_offset = offset + len(sdoc_ids)
+    return PaginatedElasticSearchDocumentHits(
+        hits=[
+            ElasticSearchDocumentHit(
+                document_id=int(sdoc_id),
+                score=float(scores[idx]) if scores is not None else None,
+                highlights=highlights.get(int(sdoc_id), []),
+            )
+            for idx, sdoc_id in enumerate(sdoc_ids)
+        ],
+        total_results=total_results,
+        next_cursor=(
+            encode_cursor(fingerprint, next_offset, int(sdoc_ids[-1]))
+            if next_offset < total_results and len(sdoc_ids) > 0
+            else None
+        ),
+    )
+
+
+def _search_all(
+    project_id: int,
+    search_query: str,
+    expert_mode: bool,
+    filter: Filter[SdocColumns],
+    sorts: List[Sort[SdocColumns]],
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Returns the ordered sdoc ids and (for content searches) scores of all results."""
+    result = _search(
+        project_id=project_id,
+        search_query=search_query,
+        expert_mode=expert_mode,
+        highlight=False,
+        filter=filter,
+        sorts=sorts,
+    )
+    sdoc_ids = np.array([hit.document_id for hit in result.hits], dtype=np.int32)
+    if search_query == "":
+        return sdoc_ids, None
+    scores = np.array(
+        [hit.score if hit.score is not None else 0.0 for hit in result.hits],
+        dtype=np.float32,
+    )
+    return sdoc_ids, scores
+
+
 def filter_sdoc_ids(
     db: Session,
     project_id: int,
@@ -108,18 +294,21 @@ def filter_sdoc_ids(
     sorts: List[Sort[SdocColumns]] = [],
     page_number: Optional[int] = None,
     page_size: Optional[int] = None,
+    sdoc_ids: Optional[List[int]] = None,
 ) -> Tuple[List[int], int]:
     builder = SearchBuilder(db, filter, sorts)
     # build the initial subquery that just queries all sdoc_ids of the project
-    subquery = builder.build_subquery(
-        subquery=(
-            db.query(
-                SourceDocumentORM.id,
-            )
-            .group_by(SourceDocumentORM.id)
-            .filter(SourceDocumentORM.project_id == project_id)
+    # (or only the given sdoc_ids)
+    subquery = (
+        db.query(
+            SourceDocumentORM.id,
         )
+        .group_by(SourceDocumentORM.id)
+        .filter(SourceDocumentORM.project_id == project_id)
     )
+    if sdoc_ids is not None:
+        subquery = subquery.filter(SourceDocumentORM.id.in_(sdoc_ids))
+    subquery = builder.build_subquery(subquery=subquery)
     # build the query, specifying the result columns and joining the subquery
     builder.build_query(
         query=db.query(
@@ -133,6 +322,44 @@ def filter_sdoc_ids(
     return [row[0] for row in result_rows], total_results
 
 
+def _find_similar(
+    proj_id: int,
+    index_type: IndexType,
+    query: Union[str, List[str], int],
+    top_k: int,
+    threshold: float,
+    filter: Filter[SdocColumns],
+) -> List[SimSearchSentenceHit] | List[SimSearchImageHit]:
+    # special case: no filter -> all sdocs are relevant
+    if len(get_columns_affected_by_filter(filter)) == 0:
+        return SimSearchService().find_similar(
+            proj_id=proj_id,
+            index_type=index_type,
+            sdoc_ids_to_search=None,
+            query=query,
+            top_k=top_k,
+            threshold=threshold,
+        )
+
+    def filter_candidates(candidate_sdoc_ids: Optional[List[int]]) -> List[int]:
+        if candidate_sdoc_ids is not None and len(candidate_sdoc_ids) == 0:
+            return []
+        with SQLService().db_session() as db:
+            filtered_sdoc_ids, _ = filter_sdoc_ids(
+                db, proj_id, filter, sdoc_ids=candidate_sdoc_ids
+            )
+        return filtered_sdoc_ids
+
+    return SimSearchService().find_similar_post_filtered(
+        proj_id=proj_id,
+        index_type=index_type,
+        query=query,
+        top_k=top_k,
+        threshold=threshold,
+        filter_sdoc_ids=filter_candidates,
+    )
+
+
 def find_similar_sentences(
     proj_id: int,
     query: Union[str, List[str], int],
@@ -140,15 +367,14 @@ def find_similar_sentences(
     threshold: float,
     filter: Filter[SdocColumns],
 ) -> List[SimSearchSentenceHit]:
-    with SQLService().db_session() as db:
-        filtered_sdoc_ids, _ = filter_sdoc_ids(db, proj_id, filter)
-    return SimSearchService().find_similar_sentences(
-        sdoc_ids_to_search=filtered_sdoc_ids,
+    return _find_similar(
         proj_id=proj_id,
+        index_type=IndexType.SENTENCE,
         query=query,
         top_k=top_k,
         threshold=threshold,
-    )
+        filter=filter,
+    )  # type: ignore
 
 
 def find_similar_images(
@@ -158,12 +384,11 @@ def find_similar_images(
     threshold: float,
     filter: Filter[SdocColumns],
 ) -> List[SimSearchImageHit]:
-    with SQLService().db_session() as db:
-        filtered_sdoc_ids, _ = filter_sdoc_ids(db, proj_id, filter)
-    return SimSearchService().find_similar_images(
-        sdoc_ids_to_search=filtered_sdoc_ids,
+    return _find_similar(
         proj_id=proj_id,
+        index_type=IndexType.IMAGE,
         query=query,
         top_k=top_k,
         threshold=threshold,
-    )
+        filter=filter,
+    )  # type: ignore
@@ -0,0 +1,252 @@
+import hashlib
+import json
+from typing import Any, Callable, Iterable, Optional, Set, Tuple
+
+import numpy as np
+from loguru import logger
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import ORMExecuteState, Session, sessionmaker
+
+from app.core.data.orm.annotation_document import AnnotationDocumentORM
+from app.core.data.orm.document_tag import (
+    DocumentTagORM,
+    SourceDocumentDocumentTagLinkTable,
+)
+from app.core.data.orm.project_metadata import ProjectMetadataORM
+from app.core.data.orm.sentence_annotation import SentenceAnnotationORM
+from app.core.data.orm.source_document import SourceDocumentORM
+from app.core.data.orm.source_document_metadata import SourceDocumentMetadataORM
+from app.core.data.orm.span_annotation import SpanAnnotationORM
+from app.core.db.redis_service import RedisService
+from config import conf
+
+# changes of these ORMs can change the result of a sdoc search. Span texts are not
+# included, they are never updated and only found through their span annotations.
+SEARCH_RELEVANT_ORMS = (
+    SourceDocumentORM,
+    SourceDocumentMetadataORM,
+    ProjectMetadataORM,
+    DocumentTagORM,
+    SourceDocumentDocumentTagLinkTable,
+    AnnotationDocumentORM,
+    SpanAnnotationORM,
+    SentenceAnnotationORM,
+)
+SEARCH_RELEVANT_TABLES = {orm.__tablename__ for orm in SEARCH_RELEVANT_ORMS}
+
+# the project of a changed row is determined by the first of these columns it has
+_PROJECT_COLUMNS = ("project_id", "source_document_id", "annotation_document_id")
+
+# session.info key of the projects whose search results have to be invalidated,
+# None stands for all projects
+_DIRTY_PROJECTS_KEY = "search_result_cache_dirty_projects"
+
+
+class SearchResultCache:
+    """
+    Caches the complete, ordered sdoc ids (and scores) of a search in Redis, so that
+    pages are served as slices of the cached result instead of executing the search
+    again. Cached results are identified by a fingerprint of the search parameters and
+    a generation counter of the project, which is incremented whenever documents or
+    annotations of the project change (see register_search_result_invalidation).
+    """
+
+    def __init__(self, ttl: int = conf.search.result_cache.ttl):
+        self.ttl = int(ttl)
+
+    @staticmethod
+    def fingerprint(**search_params: Any) -> str:
+        data = json.dumps(search_params, sort_keys=True, default=str)
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def result_key(self, project_id: int, fingerprint: str) -> str:
+        """
+        Returns the key of the search result for the current generation of the
+        project. It has to be read before the search is executed, so that a result
+        that misses concurrent changes is stored under an outdated key.
+        """
+        global_gen, project_gen = RedisService().get_search_result_generations(
+            project_id
+        )
+        return f"result:{project_id}:{global_gen}.{project_gen}:{fingerprint}"
+
+    def store(
+        self,
+        key: str,
+        sdoc_ids: np.ndarray,
+        scores: Optional[np.ndarray] = None,
+    ) -> None:
+        RedisService().store_search_result(
+            key=key,
+            sdoc_ids=sdoc_ids.astype("<i4").tobytes(),
+            scores=scores.astype("<f4").tobytes() if scores is not None else None,
+            ttl=self.ttl,
+        )
+
+    def load_range(
+        self,
+        key: str,
+        offset: int,
+        limit: int,
+        with_scores: bool = False,
+    ) -> Optional[Tuple[np.ndarray, Optional[np.ndarray], int]]:
+        """
+        Returns the sdoc ids and scores at [offset, offset + limit) of the cached search
+        result together with the total number of results, or None if the result is not
+        cached. Only the requested range is transferred from Redis.
+        """
+        res = RedisService().load_search_result_range(
+            key=key,
+            start=offset * 4,
+            end=(offset + limit) * 4,
+            with_scores=with_scores,
+        )
+        if res is None:
+            return None
+        num_bytes, sdoc_ids, scores = res
+        return (
+            np.frombuffer(sdoc_ids, dtype="<i4"),
+            np.frombuffer(scores, dtype="<f4") if scores is not None else None,
+            num_bytes // 4,
+        )
+
+
+def encode_cursor(fingerprint: str, offset: int, last_sdoc_id: int) -> str:
+    return f"{fingerprint}.{offset}.{last_sdoc_id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int, int]:
+    try:
+        fingerprint, offset, last_sdoc_id = cursor.split(".")
+        return fingerprint, int(offset), int(last_sdoc_id)
+    except ValueError:
+        raise ValueError(f"Invalid search cursor '{cursor}'!")
+
+
+def _mark_dirty(session: Session, project_ids: Iterable[Optional[int]]) -> None:
+    dirty: Set[Optional[int]] = session.info.setdefault(_DIRTY_PROJECTS_KEY, set())
+    dirty.update(project_ids)
+
+
+class _ChangedRows:
+    """
+    Collects the project, source document or annotation document ids of changed rows
+    and resolves them to the ids of the affected projects. The project of a row
+    without any of these ids cannot be determined, which affects all projects (None).
+    """
+
+    def __init__(self):
+        self.project_ids: Set[int] = set()
+        self.sdoc_ids: Set[int] = set()
+        self.adoc_ids: Set[int] = set()
+        self.unknown = False
+
+    def add(self, get_value: Callable[[str], Any]) -> None:
+        for column, ids in zip(
+            _PROJECT_COLUMNS, (self.project_ids, self.sdoc_ids, self.adoc_ids)
+        ):
+            value = get_value(column)
+            if value is not None:
+                ids.add(int(value))
+                return
+        self.unknown = True
+
+    def resolve(self, session: Session) -> Set[Optional[int]]:
+        project_ids: Set[Optional[int]] = set(self.project_ids)
+        if len(self.sdoc_ids) > 0:
+            project_ids.update(
+                session.execute(
+                    select(SourceDocumentORM.project_id)
+                    .where(SourceDocumentORM.id.in_(self.sdoc_ids))
+                    .distinct()
+                ).scalars()
+            )
+        if len(self.adoc_ids) > 0:
+            project_ids.update(
+                session.execute(
+                    select(SourceDocumentORM.project_id)
+                    .join(
+                        AnnotationDocumentORM,
+                        AnnotationDocumentORM.source_document_id
+                        == SourceDocumentORM.id,
+                    )
+                    .where(AnnotationDocumentORM.id.in_(self.adoc_ids))
+                    .distinct()
+                ).scalars()
+            )
+        if self.unknown:
+            project_ids.add(None)
+        return project_ids
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    rows = _ChangedRows()
+    for obj in [*session.new, *session.dirty, *session.deleted]:
+        if isinstance(obj, SEARCH_RELEVANT_ORMS):
+            # only loaded attributes are read, loading them may fail for deleted rows
+            state = inspect(obj).dict
+            rows.add(lambda column: state.get(column))
+    # deleted rows are resolved by their (deleted) source documents in this flush or
+    # by the rows that still reference them
+    _mark_dirty(session, rows.resolve(session))
+
+
+def _do_orm_execute(orm_execute_state: ORMExecuteState) -> None:
+    # bulk statements like insert(...) or query.delete() are not part of the flush
+    if not (
+        orm_execute_state.is_insert
+        or orm_execute_state.is_update
+        or orm_execute_state.is_delete
+    ):
+        return
+    statement = orm_execute_state.statement
+    table = getattr(statement, "table", None)
+    if table is None or getattr(table, "name", None) not in SEARCH_RELEVANT_TABLES:
+        return
+
+    rows = _ChangedRows()
+    column = next((c for c in _PROJECT_COLUMNS if c in table.c), None)
+    if column is None:
+        rows.unknown = True
+    elif orm_execute_state.is_insert:
+        parameters = orm_execute_state.parameters
+        if isinstance(parameters, dict):
+            parameters = [parameters]
+        if not parameters:
+            rows.unknown = True
+        for params in parameters or []:
+            rows.add(lambda c: params.get(c))
+    else:
+        # the statement is not executed yet, so the rows it changes are selected first
+        query = select(table.c[column]).distinct()
+        if statement.whereclause is not None:
+            query = query.where(statement.whereclause)
+        values = orm_execute_state.session.execute(query).scalars().all()
+        for value in values:
+            rows.add(lambda c: value if c == column else None)
+    _mark_dirty(orm_execute_state.session, rows.resolve(orm_execute_state.session))
+
+
+def _after_commit(session: Session) -> None:
+    dirty: Set[Optional[int]] = session.info.pop(_DIRTY_PROJECTS_KEY, set())
+    if len(dirty) == 0:
+        return
+    try:
+        if None in dirty:
+            RedisService().increment_search_result_generation(None)
+        else:
+            for project_id in dirty:
+                RedisService().increment_search_result_generation(project_id)
+    except Exception as e:
+        logger.warning(f"Cannot invalidate cached search results: {e}")
+
+
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_DIRTY_PROJECTS_KEY, None)
+
+
+def register_search_result_invalidation(session_maker: sessionmaker) -> None:
+    event.listen(session_maker, "after_flush", _after_flush)
+    event.listen(session_maker, "do_orm_execute", _do_orm_execute)
+    event.listen(session_maker, "after_commit", _after_commit)
+    event.listen(session_maker, "after_rollback", _after_rollback)
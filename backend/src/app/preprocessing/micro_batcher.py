@@ -0,0 +1,104 @@
+import threading
+from typing import Callable, Generic, List, Optional, TypeVar
+
+from loguru import logger
+
+InputT = TypeVar("InputT")
+OutputT = TypeVar("OutputT")
+
+
+class _BatchRequest(Generic[InputT, OutputT]):
+    def __init__(self, item: InputT):
+        self.item = item
+        self.result: Optional[OutputT] = None
+        self.error: Optional[Exception] = None
+        self.finished = False
+        # set when the request is finished or its thread has to process the next batch
+        self.wakeup = threading.Event()
+
+
+class MicroBatcher(Generic[InputT, OutputT]):
+    """
+    Merges concurrent requests of multiple threads into batches. The first thread
+    that submits a request while no batch is in flight processes it directly, so a
+    single caller does not wait for anything. Requests that are submitted while a
+    batch is in flight are collected and processed together as the next batch by
+    the same thread. Once the request of that thread is finished, the next waiting
+    thread takes over, so no thread processes the requests of others indefinitely.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        process_batch: Callable[[List[InputT]], List[OutputT]],
+        max_batch_size: int = 64,
+    ):
+        self.name = name
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self._queue: List[_BatchRequest[InputT, OutputT]] = []
+        self._busy = False
+        self._lock = threading.Lock()
+
+    def submit(self, item: InputT) -> OutputT:
+        request: _BatchRequest[InputT, OutputT] = _BatchRequest(item)
+        with self._lock:
+            self._queue.append(request)
+            is_leader = not self._busy
+            self._busy = True
+
+        if is_leader:
+            self._drain(request)
+        while not request.finished:
+            request.wakeup.wait()
+            request.wakeup.clear()
+            if not request.finished:
+                self._drain(request)
+
+        if request.error is not None:
+            raise request.error
+        return request.result  # type: ignore
+
+    def _drain(self, own_request: _BatchRequest[InputT, OutputT]) -> None:
+        while True:
+            with self._lock:
+                if len(self._queue) == 0:
+                    self._busy = False
+                    return
+                if own_request.finished:
+                    # hand over to the thread of the next waiting request
+                    self._queue[0].wakeup.set()
+                    return
+                batch = self._queue[: self.max_batch_size]
+                del self._queue[: self.max_batch_size]
+
+            if len(batch) > 1:
+                logger.debug(f"{self.name}: processing {len(batch)} merged requests")
+            try:
+                self._process(batch)
+            finally:
+                for request in batch:
+                    request.finished = True
+                    request.wakeup.set()
+
+    def _process(self, batch: List[_BatchRequest[InputT, OutputT]]) -> None:
+        try:
+            results = self.process_batch([request.item for request in batch])
+            if len(results) != len(batch):
+                raise ValueError(
+                    f"{self.name}: got {len(results)} results "
+                    f"for {len(batch)} requests!"
+                )
+            for request, result in zip(batch, results):
+                request.result = result
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0].error = e
+                return
+            # an erroneous request must not fail the merged requests of other threads
+            logger.warning(
+                f"{self.name}: processing {len(batch)} merged requests failed! "
+                f"Processing them separately... Error: {e}"
+            )
+            for request in batch:
+                self._process([request])
@@ -1,6 +1,6 @@
-from typing import TYPE_CHECKING, Any, Dict, List
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
-from pydantic import BaseModel, ConfigDict, Field, SkipValidation
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, SkipValidation
 
 from app.core.data.dto.preprocessing_job import PreprocessingJobPayloadRead
 
@@ -26,4 +26,9 @@ class PipelineCargo(BaseModel):
     )
 
     data: Dict[str, Any] = Field(description="data", default_factory=dict)
+
+    # set by the PreprocessingPipeline if a step failed with a transient error and
+    # the execution is retried (from the last checkpoint) instead of failing
+    _retry_transient_errors: bool = PrivateAttr(default=False)
+    _transient_error: Optional[Exception] = PrivateAttr(default=None)
     model_config = ConfigDict(arbitrary_types_allowed=True)
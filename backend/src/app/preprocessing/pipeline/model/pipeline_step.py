@@ -1,18 +1,57 @@
-from typing import Callable, List
+from typing import Callable, List, Optional
 
 from pydantic import BaseModel, Field
 
 from app.preprocessing.pipeline.model.pipeline_cargo import PipelineCargo
 
 
+class PipelineBatchError(Exception):
+    """
+    Raised by a batch implementation of a PipelineStep that succeeded for all cargos
+    except the ones at failed_idxs. Only these cargos are processed again.
+    """
+
+    def __init__(self, msg: str, failed_idxs: List[int]):
+        super().__init__(msg)
+        self.failed_idxs = failed_idxs
+
+
 class PipelineStep(BaseModel):
     name: str = Field(description="Name of the PipelineStep")
     ordering: int = Field(description="Ordering of the PipelineStep")
     required_data: List[str] = Field(
-        description="Required data the PipelineStep needs to access.",
+        description=(
+            "Required data the PipelineStep needs to access. Either a key of the "
+            "cargo data or a part of it, e.g., 'pptd.word_freqs'."
+        ),
         default_factory=list,
     )
+    produced_data: Optional[List[str]] = Field(
+        description=(
+            "Data the PipelineStep creates or modifies. If None, the PipelineStep "
+            "may modify anything and cannot run concurrently with other steps."
+        ),
+        default=None,
+    )
+    checkpoint: bool = Field(
+        description=(
+            "If True, the cargo is stored after the PipelineStep, so that a retried "
+            "execution resumes after it. Should be set for expensive steps."
+        ),
+        default=False,
+    )
     run: Callable[["PipelineCargo"], "PipelineCargo"]
+    run_batch: Optional[Callable[[List["PipelineCargo"]], List["PipelineCargo"]]] = (
+        Field(
+            description=(
+                "Optional implementation of the PipelineStep that processes "
+                "multiple cargos at once. If it fails, the PipelineStep is run for "
+                "each cargo separately, so it must either have no effect then (e.g. "
+                "by using a single transaction) or raise a PipelineBatchError."
+            ),
+            default=None,
+        )
+    )
 
     def __lt__(self, other: "PipelineStep"):
         return self.ordering < other.ordering
@@ -21,7 +60,10 @@ class PipelineStep(BaseModel):
         return (
             f"PipelineStep({self.name}, "
             f"ordering={self.ordering}, "
-            f"required_data={self.required_data})"
+            f"required_data={self.required_data}, "
+            f"produced_data={self.produced_data}, "
+            f"batchable={self.run_batch is not None}, "
+            f"checkpoint={self.checkpoint})"
         )
 
     def __repr__(self):
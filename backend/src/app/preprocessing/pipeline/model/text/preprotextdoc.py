@@ -7,16 +7,18 @@ from app.preprocessing.pipeline.model.preprodoc_base import PreProDocBase
 from app.preprocessing.pipeline.model.text.autosentanno import AutoSentAnno
 from app.preprocessing.pipeline.model.text.autospan import AutoSpan
 from app.preprocessing.pipeline.model.text.sentence import Sentence
-from app.preprocessing.ray_model_worker.dto.spacy import SpacyPipelineOutput
+from app.preprocessing.pipeline.model.text.source_mapping import SourceMapping
+from app.preprocessing.ray_model_worker.dto.spacy import SpacyColumns
 
 
 class PreProTextDoc(PreProDocBase):
     text: str = Field(default="")
     html: str = Field(default="")
-    spacy_pipeline_output: Optional[SpacyPipelineOutput] = Field(default=None)
+    spacy_pipeline_output: Optional[SpacyColumns] = Field(default=None)
     tokens: List[str] = Field(default_factory=list)
     token_character_offsets: List[Tuple[int, int]] = Field(default_factory=list)
-    text2html_character_offsets: List[int] = Field(default_factory=list)
+    token_html_character_offsets: List[Tuple[int, int]] = Field(default_factory=list)
+    text2html_source_mapping: SourceMapping = Field(default_factory=SourceMapping)
     html_filepath: Path = Field(default_factory=Path)
     lemmas: List[str] = Field(default_factory=list)
     pos: List[str] = Field(default_factory=list)
@@ -0,0 +1,55 @@
+from typing import Sequence, Union
+
+import numpy as np
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class SourceMapping(BaseModel):
+    """
+    Maps character offsets in the text extracted from an HTML document to character
+    offsets in the HTML. The mapping is stored as run-length segments: the text
+    offsets text_starts[i] + j (0 <= j < lengths[i]) map to html_starts[i] + j.
+    All lookups are binary searches over the segments.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    text_starts: np.ndarray = Field(default_factory=lambda: np.zeros(0, np.int32))
+    html_starts: np.ndarray = Field(default_factory=lambda: np.zeros(0, np.int32))
+    lengths: np.ndarray = Field(default_factory=lambda: np.zeros(0, np.int32))
+
+    @classmethod
+    def from_segments(
+        cls, html_starts: Sequence[int], lengths: Sequence[int]
+    ) -> "SourceMapping":
+        """
+        Creates the mapping of consecutive text segments, given by the HTML offset
+        of their first character and their length.
+        """
+        lengths_array = np.asarray(lengths, dtype=np.int32)
+        text_starts = np.zeros(len(lengths_array), dtype=np.int32)
+        np.cumsum(lengths_array[:-1], out=text_starts[1:])
+        return cls(
+            text_starts=text_starts,
+            html_starts=np.asarray(html_starts, dtype=np.int32),
+            lengths=lengths_array,
+        )
+
+    def __len__(self) -> int:
+        if len(self.lengths) == 0:
+            return 0
+        return int(self.text_starts[-1]) + int(self.lengths[-1])
+
+    def to_html(self, offsets: Union[int, np.ndarray]) -> Union[int, np.ndarray]:
+        """
+        Returns the HTML offsets of the text offsets. Raises an IndexError if any
+        offset is not mapped.
+        """
+        text_offsets = np.asarray(offsets, dtype=np.int64)
+        if text_offsets.size > 0 and (
+            text_offsets.min() < 0 or text_offsets.max() >= len(self)
+        ):
+            raise IndexError(f"Text offsets out of range (0, {len(self)})!")
+        segments = np.searchsorted(self.text_starts, text_offsets, side="right") - 1
+        res = self.html_starts[segments] + (text_offsets - self.text_starts[segments])
+        return res.item() if np.ndim(res) == 0 else res
@@ -0,0 +1,113 @@
+import hashlib
+import pickle
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+from app.core.data.dto.background_job_base import BackgroundJobStatus
+from app.core.db.redis_service import RedisService
+from app.preprocessing.pipeline.model.pipeline_cargo import PipelineCargo
+from app.preprocessing.pipeline.model.pipeline_step import PipelineStep
+from config import conf
+
+FINAL_STATUSES = (
+    BackgroundJobStatus.FINISHED,
+    BackgroundJobStatus.ERROR,
+    BackgroundJobStatus.ABORTED,
+)
+
+
+class PipelineCheckpoints:
+    """
+    Stores the data and the finished steps of a cargo in Redis after expensive steps
+    (steps registered with checkpoint=True), so that a retry of the preprocessing
+    task resumes after the last checkpoint instead of running all steps again.
+    Finished (or failed) cargos keep a checkpoint without data, so that retrying a
+    batch only executes the cargos that were interrupted. The checkpoints are bound
+    to the steps of the pipeline and expire after checkpoint_ttl seconds.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = str(conf.celery.preprocessing.checkpoints).lower() == "true",
+        ttl: int = int(conf.celery.preprocessing.checkpoint_ttl),
+    ):
+        self.enabled = enabled
+        self.ttl = ttl
+        self._pipeline_key = ""
+
+    def freeze(self, steps: List[PipelineStep]) -> None:
+        # checkpoints of other pipelines (or versions of the pipeline) are ignored
+        names = "\n".join(step.name for step in steps)
+        self._pipeline_key = hashlib.sha1(names.encode("utf-8")).hexdigest()[:16]
+
+    def _key(self, cargo: PipelineCargo) -> str:
+        return f"{cargo.ppj_payload.id}:{self._pipeline_key}"
+
+    def store(self, cargo: PipelineCargo) -> bool:
+        """
+        Stores the checkpoint of the cargo. Returns False if it is not stored.
+        """
+        if not self.enabled:
+            return False
+        finished = cargo.ppj_payload.status in FINAL_STATUSES
+        try:
+            checkpoint = pickle.dumps(
+                {
+                    "finished_steps": [step.name for step in cargo.finished_steps],
+                    "status": cargo.ppj_payload.status,
+                    "data": None if finished else cargo.data,
+                },
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+            RedisService().store_pipeline_checkpoint(
+                key=self._key(cargo), checkpoint=checkpoint, ttl=self.ttl
+            )
+        except Exception as e:
+            # without the checkpoint a retry resumes from an earlier one
+            logger.warning(
+                f"Cannot store checkpoint for {cargo.ppj_payload.filename}: {e}"
+            )
+            return False
+        logger.debug(
+            f"Stored checkpoint ({len(checkpoint)} bytes) after "
+            f"{len(cargo.finished_steps)} steps for {cargo.ppj_payload.filename}"
+        )
+        return True
+
+    def restore(
+        self, cargo: PipelineCargo, steps_by_name: Dict[str, PipelineStep]
+    ) -> PipelineCargo:
+        """
+        Restores the data and the finished steps of the cargo from its last
+        checkpoint (if it exists). The cargo of a finished (or failed) payload is
+        restored with its final status and without data.
+        """
+        if not self.enabled:
+            return cargo
+        try:
+            checkpoint: Optional[bytes] = RedisService().load_pipeline_checkpoint(
+                key=self._key(cargo)
+            )
+            if checkpoint is None:
+                return cargo
+            state = pickle.loads(checkpoint)
+        except Exception as e:
+            logger.warning(
+                f"Cannot restore checkpoint for {cargo.ppj_payload.filename}, "
+                f"running all steps: {e}"
+            )
+            return cargo
+        cargo.finished_steps = [steps_by_name[name] for name in state["finished_steps"]]
+        cargo.next_steps = [
+            step for step in cargo.next_steps if step not in cargo.finished_steps
+        ]
+        if state["status"] in FINAL_STATUSES:
+            cargo.ppj_payload.status = state["status"]
+        else:
+            cargo.data = state["data"]
+        logger.info(
+            f"Resuming {cargo.ppj_payload.filename} from its checkpoint after "
+            f"{len(cargo.finished_steps)} steps"
+        )
+        return cargo
@@ -0,0 +1,56 @@
+from typing import Dict, List, Set
+
+from app.preprocessing.pipeline.model.pipeline_step import PipelineStep
+
+
+def _overlaps(a: str, b: str) -> bool:
+    # "pptd" overlaps with "pptd.text", but "pptd.text" does not overlap with "pptd.html"
+    return a == b or a.startswith(f"{b}.") or b.startswith(f"{a}.")
+
+
+def _any_overlaps(items_a: List[str], items_b: List[str]) -> bool:
+    return any(_overlaps(a, b) for a in items_a for b in items_b)
+
+
+def depends_on(step: PipelineStep, previous: PipelineStep) -> bool:
+    """
+    Whether step has to run after the previous step (i.e., a step with a lower ordering).
+    Steps that do not declare the data they produce could modify anything, so they
+    depend on all previous steps and all following steps depend on them.
+    """
+    if step.produced_data is None or previous.produced_data is None:
+        return True
+    # step reads what previous writes
+    if _any_overlaps(step.required_data, previous.produced_data):
+        return True
+    # step overwrites what previous writes
+    if _any_overlaps(step.produced_data, previous.produced_data):
+        return True
+    # step overwrites what previous reads
+    if _any_overlaps(step.produced_data, previous.required_data):
+        return True
+    return False
+
+
+def compute_pipeline_stages(steps: List[PipelineStep]) -> List[List[PipelineStep]]:
+    """
+    Groups the steps into stages, so that all steps of a stage are independent of each
+    other and only depend on steps of previous stages. The steps of a stage can be
+    executed concurrently.
+    """
+    steps = sorted(steps)
+    step_stage: Dict[int, int] = dict()
+    for idx, step in enumerate(steps):
+        dependencies: Set[int] = {
+            step_stage[previous.ordering]
+            for previous in steps[:idx]
+            if depends_on(step, previous)
+        }
+        step_stage[step.ordering] = max(dependencies, default=-1) + 1
+
+    stages: List[List[PipelineStep]] = [
+        [] for _ in range(max(step_stage.values(), default=-1) + 1)
+    ]
+    for step in steps:
+        stages[step_stage[step.ordering]].append(step)
+    return stages
@@ -0,0 +1,142 @@
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from loguru import logger
+
+from app.core.data.crud.preprocessing_job import crud_prepro_job
+from app.core.data.crud.preprocessing_job_payload import crud_prepro_job_payload
+from app.core.data.dto.background_job_base import BackgroundJobStatus
+from app.core.data.dto.preprocessing_job import PreprocessingJobUpdate
+from app.core.data.dto.preprocessing_job_payload import PreprocessingJobPayloadUpdate
+from app.core.db.sql_service import SQLService
+from app.preprocessing.pipeline.model.pipeline_cargo import PipelineCargo
+from config import conf
+
+
+class PreprocessingJobProgress:
+    """
+    Reduces the number of SQL round trips the PreprocessingPipeline needs to report
+    its progress:
+    - The status of the PreprocessingJobs is cached for status_cache_ttl seconds,
+      so an abort by the user is noticed after at most status_cache_ttl seconds.
+    - Updates of the current step and the RUNNING status of the payloads are
+      buffered and written together every progress_granularity steps (of a single
+      payload) or at least
+      every progress_flush_interval seconds. All other status updates (FINISHED,
+      ERROR, ABORTED) are written immediately together with the buffered updates.
+    """
+
+    def __init__(
+        self,
+        sqls: SQLService,
+        status_cache_ttl: float = conf.celery.preprocessing.status_cache_ttl,
+        progress_granularity: int = conf.celery.preprocessing.progress_granularity,
+        progress_flush_interval: float = conf.celery.preprocessing.progress_flush_interval,
+    ):
+        self.sqls = sqls
+        self.status_cache_ttl = status_cache_ttl
+        self.progress_granularity = max(1, int(progress_granularity))
+        self.progress_flush_interval = progress_flush_interval
+
+        # ppj_id -> (status, time of the last read)
+        self._ppj_status_cache: Dict[str, Tuple[BackgroundJobStatus, float]] = dict()
+        # ppj payload id -> buffered update
+        self._pending_updates: Dict[str, PreprocessingJobPayloadUpdate] = dict()
+        # ppj payload id -> number of steps since the last flush
+        self._pending_steps: Dict[str, int] = dict()
+        self._last_flush = time.monotonic()
+        self._lock = threading.RLock()
+
+    def get_ppj_status(self, cargo: PipelineCargo) -> BackgroundJobStatus:
+        """
+        Returns the (cached) status of the PreprocessingJob of the cargo and sets it
+        to RUNNING if it is neither RUNNING nor ABORTED.
+        """
+        ppj_id = cargo.ppj_payload.prepro_job_id
+        with self._lock:
+            cached = self._ppj_status_cache.get(ppj_id)
+            if (
+                cached is not None
+                and time.monotonic() - cached[1] < self.status_cache_ttl
+            ):
+                return cached[0]
+
+            with self.sqls.db_session() as db:
+                status = crud_prepro_job.get_status_by_id(db=db, uuid=ppj_id)
+                if (
+                    status != BackgroundJobStatus.ABORTED
+                    and status != BackgroundJobStatus.RUNNING
+                ):
+                    logger.info(
+                        f"Updating PreprocessingJob {ppj_id} "
+                        f"Status to {BackgroundJobStatus.RUNNING.value}..."
+                    )
+                    crud_prepro_job.update(
+                        db=db,
+                        uuid=ppj_id,
+                        update_dto=PreprocessingJobUpdate(
+                            status=BackgroundJobStatus.RUNNING
+                        ),
+                    )
+                    status = BackgroundJobStatus.RUNNING
+            self._ppj_status_cache[ppj_id] = (status, time.monotonic())
+            return status
+
+    def set_ppj_status(self, ppj_id: str, status: BackgroundJobStatus) -> None:
+        with self._lock:
+            self._ppj_status_cache[ppj_id] = (status, time.monotonic())
+
+    def update_payload(
+        self,
+        cargo: PipelineCargo,
+        current_step_name: Optional[str] = None,
+        status: Optional[BackgroundJobStatus] = None,
+        error_msg: Optional[str] = None,
+        flush: Optional[bool] = None,
+    ) -> PipelineCargo:
+        """
+        Updates the ppj payload of the cargo. The update is buffered unless flush is
+        True or, if flush is None, the status is set to anything but RUNNING.
+        """
+        with self._lock:
+            update_dto = self._pending_updates.get(cargo.ppj_payload.id)
+            if update_dto is None:
+                # we have to set the members explicitly due to pydantic default value behavior
+                update_dto = PreprocessingJobPayloadUpdate()
+                self._pending_updates[cargo.ppj_payload.id] = update_dto
+            if current_step_name is not None:
+                update_dto.current_pipeline_step = current_step_name
+                cargo.ppj_payload.current_pipeline_step = current_step_name
+                self._pending_steps[cargo.ppj_payload.id] = (
+                    self._pending_steps.get(cargo.ppj_payload.id, 0) + 1
+                )
+            if status is not None:
+                update_dto.status = status
+                cargo.ppj_payload.status = status
+            if error_msg is not None:
+                update_dto.error_message = error_msg
+                cargo.ppj_payload.error_message = error_msg
+
+            if flush is None:
+                flush = (
+                    (status is not None and status != BackgroundJobStatus.RUNNING)
+                    or self._pending_steps.get(cargo.ppj_payload.id, 0)
+                    >= self.progress_granularity
+                    or time.monotonic() - self._last_flush
+                    >= self.progress_flush_interval
+                )
+            if flush:
+                self.flush()
+        return cargo
+
+    def flush(self) -> None:
+        with self._lock:
+            if len(self._pending_updates) > 0:
+                with self.sqls.db_session() as db:
+                    crud_prepro_job_payload.update_multi(
+                        db=db, update_dtos=self._pending_updates
+                    )
+            self._pending_updates = dict()
+            self._pending_steps = dict()
+            self._last_flush = time.monotonic()
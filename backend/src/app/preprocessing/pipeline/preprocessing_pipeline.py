@@ -1,24 +1,29 @@
 import os
 import time
-from typing import Callable, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
 
 from loguru import logger
 
 from app.core.data.crud.preprocessing_job import crud_prepro_job
-from app.core.data.crud.preprocessing_job_payload import crud_prepro_job_payload
 from app.core.data.doc_type import DocType
 from app.core.data.dto.background_job_base import BackgroundJobStatus
 from app.core.data.dto.preprocessing_job import (
-    PreprocessingJobRead,
     PreprocessingJobUpdate,
 )
-from app.core.data.dto.preprocessing_job_payload import (
-    PreprocessingJobPayloadRead,
-    PreprocessingJobPayloadUpdate,
-)
 from app.core.db.sql_service import SQLService
 from app.preprocessing.pipeline.model.pipeline_cargo import PipelineCargo
-from app.preprocessing.pipeline.model.pipeline_step import PipelineStep
+from app.preprocessing.pipeline.model.pipeline_step import (
+    PipelineBatchError,
+    PipelineStep,
+)
+from app.preprocessing.pipeline.pipeline_checkpoints import PipelineCheckpoints
+from app.preprocessing.pipeline.pipeline_stages import compute_pipeline_stages
+from app.preprocessing.pipeline.preprocessing_job_progress import (
+    PreprocessingJobProgress,
+)
+from app.preprocessing.pipeline.transient_errors import is_transient_error
+from config import conf
 
 
 class PreprocessingPipeline:
@@ -30,6 +35,14 @@ class PreprocessingPipeline:
         self._steps_by_ordering: Dict[int, PipelineStep] = dict()
         self._steps_by_name: Dict[str, PipelineStep] = dict()
         self.sqls: SQLService = SQLService()
+        self.progress: PreprocessingJobProgress = PreprocessingJobProgress(
+            sqls=self.sqls
+        )
+        self.checkpoints: PipelineCheckpoints = PipelineCheckpoints()
+        self.max_concurrent_steps: int = int(
+            conf.celery.preprocessing.max_concurrent_steps
+        )
+        self._stages: List[List[PipelineStep]] = []
 
         self.__is_frozen = False
 
@@ -65,7 +78,15 @@ class PreprocessingPipeline:
     def get_step_by_ordering(self, ordering: int) -> PipelineStep:
         return self._steps_by_ordering[ordering]
 
-    def execute(self, cargo: PipelineCargo) -> PipelineCargo:
+    def execute(
+        self, cargo: PipelineCargo, retry_transient_errors: bool = False
+    ) -> PipelineCargo:
+        """
+        Executes the pipeline for the cargo, resuming from its last checkpoint if it
+        exists. If retry_transient_errors is set, a transient error (e.g. of an
+        unavailable database) is raised instead of failing the payload, so that the
+        (celery) task can be retried.
+        """
         if not self.__is_frozen:
             raise ValueError(
                 f"Cannot execute PreprocessingPipeline({self._dt})"
@@ -73,30 +94,37 @@ class PreprocessingPipeline:
             )
         # initialize the cargo
         cargo = self._set_next_steps_of_cargo(cargo=cargo)
+        cargo = self._resume_cargo(
+            cargo=cargo, retry_transient_errors=retry_transient_errors
+        )
 
         start_t = time.perf_counter()
 
         logger.info(
-            f"Executing PreprocessingPipeline({self._dt}) sequentially"
+            f"Executing PreprocessingPipeline({self._dt}) in {len(self._stages)} stages"
             f" for cargo {cargo.ppj_payload.filename}!"
         )
 
-        for ordering in sorted(self._steps_by_ordering.keys()):
-            cargo = self._run_step(
-                cargo=cargo, step=self.get_step_by_ordering(ordering)
-            )
-            if (
-                cargo.ppj_payload.status == BackgroundJobStatus.ABORTED
-                or cargo.ppj_payload.status == BackgroundJobStatus.ERROR
-            ):
-                break
+        with self._create_executor() as executor:
+            for stage in self._stages:
+                if self._is_stopped(cargo=cargo):
+                    break
+                num_finished_steps = len(cargo.finished_steps)
+                cargo = self._run_stage(cargo=cargo, stage=stage, executor=executor)
+                self._store_checkpoint(
+                    cargo=cargo, stage=stage, num_finished_steps=num_finished_steps
+                )
 
-        if cargo.ppj_payload.status == BackgroundJobStatus.RUNNING:
+        if (
+            cargo.ppj_payload.status == BackgroundJobStatus.RUNNING
+            and cargo._transient_error is None
+        ):
             cargo = self._update_ppj_payload_of_cargo(
                 cargo=cargo,
                 current_step_name="None",
                 status=BackgroundJobStatus.FINISHED,
             )
+        self._finish_checkpoint(cargo=cargo)
 
         stop_t = time.perf_counter()
 
@@ -108,8 +136,212 @@ class PreprocessingPipeline:
         # update the status of the preprocessing jobs to finished (if all
         # ppj payloads are finished)
         self._set_ppj_status_to_finished(cargo=cargo)
+        if cargo._transient_error is not None:
+            raise cargo._transient_error
         return cargo
 
+    def execute_batch(
+        self, cargos: List[PipelineCargo], retry_transient_errors: bool = False
+    ) -> List[PipelineCargo]:
+        """
+        Executes the pipeline for multiple cargos at once. Steps that provide a
+        batch implementation process all cargos with a single call, all other
+        steps run for each cargo separately. An error only affects the cargo
+        that caused it, all other cargos continue with the next step. A transient
+        error is raised after all other cargos finished (see execute), a retry only
+        resumes the cargos that did not finish. If the other cargos cannot be
+        skipped by a retry (e.g. without checkpoints), the transient error fails
+        the cargo instead.
+        """
+        if not self.__is_frozen:
+            raise ValueError(
+                f"Cannot execute PreprocessingPipeline({self._dt})"
+                " since it has not been frozen yet!"
+            )
+        # initialize the cargos
+        cargos = [
+            self._resume_cargo(
+                cargo=self._set_next_steps_of_cargo(cargo=cargo),
+                retry_transient_errors=retry_transient_errors,
+            )
+            for cargo in cargos
+        ]
+
+        start_t = time.perf_counter()
+
+        logger.info(
+            f"Executing PreprocessingPipeline({self._dt}) in batch mode"
+            f" for {len(cargos)} cargos!"
+        )
+
+        with self._create_executor() as executor:
+            for stage in self._stages:
+                num_finished_steps = [len(cargo.finished_steps) for cargo in cargos]
+                steps_with_runnable_idxs: List[Tuple[PipelineStep, List[int]]] = []
+                for step in stage:
+                    runnable_idxs: List[int] = []
+                    for idx, cargo in enumerate(cargos):
+                        if self._is_stopped(cargo=cargo):
+                            continue
+                        cargos[idx], should_run = self._prepare_step(
+                            cargo=cargo, step=step
+                        )
+                        if should_run:
+                            runnable_idxs.append(idx)
+                    if len(runnable_idxs) > 0:
+                        steps_with_runnable_idxs.append((step, runnable_idxs))
+
+                if len(steps_with_runnable_idxs) == 1:
+                    step, runnable_idxs = steps_with_runnable_idxs[0]
+                    results = [
+                        self._try_run_step_for_cargos(
+                            cargos=[cargos[idx] for idx in runnable_idxs], step=step
+                        )
+                    ]
+                else:
+                    futures = [
+                        executor.submit(
+                            self._try_run_step_for_cargos,
+                            cargos=[cargos[idx] for idx in runnable_idxs],
+                            step=step,
+                        )
+                        for step, runnable_idxs in steps_with_runnable_idxs
+                    ]
+                    results = [future.result() for future in futures]
+                # the steps and their errors are recorded by this thread only
+                for (step, runnable_idxs), step_results in zip(
+                    steps_with_runnable_idxs, results
+                ):
+                    for idx, (cargo, error) in zip(runnable_idxs, step_results):
+                        cargos[idx] = self._complete_step(
+                            cargo=cargo, step=step, error=error
+                        )
+
+                for idx, cargo in enumerate(cargos):
+                    self._store_checkpoint(
+                        cargo=cargo,
+                        stage=stage,
+                        num_finished_steps=num_finished_steps[idx],
+                    )
+
+        for idx, cargo in enumerate(cargos):
+            if (
+                cargo.ppj_payload.status == BackgroundJobStatus.RUNNING
+                and cargo._transient_error is None
+            ):
+                cargos[idx] = self.progress.update_payload(
+                    cargo=cargo,
+                    current_step_name="None",
+                    status=BackgroundJobStatus.FINISHED,
+                    flush=False,
+                )
+        # a retry skips the finished (or failed) cargos by their final checkpoints.
+        # Without them, it would execute these cargos again, so the cargos with a
+        # transient error fail instead.
+        if not all([self._finish_checkpoint(cargo=cargo) for cargo in cargos]):
+            for idx, cargo in enumerate(cargos):
+                if cargo._transient_error is not None:
+                    error = cargo._transient_error
+                    cargo._retry_transient_errors = False
+                    cargo._transient_error = None
+                    cargos[idx] = self._set_error_of_cargo(cargo=cargo, error=error)
+        self.progress.flush()
+
+        stop_t = time.perf_counter()
+
+        logger.info(
+            f"Executing the PreprocessingPipeline({self._dt}) for {len(cargos)} "
+            f"cargos took {stop_t - start_t:0.4f} seconds"
+        )
+
+        # update the status of the preprocessing jobs to finished (if all
+        # ppj payloads are finished). The cargos may belong to different jobs.
+        ppj_id2cargo = {cargo.ppj_payload.prepro_job_id: cargo for cargo in cargos}
+        for cargo in ppj_id2cargo.values():
+            self._set_ppj_status_to_finished(cargo=cargo)
+        for cargo in cargos:
+            if cargo._transient_error is not None:
+                raise cargo._transient_error
+        return cargos
+
+    def _try_run_step_for_cargos(
+        self, cargos: List[PipelineCargo], step: PipelineStep
+    ) -> List[Tuple[PipelineCargo, Optional[Exception]]]:
+        if step.run_batch is not None and len(cargos) > 1:
+            return self._try_run_batch_step(cargos=cargos, step=step)
+        return [self._try_run_step(cargo=cargo, step=step) for cargo in cargos]
+
+    def _run_stage(
+        self,
+        cargo: PipelineCargo,
+        stage: List[PipelineStep],
+        executor: ThreadPoolExecutor,
+    ) -> PipelineCargo:
+        if len(stage) == 1:
+            return self._run_step(cargo=cargo, step=stage[0])
+
+        prepared_steps: List[PipelineStep] = []
+        for step in stage:
+            cargo, should_run = self._prepare_step(cargo=cargo, step=step)
+            if self._is_stopped(cargo=cargo):
+                return cargo
+            if should_run:
+                prepared_steps.append(step)
+
+        # the steps of a stage write disjoint parts of the cargo data (see
+        # compute_pipeline_stages), but only this thread records the finished steps
+        # and errors in the cargo
+        futures = [
+            executor.submit(self._try_run_step, cargo=cargo, step=step)
+            for step in prepared_steps
+        ]
+        for step, future in zip(prepared_steps, futures):
+            _, error = future.result()
+            cargo = self._complete_step(cargo=cargo, step=step, error=error)
+        return cargo
+
+    def _create_executor(self) -> ThreadPoolExecutor:
+        # one executor per execution, since the pipeline is shared by the threads of
+        # a celery worker and every execution may run max_concurrent_steps steps.
+        # The threads are only started by the first stage with concurrent steps.
+        return ThreadPoolExecutor(
+            max_workers=self.max_concurrent_steps,
+            thread_name_prefix=f"PreprocessingPipeline({self._dt})",
+        )
+
+    @staticmethod
+    def _is_stopped(cargo: PipelineCargo) -> bool:
+        return (
+            cargo.ppj_payload.status == BackgroundJobStatus.ABORTED
+            or cargo.ppj_payload.status == BackgroundJobStatus.ERROR
+            # finished by a previous execution, see PipelineCheckpoints
+            or cargo.ppj_payload.status == BackgroundJobStatus.FINISHED
+            or cargo._transient_error is not None
+        )
+
+    def _resume_cargo(
+        self, cargo: PipelineCargo, retry_transient_errors: bool
+    ) -> PipelineCargo:
+        cargo._retry_transient_errors = retry_transient_errors
+        cargo._transient_error = None
+        return self.checkpoints.restore(cargo=cargo, steps_by_name=self._steps_by_name)
+
+    def _store_checkpoint(
+        self, cargo: PipelineCargo, stage: List[PipelineStep], num_finished_steps: int
+    ) -> None:
+        # only after the steps of the stage are finished, since they modify the cargo
+        if self._is_stopped(cargo=cargo):
+            return
+        if any(step.checkpoint for step in cargo.finished_steps[num_finished_steps:]):
+            self.checkpoints.store(cargo=cargo)
+
+    def _finish_checkpoint(self, cargo: PipelineCargo) -> bool:
+        # the retry resumes interrupted cargos from their last checkpoint and skips
+        # finished (or failed) cargos. Returns False if a retry cannot skip the cargo.
+        if cargo._transient_error is None:
+            return self.checkpoints.store(cargo=cargo)
+        return True
+
     def _set_ppj_status_to_finished(self, cargo: PipelineCargo) -> None:
         with self.sqls.db_session() as db:
             ppj_status = crud_prepro_job.get_status_by_id(
@@ -125,19 +357,6 @@ class PreprocessingPipeline:
                     cargo=cargo, status=BackgroundJobStatus.FINISHED
                 )
 
-    def _set_ppj_status_to_running(self, cargo: PipelineCargo) -> None:
-        with self.sqls.db_session() as db:
-            ppj_status = crud_prepro_job.get_status_by_id(
-                db=db, uuid=cargo.ppj_payload.prepro_job_id
-            )
-            if (
-                ppj_status != BackgroundJobStatus.ABORTED
-                and ppj_status != BackgroundJobStatus.RUNNING
-            ):
-                self.__update_status_of_ppj(
-                    cargo=cargo, status=BackgroundJobStatus.RUNNING
-                )
-
     def __update_status_of_ppj(
         self, cargo: PipelineCargo, status: BackgroundJobStatus
     ) -> PipelineCargo:
@@ -148,6 +367,7 @@ class PreprocessingPipeline:
         )
         with self.sqls.db_session() as db:
             _ = crud_prepro_job.update(db=db, uuid=ppj_id, update_dto=update_dto)
+        self.progress.set_ppj_status(ppj_id=ppj_id, status=status)
         return cargo
 
     def _set_next_steps_of_cargo(self, cargo: PipelineCargo) -> PipelineCargo:
@@ -163,21 +383,24 @@ class PreprocessingPipeline:
         )
         return cargo
 
-    def _load_ppj_of_cargo(
-        self,
-        cargo: PipelineCargo,
-    ) -> PreprocessingJobRead:
-        with self.sqls.db_session() as db:
-            db_obj = crud_prepro_job.read(db=db, uuid=cargo.ppj_payload.prepro_job_id)
-            ppj = PreprocessingJobRead.model_validate(db_obj)
-        return ppj
-
     def _run_step(self, cargo: PipelineCargo, step: PipelineStep) -> PipelineCargo:
-        ppj = self._load_ppj_of_cargo(cargo=cargo)
-        self._set_ppj_status_to_running(cargo=cargo)
+        cargo, should_run = self._prepare_step(cargo=cargo, step=step)
+        if not should_run:
+            return cargo
+        return self._run_prepared_step(cargo=cargo, step=step)
+
+    def _prepare_step(
+        self, cargo: PipelineCargo, step: PipelineStep
+    ) -> Tuple[PipelineCargo, bool]:
+        """
+        Checks if the step has to be run for the cargo and marks it as the current
+        step of the cargo.
+        :return: The (updated) cargo and whether the step has to be run
+        """
+        ppj_status = self.progress.get_ppj_status(cargo=cargo)
         if (
             cargo.ppj_payload.status == BackgroundJobStatus.ABORTED
-            or ppj.status == BackgroundJobStatus.ABORTED
+            or ppj_status == BackgroundJobStatus.ABORTED
         ):
             logger.warning(
                 (
@@ -190,10 +413,10 @@ class PreprocessingPipeline:
                 cargo=cargo,
                 status=BackgroundJobStatus.ABORTED,
             )
-            return cargo
+            return cargo, False
         elif (
             cargo.ppj_payload.status == BackgroundJobStatus.ERROR
-            or ppj.status == BackgroundJobStatus.ERROR
+            or ppj_status == BackgroundJobStatus.ERROR
         ):
             logger.warning(
                 (
@@ -202,7 +425,7 @@ class PreprocessingPipeline:
                     f"since it has an error!"
                 )
             )
-            return cargo
+            return cargo, False
 
         try:
             if cargo.ppj_payload.status == BackgroundJobStatus.WAITING:
@@ -217,9 +440,10 @@ class PreprocessingPipeline:
                         "it has been executed already!"
                     )
                 )
-                return cargo
+                return cargo, False
             for required_data in step.required_data:
-                if required_data not in cargo.data:
+                # parts of the data (e.g. 'pptd.text') are checked by their key
+                if required_data.split(".")[0] not in cargo.data:
                     msg = (
                         f"[Pipeline Worker {os.getpid()}] Skipping: {step} for "
                         f"Payload {cargo.ppj_payload.filename} since it is missing "
@@ -235,30 +459,104 @@ class PreprocessingPipeline:
                 )
             )
             self._update_ppj_payload_of_cargo(cargo=cargo, current_step_name=step.name)
+        except Exception as e:
+            return self._set_error_of_cargo(cargo=cargo, error=e), False
 
-            cargo = step.run(cargo)
-
-            cargo.finished_steps.append(step)
-            if len(cargo.next_steps) > 0:
-                cargo.next_steps.pop(0)
+        return cargo, True
 
-            logger.debug(f"[Pipeline Worker {os.getpid()}] Finished: {step} !")
+    def _run_prepared_step(
+        self, cargo: PipelineCargo, step: PipelineStep
+    ) -> PipelineCargo:
+        cargo, error = self._try_run_step(cargo=cargo, step=step)
+        return self._complete_step(cargo=cargo, step=step, error=error)
+
+    @staticmethod
+    def _try_run_step(
+        cargo: PipelineCargo, step: PipelineStep
+    ) -> Tuple[PipelineCargo, Optional[Exception]]:
+        # may run in a worker thread, so the cargo is completed by the caller
+        try:
+            return step.run(cargo), None
+        except Exception as e:
+            return cargo, e
 
+    def _try_run_batch_step(
+        self, cargos: List[PipelineCargo], step: PipelineStep
+    ) -> List[Tuple[PipelineCargo, Optional[Exception]]]:
+        assert step.run_batch is not None, f"{step} has no batch implementation!"
+        try:
+            logger.info(
+                f"[Pipeline Worker {os.getpid()}] Running: {step} for "
+                f"a batch of {len(cargos)} Payloads..."
+            )
+            cargos = step.run_batch(cargos)
+        except PipelineBatchError as e:
+            # the step succeeded for all other cargos
+            logger.warning(
+                f"[Pipeline Worker {os.getpid()}] Running: {step} for a batch of "
+                f"{len(cargos)} Payloads failed for {len(e.failed_idxs)} Payloads! "
+                f"Running it for each of them separately...\nError: {e}"
+            )
+            failed_idxs = set(e.failed_idxs)
+            return [
+                self._try_run_step(cargo=cargo, step=step)
+                if idx in failed_idxs
+                else (cargo, None)
+                for idx, cargo in enumerate(cargos)
+            ]
         except Exception as e:
-            msg = (
-                "An error occurred while executing the PreprocessingPipeline("
-                f"{self._dt}) for PreprocessingJobPayload "
-                f"{cargo.ppj_payload.filename}!\n"
-                f"Error: {e}"
+            # isolate the erroneous cargos by running the step for each cargo
+            # separately, the failed batch had no effect (see PipelineStep.run_batch)
+            logger.warning(
+                f"[Pipeline Worker {os.getpid()}] Running: {step} for a batch of "
+                f"{len(cargos)} Payloads failed! Running it for each Payload "
+                f"separately...\nError: {e}"
             )
-            logger.error(msg)
-            cargo = self._update_ppj_payload_of_cargo(
-                cargo=cargo,
-                status=BackgroundJobStatus.ERROR,
-                error_msg=msg,
+            return [self._try_run_step(cargo=cargo, step=step) for cargo in cargos]
+
+        return [(cargo, None) for cargo in cargos]
+
+    def _complete_step(
+        self, cargo: PipelineCargo, step: PipelineStep, error: Optional[Exception]
+    ) -> PipelineCargo:
+        if error is not None:
+            return self._set_error_of_cargo(cargo=cargo, error=error)
+        return self._finish_step_of_cargo(cargo=cargo, step=step)
+
+    def _finish_step_of_cargo(
+        self, cargo: PipelineCargo, step: PipelineStep
+    ) -> PipelineCargo:
+        cargo.finished_steps.append(step)
+        # the steps of a stage do not finish in the order of the next steps
+        if step in cargo.next_steps:
+            cargo.next_steps.remove(step)
+
+        logger.debug(f"[Pipeline Worker {os.getpid()}] Finished: {step} !")
+        return cargo
+
+    def _set_error_of_cargo(
+        self, cargo: PipelineCargo, error: Exception
+    ) -> PipelineCargo:
+        if cargo._retry_transient_errors and is_transient_error(error):
+            logger.warning(
+                f"A transient error occurred while executing the PreprocessingPipeline("
+                f"{self._dt}) for PreprocessingJobPayload {cargo.ppj_payload.filename}!"
+                f" Retrying from the last checkpoint...\nError: {error}"
             )
-        finally:
+            cargo._transient_error = error
             return cargo
+        msg = (
+            "An error occurred while executing the PreprocessingPipeline("
+            f"{self._dt}) for PreprocessingJobPayload "
+            f"{cargo.ppj_payload.filename}!\n"
+            f"Error: {error}"
+        )
+        logger.error(msg)
+        return self._update_ppj_payload_of_cargo(
+            cargo=cargo,
+            status=BackgroundJobStatus.ERROR,
+            error_msg=msg,
+        )
 
     def _update_ppj_payload_of_cargo(
         self,
@@ -267,31 +565,39 @@ class PreprocessingPipeline:
         status: Optional[BackgroundJobStatus] = None,
         error_msg: Optional[str] = None,
     ) -> PipelineCargo:
-        # we have to set the members explicitly due to pydantic default value behavior
-        update_dto = PreprocessingJobPayloadUpdate()
-        if current_step_name is not None:
-            update_dto.current_pipeline_step = current_step_name
-        if status is not None:
-            update_dto.status = status
-        if error_msg is not None:
-            update_dto.error_message = error_msg
-        with self.sqls.db_session() as db:
-            db_obj = crud_prepro_job_payload.update(
-                db=db,
-                uuid=cargo.ppj_payload.id,
-                update_dto=update_dto,
-            )
-            cargo.ppj_payload = PreprocessingJobPayloadRead.model_validate(db_obj)
-        return cargo
+        # step and RUNNING updates are buffered, see PreprocessingJobProgress
+        return self.progress.update_payload(
+            cargo=cargo,
+            current_step_name=current_step_name,
+            status=status,
+            error_msg=error_msg,
+        )
 
     def freeze(self) -> None:
         logger.info(f"Freezing the PreprocessingPipeline({self._dt})!")
+        steps = [step for _, step in sorted(self._steps_by_ordering.items())]
+        self.checkpoints.freeze(steps)
+        if self.max_concurrent_steps > 1:
+            self._stages = compute_pipeline_stages(steps)
+        else:
+            self._stages = [[step] for step in steps]
+        logger.info(
+            f"PreprocessingPipeline({self._dt}) stages:\n\t"
+            + "\n\t".join(
+                ", ".join(step.name for step in stage) for stage in self._stages
+            )
+        )
         self.__is_frozen = True
 
     def register_step(
         self,
         func: Callable[[PipelineCargo], PipelineCargo],
         required_data: List[str] = [],
+        produced_data: Optional[List[str]] = None,
+        batch_func: Optional[
+            Callable[[List[PipelineCargo]], List[PipelineCargo]]
+        ] = None,
+        checkpoint: bool = False,
     ):
         if self.__is_frozen:
             msg = (
@@ -304,7 +610,10 @@ class PreprocessingPipeline:
             name=func.__name__,
             ordering=len(self) + 1,
             required_data=required_data,
+            produced_data=produced_data,
             run=func,
+            run_batch=batch_func,
+            checkpoint=checkpoint,
         )
         self._register_pipeline_step(step_instance)
 
@@ -329,7 +638,10 @@ class PreprocessingPipeline:
                 name=f"{pipeline._dt}::{step.name}",
                 ordering=len(self) + 1,
                 required_data=step.required_data,
+                produced_data=step.produced_data,
                 run=step.run,
+                run_batch=step.run_batch,
+                checkpoint=step.checkpoint,
             )
             self._register_pipeline_step(step_with_new_ordering)
 
@@ -33,4 +33,5 @@ def add_audio_processing_steps(pipeline: PreprocessingPipeline) -> None:
     pipeline.register_step(
         func=generate_automatic_transcription,
         required_data=["ppad"],
+        checkpoint=True,
     )
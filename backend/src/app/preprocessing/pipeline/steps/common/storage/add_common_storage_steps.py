@@ -7,12 +7,14 @@ from app.preprocessing.pipeline.steps.common.storage.persist_sdoc_info import (
 def add_common_storage_steps(pipeline: PreprocessingPipeline) -> None:
     from app.preprocessing.pipeline.steps.common.storage.index_text_document_for_simsearch import (
         index_text_document_for_simsearch,
+        index_text_documents_for_simsearch,
     )
     from app.preprocessing.pipeline.steps.common.storage.remove_erroneous_sdoc import (
         remove_erroneous_or_unfinished_sdocs,
     )
     from app.preprocessing.pipeline.steps.common.storage.store_document_in_elasticsearch import (
         store_document_in_elasticsearch,
+        store_documents_in_elasticsearch,
     )
 
     pipeline.register_step(
@@ -26,10 +28,14 @@ def add_common_storage_steps(pipeline: PreprocessingPipeline) -> None:
 
     pipeline.register_step(
         func=store_document_in_elasticsearch,
-        required_data=["pptd", "sdoc_id"],
+        required_data=["pptd.text", "sdoc_id"],
+        produced_data=[],
+        batch_func=store_documents_in_elasticsearch,
     )
 
     pipeline.register_step(
         func=index_text_document_for_simsearch,
-        required_data=["pptd", "sdoc_id"],
+        required_data=["pptd.sentences", "sdoc_id"],
+        produced_data=[],
+        batch_func=index_text_documents_for_simsearch,
     )
@@ -1,3 +1,5 @@
+from typing import Dict, List
+
 from app.core.db.simsearch_service import SimSearchService
 from app.preprocessing.pipeline.model.pipeline_cargo import PipelineCargo
 from app.preprocessing.pipeline.model.text.preprotextdoc import PreProTextDoc
@@ -20,3 +22,23 @@ def index_text_document_for_simsearch(cargo: PipelineCargo) -> PipelineCargo:
         )
 
     return cargo
+
+
+def index_text_documents_for_simsearch(
+    cargos: List[PipelineCargo],
+) -> List[PipelineCargo]:
+    proj_id2sdoc_id2sentences: Dict[int, Dict[int, List[str]]] = dict()
+    for cargo in cargos:
+        pptd: PreProTextDoc = cargo.data["pptd"]
+        proj_id2sdoc_id2sentences.setdefault(pptd.project_id, dict())[
+            cargo.data["sdoc_id"]
+        ] = [sent.text for sent in pptd.sentences]
+
+    # adding the sentences of an SDoc again (after an error) replaces its embeddings
+    for proj_id, sdoc_id2sentences in proj_id2sdoc_id2sentences.items():
+        sss.add_text_sdocs_to_index(
+            proj_id=proj_id,
+            sdoc_id2sentences=sdoc_id2sentences,
+        )
+
+    return cargos
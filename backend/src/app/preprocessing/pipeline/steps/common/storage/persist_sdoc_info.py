@@ -18,7 +18,6 @@ from app.core.data.dto.source_document_data import SourceDocumentDataCreate
 from app.core.data.dto.source_document_metadata import SourceDocumentMetadataCreate
 from app.core.data.orm.source_document import SourceDocumentORM
 from app.core.data.repo.repo_service import RepoService
-from app.core.db.elasticsearch_service import ElasticSearchService
 from app.core.db.sql_service import SQLService
 from app.preprocessing.pipeline.model.audio.preproaudiodoc import PreProAudioDoc
 from app.preprocessing.pipeline.model.pipeline_cargo import PipelineCargo
@@ -27,7 +26,6 @@ from app.preprocessing.pipeline.model.text.preprotextdoc import PreProTextDoc
 
 repo: RepoService = RepoService()
 sql: SQLService = SQLService()
-es = ElasticSearchService()
 
 
 def __create_and_persist_sdoc(db: Session, ppdb: PreProDocBase) -> SourceDocumentORM:
@@ -138,6 +136,8 @@ def __persist_sdoc_data(
         html=pptd.html,
         token_starts=[s for s, _ in pptd.token_character_offsets],
         token_ends=[e for _, e in pptd.token_character_offsets],
+        token_html_starts=[s for s, _ in pptd.token_html_character_offsets],
+        token_html_ends=[e for _, e in pptd.token_html_character_offsets],
         sentence_starts=[s.start for s in pptd.sentences],
         sentence_ends=[s.end for s in pptd.sentences],
         repo_url=url,
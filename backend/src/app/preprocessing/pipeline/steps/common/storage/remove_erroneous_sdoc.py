@@ -13,7 +13,8 @@ sql: SQLService = SQLService()
 def remove_erroneous_or_unfinished_sdocs(cargo: PipelineCargo) -> PipelineCargo:
     # this method should be called before writing a document to the database. So in case
     # the document is already in the database but not finished, we remove it to make the
-    # preprocessing pipeline idempotent.
+    # preprocessing pipeline idempotent, e.g., if a retry resumes from a checkpoint after
+    # the document was (partially) written. The file is kept, since it is preprocessed.
     with sql.db_session() as db:
         # this should work for all kind of documents (audio, image, text, video)
         for doc in ["ppad", "pptd", "ppvd", "ppid"]:
@@ -29,9 +30,9 @@ def remove_erroneous_or_unfinished_sdocs(cargo: PipelineCargo) -> PipelineCargo:
                     filename=filename,
                     only_finished=False,
                 )
-                if sdoc is not None and sdoc.status != SDocStatus.finished is False:
+                if sdoc is not None and sdoc.status != SDocStatus.finished:
                     logger.info(
                         f"Removing erroneous or unfinished SourceDocument {filename}!"
                     )
-                    sdoc = crud_sdoc.remove(db=db, id=sdoc.id)
+                    sdoc = crud_sdoc.remove(db=db, id=sdoc.id, remove_file=False)
     return cargo
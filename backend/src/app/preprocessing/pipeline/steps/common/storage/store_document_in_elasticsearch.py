@@ -1,12 +1,13 @@
+from typing import Dict, List, Set
+
 from app.core.data.dto.search import (
     ElasticSearchDocumentCreate,
 )
 from app.core.db.elasticsearch_service import ElasticSearchService
 from app.preprocessing.pipeline.model.pipeline_cargo import PipelineCargo
+from app.preprocessing.pipeline.model.pipeline_step import PipelineBatchError
 from app.preprocessing.pipeline.model.text.preprotextdoc import PreProTextDoc
 
-es = ElasticSearchService()
-
 
 def store_document_in_elasticsearch(cargo: PipelineCargo) -> PipelineCargo:
     pptd: PreProTextDoc = cargo.data["pptd"]
@@ -21,6 +22,43 @@ def store_document_in_elasticsearch(cargo: PipelineCargo) -> PipelineCargo:
         project_id=pptd.project_id,
     )
 
-    es.add_document_to_index(proj_id=proj_id, esdoc=esdoc)
+    ElasticSearchService().add_document_to_index(proj_id=proj_id, esdoc=esdoc)
 
     return cargo
+
+
+def store_documents_in_elasticsearch(
+    cargos: List[PipelineCargo],
+) -> List[PipelineCargo]:
+    proj_id2esdocs: Dict[int, List[ElasticSearchDocumentCreate]] = dict()
+    for cargo in cargos:
+        pptd: PreProTextDoc = cargo.data["pptd"]
+        proj_id2esdocs.setdefault(pptd.project_id, []).append(
+            ElasticSearchDocumentCreate(
+                filename=pptd.filename,
+                content=pptd.text,
+                sdoc_id=cargo.data["sdoc_id"],
+                project_id=pptd.project_id,
+            )
+        )
+
+    # the documents are indexed by their sdoc_id, so adding them again (after an
+    # error) replaces them
+    failed_ids: Set[int] = set()
+    for proj_id, esdocs in proj_id2esdocs.items():
+        added_ids = ElasticSearchService().add_documents_to_index(
+            proj_id=proj_id, esdocs=esdocs
+        )
+        if len(added_ids) != len(esdocs):
+            failed_ids.update({esdoc.sdoc_id for esdoc in esdocs}.difference(added_ids))
+    if len(failed_ids) > 0:
+        raise PipelineBatchError(
+            f"Cannot add the SourceDocuments {sorted(failed_ids)} to ElasticSearch!",
+            failed_idxs=[
+                idx
+                for idx, cargo in enumerate(cargos)
+                if cargo.data["sdoc_id"] in failed_ids
+            ],
+        )
+
+    return cargos
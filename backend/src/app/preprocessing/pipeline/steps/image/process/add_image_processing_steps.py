@@ -28,9 +28,11 @@ def add_image_processing_steps(pipeline: PreprocessingPipeline) -> None:
     pipeline.register_step(
         func=run_object_detection,
         required_data=["ppid"],
+        checkpoint=True,
     )
 
     pipeline.register_step(
         func=generate_image_caption,
         required_data=["ppid"],
+        checkpoint=True,
     )
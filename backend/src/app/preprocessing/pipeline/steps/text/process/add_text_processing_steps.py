@@ -6,9 +6,6 @@ def add_text_processing_steps(
     pipeline: PreprocessingPipeline,
     is_init: bool = True,
 ) -> None:
-    from app.preprocessing.pipeline.steps.text.process.apply_html_source_mapping_with_custom_html_tags import (
-        apply_html_source_mapping_with_custom_html_tags,
-    )
     from app.preprocessing.pipeline.steps.text.process.detect_content_language import (
         detect_content_language,
     )
@@ -30,8 +27,12 @@ def add_text_processing_steps(
     from app.preprocessing.pipeline.steps.text.process.generate_word_frequencies import (
         generate_word_frequncies,
     )
+    from app.preprocessing.pipeline.steps.text.process.map_token_offsets_to_html import (
+        map_token_offsets_to_html,
+    )
     from app.preprocessing.pipeline.steps.text.process.run_spacy_pipeline import (
         run_spacy_pipeline,
+        run_spacy_pipeline_batch,
     )
 
     pipeline.register_step(
@@ -46,36 +47,56 @@ def add_text_processing_steps(
 
     pipeline.register_step(
         func=run_spacy_pipeline,
-        required_data=["pptd"],
+        required_data=["pptd.text", "pptd.metadata.language"],
+        produced_data=["pptd.spacy_pipeline_output"],
+        batch_func=run_spacy_pipeline_batch,
+        checkpoint=True,
     )
 
     pipeline.register_step(
         func=generate_word_frequncies,
-        required_data=["pptd"],
+        required_data=["pptd.spacy_pipeline_output"],
+        produced_data=[
+            "pptd.tokens",
+            "pptd.token_character_offsets",
+            "pptd.word_freqs",
+        ],
     )
 
     pipeline.register_step(
         func=generate_keywords,
-        required_data=["pptd"],
+        required_data=[
+            "pptd.spacy_pipeline_output",
+            "pptd.text",
+            "pptd.metadata.language",
+        ],
+        produced_data=["pptd.metadata.keywords"],
     )
 
     pipeline.register_step(
         func=generate_sentence_annotations,
-        required_data=["pptd"],
+        required_data=["pptd.spacy_pipeline_output"],
+        produced_data=["pptd.sentences"],
     )
 
     pipeline.register_step(
         func=generate_named_entity_annotations,
-        required_data=["pptd"],
+        required_data=["pptd.spacy_pipeline_output"],
+        produced_data=["pptd.spans", "pptd.sent_annos"],
     )
 
     pipeline.register_step(
-        func=apply_html_source_mapping_with_custom_html_tags,
-        required_data=["pptd"],
+        func=map_token_offsets_to_html,
+        required_data=[
+            "pptd.text2html_source_mapping",
+            "pptd.token_character_offsets",
+        ],
+        produced_data=["pptd.token_html_character_offsets"],
     )
 
     if is_init:
         pipeline.register_step(
             func=extract_sdoc_links_from_html_of_mixed_documents,
-            required_data=["pptd"],
+            required_data=["pptd.html"],
+            produced_data=["pptd.sdoc_link_create_dtos"],
         )
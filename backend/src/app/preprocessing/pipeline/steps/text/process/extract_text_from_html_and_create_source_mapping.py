@@ -1,10 +1,10 @@
-import re
 from html.parser import HTMLParser
 from itertools import accumulate
 from typing import List, Optional, TypedDict
 
 from app.preprocessing.pipeline.model.pipeline_cargo import PipelineCargo
 from app.preprocessing.pipeline.model.text.preprotextdoc import PreProTextDoc
+from app.preprocessing.pipeline.model.text.source_mapping import SourceMapping
 
 
 class Text(TypedDict):
@@ -54,17 +54,12 @@ class HTMLTextMapper(CustomLineHTMLParser):
     def handle_data(self, data: str):
         # only add text if it is not only whitespaces!
         if not data.isspace():
-            match = re.match(r"^(\s+)", data)
-            start_spaces = 0
-            if match and match.group(1):
-                start_spaces = len(match.group(1))
-
-            match2 = re.match(r".*(\s+)$", data)
-            if match2 and match2.group(1):
-                self.end_spaces = len(match2.group(1))
+            text = data.strip()
+            start_spaces = len(data) - len(data.lstrip())
+            self.end_spaces = len(data) - len(data.rstrip())
 
             self.text = {
-                "text": data.strip(),
+                "text": text,
                 "start": self.current_index + start_spaces,
                 "end": -1,
             }
@@ -101,11 +96,11 @@ def extract_text_from_html_and_create_source_mapping(
 
     text = " ".join([str(r["text"]) for r in results])
     pptd.text = text
-    text2html_character_offsets: List[int] = []
-    for result in results:
-        text2html_character_offsets.extend(
-            range(int(result["start"]), int(result["end"]) + 1)
-        )
-    pptd.text2html_character_offsets = text2html_character_offsets
+    # each text is followed by a joining space (or the end of the text), which is
+    # mapped to the end of the text in the HTML
+    pptd.text2html_source_mapping = SourceMapping.from_segments(
+        html_starts=[int(r["start"]) for r in results],
+        lengths=[int(r["end"]) - int(r["start"]) + 1 for r in results],
+    )
 
     return cargo
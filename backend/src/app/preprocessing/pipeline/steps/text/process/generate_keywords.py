@@ -34,7 +34,7 @@ def generate_keywords(cargo: PipelineCargo) -> PipelineCargo:
         keyword_proposals = kw_extractor.extract_keywords(pptd.text)
         keyword_proposals = [kw for kw, _ in keyword_proposals]
 
-        tok2pos = {tok.text: tok.pos for tok in out.tokens}
+        tok2pos = dict(zip(out.token_texts(pptd.text), out.token_pos_tags()))
 
         keep = [
             "NOUN",
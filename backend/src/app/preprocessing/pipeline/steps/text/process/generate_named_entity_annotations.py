@@ -1,3 +1,4 @@
+import numpy as np
 from loguru import logger
 
 from app.core.data.crud.user import SYSTEM_USER_ID
@@ -31,19 +32,23 @@ def generate_named_entity_annotations(cargo: PipelineCargo) -> PipelineCargo:
             pptd.sent_annos[auto.code].add(auto)
 
     # create AutoSpans for NER
-    for ne in out.ents:
-        # FIXME Flo: hacky solution for German NER model, which only contains ('LOC', 'MISC', 'ORG', 'PER')
-        code_name = f"{ne.label}"
-        if code_name == "PER":
-            code_name = "PERSON"
-
+    # FIXME Flo: hacky solution for German NER model, which only contains ('LOC', 'MISC', 'ORG', 'PER')
+    labels = out.ent_label_names()
+    code_names = np.where(labels == "PER", "PERSON", labels).tolist()
+    for code_name, start, end, start_token, end_token in zip(
+        code_names,
+        out.ent_starts.tolist(),
+        out.ent_ends.tolist(),
+        out.ent_start_tokens.tolist(),
+        out.ent_end_tokens.tolist(),
+    ):
         auto = AutoSpan(
             code=code_name,
-            start=ne.start_char,
-            end=ne.end_char,
-            text=ne.text,
-            start_token=ne.start_token,
-            end_token=ne.end_token,
+            start=start,
+            end=end,
+            text=pptd.text[start:end],
+            start_token=start_token,
+            end_token=end_token,
             user_id=SYSTEM_USER_ID,
         )
         if auto.code not in pptd.spans:
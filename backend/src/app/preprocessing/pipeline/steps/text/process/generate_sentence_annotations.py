@@ -16,13 +16,9 @@ def generate_sentence_annotations(cargo: PipelineCargo) -> PipelineCargo:
         )
         return cargo
 
-    pptd.sentences = list()
-    for s in out.sents:
-        sent = Sentence(
-            start=s.start_char,
-            end=s.end_char,
-            text=s.text,
-        )
-        pptd.sentences.append(sent)
+    pptd.sentences = [
+        Sentence(start=start, end=end, text=pptd.text[start:end])
+        for start, end in zip(out.sent_starts.tolist(), out.sent_ends.tolist())
+    ]
 
     return cargo
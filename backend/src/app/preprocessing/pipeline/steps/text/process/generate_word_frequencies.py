@@ -1,11 +1,18 @@
 from collections import Counter
 from typing import Optional
 
+import numpy as np
 from loguru import logger
 
 from app.preprocessing.pipeline.model.audio.preproaudiodoc import PreProAudioDoc
 from app.preprocessing.pipeline.model.pipeline_cargo import PipelineCargo
 from app.preprocessing.pipeline.model.text.preprotextdoc import PreProTextDoc
+from app.preprocessing.ray_model_worker.dto.spacy import (
+    IS_ALPHA,
+    IS_DIGIT,
+    IS_PUNCTUATION,
+    IS_STOPWORD,
+)
 
 
 def generate_word_frequncies(cargo: PipelineCargo) -> PipelineCargo:
@@ -21,18 +28,19 @@ def generate_word_frequncies(cargo: PipelineCargo) -> PipelineCargo:
         )
         return cargo
 
-    pptd.word_freqs = Counter()
+    word_freqs: Counter = Counter()
     if not ppad or ppad.tokens is None or ppad.token_character_offsets is None:
-        for token in out.tokens:
-            pptd.tokens.append(token.text)
-            pptd.token_character_offsets.append((token.start_char, token.end_char))
-            # pptd.pos.append(token.pos)
-            # pptd.lemmas.append(token.lemma)
-            # pptd.stopwords.append(token.is_stopword)
-            if not (token.is_stopword or token.is_punctuation) and (
-                token.is_alpha or token.is_digit
-            ):
-                pptd.word_freqs.update((token.text,))
+        pptd.tokens = out.token_texts(pptd.text)
+        pptd.token_character_offsets = list(
+            zip(out.token_starts.tolist(), out.token_ends.tolist())
+        )
+        # words are alphabetic or numeric tokens that are neither stopwords
+        # nor punctuation
+        flags = out.token_flags
+        is_word = ((flags & (IS_STOPWORD | IS_PUNCTUATION)) == 0) & (
+            (flags & (IS_ALPHA | IS_DIGIT)) != 0
+        )
+        word_freqs.update(map(pptd.tokens.__getitem__, np.flatnonzero(is_word)))
 
     else:
         pptd.tokens = ppad.tokens
@@ -40,9 +48,6 @@ def generate_word_frequncies(cargo: PipelineCargo) -> PipelineCargo:
         # TODO: What are stopwords and punctuations and so on?
 
     # sort the word freqs!
-    pptd.word_freqs = {
-        k: v
-        for (k, v) in sorted(pptd.word_freqs.items(), key=lambda i: i[1], reverse=True)
-    }
+    pptd.word_freqs = dict(word_freqs.most_common())
 
     return cargo
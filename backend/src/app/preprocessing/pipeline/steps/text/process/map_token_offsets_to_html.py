@@ -0,0 +1,24 @@
+import numpy as np
+from loguru import logger
+
+from app.preprocessing.pipeline.model.pipeline_cargo import PipelineCargo
+from app.preprocessing.pipeline.model.text.preprotextdoc import PreProTextDoc
+
+
+def map_token_offsets_to_html(
+    cargo: PipelineCargo,
+) -> PipelineCargo:
+    pptd: PreProTextDoc = cargo.data["pptd"]
+
+    # the <t> and <sent> tags are rendered on demand with these offsets,
+    # see SourceDocumentDataORM.tagged_html
+    try:
+        html_offsets = pptd.text2html_source_mapping.to_html(
+            np.asarray(pptd.token_character_offsets, dtype=np.int64).reshape(-1, 2)
+        ).tolist()
+    except IndexError as e:
+        logger.error(f"'${pptd.filename}' seems to be corrupted! {e}")
+        raise e
+    pptd.token_html_character_offsets = [(start, end) for start, end in html_offsets]
+
+    return cargo
@@ -1,7 +1,13 @@
+from typing import List
+
 from app.preprocessing.pipeline.model.pipeline_cargo import PipelineCargo
 from app.preprocessing.pipeline.model.text.preprotextdoc import PreProTextDoc
 from app.preprocessing.ray_model_service import RayModelService
-from app.preprocessing.ray_model_worker.dto.spacy import SpacyInput, SpacyPipelineOutput
+from app.preprocessing.ray_model_worker.dto.spacy import (
+    SpacyBatchInput,
+    SpacyColumns,
+    SpacyInput,
+)
 
 rms = RayModelService()
 
@@ -14,7 +20,30 @@ def run_spacy_pipeline(cargo: PipelineCargo) -> PipelineCargo:
         text=pptd.text,
         language=pptd.metadata["language"],
     )
-    spacy_output: SpacyPipelineOutput = rms.spacy_pipline(spacy_input)
+    spacy_output: SpacyColumns = rms.spacy_pipline(spacy_input)
     pptd.spacy_pipeline_output = spacy_output
 
     return cargo
+
+
+def run_spacy_pipeline_batch(cargos: List[PipelineCargo]) -> List[PipelineCargo]:
+    pptds: List[PreProTextDoc] = [cargo.data["pptd"] for cargo in cargos]
+
+    for pptd in pptds:
+        assert isinstance(pptd.metadata["language"], str), "Language is not a string"
+    spacy_input = SpacyBatchInput(
+        items=[
+            SpacyInput(text=pptd.text, language=pptd.metadata["language"])  # type: ignore
+            for pptd in pptds
+        ]
+    )
+    spacy_output = rms.spacy_pipeline_batch(spacy_input)
+    if len(spacy_output) != len(pptds):
+        raise ValueError(
+            f"spaCy Input/Output mismatch! Input: {len(pptds)} documents, "
+            f"Output: {len(spacy_output)} documents"
+        )
+    for pptd, output in zip(pptds, spacy_output):
+        pptd.spacy_pipeline_output = output
+
+    return cargos
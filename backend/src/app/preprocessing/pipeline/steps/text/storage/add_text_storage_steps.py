@@ -1,10 +1,15 @@
 from app.core.db.sql_service import SQLService
 from app.preprocessing.pipeline.preprocessing_pipeline import PreprocessingPipeline
+from app.preprocessing.pipeline.steps.text.storage.persist_sdoc_duplicate_signature import (
+    persist_sdoc_duplicate_signature,
+    persist_sdoc_duplicate_signatures,
+)
 from app.preprocessing.pipeline.steps.text.storage.persist_sdoc_links import (
     persist_sdoc_links,
 )
 from app.preprocessing.pipeline.steps.text.storage.persist_sdoc_word_frequencies import (
     persist_sdoc_word_frequencies,
+    persist_sdoc_word_frequencies_batch,
 )
 from app.preprocessing.pipeline.steps.text.storage.persist_sentence_annotations import (
     persist_sentence_annotations,
@@ -17,26 +22,43 @@ sql: SQLService = SQLService()
 
 
 def add_text_storage_steps(pipeline: PreprocessingPipeline) -> None:
+    # the storage steps only write to the databases, so they can run concurrently.
+    # Persisting span and sentence annotations both create the AnnotationDocuments
+    # of the annotating users, so they must not run at the same time.
+
     # persist SourceDocument Links
     pipeline.register_step(
         func=persist_sdoc_links,
-        required_data=["pptd"],
+        required_data=["pptd.sdoc_link_create_dtos", "sdoc_id"],
+        produced_data=[],
     )
 
     # persist SpanAnnotations
     pipeline.register_step(
         func=persist_span_annotations,
-        required_data=["pptd"],
+        required_data=["pptd.spans", "sdoc_id"],
+        produced_data=["annotation_documents"],
     )
 
     # persist SentenceAnnotations
     pipeline.register_step(
         func=persist_sentence_annotations,
-        required_data=["pptd"],
+        required_data=["pptd.sent_annos", "sdoc_id"],
+        produced_data=["annotation_documents"],
     )
 
     # persist WordFrequencies
     pipeline.register_step(
         func=persist_sdoc_word_frequencies,
-        required_data=["pptd"],
+        required_data=["pptd.word_freqs", "sdoc_id"],
+        produced_data=[],
+        batch_func=persist_sdoc_word_frequencies_batch,
+    )
+
+    # persist the MinHash signature used by the duplicate finder
+    pipeline.register_step(
+        func=persist_sdoc_duplicate_signature,
+        required_data=["pptd.word_freqs", "sdoc_id"],
+        produced_data=[],
+        batch_func=persist_sdoc_duplicate_signatures,
     )
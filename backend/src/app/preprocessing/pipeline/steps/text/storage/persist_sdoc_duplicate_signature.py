@@ -0,0 +1,52 @@
+from typing import List
+
+from loguru import logger
+
+from app.core.analysis.duplicate_finder.signature_index import (
+    compute_duplicate_signature,
+)
+from app.core.data.crud.duplicate_signature import crud_duplicate_signature
+from app.core.db.sql_service import SQLService
+from app.preprocessing.pipeline.model.pipeline_cargo import PipelineCargo
+from app.preprocessing.pipeline.model.text.preprotextdoc import PreProTextDoc
+
+sql: SQLService = SQLService()
+
+
+def persist_sdoc_duplicate_signature(cargo: PipelineCargo) -> PipelineCargo:
+    pptd: PreProTextDoc = cargo.data["pptd"]
+    if len(pptd.word_freqs) == 0:
+        return cargo
+
+    logger.info(f"Persisting SourceDocument Duplicate Signature for {pptd.filename}...")
+    create_dto = compute_duplicate_signature(
+        sdoc_id=cargo.data["sdoc_id"],
+        project_id=pptd.project_id,
+        word_freqs=pptd.word_freqs,
+    )
+    with sql.db_session() as db:
+        crud_duplicate_signature.upsert_multi(db=db, create_dtos=[create_dto])
+    return cargo
+
+
+def persist_sdoc_duplicate_signatures(
+    cargos: List[PipelineCargo],
+) -> List[PipelineCargo]:
+    create_dtos = []
+    for cargo in cargos:
+        pptd: PreProTextDoc = cargo.data["pptd"]
+        if len(pptd.word_freqs) == 0:
+            continue
+        create_dtos.append(
+            compute_duplicate_signature(
+                sdoc_id=cargo.data["sdoc_id"],
+                project_id=pptd.project_id,
+                word_freqs=pptd.word_freqs,
+            )
+        )
+
+    logger.info(f"Persisting {len(create_dtos)} SourceDocument Duplicate Signatures...")
+    # upsert_multi commits once, so nothing is persisted if it fails
+    with sql.db_session() as db:
+        crud_duplicate_signature.upsert_multi(db=db, create_dtos=create_dtos)
+    return cargos
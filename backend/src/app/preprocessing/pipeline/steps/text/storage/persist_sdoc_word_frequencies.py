@@ -1,7 +1,10 @@
 import traceback
+from collections import defaultdict
+from typing import Dict, List
 
 from loguru import logger
 
+from app.core.data.crud.project_word_frequency import crud_project_word_frequency
 from app.core.data.crud.word_frequency import crud_word_frequency
 from app.core.data.dto.word_frequency import WordFrequencyCreate
 from app.core.db.sql_service import SQLService
@@ -28,6 +31,10 @@ def persist_sdoc_word_frequencies(cargo: PipelineCargo) -> PipelineCargo:
                         count=count,
                     )
                 )
+            # committed together with the word frequencies
+            crud_project_word_frequency.add_sdoc_word_frequencies(
+                db=db, project_id=pptd.project_id, word_freqs=[word_freqs]
+            )
             crud_word_frequency.create_multi(db=db, create_dtos=wfs_create_dtos)
         except Exception as e:
             logger.error(
@@ -42,3 +49,38 @@ def persist_sdoc_word_frequencies(cargo: PipelineCargo) -> PipelineCargo:
             db.rollback()
             raise e
     return cargo
+
+
+def persist_sdoc_word_frequencies_batch(
+    cargos: List[PipelineCargo],
+) -> List[PipelineCargo]:
+    logger.info(f"Persisting SourceDocument Word Frequencies for {len(cargos)} docs...")
+    wfs_create_dtos = []
+    for cargo in cargos:
+        pptd: PreProTextDoc = cargo.data["pptd"]
+        sdoc_id = cargo.data["sdoc_id"]
+        for word, count in pptd.word_freqs.items():
+            wfs_create_dtos.append(
+                WordFrequencyCreate(
+                    sdoc_id=sdoc_id,
+                    word=word,
+                    count=count,
+                )
+            )
+    project_id2word_freqs: Dict[int, List[Dict[str, int]]] = defaultdict(list)
+    for cargo in cargos:
+        pptd: PreProTextDoc = cargo.data["pptd"]
+        project_id2word_freqs[pptd.project_id].append(pptd.word_freqs)
+    with sql.db_session() as db:
+        # everything is committed at once by create_multi, so nothing is persisted if
+        # it fails and the step can be run for each cargo separately
+        try:
+            for project_id, word_freqs in project_id2word_freqs.items():
+                crud_project_word_frequency.add_sdoc_word_frequencies(
+                    db=db, project_id=project_id, word_freqs=word_freqs
+                )
+            crud_word_frequency.create_multi(db=db, create_dtos=wfs_create_dtos)
+        except Exception as e:
+            db.rollback()
+            raise e
+    return cargos
@@ -0,0 +1,35 @@
+from typing import Optional, Set
+
+import httpx
+import redis
+import requests
+import sqlalchemy.exc
+from elasticsearch.exceptions import ConnectionError as ESConnectionError
+
+# errors of unavailable or overloaded services that are likely gone on a retry
+TRANSIENT_ERRORS = (
+    ConnectionError,
+    TimeoutError,
+    ESConnectionError,
+    httpx.TransportError,
+    redis.exceptions.ConnectionError,
+    redis.exceptions.TimeoutError,
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    sqlalchemy.exc.OperationalError,
+    sqlalchemy.exc.TimeoutError,
+)
+
+
+def is_transient_error(error: Optional[BaseException]) -> bool:
+    """
+    Returns True if the error or one of the errors it was raised from (or while
+    handling) is transient, e.g., clients wrap the errors of their connections.
+    """
+    seen: Set[int] = set()
+    while error is not None and id(error) not in seen:
+        if isinstance(error, TRANSIENT_ERRORS):
+            return True
+        seen.add(id(error))
+        error = error.__cause__ or error.__context__
+    return False
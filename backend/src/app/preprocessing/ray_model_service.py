@@ -1,11 +1,16 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
+import numpy as np
 import requests
 from loguru import logger
 from requests import Response
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+from app.preprocessing.micro_batcher import MicroBatcher
 from app.preprocessing.ray_model_worker.dto.blip2 import Blip2FilePathInput, Blip2Output
 from app.preprocessing.ray_model_worker.dto.clip import (
+    NPY_MEDIA_TYPE,
     ClipEmbeddingOutput,
     ClipImageEmbeddingInput,
     ClipTextEmbeddingInput,
@@ -22,7 +27,15 @@ from app.preprocessing.ray_model_worker.dto.seqsenttagger import (
     SeqSentTaggerJobInput,
     SeqSentTaggerJobResponse,
 )
-from app.preprocessing.ray_model_worker.dto.spacy import SpacyInput, SpacyPipelineOutput
+from app.preprocessing.ray_model_worker.dto.spacy import (
+    SPACY_COLUMNS_MEDIA_TYPE,
+    SpacyBatchInput,
+    SpacyBatchPipelineOutput,
+    SpacyColumns,
+    SpacyInput,
+    SpacyPipelineOutput,
+    decode_spacy_columns,
+)
 from app.preprocessing.ray_model_worker.dto.whisper import (
     WhisperFilePathInput,
     WhisperTranscriptionOutput,
@@ -30,14 +43,26 @@ from app.preprocessing.ray_model_worker.dto.whisper import (
 from app.util.singleton_meta import SingletonMeta
 from config import conf
 
+cc = conf.ray.client
+
+# responses with these status codes are retried (e.g. while ray serve is restarting)
+RETRY_STATUS_CODES = [502, 503, 504]
+
 
 class RayModelService(metaclass=SingletonMeta):
     def __new__(cls, *args, **kwargs):
         cls.base_url = f"{conf.ray.protocol}://{conf.ray.host}:{conf.ray.port}"
         logger.info(f"RayModelService base_url: {cls.base_url}")
 
+        cls.timeout = (float(cc.connect_timeout), float(cc.read_timeout))
+        cls.max_retries = int(cc.max_retries)
+        cls.backoff_factor = float(cc.backoff_factor)
+        cls.binary_embeddings = bool(cc.binary_embeddings)
+        cls.binary_spacy = bool(cc.binary_spacy)
+        cls.session = cls._create_session()
+
         try:
-            response = requests.get(f"{cls.base_url}/-/routes")
+            response = cls.session.get(f"{cls.base_url}/-/routes")
             if not response.status_code == 200:
                 msg = (
                     f"Request to {cls.base_url} failed with "
@@ -58,7 +83,44 @@ class RayModelService(metaclass=SingletonMeta):
             logger.error(msg)
             raise SystemExit(msg)
 
-        return super(RayModelService, cls).__new__(cls)
+        instance = super(RayModelService, cls).__new__(cls)
+
+        # concurrent requests of multiple threads are merged into a single ray call
+        instance._spacy_batcher = None
+        instance._clip_text_batcher = None
+        if bool(cc.micro_batching):
+            instance._spacy_batcher = MicroBatcher(
+                name="spacy_pipeline",
+                process_batch=instance._spacy_pipeline_merged,
+                max_batch_size=int(cc.max_batch_size),
+            )
+            instance._clip_text_batcher = MicroBatcher(
+                name="clip_text_embedding",
+                process_batch=instance._clip_text_embedding_merged,
+                max_batch_size=int(cc.max_batch_size),
+            )
+
+        return instance
+
+    @classmethod
+    def _create_session(cls) -> requests.Session:
+        # keeps the connections to ray alive instead of opening one per request
+        retry = Retry(
+            total=cls.max_retries,
+            backoff_factor=cls.backoff_factor,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=None,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=int(cc.pool_size),
+            pool_maxsize=int(cc.pool_size),
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
 
     def _assert_valid_base_route(self, endpoint: str) -> None:
         for br in self.base_routes:
@@ -71,10 +133,15 @@ class RayModelService(metaclass=SingletonMeta):
         logger.error(msg)
         raise Exception(msg)
 
-    def _make_post_request(self, endpoint: str, data: Dict[str, Any]) -> Response:
+    def _make_post_request(
+        self, endpoint: str, data: Dict[str, Any], accept: Optional[str] = None
+    ) -> Response:
         url = f"{self.base_url}{endpoint}"
         logger.debug(f"Making POST request to {url} with data: {data}"[:1000])
-        response = requests.post(url, json=data, timeout=1200)
+        headers = {"Accept": accept} if accept is not None else None
+        response = self.session.post(
+            url, json=data, headers=headers, timeout=self.timeout
+        )
         if not response.status_code == 200:
             msg = (
                 f"Request to {url} failed with "
@@ -85,9 +152,56 @@ class RayModelService(metaclass=SingletonMeta):
             raise Exception(msg)
         return response
 
-    def spacy_pipline(self, input: SpacyInput) -> SpacyPipelineOutput:
-        response = self._make_post_request("/spacy/pipeline", input.model_dump())
-        return SpacyPipelineOutput.model_validate(response.json())
+    def _clip_accept_header(self) -> Optional[str]:
+        return NPY_MEDIA_TYPE if self.binary_embeddings else None
+
+    @staticmethod
+    def _parse_clip_embedding_output(
+        response: Response,
+    ) -> ClipEmbeddingOutput:
+        if response.headers.get("content-type", "").startswith(NPY_MEDIA_TYPE):
+            return ClipEmbeddingOutput.from_npy(response.content)
+        return ClipEmbeddingOutput.model_validate(response.json())
+
+    def _spacy_accept_header(self) -> Optional[str]:
+        return SPACY_COLUMNS_MEDIA_TYPE if self.binary_spacy else None
+
+    @staticmethod
+    def _parse_spacy_output(response: Response, batch: bool) -> List[SpacyColumns]:
+        if response.headers.get("content-type", "").startswith(
+            SPACY_COLUMNS_MEDIA_TYPE
+        ):
+            return decode_spacy_columns(response.content)
+        # ray workers without the binary format respond with one object per token
+        if batch:
+            outputs = SpacyBatchPipelineOutput.model_validate(response.json()).outputs
+        else:
+            outputs = [SpacyPipelineOutput.model_validate(response.json())]
+        return [SpacyColumns.from_output(output) for output in outputs]
+
+    def spacy_pipline(self, input: SpacyInput) -> SpacyColumns:
+        if self._spacy_batcher is not None:
+            return self._spacy_batcher.submit(input)
+        return self._spacy_pipeline(input)
+
+    def _spacy_pipeline(self, input: SpacyInput) -> SpacyColumns:
+        response = self._make_post_request(
+            "/spacy/pipeline", input.model_dump(), accept=self._spacy_accept_header()
+        )
+        return self._parse_spacy_output(response, batch=False)[0]
+
+    def _spacy_pipeline_merged(self, inputs: List[SpacyInput]) -> List[SpacyColumns]:
+        if len(inputs) == 1:
+            return [self._spacy_pipeline(inputs[0])]
+        return self.spacy_pipeline_batch(SpacyBatchInput(items=inputs))
+
+    def spacy_pipeline_batch(self, input: SpacyBatchInput) -> List[SpacyColumns]:
+        response = self._make_post_request(
+            "/spacy/pipeline_batch",
+            input.model_dump(),
+            accept=self._spacy_accept_header(),
+        )
+        return self._parse_spacy_output(response, batch=True)
 
     def whisper_transcribe(
         self, input: WhisperFilePathInput
@@ -108,14 +222,51 @@ class RayModelService(metaclass=SingletonMeta):
         return Blip2Output.model_validate(response.json())
 
     def clip_text_embedding(self, input: ClipTextEmbeddingInput) -> ClipEmbeddingOutput:
-        response = self._make_post_request("/clip/embedding/text", input.model_dump())
-        return ClipEmbeddingOutput.model_validate(response.json())
+        if self._clip_text_batcher is not None:
+            return self._clip_text_batcher.submit(input)
+        return self._clip_text_embedding(input)
+
+    def _clip_text_embedding(
+        self, input: ClipTextEmbeddingInput
+    ) -> ClipEmbeddingOutput:
+        response = self._make_post_request(
+            "/clip/embedding/text",
+            input.model_dump(),
+            accept=self._clip_accept_header(),
+        )
+        return self._parse_clip_embedding_output(response)
+
+    def _clip_text_embedding_merged(
+        self, inputs: List[ClipTextEmbeddingInput]
+    ) -> List[ClipEmbeddingOutput]:
+        if len(inputs) == 1:
+            return [self._clip_text_embedding(inputs[0])]
+        output = self._clip_text_embedding(
+            ClipTextEmbeddingInput(
+                text=[text for input in inputs for text in input.text]
+            )
+        )
+        embeddings = output.numpy()
+        ends = np.cumsum([len(input.text) for input in inputs])
+        if len(embeddings) != ends[-1]:
+            raise ValueError(
+                f"Embedding/Text mismatch! Input: {ends[-1]} texts, "
+                f"Output: {len(embeddings)} embeddings"
+            )
+        return [
+            ClipEmbeddingOutput.from_numpy(embeddings[end - len(input.text) : end])
+            for input, end in zip(inputs, ends)
+        ]
 
     def clip_image_embedding(
         self, input: ClipImageEmbeddingInput
     ) -> ClipEmbeddingOutput:
-        response = self._make_post_request("/clip/embedding/image", input.model_dump())
-        return ClipEmbeddingOutput.model_validate(response.json())
+        response = self._make_post_request(
+            "/clip/embedding/image",
+            input.model_dump(),
+            accept=self._clip_accept_header(),
+        )
+        return self._parse_clip_embedding_output(response)
 
     def cota_finetune_apply_compute(self, input: RayCOTAJobInput) -> RayCOTAJobResponse:
         response = self._make_post_request(
@@ -1,11 +1,12 @@
 import logging
 
 from dto.clip import (
+    NPY_MEDIA_TYPE,
     ClipEmbeddingOutput,
     ClipImageEmbeddingInput,
     ClipTextEmbeddingInput,
 )
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from models.clip import ClipModel
 from ray import serve
 from ray.serve.handle import DeploymentHandle
@@ -15,6 +16,13 @@ logger = logging.getLogger("ray.serve")
 api = FastAPI()
 
 
+def _encode_output(output: ClipEmbeddingOutput, request: Request):
+    # clients can request the embeddings as binary numpy array instead of JSON floats
+    if NPY_MEDIA_TYPE in request.headers.get("accept", ""):
+        return Response(content=output.to_npy(), media_type=NPY_MEDIA_TYPE)
+    return output
+
+
 @serve.deployment(num_replicas=1, route_prefix="/clip")
 @serve.ingress(api)
 class ClipApi:
@@ -22,14 +30,14 @@ class ClipApi:
         self.clip = clip_model_handle
 
     @api.post("/embedding/text", response_model=ClipEmbeddingOutput)
-    async def text_embedding(self, input: ClipTextEmbeddingInput):
+    async def text_embedding(self, input: ClipTextEmbeddingInput, request: Request):
         predict_result = await self.clip.text_embedding.remote(input)
-        return predict_result
+        return _encode_output(predict_result, request)
 
     @api.post("/embedding/image", response_model=ClipEmbeddingOutput)
-    async def image_embedding(self, input: ClipImageEmbeddingInput):
+    async def image_embedding(self, input: ClipImageEmbeddingInput, request: Request):
         predict_result = await self.clip.image_embedding.remote(input)
-        return predict_result
+        return _encode_output(predict_result, request)
 
 
 app = ClipApi.bind(
@@ -1,7 +1,14 @@
 import logging
 
-from dto.spacy import SpacyInput, SpacyPipelineOutput
-from fastapi import FastAPI
+from dto.spacy import (
+    SPACY_COLUMNS_MEDIA_TYPE,
+    SpacyBatchInput,
+    SpacyBatchPipelineOutput,
+    SpacyInput,
+    SpacyPipelineOutput,
+    encode_spacy_columns,
+)
+from fastapi import FastAPI, Request, Response
 from models.spacy import SpacyModel
 from ray import serve
 from ray.serve.handle import DeploymentHandle
@@ -11,6 +18,11 @@ api = FastAPI()
 logger = logging.getLogger("ray.serve")
 
 
+def _accepts_columns(request: Request) -> bool:
+    # clients can request the outputs as binary arrays instead of one JSON object per token
+    return SPACY_COLUMNS_MEDIA_TYPE in request.headers.get("accept", "")
+
+
 @serve.deployment(num_replicas=1, route_prefix="/spacy")
 @serve.ingress(api)
 class SpacyApi:
@@ -18,10 +30,27 @@ class SpacyApi:
         self.spacy = spacy_model_handle
 
     @api.post("/pipeline", response_model=SpacyPipelineOutput)
-    async def pipeline(self, input: SpacyInput) -> SpacyPipelineOutput:
+    async def pipeline(self, input: SpacyInput, request: Request):
+        if _accepts_columns(request):
+            columns = await self.spacy.pipeline_columns.remote(input)
+            return Response(
+                content=encode_spacy_columns([columns]),
+                media_type=SPACY_COLUMNS_MEDIA_TYPE,
+            )
         predict_result = await self.spacy.pipeline.remote(input)
         return predict_result
 
+    @api.post("/pipeline_batch", response_model=SpacyBatchPipelineOutput)
+    async def pipeline_batch(self, input: SpacyBatchInput, request: Request):
+        if _accepts_columns(request):
+            columns = await self.spacy.pipeline_batch_columns.remote(input)
+            return Response(
+                content=encode_spacy_columns(columns),
+                media_type=SPACY_COLUMNS_MEDIA_TYPE,
+            )
+        predict_result = await self.spacy.pipeline_batch.remote(input)
+        return predict_result
+
 
 app = SpacyApi.bind(
     spacy_model_handle=SpacyModel.bind(),
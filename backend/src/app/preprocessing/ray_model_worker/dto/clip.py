@@ -1,7 +1,11 @@
-from typing import List
+import io
+from typing import List, Optional
 
 import numpy as np
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
+
+# media type of the binary (numpy .npy) transfer format of embeddings
+NPY_MEDIA_TYPE = "application/x-npy"
 
 
 class ClipImageEmbeddingInput(BaseModel):
@@ -15,6 +19,24 @@ class ClipTextEmbeddingInput(BaseModel):
 
 class ClipEmbeddingOutput(BaseModel):
     embeddings: List[List[float]] = Field(examples=[[f for f in np.arange(0, 1, 0.1)]])
+    _array: Optional[np.ndarray] = PrivateAttr(default=None)
 
     def numpy(self) -> np.ndarray:
-        return np.array(self.embeddings, dtype=np.float32)
+        if self._array is None:
+            self._array = np.array(self.embeddings, dtype=np.float32)
+        return self._array
+
+    def to_npy(self) -> bytes:
+        buffer = io.BytesIO()
+        np.save(buffer, self.numpy(), allow_pickle=False)
+        return buffer.getvalue()
+
+    @classmethod
+    def from_numpy(cls, embeddings: np.ndarray) -> "ClipEmbeddingOutput":
+        output = cls(embeddings=embeddings.tolist())
+        output._array = embeddings.astype(np.float32, copy=False)
+        return output
+
+    @classmethod
+    def from_npy(cls, data: bytes) -> "ClipEmbeddingOutput":
+        return cls.from_numpy(np.load(io.BytesIO(data), allow_pickle=False))
@@ -1,6 +1,17 @@
-from typing import List, Optional
+import io
+from typing import Dict, List, Optional, Tuple
 
-from pydantic import BaseModel, Field
+import numpy as np
+from pydantic import BaseModel, ConfigDict, Field
+
+# media type of the binary (columnar) transfer format of spaCy outputs
+SPACY_COLUMNS_MEDIA_TYPE = "application/x-spacy-columns"
+
+# bits of SpacyColumns.token_flags
+IS_STOPWORD = 1
+IS_PUNCTUATION = 2
+IS_ALPHA = 4
+IS_DIGIT = 8
 
 
 class SpacySpan(BaseModel):
@@ -132,3 +143,227 @@ class SpacyPipelineOutput(BaseModel):
         ],
         default_factory=list,
     )
+
+
+class SpacyBatchInput(BaseModel):
+    items: List[SpacyInput] = Field(
+        examples=[[SpacyInput(text="I love Hamburg!", language="en")]],
+        default_factory=list,
+    )
+
+
+class SpacyBatchPipelineOutput(BaseModel):
+    outputs: List[SpacyPipelineOutput] = Field(
+        description="The pipeline outputs in the same order as the input items",
+        default_factory=list,
+    )
+
+
+# dtypes of the arrays of SpacyColumns, grouped by the (token, ent, sent) they describe
+_ARRAYS: Dict[str, Dict[str, type]] = {
+    "token": {
+        "token_starts": np.int32,
+        "token_ends": np.int32,
+        "token_flags": np.uint8,
+        "token_pos": np.int32,
+        "token_lemmas": np.int32,
+    },
+    "ent": {
+        "ent_starts": np.int32,
+        "ent_ends": np.int32,
+        "ent_start_tokens": np.int32,
+        "ent_end_tokens": np.int32,
+        "ent_labels": np.int32,
+    },
+    "sent": {
+        "sent_starts": np.int32,
+        "sent_ends": np.int32,
+        "sent_start_tokens": np.int32,
+        "sent_end_tokens": np.int32,
+    },
+}
+# arrays of indices into string tables
+_TABLES: Dict[str, str] = {
+    "token_pos": "pos_table",
+    "token_lemmas": "lemma_table",
+    "ent_labels": "label_table",
+}
+
+
+def _empty(dtype: type):
+    return lambda: np.zeros(0, dtype=dtype)
+
+
+class SpacyColumns(BaseModel):
+    """
+    The columnar form of a SpacyPipelineOutput: one NumPy array per attribute of the
+    tokens, entities and sentences instead of one object per token. POS tags, lemmas
+    and entity labels are indices into tables of their distinct strings. The texts of
+    the tokens and spans are not stored, they are slices of the input text.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    token_starts: np.ndarray = Field(default_factory=_empty(np.int32))
+    token_ends: np.ndarray = Field(default_factory=_empty(np.int32))
+    token_flags: np.ndarray = Field(
+        description="IS_STOPWORD | IS_PUNCTUATION | IS_ALPHA | IS_DIGIT bits",
+        default_factory=_empty(np.uint8),
+    )
+    token_pos: np.ndarray = Field(default_factory=_empty(np.int32))
+    token_lemmas: np.ndarray = Field(default_factory=_empty(np.int32))
+    pos_table: List[str] = Field(default_factory=list)
+    lemma_table: List[str] = Field(default_factory=list)
+
+    ent_starts: np.ndarray = Field(default_factory=_empty(np.int32))
+    ent_ends: np.ndarray = Field(default_factory=_empty(np.int32))
+    ent_start_tokens: np.ndarray = Field(default_factory=_empty(np.int32))
+    ent_end_tokens: np.ndarray = Field(default_factory=_empty(np.int32))
+    ent_labels: np.ndarray = Field(default_factory=_empty(np.int32))
+    label_table: List[str] = Field(default_factory=list)
+
+    sent_starts: np.ndarray = Field(default_factory=_empty(np.int32))
+    sent_ends: np.ndarray = Field(default_factory=_empty(np.int32))
+    sent_start_tokens: np.ndarray = Field(default_factory=_empty(np.int32))
+    sent_end_tokens: np.ndarray = Field(default_factory=_empty(np.int32))
+
+    def token_texts(self, text: str) -> List[str]:
+        return [
+            text[start:end]
+            for start, end in zip(self.token_starts.tolist(), self.token_ends.tolist())
+        ]
+
+    def token_pos_tags(self) -> np.ndarray:
+        return np.array(self.pos_table, dtype=object)[self.token_pos]
+
+    def ent_label_names(self) -> np.ndarray:
+        return np.array(self.label_table, dtype=object)[self.ent_labels]
+
+    @classmethod
+    def from_output(cls, output: SpacyPipelineOutput) -> "SpacyColumns":
+        pos_table: Dict[str, int] = dict()
+        lemma_table: Dict[str, int] = dict()
+        label_table: Dict[str, int] = dict()
+        tokens = output.tokens
+        return cls(
+            token_starts=np.array([t.start_char for t in tokens], dtype=np.int32),
+            token_ends=np.array([t.end_char for t in tokens], dtype=np.int32),
+            token_flags=np.array(
+                [
+                    IS_STOPWORD * t.is_stopword
+                    | IS_PUNCTUATION * t.is_punctuation
+                    | IS_ALPHA * t.is_alpha
+                    | IS_DIGIT * t.is_digit
+                    for t in tokens
+                ],
+                dtype=np.uint8,
+            ),
+            token_pos=np.array(
+                [pos_table.setdefault(t.pos, len(pos_table)) for t in tokens],
+                dtype=np.int32,
+            ),
+            token_lemmas=np.array(
+                [lemma_table.setdefault(t.lemma, len(lemma_table)) for t in tokens],
+                dtype=np.int32,
+            ),
+            pos_table=list(pos_table),
+            lemma_table=list(lemma_table),
+            ent_starts=np.array([e.start_char for e in output.ents], dtype=np.int32),
+            ent_ends=np.array([e.end_char for e in output.ents], dtype=np.int32),
+            ent_start_tokens=np.array(
+                [e.start_token for e in output.ents], dtype=np.int32
+            ),
+            ent_end_tokens=np.array([e.end_token for e in output.ents], dtype=np.int32),
+            ent_labels=np.array(
+                [
+                    label_table.setdefault(e.label or "", len(label_table))
+                    for e in output.ents
+                ],
+                dtype=np.int32,
+            ),
+            label_table=list(label_table),
+            sent_starts=np.array([s.start_char for s in output.sents], dtype=np.int32),
+            sent_ends=np.array([s.end_char for s in output.sents], dtype=np.int32),
+            sent_start_tokens=np.array(
+                [s.start_token for s in output.sents], dtype=np.int32
+            ),
+            sent_end_tokens=np.array(
+                [s.end_token for s in output.sents], dtype=np.int32
+            ),
+        )
+
+
+def _encode_strings(strings: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    encoded = [string.encode("utf-8") for string in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _decode_strings(data: np.ndarray, offsets: np.ndarray) -> List[str]:
+    raw = data.tobytes()
+    return [
+        raw[start:end].decode("utf-8")
+        for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())
+    ]
+
+
+def encode_spacy_columns(outputs: List[SpacyColumns]) -> bytes:
+    """
+    Encodes the outputs as one .npz archive: the arrays of all outputs are
+    concatenated, the string tables are merged and stored as UTF-8 bytes and offsets.
+    """
+    arrays: Dict[str, np.ndarray] = dict()
+    for group, names in _ARRAYS.items():
+        first = next(iter(names))
+        arrays[f"num_{group}s"] = np.array(
+            [len(getattr(output, first)) for output in outputs], dtype=np.int64
+        )
+        for name, dtype in names.items():
+            columns = [getattr(output, name) for output in outputs]
+            if name in _TABLES:
+                # the indices into the tables of the outputs become indices into the
+                # merged table
+                merged: Dict[str, int] = dict()
+                for idx, output in enumerate(outputs):
+                    table = getattr(output, _TABLES[name])
+                    mapping = np.array(
+                        [merged.setdefault(string, len(merged)) for string in table],
+                        dtype=dtype,
+                    )
+                    columns[idx] = mapping[columns[idx]]
+                data, offsets = _encode_strings(list(merged))
+                arrays[f"{_TABLES[name]}_data"] = data
+                arrays[f"{_TABLES[name]}_offsets"] = offsets
+            arrays[name] = np.concatenate(
+                [np.asarray(column, dtype=dtype) for column in columns]
+                or [np.zeros(0, dtype=dtype)]
+            )
+    buffer = io.BytesIO()
+    np.savez(buffer, allow_pickle=False, **arrays)
+    return buffer.getvalue()
+
+
+def decode_spacy_columns(data: bytes) -> List[SpacyColumns]:
+    with np.load(io.BytesIO(data), allow_pickle=False) as npz:
+        arrays = {name: npz[name] for name in npz.files}
+    tables = {
+        table: _decode_strings(arrays[f"{table}_data"], arrays[f"{table}_offsets"])
+        for table in _TABLES.values()
+    }
+
+    num_outputs = len(arrays["num_tokens"])
+    fields: List[Dict[str, object]] = [dict() for _ in range(num_outputs)]
+    for group, names in _ARRAYS.items():
+        bounds = np.concatenate([[0], np.cumsum(arrays[f"num_{group}s"])]).tolist()
+        for name in names:
+            for idx in range(num_outputs):
+                column = arrays[name][bounds[idx] : bounds[idx + 1]]
+                if name in _TABLES:
+                    # every output gets a table of only its own strings
+                    used, column = np.unique(column, return_inverse=True)
+                    column = column.reshape(-1).astype(np.int32)
+                    table = tables[_TABLES[name]]
+                    fields[idx][_TABLES[name]] = [table[i] for i in used.tolist()]
+                fields[idx][name] = column
+    return [SpacyColumns(**f) for f in fields]  # type: ignore
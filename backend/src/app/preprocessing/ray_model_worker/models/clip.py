@@ -60,7 +60,7 @@ class ClipModel:
             )
             assert isinstance(encoded_text, ndarray), "Failed to encode texts"
 
-            return ClipEmbeddingOutput(embeddings=encoded_text.tolist())
+            return ClipEmbeddingOutput.from_numpy(encoded_text)
 
     def image_embedding(self, input: ClipImageEmbeddingInput) -> ClipEmbeddingOutput:
         images = [
@@ -86,4 +86,4 @@ class ClipModel:
             # close the images
             for img in images:
                 img.close()
-            return ClipEmbeddingOutput(embeddings=encoded_images.tolist())
+            return ClipEmbeddingOutput.from_numpy(encoded_images)
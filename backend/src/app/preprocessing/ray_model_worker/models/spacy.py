@@ -1,11 +1,28 @@
 import logging
-from typing import Dict, List
+from typing import Dict, Iterator, List, Tuple
 
+import numpy as np
 import spacy
-from dto.spacy import SpacyInput, SpacyPipelineOutput, SpacySpan, SpacyToken
+from dto.spacy import (
+    IS_ALPHA,
+    IS_DIGIT,
+    IS_PUNCTUATION,
+    IS_STOPWORD,
+    SpacyBatchInput,
+    SpacyBatchPipelineOutput,
+    SpacyColumns,
+    SpacyInput,
+    SpacyPipelineOutput,
+    SpacySpan,
+    SpacyToken,
+)
 from ray import serve
 from ray_config import build_ray_model_deployment_config, conf
+from spacy.attrs import IDX, IS_PUNCT, IS_STOP, LEMMA, LENGTH, POS
+from spacy.attrs import IS_ALPHA as SPACY_IS_ALPHA
+from spacy.attrs import IS_DIGIT as SPACY_IS_DIGIT
 from spacy.language import Language
+from spacy.tokens import Doc
 
 cc = conf.spacy
 
@@ -31,7 +48,7 @@ class SpacyModel:
                     if len(DEVICE) > 4 and ":" in DEVICE
                     else 0
                 )
-                spacy.require_gpu(gpu_id=device_id)  # type: ignore
+                spacy.require_gpu(gpu_id=device_id)
 
         nlp: Dict[str, Language] = dict()
 
@@ -60,6 +77,103 @@ class SpacyModel:
     def pipeline(self, input: SpacyInput) -> SpacyPipelineOutput:
         model = self._get_language_specific_model(input.language)
         doc = model(input.text)
+        return self._doc_to_output(doc)
+
+    def pipeline_columns(self, input: SpacyInput) -> SpacyColumns:
+        model = self._get_language_specific_model(input.language)
+        doc = model(input.text)
+        return self._doc_to_columns(doc)
+
+    def pipeline_batch(self, input: SpacyBatchInput) -> SpacyBatchPipelineOutput:
+        outputs: List[SpacyPipelineOutput] = [SpacyPipelineOutput()] * len(input.items)
+        for idx, doc in self._pipe(input):
+            outputs[idx] = self._doc_to_output(doc)
+
+        return SpacyBatchPipelineOutput(outputs=outputs)
+
+    def pipeline_batch_columns(self, input: SpacyBatchInput) -> List[SpacyColumns]:
+        outputs: List[SpacyColumns] = [SpacyColumns()] * len(input.items)
+        for idx, doc in self._pipe(input):
+            outputs[idx] = self._doc_to_columns(doc)
+
+        return outputs
+
+    def _pipe(self, input: SpacyBatchInput) -> Iterator[Tuple[int, Doc]]:
+        # documents of the same language are processed together with nlp.pipe
+        idxs_by_language: Dict[str, List[int]] = dict()
+        for idx, item in enumerate(input.items):
+            idxs_by_language.setdefault(item.language, []).append(idx)
+
+        for language, idxs in idxs_by_language.items():
+            model = self._get_language_specific_model(language)
+            docs = model.pipe(input.items[idx].text for idx in idxs)
+            yield from zip(idxs, docs)
+
+    def _doc_to_columns(self, doc: Doc) -> SpacyColumns:
+        attrs = np.asarray(
+            doc.to_array(
+                [
+                    IDX,
+                    LENGTH,
+                    POS,
+                    LEMMA,
+                    IS_STOP,
+                    IS_PUNCT,
+                    SPACY_IS_ALPHA,
+                    SPACY_IS_DIGIT,
+                ]
+            ),
+            dtype=np.uint64,
+        ).reshape(len(doc), 8)
+        # POS tags and lemmas are hashes (or symbols) of the vocab's string store
+        pos_hashes, token_pos = np.unique(attrs[:, 2], return_inverse=True)
+        lemma_hashes, token_lemmas = np.unique(attrs[:, 3], return_inverse=True)
+        flags = (
+            attrs[:, 4] * IS_STOPWORD
+            | attrs[:, 5] * IS_PUNCTUATION
+            | attrs[:, 6] * IS_ALPHA
+            | attrs[:, 7] * IS_DIGIT
+        )
+
+        labels: Dict[str, int] = dict()
+        ents = [
+            (
+                ent.start_char,
+                ent.end_char,
+                ent.start,
+                ent.end,
+                labels.setdefault(ent.label_, len(labels)),
+            )
+            for ent in doc.ents
+        ]
+        sents = [
+            (sent.start_char, sent.end_char, sent.start, sent.end) for sent in doc.sents
+        ]
+        ent_array = np.array(ents, dtype=np.int32).reshape(len(ents), 5)
+        sent_array = np.array(sents, dtype=np.int32).reshape(len(sents), 4)
+
+        strings = doc.vocab.strings
+        return SpacyColumns(
+            token_starts=attrs[:, 0].astype(np.int32),
+            token_ends=(attrs[:, 0] + attrs[:, 1]).astype(np.int32),
+            token_flags=flags.astype(np.uint8),
+            token_pos=token_pos.reshape(-1).astype(np.int32),
+            token_lemmas=token_lemmas.reshape(-1).astype(np.int32),
+            pos_table=[strings[int(h)] for h in pos_hashes],
+            lemma_table=[strings[int(h)] for h in lemma_hashes],
+            ent_starts=ent_array[:, 0],
+            ent_ends=ent_array[:, 1],
+            ent_start_tokens=ent_array[:, 2],
+            ent_end_tokens=ent_array[:, 3],
+            ent_labels=ent_array[:, 4],
+            label_table=list(labels),
+            sent_starts=sent_array[:, 0],
+            sent_ends=sent_array[:, 1],
+            sent_start_tokens=sent_array[:, 2],
+            sent_end_tokens=sent_array[:, 3],
+        )
+
+    def _doc_to_output(self, doc: Doc) -> SpacyPipelineOutput:
         tokens: List[SpacyToken] = [
             SpacyToken(
                 text=token.text,
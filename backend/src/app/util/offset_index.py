@@ -0,0 +1,56 @@
+from typing import Sequence, Tuple, Union
+
+import numpy as np
+
+
+class OffsetIndex:
+    """
+    Maps character offsets to the indices of spans, e.g. tokens or sentences, that
+    are given by their sorted and non-overlapping start and end character offsets.
+    All lookups are binary searches, i.e., O(log n) per offset, and accept single
+    offsets as well as arrays of offsets.
+    """
+
+    def __init__(self, starts: Sequence[int], ends: Sequence[int]):
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        assert len(self.starts) == len(self.ends), "starts and ends do not match!"
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def span_at(self, offsets: Union[int, np.ndarray]) -> Union[int, np.ndarray]:
+        """
+        Returns the index of the span that contains the offset. Offsets between two
+        spans (e.g. whitespace) are mapped to the following span, offsets after the
+        last span to len(self).
+        """
+        res = np.searchsorted(self.ends, offsets, side="right")
+        return res.item() if np.ndim(res) == 0 else res
+
+    def span_starting_at(
+        self, offsets: Union[int, np.ndarray]
+    ) -> Union[int, np.ndarray]:
+        """
+        Returns the index of the span that starts at the offset (or the next span).
+        """
+        res = np.searchsorted(self.starts, offsets, side="left")
+        return res.item() if np.ndim(res) == 0 else res
+
+    def span_ending_at(self, offsets: Union[int, np.ndarray]) -> Union[int, np.ndarray]:
+        """
+        Returns the index of the span that ends at the offset (or the next span).
+        """
+        res = np.searchsorted(self.ends, offsets, side="left")
+        return res.item() if np.ndim(res) == 0 else res
+
+    def char_range_to_span_range(self, begin: int, end: int) -> Tuple[int, int]:
+        """
+        Returns the index of the first span and the exclusive index of the last span
+        of the character range [begin, end). Returns (-1, -1) if the range is not
+        (entirely) covered by the spans.
+        """
+        if len(self) == 0 or begin < 0 or end > self.ends[-1] or begin >= end:
+            return -1, -1
+        # an end after the last span is mapped to len(self), a valid exclusive end
+        return self.span_at(begin), self.span_at(end)
@@ -0,0 +1,82 @@
+import re
+from typing import List, Optional, Sequence, Tuple
+
+# the tags that wrap the tokens and sentences in the html
+TOKEN_MARKUP_PATTERN = re.compile(r"<t id=\d+>|</t>|<sent id=\d+>|</sent>")
+
+
+def render_token_markup(
+    html: str,
+    token_starts: Sequence[int],
+    token_ends: Sequence[int],
+    token_html_starts: Sequence[int],
+    token_html_ends: Sequence[int],
+    sentence_starts: Sequence[int],
+    sentence_ends: Sequence[int],
+) -> str:
+    """
+    Wraps every token of the html in <t id=N> and every sentence in <sent id=N> tags,
+    given the character offsets of the tokens and sentences in the text and of the
+    tokens in the html.
+    """
+    # <html><body><p><sent id=0><t id=0>Today,</t><t id=1> </t>i<t id=2>n </t>t<t id=3>he w</t>o<t id=4>r</t>l<t id=5>d of fr</t>e<t id=6>ed</t>o<t id=7>m, the </t>p<t id=8>roud</t>e<t id=9>st</t> <t id=10>bo</t>a<t id=11>st</t> <t id=12>is</t>,<t id=13></t> <t id=14>Ich bin</t> ein B -Leader!</p></body></html>
+    parts: List[str] = []
+    current_position = 0
+    current_sentence_idx = 0
+    num_sentences = len(sentence_starts)
+    for token_id, (text_start, text_end, html_start, html_end) in enumerate(
+        zip(token_starts, token_ends, token_html_starts, token_html_ends)
+    ):
+        parts.append(html[current_position:html_start])
+        if (
+            num_sentences > current_sentence_idx
+            and sentence_ends[current_sentence_idx] == text_end
+        ):
+            parts.append("</sent>")
+            current_sentence_idx += 1
+
+        if (
+            num_sentences > current_sentence_idx
+            and sentence_starts[current_sentence_idx] == text_start
+        ):
+            parts.append(f"<sent id={current_sentence_idx}>")
+
+        parts.append(f"<t id={token_id}>")
+        parts.append(html[html_start:html_end])
+        parts.append("</t>")
+
+        current_position = html_end
+    parts.append(html[current_position:])
+
+    return "".join(parts)
+
+
+def strip_token_markup(
+    tagged_html: str,
+) -> Optional[Tuple[str, List[int], List[int]]]:
+    """
+    Removes the <t> and <sent> tags from the html. Returns the html and the
+    character offsets of the tokens in it, or None if the tokens are not numbered
+    consecutively.
+    """
+    parts: List[str] = []
+    token_html_starts: List[int] = []
+    token_html_ends: List[int] = []
+    position = 0
+    length = 0
+    for match in TOKEN_MARKUP_PATTERN.finditer(tagged_html):
+        parts.append(tagged_html[position : match.start()])
+        length += match.start() - position
+        position = match.end()
+        tag = match.group()
+        if tag.startswith("<t "):
+            if tag != f"<t id={len(token_html_starts)}>":
+                return None
+            token_html_starts.append(length)
+        elif tag == "</t>":
+            token_html_ends.append(length)
+    parts.append(tagged_html[position:])
+
+    if len(token_html_starts) != len(token_html_ends):
+        return None
+    return "".join(parts), token_html_starts, token_html_ends
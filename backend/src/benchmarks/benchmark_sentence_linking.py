@@ -0,0 +1,96 @@
+"""
+Benchmarks the linking of span annotations to sentences (AnnoScalingService) against
+the number of annotations on synthetic documents. Compares the previous approach, a
+loop that computes the overlap with every sentence of the document, with the
+vectorized link_spans_to_sentences.
+
+Usage (in backend/src): python -m benchmarks.benchmark_sentence_linking
+"""
+
+import argparse
+from time import perf_counter
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from app.core.annoscaling.sentence_linking import link_spans_to_sentences
+
+
+def _make_documents(
+    rng: np.random.Generator, num_docs: int, num_sentences: int
+) -> Dict[int, Tuple[List[int], List[int]]]:
+    docs = {}
+    for sdoc_id in range(num_docs):
+        lengths = rng.integers(20, 200, size=num_sentences)
+        gaps = rng.integers(1, 3, size=num_sentences)
+        starts = np.cumsum(gaps + lengths) - lengths
+        docs[sdoc_id] = (starts.tolist(), (starts + lengths).tolist())
+    return docs
+
+
+def _make_spans(
+    rng: np.random.Generator,
+    docs: Dict[int, Tuple[List[int], List[int]]],
+    num_spans: int,
+) -> List[Tuple[int, int, int]]:
+    sdoc_ids = rng.integers(0, len(docs), size=num_spans)
+    spans = []
+    for sdoc_id in sdoc_ids.tolist():
+        doc_end = docs[sdoc_id][1][-1]
+        begin = int(rng.integers(0, doc_end))
+        spans.append((begin, min(begin + int(rng.integers(1, 150)), doc_end), sdoc_id))
+    return spans
+
+
+def _link_with_loop(
+    spans: List[Tuple[int, int, int]],
+    docs: Dict[int, Tuple[List[int], List[int]]],
+) -> List[int]:
+    sent_ids = []
+    for begin, end, sdoc_id in spans:
+        starts, ends = docs[sdoc_id]
+        overlap = [max(min(e, end) - max(s, begin), 0) for s, e in zip(starts, ends)]
+        sent_ids.append(np.asarray(overlap).argmax().item())
+    return sent_ids
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--num-docs", type=int, default=500)
+    parser.add_argument("--num-sentences", type=int, default=300)
+    parser.add_argument(
+        "--num-spans", type=int, nargs="+", default=[100, 1000, 10000, 50000]
+    )
+    parser.add_argument(
+        "--max-loop-spans",
+        type=int,
+        default=10000,
+        help="skip the (slow) loop for more annotations",
+    )
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    docs = _make_documents(rng, args.num_docs, args.num_sentences)
+
+    print(f"{args.num_docs} documents with {args.num_sentences} sentences each")
+    print(f"{'annotations':>12} {'loop [ms]':>12} {'vectorized [ms]':>16}")
+    for num_spans in args.num_spans:
+        spans = _make_spans(rng, docs, num_spans)
+
+        start = perf_counter()
+        begins, ends, sdoc_ids = zip(*spans)
+        vectorized = link_spans_to_sentences(begins, ends, sdoc_ids, docs)
+        vectorized_ms = (perf_counter() - start) * 1000
+
+        loop_ms = "-"
+        if num_spans <= args.max_loop_spans:
+            start = perf_counter()
+            loop = _link_with_loop(spans, docs)
+            loop_ms = f"{(perf_counter() - start) * 1000:.1f}"
+            assert loop == vectorized.tolist(), "Results do not match!"
+
+        print(f"{num_spans:>12} {loop_ms:>12} {vectorized_ms:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmarks the storage settings of the vector index on synthetic (clustered and
+normalized) embeddings: the memory needed to search the embeddings and the
+recall@k compared to an exact float32 search, for float16 embeddings and for int8
+quantized embeddings with and without re-ranking of the top_k * oversampling
+candidates with the (float16) full-precision embeddings.
+
+Usage (in backend/src): python -m benchmarks.benchmark_vector_quantization
+"""
+
+import argparse
+from time import perf_counter
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from app.core.db.vector_quantization import Int8Quantizer
+
+
+def _make_embeddings(
+    rng: np.random.Generator, num: int, dim: int, num_clusters: int
+) -> np.ndarray:
+    centers = rng.normal(size=(num_clusters, dim)).astype(np.float32)
+    embs = centers[rng.integers(0, num_clusters, size=num)]
+    embs += rng.normal(scale=2.0, size=embs.shape).astype(np.float32)
+    return embs / np.linalg.norm(embs, axis=1, keepdims=True)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
+
+def _search(
+    scores: Callable[[np.ndarray], np.ndarray],
+    queries: np.ndarray,
+    k: int,
+    rerank: Optional[np.ndarray] = None,
+    oversampling: int = 1,
+) -> np.ndarray:
+    candidates = _top_k(scores(queries), k * oversampling)
+    if rerank is None:
+        return candidates
+    exact = np.einsum(
+        "qkd,qd->qk", rerank[candidates].astype(np.float32), queries, optimize=True
+    )
+    return np.take_along_axis(candidates, _top_k(exact, k), axis=1)
+
+
+def _recall(result: np.ndarray, truth: np.ndarray) -> float:
+    hits = [len(np.intersect1d(r, t)) for r, t in zip(result, truth)]
+    return float(np.sum(hits)) / truth.size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--num-embeddings", type=int, default=200000)
+    parser.add_argument("--num-queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--num-clusters", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--oversampling", type=int, nargs="+", default=[2, 4, 8])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    embs = _make_embeddings(rng, args.num_embeddings, args.dim, args.num_clusters)
+    queries = _make_embeddings(rng, args.num_queries, args.dim, args.num_clusters)
+    truth = _search(lambda q: q @ embs.T, queries, args.k)
+
+    embs16 = embs.astype(np.float16)
+    quantizer = Int8Quantizer(args.dim)
+    quantized = quantizer.encode(embs)
+
+    settings: List[tuple] = [
+        (
+            "float32",
+            embs.nbytes,
+            lambda: _search(lambda q: q @ embs.T, queries, args.k),
+        ),
+        (
+            "float16",
+            embs16.nbytes,
+            lambda: _search(lambda q: q @ embs16.T.astype(np.float32), queries, args.k),
+        ),
+        (
+            "int8",
+            quantized.nbytes,
+            lambda: _search(lambda q: quantizer.scores(quantized, q), queries, args.k),
+        ),
+    ]
+    for oversampling in args.oversampling:
+        settings.append(
+            (
+                f"int8 + re-ranking x{oversampling}",
+                quantized.nbytes,
+                lambda oversampling=oversampling: _search(
+                    lambda q: quantizer.scores(quantized, q),
+                    queries,
+                    args.k,
+                    rerank=embs16,
+                    oversampling=oversampling,
+                ),
+            )
+        )
+
+    print(
+        f"{args.num_embeddings} embeddings ({args.dim}-d), {args.num_queries} queries"
+    )
+    print(
+        f"{'setting':>24} {'bytes/emb':>10} {'memory [MB]':>12}"
+        f" {f'recall@{args.k}':>10} {'time/query [ms]':>16}"
+    )
+    for name, nbytes, search in settings:
+        start = perf_counter()
+        result = search()
+        ms = (perf_counter() - start) * 1000 / args.num_queries
+        print(
+            f"{name:>24} {nbytes // args.num_embeddings:>10}"
+            f" {nbytes / 2**20:>12.1f} {_recall(result, truth):>10.3f} {ms:>16.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pytest
+from fastapi import Request, Response
+from starlette.datastructures import Headers
+
+from api.endpoints import source_document
+from app.core.data.dto.source_document_data import SourceDocumentDataRangeUnit
+
+
+class FakeAuthzUser:
+    def assert_in_same_project_as(self, crud, id) -> None:
+        pass
+
+
+class FakeCrudSdoc:
+    def __init__(self) -> None:
+        self.updated = datetime(2024, 1, 1)
+        self.reads: List[str] = []
+
+    def read_updated(self, db, *, id: int) -> datetime:
+        return self.updated
+
+    def read_data_range(self, db, *, id, unit, start, end) -> Dict:
+        self.reads.append(f"{unit.value}:{start}-{end}")
+        return {"id": id, "start": start, "end": end}
+
+
+def make_request(if_none_match: Optional[str] = None) -> Request:
+    headers = {} if if_none_match is None else {"If-None-Match": if_none_match}
+    return Request(
+        {
+            "type": "http",
+            "path": "/",
+            "headers": Headers(headers).raw,
+            "http_version": "1.1",
+            "method": "GET",
+        }
+    )
+
+
+@pytest.fixture
+def crud(monkeypatch: pytest.MonkeyPatch) -> FakeCrudSdoc:
+    crud = FakeCrudSdoc()
+    monkeypatch.setattr(source_document, "crud_sdoc", crud)
+    return crud
+
+
+def get_range(
+    crud: FakeCrudSdoc, if_none_match: Optional[str] = None, start: int = 0
+) -> tuple:
+    response = Response()
+    result = source_document.get_data_range_by_id(
+        request=make_request(if_none_match),
+        response=response,
+        db=None,
+        sdoc_id=1,
+        unit=SourceDocumentDataRangeUnit.SENTENCE,
+        start=start,
+        end=10,
+        authz_user=FakeAuthzUser(),
+    )
+    return result, response
+
+
+def test_data_range_conditional_get(crud: FakeCrudSdoc) -> None:
+    result, response = get_range(crud)
+    assert result == {"id": 1, "start": 0, "end": 10}
+    etag = response.headers["ETag"]
+    assert response.headers["Cache-Control"] == "private, no-cache"
+
+    # the same range of the unchanged document is not modified
+    for if_none_match in [etag, f'"other", {etag}', "*"]:
+        result, _ = get_range(crud, if_none_match)
+        assert isinstance(result, Response)
+        assert result.status_code == 304
+        assert result.headers["ETag"] == etag
+    assert crud.reads == ["sentence:0-10"]
+
+    # another range or a changed document is read again
+    result, response = get_range(crud, etag, start=1)
+    assert result == {"id": 1, "start": 1, "end": 10}
+    assert response.headers["ETag"] != etag
+    crud.updated = datetime(2024, 1, 2)
+    result, response = get_range(crud, etag)
+    assert result == {"id": 1, "start": 0, "end": 10}
+    assert response.headers["ETag"] != etag
+    assert crud.reads == ["sentence:0-10", "sentence:1-10", "sentence:0-10"]
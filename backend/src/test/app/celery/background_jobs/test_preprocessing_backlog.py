@@ -0,0 +1,80 @@
+from typing import Dict, List
+
+import pytest
+
+import app.celery.background_jobs as background_jobs
+from app.celery.background_jobs import preprocess
+from app.core.data.doc_type import DocType
+from app.core.data.dto.background_job_base import BackgroundJobStatus
+from app.core.data.dto.preprocessing_job_payload import PreprocessingJobPayloadRead
+from app.preprocessing.pipeline.model.pipeline_cargo import PipelineCargo
+from config import conf
+
+
+class FakeRedisService:
+    def __init__(self):
+        self.backlogs: Dict[int, int] = dict()
+
+    def add_preprocessing_backlog(self, proj_id: int, num_docs: int, ttl: int) -> int:
+        self.backlogs[proj_id] = self.backlogs.get(proj_id, 0) + num_docs
+        return self.backlogs[proj_id]
+
+    def remove_preprocessing_backlog(self, proj_id: int, num_docs: int) -> None:
+        self.backlogs[proj_id] = self.backlogs.get(proj_id, 0) - num_docs
+        if self.backlogs[proj_id] <= 0:
+            del self.backlogs[proj_id]
+
+
+@pytest.fixture
+def redis(monkeypatch) -> FakeRedisService:
+    redis = FakeRedisService()
+    monkeypatch.setattr(background_jobs, "RedisService", lambda: redis)
+    monkeypatch.setattr(preprocess, "redis", redis)
+    monkeypatch.setattr(conf.celery.scheduling, "fair_priorities", True)
+    return redis
+
+
+def _cargos(project_ids: List[int]) -> List[PipelineCargo]:
+    return [
+        PipelineCargo(
+            ppj_payload=PreprocessingJobPayloadRead.model_construct(
+                id=f"payload_{idx}",
+                prepro_job_id="job",
+                project_id=project_id,
+                status=BackgroundJobStatus.WAITING,
+                filename=f"doc_{idx}.txt",
+                mime_type="text/plain",
+                doc_type=DocType.text,
+            ),
+            ppj_id="job",
+        )
+        for idx, project_id in enumerate(project_ids)
+    ]
+
+
+def test_priority_decreases_with_the_backlog(redis) -> None:
+    priority = background_jobs._preprocessing_priority
+    assert priority(proj_id=1, num_docs=5) == 9
+    assert priority(proj_id=1, num_docs=10) == 7
+    assert priority(proj_id=1, num_docs=100) == 5
+    assert priority(proj_id=1, num_docs=100_000) == 1
+    # the backlog of other projects does not matter
+    assert priority(proj_id=2, num_docs=1) == 9
+    assert redis.backlogs == {1: 100_115, 2: 1}
+
+
+def test_release_backlog(redis) -> None:
+    background_jobs._preprocessing_priority(proj_id=1, num_docs=150)
+    background_jobs._preprocessing_priority(proj_id=2, num_docs=2)
+
+    preprocess.release_preprocessing_backlog_(cargos=_cargos([1] * 100 + [2, 2]))
+    assert redis.backlogs == {1: 50}
+    # once the backlog of the large import shrinks, its priority rises again
+    assert background_jobs._preprocessing_priority(proj_id=1, num_docs=1) == 7
+
+
+def test_without_fair_priorities(redis, monkeypatch) -> None:
+    monkeypatch.setattr(conf.celery.scheduling, "fair_priorities", False)
+    assert background_jobs._preprocessing_priority(proj_id=1, num_docs=1000) == 9
+    preprocess.release_preprocessing_backlog_(cargos=_cargos([1]))
+    assert redis.backlogs == {}
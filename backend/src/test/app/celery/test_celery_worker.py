@@ -0,0 +1,36 @@
+import pytest
+
+from app.celery.celery_worker import celery_worker
+
+TASKS = "app.celery.background_jobs.tasks"
+
+
+@pytest.mark.parametrize(
+    "task, queue",
+    [
+        (f"{TASKS}.execute_text_preprocessing_pipeline_task", "textPreproQ"),
+        (f"{TASKS}.execute_text_preprocessing_pipeline_batch_task", "textPreproQ"),
+        (f"{TASKS}.execute_image_preprocessing_pipeline_task", "imagePreproQ"),
+        (f"{TASKS}.execute_audio_preprocessing_pipeline_task", "audioPreproQ"),
+        (f"{TASKS}.execute_video_preprocessing_pipeline_task", "videoPreproQ"),
+        (f"{TASKS}.start_import_job", "bulkQ"),
+        (f"{TASKS}.start_crawler_job", "bulkQ"),
+        (f"{TASKS}.import_uploaded_archive", "bulkQ"),
+        (f"{TASKS}.start_trainer_job_task", "bulkQ"),
+        (f"{TASKS}.start_export_job", "interactiveQ"),
+        (f"{TASKS}.start_llm_job", "interactiveQ"),
+        (f"{TASKS}.end_bulk_indexing_task", "interactiveQ"),
+        ("some.other.task", "interactiveQ"),
+    ],
+)
+def test_task_routes(task: str, queue: str) -> None:
+    route = celery_worker.amqp.router.route({}, task)
+    assert route["queue"].name == queue
+
+
+def test_priority_queues() -> None:
+    queues = {queue.name: queue for queue in celery_worker.conf.task_queues}
+    assert queues["textPreproQ"].queue_arguments == {"x-max-priority": 9}
+    assert queues["interactiveQ"].queue_arguments == {"x-max-priority": 9}
+    # the legacy queues are still consumed
+    assert "bgJobsQ" in queues
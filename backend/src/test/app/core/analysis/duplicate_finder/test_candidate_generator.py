@@ -0,0 +1,122 @@
+from itertools import combinations
+from typing import List, Set, Tuple
+
+import numpy as np
+
+from app.core.analysis.duplicate_finder.candidate_generator import (
+    ExactCandidateGenerator,
+    MinHashLSHCandidateGenerator,
+    length_window_pairs,
+    lsh_band_pairs,
+)
+from app.core.analysis.duplicate_finder.document_vectors import DocumentVectors
+from app.core.analysis.duplicate_finder.duplicate_finder import group_duplicates
+from app.core.analysis.duplicate_finder.duplicate_finder_stats import (
+    DuplicateFinderStats,
+)
+from app.core.analysis.duplicate_finder.minhash import MinHasher, lsh_band_keys
+from app.core.analysis.duplicate_finder.union_find import UnionFind
+
+
+def _docs(texts: List[str]) -> DocumentVectors:
+    return DocumentVectors.from_word_frequency_stream(
+        (sdoc_id, word, text.split().count(word))
+        for sdoc_id, text in enumerate(texts)
+        for word in sorted(set(text.split()))
+    )
+
+
+def _brute_force_groups(
+    docs: DocumentVectors, max_different_words: int
+) -> Set[Tuple[int, ...]]:
+    uf = UnionFind(len(docs))
+    for a, b in combinations(range(len(docs)), 2):
+        if docs.l1_distance(a, b) <= max_different_words:
+            uf.union(a, b)
+    return {tuple(sorted(group)) for group in uf.groups()}
+
+
+def _random_texts(num_docs: int, seed: int = 0) -> List[str]:
+    rng = np.random.default_rng(seed)
+    vocab = [f"w{i}" for i in range(300)]
+    texts = []
+    for _ in range(num_docs // 4):
+        base = list(rng.choice(vocab, size=int(rng.integers(5, 80))))
+        texts.append(" ".join(base))
+        # near duplicates of the base text
+        for _ in range(3):
+            words = list(base)
+            for _ in range(int(rng.integers(0, 4))):
+                words[int(rng.integers(0, len(words)))] = str(rng.choice(vocab))
+            texts.append(" ".join(words))
+    return texts
+
+
+def test_minhash_signatures_estimate_similarity() -> None:
+    minhasher = MinHasher(num_perm=128)
+    hashes = np.arange(1, 101, dtype=np.uint32)
+    counts = np.ones(100, dtype=np.int64)
+    signature = minhasher.signature(hashes, counts)
+    assert signature.shape == (128,)
+    assert np.array_equal(signature, minhasher.signature(hashes, counts))
+
+    # the n-th occurrence of a word is its own element
+    more_counts = counts.copy()
+    more_counts[:10] = 2
+    similar = minhasher.signature(hashes, more_counts)
+    different = minhasher.signature(hashes + 1000, counts)
+    assert (signature == similar).mean() > 0.7
+    assert (signature == different).mean() < 0.1
+
+    keys = lsh_band_keys(np.stack([signature, signature, different]), bands=32)
+    assert keys.shape == (3, 32)
+    assert np.array_equal(keys[0], keys[1])
+    assert not np.any(keys[0] == keys[2])
+
+
+def test_length_window_pairs() -> None:
+    lengths = np.array([10, 12, 30, 11, 50])
+    assert set(length_window_pairs(lengths, 2, max_length=np.inf)) == {
+        (0, 1),
+        (0, 3),
+        (1, 3),
+    }
+    # only the query documents are paired, but with all documents
+    query_mask = np.array([False, False, False, True, False])
+    assert set(
+        length_window_pairs(lengths, 2, max_length=np.inf, query_mask=query_mask)
+    ) == {(0, 3), (1, 3)}
+
+
+def test_lsh_band_pairs_skip_connected_buckets() -> None:
+    # a large cluster of identical documents collides in every band
+    num_docs = 500
+    band_keys = np.ones((num_docs, 4), dtype=np.uint64)
+    lengths = np.full(num_docs, 100)
+
+    pairs = list(lsh_band_pairs(band_keys, lengths, 5, short_length=10))
+    assert len(pairs) == num_docs * (num_docs - 1) // 2
+    assert len(set(pairs)) == len(pairs)
+
+    uf = UnionFind(num_docs)
+    num_pairs = 0
+    for a, b in lsh_band_pairs(band_keys, lengths, 5, short_length=10, uf=uf):
+        num_pairs += 1
+        uf.union(a, b)
+    assert len(uf.groups()) == 1
+    assert num_pairs < 2 * num_docs
+
+
+def test_generators_find_all_duplicates() -> None:
+    docs = _docs(_random_texts(200))
+    expected = _brute_force_groups(docs, max_different_words=6)
+    assert len(expected) > 0
+
+    for generator in (
+        ExactCandidateGenerator(),
+        MinHashLSHCandidateGenerator(num_perm=128, bands=64),
+    ):
+        stats = DuplicateFinderStats()
+        uf = group_duplicates(docs, 6, generator, stats)
+        assert {tuple(sorted(group)) for group in uf.groups()} == expected
+        assert stats.duplicate_pairs >= sum(len(group) - 1 for group in expected)
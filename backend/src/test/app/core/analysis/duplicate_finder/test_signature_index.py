@@ -0,0 +1,184 @@
+from typing import Dict, List, Optional, Tuple
+
+import pytest
+
+from app.core.analysis.duplicate_finder import signature_index
+from app.core.analysis.duplicate_finder.candidate_generator import (
+    MinHashLSHCandidateGenerator,
+)
+from app.core.analysis.duplicate_finder.duplicate_finder_stats import (
+    DuplicateFinderStats,
+)
+from app.core.analysis.duplicate_finder.signature_index import (
+    find_duplicates_with_signature_index,
+)
+from config import conf
+
+BASE = {f"word{idx}": 1 for idx in range(20)}
+
+
+class FakeStore:
+    """
+    The word frequencies, signatures and duplicate pairs of a project.
+    """
+
+    def __init__(self):
+        self.word_freqs: Dict[int, Dict[str, int]] = dict()
+        # sdoc_id -> [num_words, signature, checked_max_different_words]
+        self.signatures: Dict[int, list] = dict()
+        # (sdoc_id, duplicate_sdoc_id) -> distance
+        self.pairs: Dict[Tuple[int, int], int] = dict()
+
+    # crud_word_frequency
+    def stream_by_sdoc_ids(self, db, *, sdoc_ids: List[int]):
+        for sdoc_id in sorted(sdoc_ids):
+            for word, count in self.word_freqs[sdoc_id].items():
+                yield sdoc_id, word, count
+
+    # crud_duplicate_signature
+    def read_sdoc_ids_without_signature(self, db, *, project_id, doctype):
+        return [
+            sdoc_id for sdoc_id in self.word_freqs if sdoc_id not in self.signatures
+        ]
+
+    def upsert_multi(self, db, *, create_dtos) -> int:
+        if len(create_dtos) > 0 and hasattr(create_dtos[0], "distance"):
+            for dto in create_dtos:
+                self.pairs[(dto.sdoc_id, dto.duplicate_sdoc_id)] = dto.distance
+            return len(create_dtos)
+        self.remove_duplicate_pairs(db, sdoc_ids=[dto.sdoc_id for dto in create_dtos])
+        for dto in create_dtos:
+            self.signatures[dto.sdoc_id] = [dto.num_words, dto.signature, None]
+        return len(create_dtos)
+
+    def remove_duplicate_pairs(self, db, *, sdoc_ids: List[int]) -> None:
+        self.pairs = {
+            pair: distance
+            for pair, distance in self.pairs.items()
+            if pair[0] not in sdoc_ids and pair[1] not in sdoc_ids
+        }
+
+    def read_by_project_and_doctype(self, db, *, project_id, doctype):
+        return [
+            (sdoc_id, *self.signatures[sdoc_id]) for sdoc_id in sorted(self.signatures)
+        ]
+
+    def update_checked_max_different_words(
+        self, db, *, sdoc_ids: List[int], max_different_words: int
+    ) -> None:
+        for sdoc_id in sdoc_ids:
+            self.signatures[sdoc_id][2] = max_different_words
+
+    # crud_duplicate_pair
+    def read_by_project(self, db, *, project_id, max_distance: int):
+        return [
+            pair for pair, distance in self.pairs.items() if distance <= max_distance
+        ]
+
+    def remove_sdoc(self, sdoc_id: int) -> None:
+        # the signature and the word frequencies are deleted with the sdoc
+        self.remove_duplicate_pairs(None, sdoc_ids=[sdoc_id])
+        del self.signatures[sdoc_id]
+        del self.word_freqs[sdoc_id]
+
+    def checked(self) -> Dict[int, Optional[int]]:
+        return {sdoc_id: row[2] for sdoc_id, row in self.signatures.items()}
+
+
+@pytest.fixture
+def store(monkeypatch) -> FakeStore:
+    store = FakeStore()
+    for name in (
+        "crud_word_frequency",
+        "crud_duplicate_signature",
+        "crud_duplicate_pair",
+    ):
+        monkeypatch.setattr(signature_index, name, store)
+    return store
+
+
+def _find(store: FakeStore, max_different_words: int):
+    stats = DuplicateFinderStats()
+    groups = find_duplicates_with_signature_index(
+        db=None,
+        project_id=1,
+        max_different_words=max_different_words,
+        # all documents are compared exactly by length, i.e., deterministically
+        candidate_generator=MinHashLSHCandidateGenerator(
+            num_perm=conf.duplicate_finder.minhash.num_perm,
+            short_document_factor=100,
+        ),
+        stats=stats,
+    )
+    return sorted(sorted(group) for group in groups), stats
+
+
+def test_thresholds_reuse_persisted_pairs(store: FakeStore) -> None:
+    store.word_freqs = {
+        1: dict(BASE),
+        2: {**BASE, "x": 2},
+        3: {**BASE, "x": 2, "y": 2},
+        4: {"other": 20},
+    }
+
+    groups, stats = _find(store, max_different_words=3)
+    assert groups == [[1, 2, 3]]
+    assert stats.new_documents == 4
+    # the pairs within the group are persisted, too
+    assert store.pairs == {(1, 2): 2, (2, 3): 2}
+    assert store.checked() == {1: 3, 2: 3, 3: 3, 4: 3}
+
+    # a smaller threshold only filters the persisted pairs
+    for max_different_words, expected in ((2, [[1, 2, 3]]), (1, [])):
+        groups, stats = _find(store, max_different_words=max_different_words)
+        assert groups == expected
+        assert stats.new_documents == 0
+        assert stats.verified_pairs == 0
+    assert store.checked() == {1: 3, 2: 3, 3: 3, 4: 3}
+
+    # a larger threshold compares all documents again
+    groups, stats = _find(store, max_different_words=4)
+    assert groups == [[1, 2, 3]]
+    assert stats.new_documents == 4
+    assert store.pairs[(1, 3)] == 4
+
+    # only the new document is compared
+    store.word_freqs[5] = dict(BASE)
+    groups, stats = _find(store, max_different_words=4)
+    assert groups == [[1, 2, 3, 5]]
+    assert stats.new_documents == 1
+    assert store.checked()[5] == 4
+    assert store.pairs[(1, 5)] == 0
+
+
+def test_removed_documents(store: FakeStore) -> None:
+    store.word_freqs = {
+        1: dict(BASE),
+        2: {**BASE, "x": 2},
+        3: {**BASE, "x": 2, "y": 2},
+    }
+    groups, _ = _find(store, max_different_words=3)
+    assert groups == [[1, 2, 3]]
+
+    # the group was connected through the removed document only
+    store.remove_sdoc(2)
+    assert store.pairs == dict()
+    groups, stats = _find(store, max_different_words=3)
+    assert groups == []
+    assert stats.new_documents == 0
+    groups, _ = _find(store, max_different_words=4)
+    assert groups == [[1, 3]]
+
+    # a changed document is compared again, its old pairs are removed
+    store.word_freqs[3] = {"other": 20}
+    store.upsert_multi(
+        None,
+        create_dtos=[
+            signature_index.compute_duplicate_signature(
+                sdoc_id=3, project_id=1, word_freqs=store.word_freqs[3]
+            )
+        ],
+    )
+    groups, stats = _find(store, max_different_words=4)
+    assert groups == []
+    assert stats.new_documents == 1
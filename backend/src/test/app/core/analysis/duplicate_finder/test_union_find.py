@@ -0,0 +1,28 @@
+import numpy as np
+
+from app.core.analysis.duplicate_finder.union_find import UnionFind
+
+
+def test_union_connects_groups() -> None:
+    uf = UnionFind(6)
+    assert uf.union(0, 1)
+    assert uf.union(2, 3)
+    assert uf.union(1, 3)
+    # already in the same group
+    assert not uf.union(0, 2)
+
+    assert uf.connected(0, 3)
+    assert not uf.connected(0, 4)
+    assert sorted(map(sorted, uf.groups())) == [[0, 1, 2, 3]]
+    assert sorted(map(sorted, uf.groups(min_size=1))) == [[0, 1, 2, 3], [4], [5]]
+    assert len(uf) == 6
+
+
+def test_find_many_matches_find() -> None:
+    rng = np.random.default_rng(0)
+    uf = UnionFind(100)
+    for a, b in rng.integers(0, 100, size=(60, 2)):
+        uf.union(int(a), int(b))
+
+    xs = rng.integers(0, 100, size=50)
+    assert uf.find_many(xs).tolist() == [uf.find(int(x)) for x in xs]
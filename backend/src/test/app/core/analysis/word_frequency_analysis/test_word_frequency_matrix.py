@@ -0,0 +1,159 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pytest
+
+from app.core.analysis.word_frequency_analysis import word_frequency_matrix
+from app.core.analysis.word_frequency_analysis.word_frequency_matrix import (
+    WordFrequencyMatrix,
+    get_word_frequency_matrix,
+)
+
+# sdoc_id -> word -> count
+WordFrequencies = Dict[int, Dict[str, int]]
+
+
+def _stream(word_freqs: WordFrequencies, after_sdoc_id: Optional[int] = None):
+    for sdoc_id in sorted(word_freqs):
+        if after_sdoc_id is None or sdoc_id > after_sdoc_id:
+            for word, count in word_freqs[sdoc_id].items():
+                yield sdoc_id, word, count
+
+
+def _naive_sum(
+    word_freqs: WordFrequencies, sdoc_ids: List[int]
+) -> Tuple[Dict[str, Tuple[int, int]], int]:
+    # word -> (total count, number of documents)
+    sums: Dict[str, Tuple[int, int]] = dict()
+    sdoc_ids = [sdoc_id for sdoc_id in set(sdoc_ids) if sdoc_id in word_freqs]
+    for sdoc_id in sdoc_ids:
+        for word, count in word_freqs[sdoc_id].items():
+            total, num_sdocs = sums.get(word, (0, 0))
+            sums[word] = (total + count, num_sdocs + 1)
+    return sums, len(sdoc_ids)
+
+
+def _sum(
+    matrix: WordFrequencyMatrix, sdoc_ids: List[int]
+) -> Tuple[Dict[str, Tuple[int, int]], int]:
+    word_counts, sdoc_counts, num_sdocs = matrix.sum_rows(sdoc_ids)
+    assert len(word_counts) == len(sdoc_counts) == len(matrix.vocab)
+    sums = {
+        word: (int(word_counts[idx]), int(sdoc_counts[idx]))
+        for idx, word in enumerate(matrix.vocab)
+        if word_counts[idx] > 0
+    }
+    return sums, num_sdocs
+
+
+def _random_word_frequencies(seed: int) -> WordFrequencies:
+    rng = np.random.default_rng(seed)
+    vocab = [f"word{idx}" for idx in range(50)]
+    return {
+        int(sdoc_id): {
+            str(word): int(rng.integers(1, 10))
+            for word in rng.choice(vocab, size=rng.integers(1, 20), replace=False)
+        }
+        for sdoc_id in rng.choice(1000, size=100, replace=False)
+    }
+
+
+def test_sum_rows() -> None:
+    word_freqs = _random_word_frequencies(seed=0)
+    matrix = WordFrequencyMatrix.from_word_frequency_stream(
+        _stream(word_freqs), version=1
+    )
+    sdoc_ids = sorted(word_freqs)
+    rng = np.random.default_rng(1)
+    for subset in (
+        sdoc_ids,
+        sdoc_ids[:1],
+        # unsorted, duplicates and documents without word frequencies
+        [*rng.choice(sdoc_ids, size=30).tolist(), 1000, -1, 1001],
+        [],
+        [1000],
+    ):
+        assert _sum(matrix, subset) == _naive_sum(word_freqs, subset)
+
+
+def test_extend() -> None:
+    word_freqs = _random_word_frequencies(seed=0)
+    last_sdoc_id = sorted(word_freqs)[50]
+    matrix = WordFrequencyMatrix.from_word_frequency_stream(
+        (row for row in _stream(word_freqs) if row[0] <= last_sdoc_id), version=1
+    )
+    # the new documents add new words
+    word_freqs[2000] = {"new": 3, "word0": 1}
+    word_freqs[2001] = {"new": 1}
+    extended = matrix.extend(_stream(word_freqs, after_sdoc_id=last_sdoc_id), 2)
+    assert extended.version == 2
+    assert extended.vocab[: len(matrix.vocab)] == matrix.vocab
+    assert extended.sdoc_ids.tolist() == sorted(word_freqs)
+    assert _sum(extended, list(word_freqs)) == _naive_sum(word_freqs, list(word_freqs))
+
+    with pytest.raises(AssertionError):
+        extended.extend(_stream({5: {"word0": 1}}), version=3)
+
+
+def test_save_and_load(tmp_path) -> None:
+    word_freqs = _random_word_frequencies(seed=0)
+    matrix = WordFrequencyMatrix.from_word_frequency_stream(
+        _stream(word_freqs), version=1
+    )
+    matrix.save(tmp_path / "v1")
+    loaded = WordFrequencyMatrix.load(tmp_path / "v1", version=1)
+    assert loaded.vocab == matrix.vocab
+    assert _sum(loaded, list(word_freqs)) == _sum(matrix, list(word_freqs))
+
+
+def test_get_word_frequency_matrix(monkeypatch, tmp_path) -> None:
+    word_freqs: WordFrequencies = {1: {"a": 2, "b": 1}, 2: {"b": 3}}
+    streamed: List[Optional[int]] = []
+
+    class FakeCrudWordFrequency:
+        def stream_by_project(self, db, *, project_id, after_sdoc_id=None):
+            streamed.append(after_sdoc_id)
+            return _stream(word_freqs, after_sdoc_id)
+
+        def read_sdoc_ids_by_project(self, db, *, project_id, max_sdoc_id):
+            return [sdoc_id for sdoc_id in sorted(word_freqs) if sdoc_id <= max_sdoc_id]
+
+    monkeypatch.setattr(
+        word_frequency_matrix, "crud_word_frequency", FakeCrudWordFrequency()
+    )
+    monkeypatch.setattr(
+        word_frequency_matrix, "_matrix_path", lambda project_id: tmp_path
+    )
+    monkeypatch.setattr(word_frequency_matrix, "_matrices", dict())
+
+    def check(version: int) -> None:
+        matrix = get_word_frequency_matrix(None, project_id=1, version=version)
+        assert matrix.version == version
+        assert _sum(matrix, list(word_freqs)) == _naive_sum(
+            word_freqs, list(word_freqs)
+        )
+
+    check(version=1)
+    assert streamed == [None]
+
+    # added documents are appended to the matrix
+    streamed.clear()
+    word_freqs[3] = {"c": 1, "a": 1}
+    check(version=2)
+    assert streamed == [2]
+
+    # a removed document rebuilds the matrix
+    streamed.clear()
+    del word_freqs[2]
+    check(version=3)
+    assert streamed == [None]
+    assert [path.name for path in tmp_path.iterdir()] == ["v3"]
+
+    # the current version is loaded from the repo, not built again
+    streamed.clear()
+    word_frequency_matrix._matrices.clear()
+    check(version=3)
+    assert streamed == []
+    word_freqs[4] = {"d": 4}
+    check(version=4)
+    assert streamed == [3]
@@ -0,0 +1,50 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from app.core.annoscaling.sentence_linking import link_spans_to_sentences
+
+
+def _link_naively(begin: int, end: int, sentences: Tuple[List[int], List[int]]) -> int:
+    overlaps = [
+        min(sent_end, end) - max(sent_start, begin)
+        for sent_start, sent_end in zip(*sentences)
+    ]
+    if len(overlaps) == 0 or max(overlaps) <= 0:
+        return 0
+    return int(np.argmax(overlaps))
+
+
+def test_link_spans_to_sentences() -> None:
+    sdoc_sentences = {
+        1: ([0, 10, 20], [9, 19, 29]),
+        2: ([0, 5], [4, 30]),
+    }
+    result = link_spans_to_sentences(
+        span_begins=[0, 12, 15, 3, 0, 8],
+        span_ends=[5, 14, 25, 20, 2, 9],
+        span_sdoc_ids=[1, 1, 1, 2, 2, 1],
+        sdoc_sentences=sdoc_sentences,
+    )
+    # spans without overlap (e.g. between two sentences) get the first sentence
+    assert result.tolist() == [0, 1, 2, 1, 0, 0]
+
+
+def test_link_spans_to_sentences_matches_naive_linking() -> None:
+    rng = np.random.default_rng(0)
+    sdoc_sentences: Dict[int, Tuple[List[int], List[int]]] = dict()
+    for sdoc_id in range(1, 20):
+        bounds = np.sort(
+            rng.choice(500, size=2 * int(rng.integers(0, 10)), replace=False)
+        )
+        sdoc_sentences[sdoc_id] = (bounds[0::2].tolist(), bounds[1::2].tolist())
+
+    sdoc_ids = rng.integers(1, 20, size=300)
+    begins = rng.integers(0, 500, size=300)
+    ends = begins + rng.integers(0, 60, size=300)
+    result = link_spans_to_sentences(begins, ends, sdoc_ids, sdoc_sentences)
+    assert result.tolist() == [
+        _link_naively(int(b), int(e), sdoc_sentences[int(s)])
+        for b, e, s in zip(begins, ends, sdoc_ids)
+    ]
+    assert len(link_spans_to_sentences([], [], [], sdoc_sentences)) == 0
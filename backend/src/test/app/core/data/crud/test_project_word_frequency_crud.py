@@ -0,0 +1,70 @@
+import ast
+from pathlib import Path
+from typing import Dict, List, Set
+
+SRC = Path(__file__).parents[5]
+
+WORD_FREQUENCY_WRITERS = {"create", "create_multi", "update", "remove"}
+
+
+def _calls(node: ast.AST) -> Set[str]:
+    # "receiver.method" of all calls in the node, e.g. "crud_word_frequency.create"
+    calls = set()
+    for child in ast.walk(node):
+        if isinstance(child, ast.Call):
+            func = child.func
+            if isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name):
+                calls.add(f"{func.value.id}.{func.attr}")
+            elif isinstance(func, ast.Name):
+                calls.add(func.id)
+    return calls
+
+
+def _functions() -> Dict[str, List[ast.AST]]:
+    functions: Dict[str, List[ast.AST]] = dict()
+    for package in ["app", "api"]:
+        for path in (SRC / package).rglob("*.py"):
+            tree = ast.parse(path.read_text(), filename=str(path))
+            functions[str(path.relative_to(SRC))] = [
+                node
+                for node in ast.walk(tree)
+                if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+            ]
+    return functions
+
+
+def test_word_frequencies_are_written_with_the_project_aggregates() -> None:
+    # the project aggregates are maintained incrementally, every other writer of the
+    # word frequencies would silently drift them
+    writers = set()
+    for path, functions in _functions().items():
+        for function in functions:
+            calls = _calls(function)
+            if any(
+                f"crud_word_frequency.{method}" in calls
+                for method in WORD_FREQUENCY_WRITERS
+            ) or ("WordFrequencyORM" in calls):
+                writers.add(f"{path}:{function.name}")
+                assert (
+                    "crud_project_word_frequency.add_sdoc_word_frequencies" in calls
+                ), f"{path}:{function.name} does not update the project aggregates"
+
+    assert writers == {
+        "app/preprocessing/pipeline/steps/text/storage/persist_sdoc_word_frequencies.py:persist_sdoc_word_frequencies",
+        "app/preprocessing/pipeline/steps/text/storage/persist_sdoc_word_frequencies.py:persist_sdoc_word_frequencies_batch",
+    }
+
+
+def test_sdoc_removal_updates_the_project_aggregates() -> None:
+    functions = {
+        function.name: _calls(function)
+        for function in _functions()["app/core/data/crud/source_document.py"]
+    }
+    assert (
+        "crud_project_word_frequency.remove_sdoc_word_frequencies"
+        in functions["remove"]
+    )
+    assert (
+        "crud_project_word_frequency.remove_by_project"
+        in functions["remove_by_project"]
+    )
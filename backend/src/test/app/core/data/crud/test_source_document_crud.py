@@ -0,0 +1,94 @@
+from typing import List, Tuple
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.core.data.crud.source_document import crud_sdoc
+from app.core.data.crud.source_document_data import crud_sdoc_data
+from app.core.data.doc_type import DocType
+from app.core.data.dto.source_document import SDocStatus, SourceDocumentCreate
+from app.core.data.dto.source_document_data import (
+    SourceDocumentDataCreate,
+    SourceDocumentDataRangeUnit,
+)
+from app.core.data.orm.project import ProjectORM
+
+CONTENT = "Hello world. Foo bar baz."
+TOKENS = [(0, 5), (6, 11), (11, 12), (13, 16), (17, 20), (21, 24), (24, 25)]
+SENTENCES = [(0, 12), (13, 25)]
+
+
+@pytest.fixture
+def sdoc_id(db: Session, project: ProjectORM) -> int:
+    sdoc = crud_sdoc.create(
+        db=db,
+        create_dto=SourceDocumentCreate(
+            filename="range.txt",
+            doctype=DocType.text,
+            status=SDocStatus.finished,
+            project_id=project.id,
+        ),
+    )
+    crud_sdoc_data.create(
+        db=db,
+        create_dto=SourceDocumentDataCreate(
+            id=sdoc.id,
+            content=CONTENT,
+            repo_url="range.html",
+            html=f"<html><body><p>{CONTENT}</p></body></html>",
+            token_starts=[s for s, _ in TOKENS],
+            token_ends=[e for _, e in TOKENS],
+            sentence_starts=[s for s, _ in SENTENCES],
+            sentence_ends=[e for _, e in SENTENCES],
+        ),
+    )
+    return sdoc.id
+
+
+@pytest.mark.parametrize(
+    "unit, start, end, token_range, sentence_range, content",
+    [
+        # the first and the last token
+        (SourceDocumentDataRangeUnit.TOKEN, 0, 1, (0, 1), (0, 1), "Hello world."),
+        (SourceDocumentDataRangeUnit.TOKEN, 6, 7, (6, 7), (1, 2), "Foo bar baz."),
+        # tokens of two sentences
+        (SourceDocumentDataRangeUnit.TOKEN, 2, 4, (2, 4), (0, 2), CONTENT),
+        # ranges are clipped to the document
+        (SourceDocumentDataRangeUnit.TOKEN, 5, 100, (5, 7), (1, 2), "Foo bar baz."),
+        # empty ranges
+        (SourceDocumentDataRangeUnit.TOKEN, 3, 3, (3, 3), (1, 1), ""),
+        (SourceDocumentDataRangeUnit.TOKEN, 7, 10, (7, 7), (2, 2), ""),
+        # the first and the last sentence
+        (SourceDocumentDataRangeUnit.SENTENCE, 0, 1, (0, 3), (0, 1), "Hello world."),
+        (SourceDocumentDataRangeUnit.SENTENCE, 1, 2, (3, 7), (1, 2), "Foo bar baz."),
+        (SourceDocumentDataRangeUnit.SENTENCE, 0, 5, (0, 7), (0, 2), CONTENT),
+        # empty ranges
+        (SourceDocumentDataRangeUnit.SENTENCE, 1, 1, (3, 3), (1, 1), ""),
+        (SourceDocumentDataRangeUnit.SENTENCE, 2, 3, (7, 7), (2, 2), ""),
+    ],
+)
+def test_read_data_range(
+    db: Session,
+    sdoc_id: int,
+    unit: SourceDocumentDataRangeUnit,
+    start: int,
+    end: int,
+    token_range: Tuple[int, int],
+    sentence_range: Tuple[int, int],
+    content: str,
+) -> None:
+    data = crud_sdoc.read_data_range(db=db, id=sdoc_id, unit=unit, start=start, end=end)
+    assert (data.num_tokens, data.num_sentences) == (7, 2)
+    assert (data.token_start, data.token_end) == token_range
+    assert (data.sentence_start, data.sentence_end) == sentence_range
+    assert data.content == content
+
+    expected_tokens: List[Tuple[int, int]] = TOKENS[slice(*token_range)]
+    assert data.token_character_offsets == expected_tokens
+    assert data.tokens == [CONTENT[s:e] for s, e in expected_tokens]
+    expected_sentences: List[Tuple[int, int]] = SENTENCES[slice(*sentence_range)]
+    assert data.sentence_character_offsets == expected_sentences
+    assert data.sentences == [CONTENT[s:e] for s, e in expected_sentences]
+    # the content starts at the first token or sentence of the range
+    if len(content) > 0:
+        assert CONTENT[data.content_start :].startswith(content)
@@ -0,0 +1,182 @@
+import gc
+import threading
+from types import SimpleNamespace
+from typing import List
+
+import pytest
+
+from app.core.data.dto.llm_job import LLMJobUpdate
+from app.core.data.llm import llm_job_executor
+from app.core.data.llm.llm_job_executor import (
+    LLMJobProgress,
+    LLMRequestExecutor,
+    _project_semaphores,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+class FakeRedisService:
+    def __init__(self):
+        self.updates: List[LLMJobUpdate] = []
+
+    def load_llm_job(self, key: str):
+        return SimpleNamespace(current_step=2)
+
+    def update_llm_job(self, key: str, update: LLMJobUpdate) -> None:
+        self.updates.append(update)
+
+
+def test_map_unordered_window() -> None:
+    running = 0
+    max_running = 0
+    lock = threading.Lock()
+    release = threading.Event()
+
+    def request(item: int) -> int:
+        nonlocal running, max_running
+        with lock:
+            running += 1
+            max_running = max(max_running, running)
+        release.wait(timeout=5)
+        with lock:
+            running -= 1
+        return item * 2
+
+    executor = LLMRequestExecutor(
+        project_id=1, max_in_flight=3, max_concurrent_requests_per_project=10
+    )
+    threading.Timer(0.1, release.set).start()
+    results = list(executor.map_unordered(request, list(range(10))))
+    assert max_running == 3
+    assert sorted(results) == [(i, i * 2, None) for i in range(10)]
+    assert list(executor.map_unordered(request, [])) == []
+
+
+def test_map_unordered_errors() -> None:
+    def request(item: int) -> int:
+        if item == 2:
+            raise ValueError("invalid response")
+        return item
+
+    executor = LLMRequestExecutor(
+        project_id=1, max_in_flight=2, max_concurrent_requests_per_project=2
+    )
+    results = sorted(executor.map_unordered(request, list(range(4))))
+    assert [(idx, result) for idx, result, _ in results] == [
+        (0, 0),
+        (1, 1),
+        (2, None),
+        (3, 3),
+    ]
+    assert isinstance(results[2][2], ValueError)
+    assert all(error is None for idx, _, error in results if idx != 2)
+
+
+def test_map_unordered_early_stop() -> None:
+    started: List[int] = []
+
+    def request(item: int) -> int:
+        started.append(item)
+        return item
+
+    executor = LLMRequestExecutor(
+        project_id=1, max_in_flight=2, max_concurrent_requests_per_project=2
+    )
+    results = executor.map_unordered(request, list(range(100)))
+    next(results)
+    results.close()
+    # no more requests are started once the consumer stopped
+    assert len(started) <= 3
+
+
+def test_project_limit() -> None:
+    running = 0
+    max_running = 0
+    lock = threading.Lock()
+
+    def request(item: int) -> int:
+        nonlocal running, max_running
+        with lock:
+            running += 1
+            max_running = max(max_running, running)
+        threading.Event().wait(0.02)
+        with lock:
+            running -= 1
+        return item
+
+    # two jobs of the same project share the slots of the project
+    executors = [
+        LLMRequestExecutor(
+            project_id=1, max_in_flight=4, max_concurrent_requests_per_project=3
+        )
+        for _ in range(2)
+    ]
+    assert executors[0].project_semaphore is executors[1].project_semaphore
+    threads = [
+        threading.Thread(
+            target=lambda executor=executor: list(
+                executor.map_unordered(request, list(range(8)))
+            )
+        )
+        for executor in executors
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    assert max_running == 3
+
+    # the semaphores are dropped once no job uses them
+    executors.clear()
+    gc.collect()
+    assert (1, 3) not in _project_semaphores
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(llm_job_executor, "time", clock)
+    return clock
+
+
+def test_progress(monkeypatch, clock) -> None:
+    redis = FakeRedisService()
+    monkeypatch.setattr(llm_job_executor, "RedisService", lambda: redis)
+    progress = LLMJobProgress("job", flush_steps=3, flush_interval=10)
+
+    progress.step("doc 1")
+    progress.step("doc 2")
+    assert redis.updates == []
+    progress.step("doc 3")
+    assert [(u.current_step, u.current_step_description) for u in redis.updates] == [
+        (5, "doc 3")
+    ]
+
+    # or after the flush interval
+    clock.now = 10.0
+    progress.step("doc 4")
+    assert redis.updates[-1].current_step == 6
+
+    progress.flush()
+    assert len(redis.updates) == 2
+    progress.step("doc 5")
+    progress.flush()
+    assert redis.updates[-1].current_step == 7
+
+
+def test_progress_errors_are_ignored(monkeypatch, clock) -> None:
+    class BrokenRedisService(FakeRedisService):
+        def update_llm_job(self, key: str, update: LLMJobUpdate) -> None:
+            raise ConnectionError("redis is down")
+
+    monkeypatch.setattr(llm_job_executor, "RedisService", BrokenRedisService)
+    progress = LLMJobProgress("job", flush_steps=1, flush_interval=10)
+    progress.step("doc 1")
+    progress.flush()
@@ -0,0 +1,73 @@
+from typing import List
+
+from pydantic import BaseModel
+
+from app.core.data.llm.llm_response_cache import LLMResponseCache
+from app.core.db import redis_service
+from app.core.db.redis_service import RedisService
+
+
+class Answer(BaseModel):
+    label: str
+    confidence: float
+
+
+class OtherAnswer(BaseModel):
+    label: str
+    explanation: str
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def time(self) -> float:
+        self.now += 1.0
+        return self.now
+
+
+def test_key() -> None:
+    key = LLMResponseCache.key("gemma2", "system", "user", Answer)
+    assert key == LLMResponseCache.key("gemma2", "system", "user", Answer)
+    assert len(key) == 64
+
+    # every part identifies the response
+    assert key != LLMResponseCache.key("llama3", "system", "user", Answer)
+    assert key != LLMResponseCache.key("gemma2", "other system", "user", Answer)
+    assert key != LLMResponseCache.key("gemma2", "system", "other user", Answer)
+    assert key != LLMResponseCache.key("gemma2", "system", "user", OtherAnswer)
+    # the parts are separated
+    assert LLMResponseCache.key("gemma2", "ab", "c", Answer) != (
+        LLMResponseCache.key("gemma2", "a", "bc", Answer)
+    )
+
+
+def test_lru_eviction(monkeypatch) -> None:
+    monkeypatch.setattr(redis_service, "time", FakeClock())
+    redis = RedisService()
+    redis._flush_client("llm_cache")
+
+    def store(key: str) -> int:
+        return redis.store_llm_response(key, key.encode("utf-8") * 10, max_bytes=25)
+
+    def cached() -> List[str]:
+        return [
+            key
+            for key in ["a", "b", "c", "d"]
+            if redis.load_llm_response(key) is not None
+        ]
+
+    assert store("a") == 0
+    assert store("b") == 0
+    assert redis.load_llm_response("a") == b"a" * 10
+
+    # b is the least recently used response
+    assert store("c") == 1
+    assert cached() == ["a", "c"]
+
+    # replacing a response does not count its old size
+    assert store("c") == 0
+    # a response larger than the cache evicts all others, but is kept itself
+    assert redis.store_llm_response("d", b"d" * 30, max_bytes=25) == 2
+    assert cached() == ["d"]
+    redis._flush_client("llm_cache")
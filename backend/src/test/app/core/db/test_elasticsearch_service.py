@@ -0,0 +1,147 @@
+from typing import Any, Dict, List, Optional, Set
+
+import pytest
+
+from app.core.data.dto.search import ElasticSearchDocumentCreate
+from app.core.db import elasticsearch_service
+from app.core.db.elasticsearch_service import ElasticSearchService
+
+INDEX = "dats_project_1_docs"
+
+
+class FakeIndices:
+    def __init__(self):
+        self.settings: Dict[str, Any] = {"index.number_of_replicas": "1"}
+        self.refreshed = 0
+
+    def get_settings(self, index: str, name: str, flat_settings: bool):
+        return {index: {"settings": dict(self.settings)}}
+
+    def put_settings(self, index: str, body: Dict[str, Any]) -> None:
+        for name, value in body.items():
+            if value is None:
+                self.settings.pop(name, None)
+            else:
+                self.settings[name] = str(value)
+
+    def exists(self, index: str) -> bool:
+        return True
+
+    def refresh(self, index: str) -> None:
+        self.refreshed += 1
+
+
+class FakeClient:
+    def __init__(self):
+        self.indices = FakeIndices()
+
+
+class FakeRedisService:
+    """Same semantics as the bulk indexing scripts of the RedisService."""
+
+    def __init__(self):
+        self.jobs: Set[str] = set()
+        self.settings: Optional[str] = None
+
+    def acquire_bulk_indexing(self, index: str, job_id: str) -> bool:
+        self.jobs.add(job_id)
+        return self.settings is None
+
+    def store_bulk_indexing_settings(self, index: str, settings: str) -> None:
+        if self.settings is None:
+            self.settings = settings
+
+    def release_bulk_indexing(self, index: str, job_id: str) -> Optional[str]:
+        self.jobs.discard(job_id)
+        return self.settings if len(self.jobs) == 0 else None
+
+    def restored_bulk_indexing(self, index: str) -> None:
+        if len(self.jobs) == 0:
+            self.settings = None
+
+
+class FakeStreamingBulk:
+    def __init__(self, statuses: List[Dict[str, Any]]):
+        # the statuses of the failing actions of each attempt
+        self.statuses = statuses
+        self.requests: List[List[str]] = []
+
+    def __call__(self, client, actions, **kwargs):
+        self.requests.append([action["_id"] for action in actions])
+        statuses = self.statuses[len(self.requests) - 1]
+        for action in actions:
+            if action["_id"] in statuses:
+                yield (
+                    False,
+                    {
+                        "index": {
+                            "_id": action["_id"],
+                            "status": statuses[action["_id"]],
+                        }
+                    },
+                )
+
+
+@pytest.fixture
+def es(monkeypatch) -> ElasticSearchService:
+    service = object.__new__(ElasticSearchService)
+    service._ElasticSearchService__client = FakeClient()
+    monkeypatch.setattr(elasticsearch_service.time, "sleep", lambda seconds: None)
+    return service
+
+
+def _esdocs(sdoc_ids: List[int]) -> List[ElasticSearchDocumentCreate]:
+    return [
+        ElasticSearchDocumentCreate(
+            filename=f"doc_{sdoc_id}.txt",
+            content="content",
+            sdoc_id=sdoc_id,
+            project_id=1,
+        )
+        for sdoc_id in sdoc_ids
+    ]
+
+
+def test_add_documents_to_index(monkeypatch, es) -> None:
+    # 2 is rejected once, 3 fails permanently, 4 is unavailable on every attempt
+    streaming_bulk = FakeStreamingBulk(
+        [{"2": 429, "3": 400, "4": 503}, {"4": 503}, {"4": 503}, {"4": 503}]
+    )
+    monkeypatch.setattr(elasticsearch_service.helpers, "streaming_bulk", streaming_bulk)
+
+    added_ids = es.add_documents_to_index(proj_id=1, esdocs=_esdocs([1, 2, 3, 4]))
+    assert added_ids == [1, 2]
+    # only the transiently failed documents are retried, at most max_retries times
+    assert streaming_bulk.requests == [
+        ["1", "2", "3", "4"],
+        ["2", "4"],
+        ["4"],
+        ["4"],
+    ]
+
+
+def test_bulk_indexing_settings(monkeypatch, es) -> None:
+    redis = FakeRedisService()
+    monkeypatch.setattr(elasticsearch_service, "RedisService", lambda: redis)
+    indices = es._ElasticSearchService__client.indices
+
+    es.begin_bulk_indexing(proj_id=1, job_id="a")
+    assert indices.settings == {
+        "index.refresh_interval": "-1",
+        "index.number_of_replicas": "0",
+    }
+    # a concurrent import does not take the bulk settings for the original ones
+    es.begin_bulk_indexing(proj_id=1, job_id="b")
+    es.end_bulk_indexing(proj_id=1, job_id="a")
+    assert indices.settings["index.refresh_interval"] == "-1"
+    assert indices.refreshed == 0
+
+    # the last import restores the original settings
+    es.end_bulk_indexing(proj_id=1, job_id="b")
+    assert indices.settings == {"index.number_of_replicas": "1"}
+    assert indices.refreshed == 1
+    assert redis.settings is None
+
+    # ending a job again has no effect
+    es.end_bulk_indexing(proj_id=1, job_id="b")
+    assert indices.refreshed == 1
@@ -0,0 +1,177 @@
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pytest
+
+from app.core.db import embedding_write_buffer
+from app.core.db.embedding_write_buffer import EmbeddingWriteBuffer
+from app.core.db.index_type import IndexType
+from app.core.db.typesense_service import TypesenseService
+
+
+class FakeRedisService:
+    """
+    The embedding write buffer of a single process, see RedisService.
+    """
+
+    def __init__(self, state: Dict[str, Dict[str, Tuple[bytes, float]]]):
+        self.pending = state.setdefault("pending", dict())
+        self.flushing = state.setdefault("flushing", dict())
+        self.discarded = state.setdefault("discarded", dict())
+
+    def push_embeddings(self, key: str, embeddings: bytes) -> int:
+        pushed = self.pending.get(key, (b"", time.time()))[1]
+        self.pending[key] = (embeddings, pushed)
+        return len(self.pending)
+
+    def schedule_embedding_buffer_flush(self, delay: float) -> bool:
+        return False
+
+    def get_embedding_buffer_state(self):
+        return (
+            len(self.pending),
+            len(self.flushing),
+            min((pushed for _, pushed in self.pending.values()), default=None),
+            min((claimed for _, claimed in self.flushing.values()), default=None),
+        )
+
+    def claim_embeddings(self, max_keys: int, claim_timeout: float):
+        keys = sorted(self.pending, key=lambda key: self.pending[key][1])[:max_keys]
+        claimed = []
+        for key in keys:
+            payload, _ = self.pending.pop(key)
+            self.flushing[key] = (payload, time.time())
+            claimed.append((key, payload))
+        return claimed
+
+    def ack_embeddings(self, keys: List[str]) -> List[str]:
+        for key in keys:
+            self.flushing.pop(key, None)
+        return [key for key in keys if self.discarded.pop(key, None) is not None]
+
+    def release_embeddings(self, keys: List[str]) -> None:
+        for key in keys:
+            payload, _ = self.flushing.pop(key)
+            self.pending.setdefault(key, (payload, time.time()))
+
+    def discard_embeddings(self, pattern: str) -> int:
+        prefix, suffix = pattern.split("*")
+        keys = [
+            key
+            for key in [*self.pending, *self.flushing]
+            if key.startswith(prefix) and key.endswith(suffix)
+        ]
+        for key in keys:
+            self.pending.pop(key, None)
+            if key in self.flushing:
+                self.discarded[key] = self.flushing[key]
+        return len(keys)
+
+
+class FakeIndex:
+    def __init__(self):
+        # (type, sdoc_id) -> embeddings
+        self.embeddings: Dict[Tuple[IndexType, int], np.ndarray] = dict()
+        self.num_batches = 0
+        self.fail = False
+        self.on_write = None
+
+    def add_embeddings_to_index_batch(self, type, entries) -> None:
+        if self.fail:
+            raise ConnectionError("index unavailable")
+        if self.on_write is not None:
+            self.on_write()
+        self.num_batches += 1
+        for _, sdoc_id, embs in entries:
+            self.embeddings[(type, sdoc_id)] = embs
+
+    def remove_embeddings_from_index(self, type, sdoc_id: int) -> None:
+        self.embeddings.pop((type, sdoc_id), None)
+
+
+@pytest.fixture
+def redis_state(monkeypatch) -> Dict[str, Dict[str, Tuple[bytes, float]]]:
+    state: Dict[str, Dict[str, Tuple[bytes, float]]] = dict()
+    monkeypatch.setattr(
+        embedding_write_buffer, "RedisService", lambda: FakeRedisService(state)
+    )
+    return state
+
+
+def _push(buffer: EmbeddingWriteBuffer, sdoc_id: int) -> None:
+    buffer.push(1, sdoc_id, {IndexType.SENTENCE: np.full((2, 4), sdoc_id)})
+
+
+def test_flush(redis_state) -> None:
+    index = FakeIndex()
+    buffer = EmbeddingWriteBuffer(
+        index=index, flush_size=3, flush_interval=60.0, claim_timeout=60.0
+    )
+    for sdoc_id in range(5):
+        _push(buffer, sdoc_id)
+    # pushing never writes to the index, the pipeline flushes after its execution
+    assert index.embeddings == dict()
+
+    # a flush writes batches of flush_size SDocs as long as a flush is due
+    assert buffer.flush() == 3
+    assert index.num_batches == 1
+    assert buffer.flush() == 0
+    assert buffer.flush(force=True) == 2
+    assert index.num_batches == 2
+    assert sorted(sdoc_id for _, sdoc_id in index.embeddings) == list(range(5))
+    assert np.all(index.embeddings[(IndexType.SENTENCE, 3)] == 3)
+
+
+def test_failed_flush_is_retried(redis_state) -> None:
+    index = FakeIndex()
+    buffer = EmbeddingWriteBuffer(
+        index=index, flush_size=10, flush_interval=60.0, claim_timeout=60.0
+    )
+    for sdoc_id in range(3):
+        _push(buffer, sdoc_id)
+
+    index.fail = True
+    with pytest.raises(ConnectionError):
+        buffer.flush(force=True)
+    assert len(redis_state["pending"]) == 3
+    assert len(redis_state["flushing"]) == 0
+
+    index.fail = False
+    assert buffer.flush(force=True) == 3
+    assert len(index.embeddings) == 3
+
+
+def test_discarded_during_flush(redis_state) -> None:
+    index = FakeIndex()
+    buffer = EmbeddingWriteBuffer(
+        index=index, flush_size=10, flush_interval=60.0, claim_timeout=60.0
+    )
+    for sdoc_id in range(3):
+        _push(buffer, sdoc_id)
+    # the SDoc is removed while its embeddings are written
+    index.on_write = lambda: buffer.discard_sdoc(1)
+    assert buffer.flush(force=True) == 3
+    assert sorted(sdoc_id for _, sdoc_id in index.embeddings) == [0, 2]
+
+
+def test_typesense_import_failure_raises() -> None:
+    class FakeDocuments:
+        def import_(self, documents, params):
+            return [{"success": True}] + [
+                {"success": False, "error": "Bad request."}
+                for _ in range(len(documents) - 1)
+            ]
+
+    class FakeCollection:
+        documents = FakeDocuments()
+
+    # the instance is not connected, only the import is called
+    service = object.__new__(TypesenseService)
+    service._client = type("FakeClient", (), {})()
+    service._client.collections = {"Sentence": FakeCollection()}
+    service.class_names = {IndexType.SENTENCE: "Sentence"}
+
+    entries = [(1, 1, np.zeros((2, 4), dtype=np.float32))]
+    with pytest.raises(RuntimeError, match="1 of 2"):
+        service.add_embeddings_to_index_batch(IndexType.SENTENCE, entries)
@@ -0,0 +1,133 @@
+from typing import Dict
+
+import numpy as np
+import pytest
+
+from app.core.db import numpy_index_service
+from app.core.db.index_type import IndexType
+from app.core.db.numpy_index_service import NumpyIndexService
+from config import conf
+
+DIM = 512
+CLASS_ATTRIBUTES = [
+    "_root",
+    "_dim",
+    "_dtype",
+    "_record_dtype",
+    "_chunk_size",
+    "_ivf_min_size",
+    "_ivf_nprobe",
+    "_quantizer",
+    "_oversampling",
+    "_mmaps",
+    "_sorted_keys",
+    "_ivfs",
+    "_lock",
+]
+
+
+def _service(monkeypatch, tmp_path, quantization: str = "none") -> NumpyIndexService:
+    # a fresh instance in tmp_path instead of the singleton, the attributes of the
+    # class are restored after the test
+    for name in CLASS_ATTRIBUTES:
+        monkeypatch.setattr(NumpyIndexService, name, None, raising=False)
+    monkeypatch.setattr(conf.repo, "root_directory", str(tmp_path))
+    monkeypatch.setattr(numpy_index_service.qc, "type", quantization)
+    return NumpyIndexService.__new__(NumpyIndexService)
+
+
+def _embeddings(num_sdocs: int, num_sents: int) -> Dict[int, np.ndarray]:
+    rng = np.random.default_rng(0)
+    return {
+        sdoc_id: rng.normal(size=(num_sents, DIM)).astype(np.float32)
+        for sdoc_id in range(num_sdocs)
+    }
+
+
+def _normalize(embs: np.ndarray) -> np.ndarray:
+    return embs / np.linalg.norm(embs, axis=-1, keepdims=True)
+
+
+@pytest.mark.parametrize("quantization", ["none", "int8"])
+def test_add_search_remove(monkeypatch, tmp_path, quantization: str) -> None:
+    service = _service(monkeypatch, tmp_path, quantization)
+    data = _embeddings(num_sdocs=10, num_sents=20)
+    for sdoc_id, embs in data.items():
+        service.add_embeddings_to_index(IndexType.SENTENCE, 1, sdoc_id, list(embs))
+    # adding the embeddings of a sdoc again replaces them
+    service.add_embeddings_to_index(IndexType.SENTENCE, 1, 5, list(data[5]))
+    assert len(service.get_embeddings(1, IndexType.SENTENCE)[0]) == 200
+
+    query = data[3][4] + 0.5 * data[7][2]
+    all_embs = _normalize(np.concatenate([data[i] for i in range(10)]))
+    expected = np.argsort(-(all_embs @ _normalize(query)))[:5]
+    hits = service.search_index(1, IndexType.SENTENCE, query, None, 5, threshold=-1)
+    assert [(h.sdoc_id, h.sentence_id) for h in hits] == [
+        (int(i) // 20, int(i) % 20) for i in expected
+    ]
+
+    hits = service.search_index(1, IndexType.SENTENCE, query, [6, 7], 5, threshold=-1)
+    assert len(hits) == 5
+    assert all(h.sdoc_id in (6, 7) for h in hits)
+    assert (hits[0].sdoc_id, hits[0].sentence_id) == (7, 2)
+
+    service.remove_embeddings_from_index(IndexType.SENTENCE, 3)
+    assert len(service.get_embeddings(1, IndexType.SENTENCE)[0]) == 180
+    hits = service.search_sentences_batch(1, np.stack([data[3][4], data[8][1]]), 3)
+    assert all(h.sdoc_id != 3 for h in hits[0][0])
+    assert (hits[1][0][0].sdoc_id, hits[1][0][0].sentence_id) == (8, 1)
+    assert hits[1][1].shape == (3, DIM)
+
+    service.remove_project_from_index(1)
+    assert service.search_index(1, IndexType.SENTENCE, query, None, 5) == []
+
+
+def test_get_sentence_embeddings(monkeypatch, tmp_path) -> None:
+    service = _service(monkeypatch, tmp_path)
+    data = _embeddings(num_sdocs=3, num_sents=5)
+    service.add_embeddings_to_index(IndexType.SENTENCE, 1, 0, list(data[0]))
+    service.add_embeddings_to_index(IndexType.SENTENCE, 2, 1, list(data[1]))
+
+    # (sentence_id, sdoc_id) of two projects and of a sdoc that is not indexed
+    embs = service.get_sentence_embeddings([(4, 1), (2, 0), (0, 2)])
+    assert embs.shape == (3, DIM)
+    assert np.allclose(embs[0], _normalize(data[1][4]), atol=1e-2)
+    assert np.allclose(embs[1], _normalize(data[0][2]), atol=1e-2)
+    assert np.isnan(embs[2]).all()
+
+    # the cached sorted keys follow the changes of the index
+    service.remove_embeddings_from_index(IndexType.SENTENCE, 1)
+    service.add_embeddings_to_index(IndexType.SENTENCE, 1, 2, list(data[2]))
+    embs = service.get_sentence_embeddings([(4, 1), (0, 2)])
+    assert np.isnan(embs[0]).all()
+    assert np.allclose(embs[1], _normalize(data[2][0]), atol=1e-2)
+
+
+def test_ivf_is_built_on_write(monkeypatch, tmp_path) -> None:
+    service = _service(monkeypatch, tmp_path)
+    monkeypatch.setattr(NumpyIndexService, "_ivf_min_size", 100)
+    data = _embeddings(num_sdocs=10, num_sents=20)
+    ivf_path = service._path(IndexType.SENTENCE, 1).with_suffix(".ivf.npz")
+
+    for sdoc_id in range(4):
+        service.add_embeddings_to_index(
+            IndexType.SENTENCE, 1, sdoc_id, list(data[sdoc_id])
+        )
+    assert not ivf_path.exists()
+    for sdoc_id in range(4, 10):
+        service.add_embeddings_to_index(
+            IndexType.SENTENCE, 1, sdoc_id, list(data[sdoc_id])
+        )
+    assert ivf_path.exists()
+
+    hits = service.search_sentences_batch(1, np.stack([data[2][7], data[9][3]]), 3)
+    assert (hits[0][0][0].sdoc_id, hits[0][0][0].sentence_id) == (2, 7)
+    assert (hits[1][0][0].sdoc_id, hits[1][0][0].sentence_id) == (9, 3)
+
+    # a rewrite of the file rebuilds the IVF, removing too many rows drops it
+    service.remove_embeddings_from_index(IndexType.SENTENCE, 2)
+    hits = service.search_sentences_batch(1, np.stack([data[9][3]]), 100)
+    assert all(h.sdoc_id != 2 for h in hits[0][0])
+    for sdoc_id in range(3, 10):
+        service.remove_embeddings_from_index(IndexType.SENTENCE, sdoc_id)
+    assert not ivf_path.exists()
@@ -0,0 +1,122 @@
+from typing import Dict, Optional
+
+import numpy as np
+import pytest
+
+from app.core.db import query_embedding_cache
+from app.core.db.query_embedding_cache import QueryEmbeddingCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+class FakeRedisService:
+    def __init__(self):
+        self.store: Dict[str, bytes] = dict()
+
+    def load_query_embedding(self, key: str) -> Optional[bytes]:
+        return self.store.get(key)
+
+    def store_query_embedding(self, key: str, emb: bytes, ttl: int) -> None:
+        self.store[key] = emb
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(query_embedding_cache, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def redis(monkeypatch) -> FakeRedisService:
+    redis = FakeRedisService()
+    monkeypatch.setattr(query_embedding_cache, "RedisService", lambda: redis)
+    return redis
+
+
+def _emb(value: float) -> np.ndarray:
+    return np.full(4, value, dtype=np.float32)
+
+
+def test_hit_and_miss(clock) -> None:
+    cache = QueryEmbeddingCache(max_size=10, ttl=60)
+    computed = []
+
+    def compute() -> np.ndarray:
+        computed.append(1)
+        return _emb(len(computed))
+
+    key = QueryEmbeddingCache.text_key("clip", "a  query")
+    assert (cache.get_or_compute(key, compute) == 1).all()
+    assert (cache.get_or_compute(key, compute) == 1).all()
+    assert len(computed) == 1
+    assert cache.stats() == {"size": 1, "hits": 1, "redis_hits": 0, "misses": 1}
+
+    # callers get a copy of the cached embedding
+    cache.get_or_compute(key, compute)[:] = 0
+    assert (cache.get(key) == 1).all()
+
+    # entries expire after the ttl
+    clock.now = 60.0
+    assert (cache.get_or_compute(key, compute) == 2).all()
+    assert len(computed) == 2
+
+
+def test_keys() -> None:
+    assert QueryEmbeddingCache.text_key("clip", " a\n query ") == (
+        QueryEmbeddingCache.text_key("clip", "a query")
+    )
+    assert QueryEmbeddingCache.text_key("clip", "a query") != (
+        QueryEmbeddingCache.text_key("other", "a query")
+    )
+    assert QueryEmbeddingCache.image_key("clip", 1, 2.0) != (
+        QueryEmbeddingCache.image_key("clip", 1, 3.0)
+    )
+
+
+def test_lru_eviction(clock) -> None:
+    cache = QueryEmbeddingCache(max_size=2, ttl=60)
+    cache.put("a", _emb(1))
+    cache.put("b", _emb(2))
+    # a is used more recently than b
+    assert cache.get("a") is not None
+    cache.put("c", _emb(3))
+    assert cache.get("b") is None
+    assert (cache.get("a") == 1).all()
+    assert (cache.get("c") == 3).all()
+    assert cache.stats()["size"] == 2
+
+
+def test_shared_via_redis(clock, redis) -> None:
+    api = QueryEmbeddingCache(max_size=10, ttl=60, use_redis=True)
+    worker = QueryEmbeddingCache(max_size=10, ttl=60, use_redis=True)
+    api.put("a", _emb(1))
+    assert "a" in redis.store
+
+    emb = worker.get("a")
+    assert emb is not None and emb.dtype == np.float32 and (emb == 1).all()
+    assert worker.stats()["redis_hits"] == 1
+    # and is cached locally afterwards
+    redis.store.clear()
+    assert worker.get("a") is not None
+    assert worker.stats()["hits"] == 1
+
+
+def test_redis_errors_are_ignored(clock, monkeypatch) -> None:
+    class BrokenRedisService:
+        def load_query_embedding(self, key: str):
+            raise ConnectionError("redis is down")
+
+        def store_query_embedding(self, key: str, emb: bytes, ttl: int):
+            raise ConnectionError("redis is down")
+
+    monkeypatch.setattr(query_embedding_cache, "RedisService", BrokenRedisService)
+    cache = QueryEmbeddingCache(max_size=10, ttl=60, use_redis=True)
+    assert (cache.get_or_compute("a", lambda: _emb(1)) == 1).all()
+    assert (cache.get("a") == 1).all()
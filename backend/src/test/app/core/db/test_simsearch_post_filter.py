@@ -0,0 +1,94 @@
+from typing import List, Optional
+
+import numpy as np
+
+# the crud modules have to be imported before the SimSearchService they depend on
+import app.core.data.crud.source_document  # noqa: F401
+from app.core.data.dto.search import SimSearchSentenceHit
+from app.core.db.index_type import IndexType
+from app.core.db.simsearch_service import SimSearchService
+from config import conf
+
+DIM = 512
+
+
+class FakeIndex:
+    def __init__(self, num_hits: int):
+        # one hit per sdoc, ordered by their score
+        self.hits = [
+            SimSearchSentenceHit(sdoc_id=i, sentence_id=0, score=1.0 - i / 1000)
+            for i in range(num_hits)
+        ]
+        self.searches: List[tuple] = []
+
+    def search_index(
+        self,
+        proj_id: int,
+        index_type: IndexType,
+        query_emb: np.ndarray,
+        top_k: int,
+        threshold: float,
+        sdoc_ids_to_search: Optional[List[int]],
+    ) -> List[SimSearchSentenceHit]:
+        self.searches.append((top_k, sdoc_ids_to_search))
+        hits = [
+            hit
+            for hit in self.hits
+            if sdoc_ids_to_search is None or hit.sdoc_id in sdoc_ids_to_search
+        ]
+        return hits[:top_k]
+
+
+def _post_filtered(num_hits: int, allowed: List[int], top_k: int):
+    service = object.__new__(SimSearchService)
+    service._index = FakeIndex(num_hits)
+    service._encode_query = lambda **kwargs: np.zeros(DIM, dtype=np.float32)
+    filter_calls = []
+
+    def filter_sdoc_ids(candidates: Optional[List[int]]) -> List[int]:
+        filter_calls.append(candidates)
+        if candidates is None:
+            return allowed
+        return [sdoc_id for sdoc_id in candidates if sdoc_id in allowed]
+
+    hits = service.find_similar_post_filtered(
+        1, IndexType.SENTENCE, "query", top_k, 0.0, filter_sdoc_ids
+    )
+    return [hit.sdoc_id for hit in hits], service._index.searches, filter_calls
+
+
+def test_post_filter_overfetch(monkeypatch) -> None:
+    monkeypatch.setattr(conf.simsearch.post_filter, "overfetch_factor", 4)
+    monkeypatch.setattr(conf.simsearch.post_filter, "max_rounds", 2)
+
+    # every other sdoc is allowed, the first round finds enough hits
+    hits, searches, filter_calls = _post_filtered(100, list(range(0, 100, 2)), 5)
+    assert hits == [0, 2, 4, 6, 8]
+    assert searches == [(20, None)]
+    assert all(candidates is not None for candidates in filter_calls)
+
+    # the second round fetches the overfetch factor again
+    hits, searches, _ = _post_filtered(100, list(range(0, 100, 10)), 5)
+    assert hits == [0, 10, 20, 30, 40]
+    assert searches == [(20, None), (80, None)]
+
+
+def test_post_filter_without_enough_hits(monkeypatch) -> None:
+    monkeypatch.setattr(conf.simsearch.post_filter, "overfetch_factor", 4)
+    monkeypatch.setattr(conf.simsearch.post_filter, "max_rounds", 2)
+
+    # all hits above the threshold were fetched, fewer than top_k are allowed
+    hits, searches, filter_calls = _post_filtered(30, [1, 3, 50], 5)
+    assert hits == [1, 3]
+    assert searches == [(20, None), (80, None)]
+    assert None not in filter_calls
+
+    # the filter is too selective, the allowed sdocs are searched instead
+    hits, searches, filter_calls = _post_filtered(1000, [200, 500], 5)
+    assert hits == [200, 500]
+    assert searches == [(20, None), (80, None), (5, [200, 500])]
+    assert filter_calls[-1] is None
+
+    hits, searches, _ = _post_filtered(1000, [], 5)
+    assert hits == []
+    assert searches == [(20, None), (80, None)]
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+# the crud modules have to be imported before the SimSearchService they depend on
+import app.core.data.crud.source_document  # noqa: F401
+from app.core.db import numpy_index_service
+from app.core.db.index_type import IndexType
+from app.core.db.numpy_index_service import NumpyIndexService
+from app.core.db.simsearch_service import SimSearchService
+from config import conf
+
+DIM = 512
+
+
+@pytest.fixture
+def service(monkeypatch, tmp_path) -> SimSearchService:
+    # a numpy index in tmp_path instead of the configured vector index
+    for name in [
+        "_root",
+        "_dim",
+        "_dtype",
+        "_record_dtype",
+        "_chunk_size",
+        "_ivf_min_size",
+        "_ivf_nprobe",
+        "_quantizer",
+        "_oversampling",
+        "_mmaps",
+        "_sorted_keys",
+        "_ivfs",
+        "_lock",
+    ]:
+        monkeypatch.setattr(NumpyIndexService, name, None, raising=False)
+    monkeypatch.setattr(conf.repo, "root_directory", str(tmp_path))
+    monkeypatch.setattr(numpy_index_service.qc, "type", "none")
+    index = NumpyIndexService.__new__(NumpyIndexService)
+
+    # two clusters of sentences of sdoc 0 (sentences 0-4) and sdoc 1 (5-9)
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(2, DIM))
+    for sdoc_id in range(2):
+        embs = centers[sdoc_id] + 0.1 * rng.normal(size=(5, DIM))
+        index.add_embeddings_to_index(
+            IndexType.SENTENCE, 1, sdoc_id, list(embs.astype(np.float32))
+        )
+
+    service = object.__new__(SimSearchService)
+    service._index = index
+    service._write_buffer = None
+    return service
+
+
+@pytest.mark.parametrize("strategy", ["multi_query", "centroid"])
+def test_suggest_similar_sentences(monkeypatch, service, strategy: str) -> None:
+    monkeypatch.setattr(conf.simsearch.suggest, "strategy", strategy)
+    pos = [(0, 0), (0, 1), (0, 2)]
+    neg = [(1, 0)]
+
+    # the marked examples are not counted towards top_k
+    hits = service.suggest_similar_sentences(1, pos, neg, top_k=2)
+    assert len(hits) == 2
+    assert all(h.sdoc_id == 0 and h.sentence_id in (3, 4) for h in hits)
+    # scores are certainties in [0, 1]
+    assert all(0.5 < h.score <= 1.0 for h in hits)
+    assert hits[0].score >= hits[1].score
+
+    # candidates closer to a negative example are dropped
+    hits = service.suggest_similar_sentences(1, pos, neg, top_k=10)
+    assert {(h.sdoc_id, h.sentence_id) for h in hits} == {(0, 3), (0, 4)}
+
+
+def test_suggest_ignores_unindexed_examples(service) -> None:
+    assert service.suggest_similar_sentences(1, [(5, 0)], [], top_k=3) == []
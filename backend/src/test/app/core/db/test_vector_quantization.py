@@ -0,0 +1,32 @@
+import numpy as np
+
+from app.core.db.vector_quantization import Int8Quantizer
+
+
+def test_encode_decode() -> None:
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(100, 64)).astype(np.float32)
+    vectors[0] = 0
+    quantizer = Int8Quantizer(64)
+
+    encoded = quantizer.encode(vectors)
+    assert encoded.dtype.itemsize == 4 + 64
+    decoded = quantizer.decode(encoded)
+    # the error is at most half a quantization step
+    max_errors = np.abs(vectors).max(axis=1) / 127 / 2
+    assert np.all(np.abs(decoded - vectors).max(axis=1) <= max_errors + 1e-6)
+    assert np.all(decoded[0] == 0)
+
+
+def test_scores_approximate_dot_products() -> None:
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(500, 128)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = vectors[:10] + 0.1 * rng.normal(size=(10, 128)).astype(np.float32)
+    quantizer = Int8Quantizer(128)
+
+    scores = quantizer.scores(quantizer.encode(vectors), queries)
+    exact = queries @ vectors.T
+    assert scores.shape == (10, 500)
+    assert np.abs(scores - exact).max() < 0.02
+    assert scores.argmax(axis=1).tolist() == list(range(10))
@@ -0,0 +1,133 @@
+from typing import Dict, Optional
+
+import numpy as np
+import pytest
+
+from app.core.search import search_result_cache
+from app.core.search.search_result_cache import (
+    SearchResultCache,
+    _after_commit,
+    _after_rollback,
+    _ChangedRows,
+    _mark_dirty,
+    decode_cursor,
+    encode_cursor,
+)
+
+
+class FakeRedisService:
+    def __init__(self, store: Dict[str, bytes]):
+        self.store = store
+
+    def get_search_result_generations(self, project_id: int):
+        return (
+            int(self.store.get("generation:global", 0)),
+            int(self.store.get(f"generation:{project_id}", 0)),
+        )
+
+    def increment_search_result_generation(self, project_id: Optional[int]):
+        key = "generation:global" if project_id is None else f"generation:{project_id}"
+        self.store[key] = int(self.store.get(key, 0)) + 1
+
+    def store_search_result(self, key: str, sdoc_ids, scores, ttl: int):
+        self.store[f"{key}:ids"] = sdoc_ids
+        if scores is not None:
+            self.store[f"{key}:scores"] = scores
+
+    def load_search_result_range(self, key: str, start, end, with_scores: bool):
+        if f"{key}:ids" not in self.store:
+            return None
+        sdoc_ids = self.store[f"{key}:ids"]
+        scores = self.store[f"{key}:scores"][start:end] if with_scores else None
+        return len(sdoc_ids), sdoc_ids[start:end], scores
+
+
+class FakeSession:
+    def __init__(self):
+        self.info = dict()
+
+
+@pytest.fixture
+def redis_store(monkeypatch) -> Dict[str, bytes]:
+    store: Dict[str, bytes] = dict()
+    monkeypatch.setattr(
+        search_result_cache, "RedisService", lambda: FakeRedisService(store)
+    )
+    return store
+
+
+def test_store_and_load_range(redis_store) -> None:
+    cache = SearchResultCache(ttl=60)
+    fingerprint = SearchResultCache.fingerprint(query="test", filter={"a": 1})
+    assert fingerprint == SearchResultCache.fingerprint(filter={"a": 1}, query="test")
+    assert fingerprint != SearchResultCache.fingerprint(query="test")
+
+    key = cache.result_key(1, fingerprint)
+    assert cache.load_range(key, offset=0, limit=10) is None
+
+    sdoc_ids = np.arange(100, 125)
+    scores = np.linspace(1, 0, 25)
+    cache.store(key, sdoc_ids, scores)
+
+    ids, page_scores, total = cache.load_range(key, offset=10, limit=10)
+    assert ids.tolist() == list(range(110, 120))
+    assert page_scores is None
+    assert total == 25
+
+    ids, page_scores, total = cache.load_range(
+        key, offset=20, limit=10, with_scores=True
+    )
+    assert ids.tolist() == list(range(120, 125))
+    assert np.allclose(page_scores, scores[20:])
+
+    ids, _, total = cache.load_range(key, offset=30, limit=10)
+    assert len(ids) == 0
+    assert total == 25
+
+
+def test_result_key_changes_with_generations(redis_store) -> None:
+    cache = SearchResultCache(ttl=60)
+    key = cache.result_key(1, "fingerprint")
+    other_key = cache.result_key(2, "fingerprint")
+
+    # a change of project 1 invalidates its results only
+    session = FakeSession()
+    _mark_dirty(session, [1])
+    _after_commit(session)
+    assert cache.result_key(1, "fingerprint") != key
+    assert cache.result_key(2, "fingerprint") == other_key
+
+    # a change of an unknown project invalidates all results
+    key = cache.result_key(1, "fingerprint")
+    _mark_dirty(session, [1, None])
+    _after_commit(session)
+    assert cache.result_key(1, "fingerprint") != key
+    assert cache.result_key(2, "fingerprint") != other_key
+    assert redis_store["generation:1"] == 1
+
+    # rolled back changes do not invalidate anything
+    key = cache.result_key(1, "fingerprint")
+    _mark_dirty(session, [1])
+    _after_rollback(session)
+    _after_commit(session)
+    assert cache.result_key(1, "fingerprint") == key
+
+
+def test_changed_rows() -> None:
+    rows = _ChangedRows()
+    rows.add({"project_id": 1, "source_document_id": 2}.get)
+    rows.add({"source_document_id": 3}.get)
+    rows.add({"annotation_document_id": 4}.get)
+    assert (rows.project_ids, rows.sdoc_ids, rows.adoc_ids) == ({1}, {3}, {4})
+    assert not rows.unknown
+    rows.add({}.get)
+    assert rows.unknown
+
+
+def test_cursor() -> None:
+    cursor = encode_cursor("abc", 20, 42)
+    assert decode_cursor(cursor) == ("abc", 20, 42)
+    with pytest.raises(ValueError):
+        decode_cursor("abc.20")
+    with pytest.raises(ValueError):
+        decode_cursor("abc.x.42")
@@ -0,0 +1,96 @@
+from typing import Callable, Dict
+
+import pytest
+
+from app.core.data.doc_type import DocType
+from app.core.data.dto.background_job_base import BackgroundJobStatus
+from app.core.data.dto.preprocessing_job_payload import PreprocessingJobPayloadRead
+from app.preprocessing.pipeline import pipeline_checkpoints, preprocessing_pipeline
+from app.preprocessing.pipeline.model.pipeline_cargo import PipelineCargo
+from app.preprocessing.pipeline.pipeline_checkpoints import PipelineCheckpoints
+from app.preprocessing.pipeline.preprocessing_pipeline import PreprocessingPipeline
+
+
+class FakeRedisService:
+    def __init__(self, store: Dict[str, bytes]):
+        self.store = store
+
+    def store_pipeline_checkpoint(self, key: str, checkpoint: bytes, ttl: int):
+        self.store[key] = checkpoint
+
+    def load_pipeline_checkpoint(self, key: str):
+        return self.store.get(key)
+
+    def delete_pipeline_checkpoint(self, key: str):
+        self.store.pop(key, None)
+
+
+class FakePreprocessingJobProgress:
+    def get_ppj_status(self, cargo: PipelineCargo) -> BackgroundJobStatus:
+        return BackgroundJobStatus.RUNNING
+
+    def update_payload(
+        self,
+        cargo: PipelineCargo,
+        current_step_name=None,
+        status=None,
+        error_msg=None,
+        flush=True,
+    ) -> PipelineCargo:
+        if status is not None:
+            cargo.ppj_payload.status = status
+        return cargo
+
+    def flush(self) -> None:
+        pass
+
+
+@pytest.fixture
+def checkpoint_store(monkeypatch) -> Dict[str, bytes]:
+    # the checkpoints are stored in this dict instead of redis
+    store: Dict[str, bytes] = dict()
+    monkeypatch.setattr(
+        pipeline_checkpoints, "RedisService", lambda: FakeRedisService(store)
+    )
+    return store
+
+
+@pytest.fixture
+def make_pipeline(
+    monkeypatch, checkpoint_store: Dict[str, bytes]
+) -> Callable[..., PreprocessingPipeline]:
+    # pipelines without the database, the status of the payloads is only set in
+    # the cargos
+    monkeypatch.setattr(preprocessing_pipeline, "SQLService", lambda: None)
+    monkeypatch.setattr(
+        preprocessing_pipeline,
+        "PreprocessingJobProgress",
+        lambda sqls: FakePreprocessingJobProgress(),
+    )
+    monkeypatch.setattr(
+        PreprocessingPipeline, "_set_ppj_status_to_finished", lambda self, cargo: None
+    )
+
+    def factory(checkpoints: bool = False) -> PreprocessingPipeline:
+        pipeline = PreprocessingPipeline(doc_type=DocType.text)
+        pipeline.checkpoints = PipelineCheckpoints(enabled=checkpoints, ttl=60)
+        return pipeline
+
+    return factory
+
+
+@pytest.fixture
+def make_cargo() -> Callable[[int], PipelineCargo]:
+    def factory(doc: int) -> PipelineCargo:
+        payload = PreprocessingJobPayloadRead.model_construct(
+            id=f"payload_{doc}",
+            prepro_job_id="job",
+            project_id=1,
+            status=BackgroundJobStatus.WAITING,
+            filename=f"doc_{doc}.txt",
+            mime_type="text/plain",
+            doc_type=DocType.text,
+        )
+        return PipelineCargo(ppj_payload=payload, ppj_id="job", data={"doc": doc})
+
+    return factory
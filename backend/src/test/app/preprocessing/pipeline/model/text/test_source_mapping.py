@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from app.preprocessing.pipeline.model.text.source_mapping import SourceMapping
+from app.preprocessing.pipeline.steps.text.process.extract_text_from_html_and_create_source_mapping import (
+    HTMLTextMapper,
+)
+
+
+def test_source_mapping_from_segments() -> None:
+    # text "ab cde" from the html segments "ab" at 3 and "cde" at 10
+    mapping = SourceMapping.from_segments(html_starts=[3, 10], lengths=[3, 3])
+    assert len(mapping) == 6
+    assert mapping.to_html(0) == 3
+    assert mapping.to_html(np.arange(6)).tolist() == [3, 4, 5, 10, 11, 12]
+
+    with pytest.raises(IndexError):
+        mapping.to_html(6)
+    with pytest.raises(IndexError):
+        mapping.to_html(np.array([0, -1]))
+    assert len(SourceMapping()) == 0
+
+
+def test_source_mapping_of_html() -> None:
+    html = (
+        "<html><body><p>Hello <b>world</b>!</p>\n<p>  Second\nline </p></body></html>"
+    )
+    results = HTMLTextMapper()(html)
+    text = " ".join(str(r["text"]) for r in results)
+    mapping = SourceMapping.from_segments(
+        html_starts=[int(r["start"]) for r in results],
+        lengths=[int(r["end"]) - int(r["start"]) + 1 for r in results],
+    )
+    assert text == "Hello world ! Second\nline"
+    assert len(mapping) == len(text) + 1
+
+    # every non-space character of the text is mapped to the same character
+    html_offsets = mapping.to_html(np.arange(len(text)))
+    for offset, html_offset in zip(range(len(text)), html_offsets.tolist()):
+        if not text[offset].isspace():
+            assert html[html_offset] == text[offset]
@@ -0,0 +1,63 @@
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from app.core.data.dto.search import ElasticSearchDocumentCreate
+from app.preprocessing.pipeline.model.pipeline_cargo import PipelineCargo
+from app.preprocessing.pipeline.model.pipeline_step import PipelineBatchError
+from app.preprocessing.pipeline.model.text.preprotextdoc import PreProTextDoc
+from app.preprocessing.pipeline.steps.common.storage import (
+    store_document_in_elasticsearch,
+)
+
+
+class FakeElasticSearchService:
+    def __init__(self, failed_sdoc_ids: List[int]):
+        self.failed_sdoc_ids = failed_sdoc_ids
+        self.requests: List[List[int]] = []
+
+    def add_documents_to_index(
+        self, *, proj_id: int, esdocs: List[ElasticSearchDocumentCreate]
+    ) -> List[int]:
+        self.requests.append([esdoc.sdoc_id for esdoc in esdocs])
+        return [
+            esdoc.sdoc_id
+            for esdoc in esdocs
+            if esdoc.sdoc_id not in self.failed_sdoc_ids
+        ]
+
+
+def _cargos(make_cargo, project_ids: List[int]) -> List[PipelineCargo]:
+    cargos = []
+    for idx, project_id in enumerate(project_ids):
+        cargo = make_cargo(idx)
+        cargo.data["pptd"] = PreProTextDoc(
+            filename=f"doc_{idx}.txt",
+            filepath=Path(f"doc_{idx}.txt"),
+            project_id=project_id,
+            mime_type="text/plain",
+            text=f"text {idx}",
+        )
+        cargo.data["sdoc_id"] = 10 + idx
+        cargos.append(cargo)
+    return cargos
+
+
+def test_store_documents_in_elasticsearch(monkeypatch, make_cargo) -> None:
+    es = FakeElasticSearchService(failed_sdoc_ids=[11, 13])
+    monkeypatch.setattr(
+        store_document_in_elasticsearch, "ElasticSearchService", lambda: es
+    )
+    cargos = _cargos(make_cargo, project_ids=[1, 1, 2, 2])
+
+    # only the cargos of the failed documents are processed again
+    with pytest.raises(PipelineBatchError) as e:
+        store_document_in_elasticsearch.store_documents_in_elasticsearch(cargos)
+    assert e.value.failed_idxs == [1, 3]
+    assert es.requests == [[10, 11], [12, 13]]
+
+    es.failed_sdoc_ids = []
+    assert store_document_in_elasticsearch.store_documents_in_elasticsearch(
+        [cargos[1], cargos[3]]
+    ) == [cargos[1], cargos[3]]
@@ -0,0 +1,163 @@
+from typing import Dict, List
+
+import pytest
+
+from app.core.data.dto.background_job_base import BackgroundJobStatus
+from app.preprocessing.pipeline import pipeline_checkpoints
+from app.preprocessing.pipeline.model.pipeline_cargo import PipelineCargo
+
+
+class ServiceUnavailableError(Exception):
+    pass
+
+
+@pytest.fixture
+def calls() -> List[str]:
+    return []
+
+
+@pytest.fixture
+def failures() -> Dict[int, int]:
+    # doc -> number of transient errors the storage step raises for it
+    return dict()
+
+
+@pytest.fixture
+def pipeline(make_pipeline, calls: List[str], failures: Dict[int, int]):
+    def embed(cargo: PipelineCargo) -> PipelineCargo:
+        calls.append(f"embed {cargo.data['doc']}")
+        cargo.data["embedding"] = cargo.data["doc"] * 2
+        return cargo
+
+    def store(cargo: PipelineCargo) -> PipelineCargo:
+        calls.append(f"store {cargo.data['doc']}")
+        if failures.get(cargo.data["doc"], 0) > 0:
+            failures[cargo.data["doc"]] -= 1
+            # clients wrap the errors of their connections
+            try:
+                raise ConnectionError("service unavailable")
+            except ConnectionError as e:
+                raise ServiceUnavailableError("cannot store") from e
+        cargo.data["stored"] = True
+        return cargo
+
+    def check(cargo: PipelineCargo) -> PipelineCargo:
+        if cargo.data["doc"] == 2:
+            raise ValueError("invalid document")
+        return cargo
+
+    pipeline = make_pipeline(checkpoints=True)
+    pipeline.register_step(
+        func=embed, required_data=["doc"], produced_data=["embedding"], checkpoint=True
+    )
+    pipeline.register_step(
+        func=store, required_data=["embedding"], produced_data=["stored"]
+    )
+    pipeline.register_step(func=check, required_data=["stored"], produced_data=[])
+    pipeline.freeze()
+    return pipeline
+
+
+def test_retry_resumes_from_checkpoint(
+    pipeline, make_cargo, calls: List[str], failures: Dict[int, int]
+) -> None:
+    failures[1] = 1
+    with pytest.raises(ServiceUnavailableError):
+        pipeline.execute(make_cargo(1), retry_transient_errors=True)
+    assert calls == ["embed 1", "store 1"]
+
+    # the retry skips the expensive step
+    calls.clear()
+    cargo = pipeline.execute(make_cargo(1), retry_transient_errors=True)
+    assert calls == ["store 1"]
+    assert cargo.ppj_payload.status == BackgroundJobStatus.FINISHED
+    assert cargo.data["stored"]
+    assert [step.name for step in cargo.finished_steps] == ["embed", "store", "check"]
+
+    # a finished cargo is not executed again
+    calls.clear()
+    cargo = pipeline.execute(make_cargo(1), retry_transient_errors=True)
+    assert calls == []
+    assert cargo.ppj_payload.status == BackgroundJobStatus.FINISHED
+
+
+def test_last_retry_fails(
+    pipeline, make_cargo, calls: List[str], failures: Dict[int, int]
+) -> None:
+    failures[1] = 1
+    cargo = pipeline.execute(make_cargo(1), retry_transient_errors=False)
+    assert cargo.ppj_payload.status == BackgroundJobStatus.ERROR
+    assert calls == ["embed 1", "store 1"]
+
+
+def test_batch_retry_resumes_interrupted_cargos(
+    pipeline, make_cargo, calls: List[str], failures: Dict[int, int]
+) -> None:
+    failures[1] = 1
+    with pytest.raises(ServiceUnavailableError):
+        pipeline.execute_batch(
+            [make_cargo(doc) for doc in (1, 2, 3)], retry_transient_errors=True
+        )
+    assert calls == ["embed 1", "embed 2", "embed 3", "store 1", "store 2", "store 3"]
+
+    # only the interrupted cargo is resumed, the others keep their final status
+    calls.clear()
+    cargos = pipeline.execute_batch(
+        [make_cargo(doc) for doc in (1, 2, 3)], retry_transient_errors=True
+    )
+    assert calls == ["store 1"]
+    assert [cargo.ppj_payload.status for cargo in cargos] == [
+        BackgroundJobStatus.FINISHED,
+        BackgroundJobStatus.ERROR,
+        BackgroundJobStatus.FINISHED,
+    ]
+
+
+def test_batch_fails_without_checkpoints(
+    monkeypatch,
+    pipeline,
+    make_cargo,
+    calls: List[str],
+    failures: Dict[int, int],
+) -> None:
+    class UnavailableRedisService:
+        def store_pipeline_checkpoint(self, key: str, checkpoint: bytes, ttl: int):
+            raise ConnectionError("redis unavailable")
+
+        def load_pipeline_checkpoint(self, key: str):
+            return None
+
+    monkeypatch.setattr(pipeline_checkpoints, "RedisService", UnavailableRedisService)
+    failures[1] = 1
+    # a retry would execute the other cargos again, so the cargo fails instead
+    cargos = pipeline.execute_batch(
+        [make_cargo(doc) for doc in (1, 3)], retry_transient_errors=True
+    )
+    assert [cargo.ppj_payload.status for cargo in cargos] == [
+        BackgroundJobStatus.ERROR,
+        BackgroundJobStatus.FINISHED,
+    ]
+
+
+def test_checkpoints_of_other_pipelines_are_ignored(
+    make_pipeline, make_cargo, checkpoint_store: Dict[str, bytes]
+) -> None:
+    def first(cargo: PipelineCargo) -> PipelineCargo:
+        return cargo
+
+    def second(cargo: PipelineCargo) -> PipelineCargo:
+        return cargo
+
+    pipeline = make_pipeline(checkpoints=True)
+    pipeline.register_step(func=first, required_data=["doc"], checkpoint=True)
+    pipeline.freeze()
+    pipeline.execute(make_cargo(1))
+    assert len(checkpoint_store) == 1
+
+    other = make_pipeline(checkpoints=True)
+    other.register_step(func=first, required_data=["doc"], checkpoint=True)
+    other.register_step(func=second, required_data=["doc"])
+    other.freeze()
+    cargo = other.execute(make_cargo(1))
+    assert [step.name for step in cargo.finished_steps] == ["first", "second"]
+    assert len(checkpoint_store) == 2
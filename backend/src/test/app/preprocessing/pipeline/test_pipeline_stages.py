@@ -0,0 +1,156 @@
+import threading
+import time
+from typing import List, Optional
+
+from app.core.data.dto.background_job_base import BackgroundJobStatus
+from app.preprocessing.pipeline.model.pipeline_cargo import PipelineCargo
+from app.preprocessing.pipeline.model.pipeline_step import PipelineStep
+from app.preprocessing.pipeline.pipeline_stages import compute_pipeline_stages
+
+
+def _step(
+    ordering: int, required_data: List[str], produced_data: Optional[List[str]]
+) -> PipelineStep:
+    return PipelineStep(
+        name=f"step_{ordering}",
+        ordering=ordering,
+        required_data=required_data,
+        produced_data=produced_data,
+        run=lambda cargo: cargo,
+    )
+
+
+def _orderings(stages: List[List[PipelineStep]]) -> List[List[int]]:
+    return [[step.ordering for step in stage] for stage in stages]
+
+
+def test_compute_pipeline_stages() -> None:
+    steps = [
+        _step(1, ["doc"], ["pptd"]),
+        # read different parts of pptd
+        _step(2, ["pptd.text"], ["pptd.word_freqs"]),
+        _step(3, ["pptd.html"], ["pptd.sentences"]),
+        # reads the whole pptd
+        _step(4, ["pptd"], ["sdoc_id"]),
+        # overwrites what step 4 reads
+        _step(5, [], ["pptd.text"]),
+        # independent of all previous steps
+        _step(6, ["doc"], ["images"]),
+    ]
+    assert _orderings(compute_pipeline_stages(steps)) == [[1, 6], [2, 3], [4], [5]]
+
+
+def test_compute_pipeline_stages_without_produced_data() -> None:
+    # steps that do not declare the data they produce run alone
+    steps = [
+        _step(1, ["doc"], ["a"]),
+        _step(2, ["doc"], None),
+        _step(3, ["doc"], ["b"]),
+        _step(4, ["doc"], ["c"]),
+    ]
+    assert _orderings(compute_pipeline_stages(steps)) == [[1], [2], [3, 4]]
+    assert compute_pipeline_stages([]) == []
+
+
+def test_execute_concurrent_steps(make_pipeline, make_cargo) -> None:
+    running = 0
+    max_running = 0
+    lock = threading.Lock()
+
+    def make_step(idx: int):
+        def step(cargo: PipelineCargo) -> PipelineCargo:
+            nonlocal running, max_running
+            with lock:
+                running += 1
+                max_running = max(max_running, running)
+            time.sleep(0.01)
+            with lock:
+                running -= 1
+            if idx == 3 and cargo.data["doc"] == 2:
+                raise ValueError("invalid document")
+            cargo.data[f"value_{idx}"] = idx
+            return cargo
+
+        step.__name__ = f"step_{idx}"
+        return step
+
+    def total(cargo: PipelineCargo) -> PipelineCargo:
+        cargo.data["total"] = sum(cargo.data[f"value_{idx}"] for idx in range(6))
+        return cargo
+
+    pipeline = make_pipeline()
+    pipeline.max_concurrent_steps = 4
+    for idx in range(6):
+        pipeline.register_step(
+            func=make_step(idx), required_data=["doc"], produced_data=[f"value_{idx}"]
+        )
+    pipeline.register_step(func=total, required_data=["doc"])
+    pipeline.freeze()
+    assert [len(stage) for stage in pipeline._stages] == [6, 1]
+
+    cargo = pipeline.execute(make_cargo(1))
+    assert max_running > 1
+    assert cargo.ppj_payload.status == BackgroundJobStatus.FINISHED
+    assert cargo.data["total"] == 15
+    assert len(cargo.finished_steps) == 7
+    assert cargo.next_steps == []
+
+    cargos = pipeline.execute_batch([make_cargo(doc) for doc in (1, 2, 3)])
+    assert [cargo.ppj_payload.status for cargo in cargos] == [
+        BackgroundJobStatus.FINISHED,
+        BackgroundJobStatus.ERROR,
+        BackgroundJobStatus.FINISHED,
+    ]
+    # the finished and the next steps of each cargo are consistent
+    for cargo in cargos:
+        finished = {step.name for step in cargo.finished_steps}
+        assert len(finished) == len(cargo.finished_steps)
+        assert finished.isdisjoint(step.name for step in cargo.next_steps)
+        assert len(cargo.finished_steps) + len(cargo.next_steps) == 7
+    assert "total" not in cargos[1].data
+    assert "step_3" not in {step.name for step in cargos[1].finished_steps}
+
+
+def test_concurrent_executions_use_separate_executors(
+    make_pipeline, make_cargo
+) -> None:
+    # the steps of both executions only finish if all of them run at the same time
+    barrier = threading.Barrier(4, timeout=5)
+
+    def make_step(idx: int):
+        def step(cargo: PipelineCargo) -> PipelineCargo:
+            barrier.wait()
+            cargo.data[f"value_{idx}"] = idx
+            return cargo
+
+        step.__name__ = f"step_{idx}"
+        return step
+
+    pipeline = make_pipeline()
+    pipeline.max_concurrent_steps = 2
+    for idx in range(2):
+        pipeline.register_step(
+            func=make_step(idx), required_data=["doc"], produced_data=[f"value_{idx}"]
+        )
+    pipeline.freeze()
+
+    cargos = dict()
+
+    def execute(doc: int) -> None:
+        cargos[doc] = pipeline.execute(make_cargo(doc))
+
+    threads = [threading.Thread(target=execute, args=(doc,)) for doc in (1, 2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    assert [cargos[doc].ppj_payload.status for doc in (1, 2)] == [
+        BackgroundJobStatus.FINISHED,
+        BackgroundJobStatus.FINISHED,
+    ]
+    # the executors are shut down after each execution
+    assert not any(
+        thread.name.startswith("PreprocessingPipeline")
+        for thread in threading.enumerate()
+    )
@@ -0,0 +1,155 @@
+from contextlib import contextmanager
+from typing import Dict, List
+
+import pytest
+
+from app.core.data.dto.background_job_base import BackgroundJobStatus
+from app.core.data.dto.preprocessing_job_payload import PreprocessingJobPayloadUpdate
+from app.preprocessing.pipeline import preprocessing_job_progress
+from app.preprocessing.pipeline.preprocessing_job_progress import (
+    PreprocessingJobProgress,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+class FakeSQLService:
+    @contextmanager
+    def db_session(self):
+        yield None
+
+
+class FakeCrudPreproJob:
+    def __init__(self):
+        self.status: Dict[str, BackgroundJobStatus] = dict()
+        self.reads = 0
+
+    def get_status_by_id(self, db, uuid: str) -> BackgroundJobStatus:
+        self.reads += 1
+        return self.status[uuid]
+
+    def update(self, db, uuid: str, update_dto) -> None:
+        self.status[uuid] = update_dto.status
+
+
+class FakeCrudPreproJobPayload:
+    def __init__(self):
+        self.writes: List[Dict[str, PreprocessingJobPayloadUpdate]] = []
+
+    def update_multi(self, db, update_dtos) -> None:
+        self.writes.append(dict(update_dtos))
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(preprocessing_job_progress, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def crud_ppj(monkeypatch) -> FakeCrudPreproJob:
+    crud = FakeCrudPreproJob()
+    monkeypatch.setattr(preprocessing_job_progress, "crud_prepro_job", crud)
+    return crud
+
+
+@pytest.fixture
+def crud_payload(monkeypatch) -> FakeCrudPreproJobPayload:
+    crud = FakeCrudPreproJobPayload()
+    monkeypatch.setattr(preprocessing_job_progress, "crud_prepro_job_payload", crud)
+    return crud
+
+
+def _progress() -> PreprocessingJobProgress:
+    return PreprocessingJobProgress(
+        sqls=FakeSQLService(),  # type: ignore
+        status_cache_ttl=5,
+        progress_granularity=3,
+        progress_flush_interval=10,
+    )
+
+
+def test_status_is_cached(clock, crud_ppj, make_cargo) -> None:
+    crud_ppj.status["job"] = BackgroundJobStatus.WAITING
+    progress = _progress()
+    cargo = make_cargo(1)
+
+    # the first read sets the job to RUNNING
+    assert progress.get_ppj_status(cargo) == BackgroundJobStatus.RUNNING
+    assert crud_ppj.status["job"] == BackgroundJobStatus.RUNNING
+    assert crud_ppj.reads == 1
+
+    # an abort is only noticed after the ttl
+    crud_ppj.status["job"] = BackgroundJobStatus.ABORTED
+    clock.now = 4.9
+    assert progress.get_ppj_status(cargo) == BackgroundJobStatus.RUNNING
+    assert crud_ppj.reads == 1
+    clock.now = 5.0
+    assert progress.get_ppj_status(cargo) == BackgroundJobStatus.ABORTED
+    assert crud_ppj.status["job"] == BackgroundJobStatus.ABORTED
+    assert crud_ppj.reads == 2
+
+    # a status set by the pipeline itself refreshes the cache
+    progress.set_ppj_status("job", BackgroundJobStatus.FINISHED)
+    assert progress.get_ppj_status(cargo) == BackgroundJobStatus.FINISHED
+    assert crud_ppj.reads == 2
+
+
+def test_progress_updates_are_buffered(clock, crud_payload, make_cargo) -> None:
+    progress = _progress()
+    cargos = [make_cargo(1), make_cargo(2)]
+
+    # the steps of both payloads are buffered until one of them made 3 steps
+    for step in ["step_1", "step_2"]:
+        for cargo in cargos:
+            progress.update_payload(cargo, current_step_name=step)
+    assert crud_payload.writes == []
+    assert cargos[0].ppj_payload.current_pipeline_step == "step_2"
+    progress.update_payload(
+        cargos[0], current_step_name="step_3", status=BackgroundJobStatus.RUNNING
+    )
+    assert len(crud_payload.writes) == 1
+    assert {
+        id: (dto.current_pipeline_step, dto.status)
+        for id, dto in crud_payload.writes[0].items()
+    } == {
+        "payload_1": ("step_3", BackgroundJobStatus.RUNNING),
+        "payload_2": ("step_2", None),
+    }
+
+    # or until the flush interval passed
+    progress.update_payload(cargos[1], current_step_name="step_3")
+    assert len(crud_payload.writes) == 1
+    clock.now = 10.0
+    progress.update_payload(cargos[1], current_step_name="step_4")
+    assert len(crud_payload.writes) == 2
+    assert list(crud_payload.writes[1]) == ["payload_2"]
+
+
+def test_final_status_is_written_immediately(clock, crud_payload, make_cargo) -> None:
+    progress = _progress()
+    cargos = [make_cargo(1), make_cargo(2)]
+    progress.update_payload(cargos[0], current_step_name="step_1")
+    progress.update_payload(
+        cargos[1], status=BackgroundJobStatus.ERROR, error_msg="invalid document"
+    )
+    # together with the buffered updates
+    assert len(crud_payload.writes) == 1
+    assert crud_payload.writes[0]["payload_1"].current_pipeline_step == "step_1"
+    assert crud_payload.writes[0]["payload_2"].status == BackgroundJobStatus.ERROR
+    assert cargos[1].ppj_payload.error_message == "invalid document"
+
+    # unless the flush is deferred explicitly
+    progress.update_payload(cargos[0], status=BackgroundJobStatus.FINISHED, flush=False)
+    assert len(crud_payload.writes) == 1
+    progress.flush()
+    assert crud_payload.writes[1]["payload_1"].status == BackgroundJobStatus.FINISHED
+    progress.flush()
+    assert len(crud_payload.writes) == 2
@@ -0,0 +1,127 @@
+from typing import List, Tuple
+
+import pytest
+
+from app.core.data.dto.background_job_base import BackgroundJobStatus
+from app.preprocessing.pipeline.model.pipeline_cargo import PipelineCargo
+from app.preprocessing.pipeline.model.pipeline_step import PipelineBatchError
+
+
+def _names(cargo: PipelineCargo) -> List[str]:
+    return [step.name for step in cargo.finished_steps]
+
+
+def test_execute_batch(make_pipeline, make_cargo) -> None:
+    calls: List[Tuple[str, List[int]]] = []
+
+    def double(cargo: PipelineCargo) -> PipelineCargo:
+        calls.append(("double", [cargo.data["doc"]]))
+        cargo.data["double"] = cargo.data["doc"] * 2
+        return cargo
+
+    def double_batch(cargos: List[PipelineCargo]) -> List[PipelineCargo]:
+        calls.append(("double_batch", [cargo.data["doc"] for cargo in cargos]))
+        for cargo in cargos:
+            cargo.data["double"] = cargo.data["doc"] * 2
+        return cargos
+
+    def check(cargo: PipelineCargo) -> PipelineCargo:
+        if cargo.data["doc"] == 2:
+            raise ValueError("invalid document")
+        return cargo
+
+    def increment(cargo: PipelineCargo) -> PipelineCargo:
+        calls.append(("increment", [cargo.data["doc"]]))
+        cargo.data["result"] = cargo.data["double"] + 1
+        return cargo
+
+    pipeline = make_pipeline()
+    pipeline.register_step(
+        func=double,
+        required_data=["doc"],
+        produced_data=["double"],
+        batch_func=double_batch,
+    )
+    pipeline.register_step(func=check, required_data=["doc"], produced_data=[])
+    pipeline.register_step(
+        func=increment, required_data=["double"], produced_data=["result"]
+    )
+    pipeline.freeze()
+
+    cargos = pipeline.execute_batch([make_cargo(doc) for doc in (1, 2, 3)])
+    # the batch step runs once for all cargos, an error only stops its cargo
+    assert calls == [
+        ("double_batch", [1, 2, 3]),
+        ("increment", [1]),
+        ("increment", [3]),
+    ]
+    assert [cargo.ppj_payload.status for cargo in cargos] == [
+        BackgroundJobStatus.FINISHED,
+        BackgroundJobStatus.ERROR,
+        BackgroundJobStatus.FINISHED,
+    ]
+    assert [cargo.data.get("result") for cargo in cargos] == [3, None, 7]
+    assert _names(cargos[0]) == ["double", "check", "increment"]
+    assert _names(cargos[1]) == ["double"]
+
+    # a single cargo does not use the batch implementation
+    calls.clear()
+    cargo = pipeline.execute(make_cargo(5))
+    assert calls == [("double", [5]), ("increment", [5])]
+    assert cargo.data["result"] == 11
+
+
+def test_execute_batch_reruns_failed_cargos(make_pipeline, make_cargo) -> None:
+    calls: List[Tuple[str, int]] = []
+
+    def first(cargo: PipelineCargo) -> PipelineCargo:
+        calls.append(("first", cargo.data["doc"]))
+        return cargo
+
+    def first_batch(cargos: List[PipelineCargo]) -> List[PipelineCargo]:
+        for cargo in cargos:
+            calls.append(("first_batch", cargo.data["doc"]))
+        raise PipelineBatchError("failed for the second cargo", failed_idxs=[1])
+
+    def second(cargo: PipelineCargo) -> PipelineCargo:
+        calls.append(("second", cargo.data["doc"]))
+        return cargo
+
+    def second_batch(cargos: List[PipelineCargo]) -> List[PipelineCargo]:
+        raise ValueError("failed for all cargos")
+
+    pipeline = make_pipeline()
+    pipeline.register_step(
+        func=first, required_data=["doc"], produced_data=["a"], batch_func=first_batch
+    )
+    pipeline.register_step(
+        func=second,
+        required_data=["doc"],
+        produced_data=["b"],
+        batch_func=second_batch,
+    )
+    pipeline.freeze()
+
+    cargos = pipeline.execute_batch([make_cargo(doc) for doc in (1, 2, 3)])
+    # a PipelineBatchError re-runs only the failed cargos, any other error of the
+    # batch implementation re-runs all cargos separately
+    assert calls == [
+        ("first_batch", 1),
+        ("first_batch", 2),
+        ("first_batch", 3),
+        ("first", 2),
+        ("second", 1),
+        ("second", 2),
+        ("second", 3),
+    ]
+    for cargo in cargos:
+        assert cargo.ppj_payload.status == BackgroundJobStatus.FINISHED
+        assert _names(cargo) == ["first", "second"]
+        assert cargo.next_steps == []
+
+
+def test_execute_requires_frozen_pipeline(make_pipeline, make_cargo) -> None:
+    pipeline = make_pipeline()
+    pipeline.register_step(func=lambda cargo: cargo, required_data=["doc"])
+    with pytest.raises(ValueError):
+        pipeline.execute_batch([make_cargo(1)])
@@ -0,0 +1,20 @@
+import numpy as np
+
+from app.preprocessing.ray_model_worker.dto.clip import ClipEmbeddingOutput
+
+
+def test_npy_roundtrip() -> None:
+    embeddings = np.random.default_rng(0).normal(size=(3, 512)).astype(np.float32)
+    output = ClipEmbeddingOutput.from_numpy(embeddings)
+
+    decoded = ClipEmbeddingOutput.from_npy(output.to_npy())
+    assert decoded.numpy().dtype == np.float32
+    assert np.array_equal(decoded.numpy(), embeddings)
+    # the JSON representation is unchanged
+    assert np.allclose(decoded.embeddings, embeddings)
+
+
+def test_json_to_npy() -> None:
+    output = ClipEmbeddingOutput(embeddings=[[0.5, 1.0], [-1.0, 0.25]])
+    decoded = ClipEmbeddingOutput.from_npy(output.to_npy())
+    assert decoded.numpy().tolist() == [[0.5, 1.0], [-1.0, 0.25]]
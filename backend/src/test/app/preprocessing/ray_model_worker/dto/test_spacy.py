@@ -0,0 +1,111 @@
+import numpy as np
+
+from app.preprocessing.ray_model_worker.dto.spacy import (
+    IS_ALPHA,
+    IS_PUNCTUATION,
+    IS_STOPWORD,
+    SpacyColumns,
+    SpacyPipelineOutput,
+    SpacySpan,
+    SpacyToken,
+    decode_spacy_columns,
+    encode_spacy_columns,
+)
+
+
+def _token(text: str, start: int, pos: str, **flags: bool) -> SpacyToken:
+    return SpacyToken(
+        text=text,
+        start_char=start,
+        end_char=start + len(text),
+        pos=pos,
+        lemma=text.lower(),
+        is_stopword=flags.get("is_stopword", False),
+        is_punctuation=flags.get("is_punctuation", False),
+        is_alpha=flags.get("is_alpha", False),
+        is_digit=False,
+    )
+
+
+def _output(text: str) -> SpacyPipelineOutput:
+    # one token per word, the last word is followed by a punctuation mark
+    tokens = []
+    start = 0
+    for word in text[:-1].split(" "):
+        tokens.append(_token(word, start, "NOUN", is_alpha=True))
+        start += len(word) + 1
+    tokens.append(_token(text[-1], len(text) - 1, "PUNCT", is_punctuation=True))
+    return SpacyPipelineOutput(
+        tokens=tokens,
+        ents=[
+            SpacySpan(
+                text=tokens[0].text,
+                start_char=0,
+                end_char=tokens[0].end_char,
+                start_token=0,
+                end_token=1,
+                label="GPE",
+            )
+        ],
+        sents=[
+            SpacySpan(
+                text=text,
+                start_char=0,
+                end_char=len(text),
+                start_token=0,
+                end_token=len(tokens),
+            )
+        ],
+    )
+
+
+def test_columns_from_output() -> None:
+    text = "Hamburg is great!"
+    output = _output(text)
+    output.tokens[1].is_stopword = True
+    columns = SpacyColumns.from_output(output)
+
+    assert columns.token_texts(text) == ["Hamburg", "is", "great", "!"]
+    assert columns.token_pos_tags().tolist() == ["NOUN", "NOUN", "NOUN", "PUNCT"]
+    assert columns.pos_table == ["NOUN", "PUNCT"]
+    assert columns.token_flags.tolist() == [
+        IS_ALPHA,
+        IS_ALPHA | IS_STOPWORD,
+        IS_ALPHA,
+        IS_PUNCTUATION,
+    ]
+    assert [columns.lemma_table[i] for i in columns.token_lemmas] == [
+        "hamburg",
+        "is",
+        "great",
+        "!",
+    ]
+    assert columns.ent_label_names().tolist() == ["GPE"]
+    assert columns.sent_ends.tolist() == [len(text)]
+    assert columns.sent_end_tokens.tolist() == [4]
+
+
+def test_encode_decode_columns() -> None:
+    texts = ["Hamburg is great!", "Berlin is big and loud.", "Ok?"]
+    outputs = [SpacyColumns.from_output(_output(text)) for text in texts]
+    outputs.append(SpacyColumns())
+
+    decoded = decode_spacy_columns(encode_spacy_columns(outputs))
+    assert len(decoded) == len(outputs)
+    for output, result in zip(outputs, decoded):
+        for name in (
+            "token_starts",
+            "token_ends",
+            "token_flags",
+            "ent_starts",
+            "ent_end_tokens",
+            "sent_starts",
+            "sent_end_tokens",
+        ):
+            assert np.array_equal(getattr(output, name), getattr(result, name)), name
+        # the string tables may be ordered differently, the strings are the same
+        assert output.token_pos_tags().tolist() == result.token_pos_tags().tolist()
+        assert [output.lemma_table[i] for i in output.token_lemmas] == [
+            result.lemma_table[i] for i in result.token_lemmas
+        ]
+        assert output.ent_label_names().tolist() == result.ent_label_names().tolist()
@@ -0,0 +1,78 @@
+import threading
+from typing import List
+
+import pytest
+
+from app.preprocessing.micro_batcher import MicroBatcher, _BatchRequest
+
+
+def test_single_caller_is_processed_directly() -> None:
+    batches: List[List[int]] = []
+
+    def process(items: List[int]) -> List[int]:
+        batches.append(items)
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher("test", process)
+    assert [batcher.submit(i) for i in range(3)] == [0, 2, 4]
+    assert batches == [[0], [1], [2]]
+
+
+def test_concurrent_requests_are_merged() -> None:
+    batches: List[List[int]] = []
+    first_started = threading.Event()
+    release_first = threading.Event()
+
+    def process(items: List[int]) -> List[int]:
+        batches.append(items)
+        if len(batches) == 1:
+            first_started.set()
+            release_first.wait(timeout=5)
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher("test", process, max_batch_size=3)
+    results = dict()
+
+    def submit(item: int) -> None:
+        results[item] = batcher.submit(item)
+
+    # the first request blocks the batcher, the others are queued meanwhile
+    first = threading.Thread(target=submit, args=(0,))
+    first.start()
+    assert first_started.wait(timeout=5)
+    others = [threading.Thread(target=submit, args=(i,)) for i in range(1, 6)]
+    for thread in others:
+        thread.start()
+    while len(batcher._queue) < 5:
+        threading.Event().wait(0.01)
+    release_first.set()
+    for thread in [first] + others:
+        thread.join(timeout=5)
+
+    assert results == {i: i * 2 for i in range(6)}
+    assert batches[0] == [0]
+    # the queued requests are processed in batches of at most max_batch_size
+    assert sorted(len(batch) for batch in batches[1:]) == [2, 3]
+    assert sorted(item for batch in batches[1:] for item in batch) == [1, 2, 3, 4, 5]
+
+
+def test_errors_are_isolated() -> None:
+    def process(items: List[int]) -> List[int]:
+        if 3 in items:
+            raise ValueError("invalid item")
+        return items
+
+    batcher = MicroBatcher("test", process)
+    with pytest.raises(ValueError):
+        batcher.submit(3)
+    assert batcher.submit(1) == 1
+
+    # a failed batch is processed request by request, only the erroneous one fails
+    batch = [_BatchRequest(item) for item in [1, 3, 5]]
+    batcher._process(batch)
+    assert [request.result for request in batch] == [1, None, 5]
+    assert [type(request.error) for request in batch] == [
+        type(None),
+        ValueError,
+        type(None),
+    ]
@@ -0,0 +1,135 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Generator, List
+
+import numpy as np
+import pytest
+
+from app.preprocessing import ray_model_service
+from app.preprocessing.ray_model_service import RayModelService
+from app.preprocessing.ray_model_worker.dto.clip import (
+    NPY_MEDIA_TYPE,
+    ClipEmbeddingOutput,
+    ClipTextEmbeddingInput,
+)
+from config import conf
+
+
+class FakeRay:
+    def __init__(self):
+        self.port = 0
+        self.failures = 0
+        self.requests: List[str] = []
+        self.clients = set()
+
+
+@pytest.fixture
+def ray() -> Generator[FakeRay, None, None]:
+    fake = FakeRay()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args) -> None:
+            pass
+
+        def _respond(self, status: int, body: bytes, content_type: str) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self) -> None:
+            self._respond(200, json.dumps({"/clip": "clip"}).encode(), "text/json")
+
+        def do_POST(self) -> None:
+            fake.requests.append(self.path)
+            fake.clients.add(self.client_address)
+            data = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if fake.failures > 0:
+                fake.failures -= 1
+                self._respond(503, b"unavailable", "text/plain")
+                return
+            output = ClipEmbeddingOutput.from_numpy(
+                np.full((len(data["text"]), 4), len(fake.requests), np.float32)
+            )
+            if self.headers.get("Accept") == NPY_MEDIA_TYPE:
+                self._respond(200, output.to_npy(), NPY_MEDIA_TYPE)
+            else:
+                self._respond(200, output.model_dump_json().encode(), "text/json")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    fake.port = server.server_address[1]
+    yield fake
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def make_service(monkeypatch, ray: FakeRay):
+    def make(**client_conf) -> RayModelService:
+        # a fresh instance instead of the singleton, the attributes of the class
+        # are restored after the test
+        for name in [
+            "base_url",
+            "timeout",
+            "max_retries",
+            "backoff_factor",
+            "binary_embeddings",
+            "binary_spacy",
+            "session",
+            "base_routes",
+        ]:
+            monkeypatch.setattr(RayModelService, name, None, raising=False)
+        monkeypatch.setattr(conf.ray, "protocol", "http")
+        monkeypatch.setattr(conf.ray, "host", "127.0.0.1")
+        monkeypatch.setattr(conf.ray, "port", ray.port)
+        monkeypatch.setattr(ray_model_service.cc, "backoff_factor", 0.01)
+        monkeypatch.setattr(ray_model_service.cc, "micro_batching", False)
+        for key, value in client_conf.items():
+            monkeypatch.setattr(ray_model_service.cc, key, value)
+        return RayModelService.__new__(RayModelService)
+
+    return make
+
+
+@pytest.mark.parametrize("binary_embeddings", [True, False])
+def test_clip_text_embedding(make_service, ray, binary_embeddings: bool) -> None:
+    service = make_service(binary_embeddings=binary_embeddings)
+    assert service.base_routes == ["/clip"]
+
+    for i in range(1, 4):
+        output = service.clip_text_embedding(ClipTextEmbeddingInput(text=["a", "b"]))
+        assert output.numpy().shape == (2, 4)
+        assert (output.numpy() == i).all()
+    # the connection is kept alive and reused
+    assert len(ray.clients) == 1
+
+
+def test_unavailable_responses_are_retried(make_service, ray) -> None:
+    service = make_service(max_retries=3)
+    ray.failures = 2
+    output = service.clip_text_embedding(ClipTextEmbeddingInput(text=["a"]))
+    assert (output.numpy() == 3).all()
+    assert ray.requests == ["/clip/embedding/text"] * 3
+
+    ray.failures = 4
+    with pytest.raises(Exception, match="status code 503"):
+        service.clip_text_embedding(ClipTextEmbeddingInput(text=["a"]))
+
+
+def test_micro_batching_splits_merged_embeddings(make_service, ray) -> None:
+    service = make_service(micro_batching=True)
+    outputs = service._clip_text_embedding_merged(
+        [
+            ClipTextEmbeddingInput(text=["a", "b"]),
+            ClipTextEmbeddingInput(text=["c"]),
+            ClipTextEmbeddingInput(text=["d", "e", "f"]),
+        ]
+    )
+    assert [output.numpy().shape for output in outputs] == [(2, 4), (1, 4), (3, 4)]
+    assert ray.requests == ["/clip/embedding/text"]
@@ -0,0 +1,40 @@
+import numpy as np
+
+from app.util.offset_index import OffsetIndex
+
+# "Hello world , foo" -> tokens [0, 5), [6, 11), [12, 13), [14, 17)
+STARTS = [0, 6, 12, 14]
+ENDS = [5, 11, 13, 17]
+
+
+def test_span_at() -> None:
+    index = OffsetIndex(STARTS, ENDS)
+    assert len(index) == 4
+    assert index.span_at(0) == 0
+    assert index.span_at(4) == 0
+    # whitespace belongs to the following span
+    assert index.span_at(5) == 1
+    assert index.span_at(16) == 3
+    assert index.span_at(17) == 4
+    assert index.span_at(np.array([0, 7, 12])).tolist() == [0, 1, 2]
+
+
+def test_span_starting_and_ending_at() -> None:
+    index = OffsetIndex(STARTS, ENDS)
+    assert index.span_starting_at(6) == 1
+    assert index.span_starting_at(7) == 2
+    assert index.span_ending_at(11) == 1
+    assert index.span_ending_at(np.array([5, 13, 17])).tolist() == [0, 2, 3]
+
+
+def test_char_range_to_span_range() -> None:
+    index = OffsetIndex(STARTS, ENDS)
+    assert index.char_range_to_span_range(0, 11) == (0, 2)
+    assert index.char_range_to_span_range(6, 17) == (1, 4)
+    # the end is the span at the end offset, like the former character map
+    assert index.char_range_to_span_range(3, 7) == (0, 1)
+    # invalid or uncovered ranges
+    assert index.char_range_to_span_range(5, 5) == (-1, -1)
+    assert index.char_range_to_span_range(-1, 3) == (-1, -1)
+    assert index.char_range_to_span_range(10, 20) == (-1, -1)
+    assert OffsetIndex([], []).char_range_to_span_range(0, 1) == (-1, -1)
@@ -0,0 +1,53 @@
+import re
+
+from app.util.token_markup import render_token_markup, strip_token_markup
+
+HTML = "<p>Hello <b>world</b>. Bye!</p>"
+# text "Hello world . Bye !" with two sentences
+TOKEN_STARTS = [0, 6, 12, 14, 18]
+TOKEN_ENDS = [5, 11, 13, 17, 19]
+TOKEN_HTML_STARTS = [3, 12, 21, 23, 26]
+TOKEN_HTML_ENDS = [8, 17, 22, 26, 27]
+SENTENCE_STARTS = [0, 14]
+SENTENCE_ENDS = [13, 19]
+
+
+def test_render_token_markup() -> None:
+    tagged = render_token_markup(
+        HTML,
+        TOKEN_STARTS,
+        TOKEN_ENDS,
+        TOKEN_HTML_STARTS,
+        TOKEN_HTML_ENDS,
+        SENTENCE_STARTS,
+        SENTENCE_ENDS,
+    )
+    assert re.findall(r"<t id=(\d+)>([^<]*)</t>", tagged) == [
+        ("0", "Hello"),
+        ("1", "world"),
+        ("2", "."),
+        ("3", "Bye"),
+        ("4", "!"),
+    ]
+    assert tagged.startswith("<p><sent id=0><t id=0>Hello</t> <b>")
+    assert tagged.count("<sent id=") == 2
+    assert tagged.count("</sent>") == 2
+
+
+def test_strip_token_markup_restores_html_and_offsets() -> None:
+    tagged = render_token_markup(
+        HTML,
+        TOKEN_STARTS,
+        TOKEN_ENDS,
+        TOKEN_HTML_STARTS,
+        TOKEN_HTML_ENDS,
+        SENTENCE_STARTS,
+        SENTENCE_ENDS,
+    )
+    assert strip_token_markup(tagged) == (HTML, TOKEN_HTML_STARTS, TOKEN_HTML_ENDS)
+
+
+def test_strip_token_markup_rejects_inconsistent_markup() -> None:
+    assert strip_token_markup("<t id=1>a</t>") is None
+    assert strip_token_markup("<t id=0>a</t><t id=1>b") is None
+    assert strip_token_markup("<p>no tokens</p>") == ("<p>no tokens</p>", [], [])
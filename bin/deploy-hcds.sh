@@ -38,6 +38,7 @@ cd ~/demos/dats || exit
 sed -i "s/dats/dwts/g" docker/.env
 sed -i "s/API_WORKERS=10/API_WORKERS=16/" docker/.env
 sed -i "s/CELERY_BACKGROUND_JOBS_WORKER_CONCURRENCY=10/CELERY_BACKGROUND_JOBS_WORKER_CONCURRENCY=32/" docker/.env
+sed -i "s/CELERY_PREPROCESSING_WORKER_CONCURRENCY=10/CELERY_PREPROCESSING_WORKER_CONCURRENCY=32/" docker/.env
 
 # pull & start docker containers
 cd ~/demos/dats/docker || exit
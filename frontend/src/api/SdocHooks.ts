@@ -1,6 +1,7 @@
 import { useMutation, useQuery } from "@tanstack/react-query";
 
 import queryClient from "../plugins/ReactQueryClient.ts";
+import { renderTokenMarkup } from "../utils/TokenMarkup.ts";
 import { QueryKey } from "./QueryKey.ts";
 import { SourceDocumentDataRead } from "./openapi/models/SourceDocumentDataRead.ts";
 import { SourceDocumentRead } from "./openapi/models/SourceDocumentRead.ts";
@@ -20,7 +21,20 @@ const useGetDocument = (sdocId: number | null | undefined) =>
 const useGetDocumentData = (sdocId: number | null | undefined) =>
   useQuery<SourceDocumentDataRead, Error>({
     queryKey: [QueryKey.SDOC_DATA, sdocId],
-    queryFn: () => SourceDocumentService.getByIdWithData({ sdocId: sdocId! }),
+    queryFn: async () => {
+      const data = await SourceDocumentService.getByIdWithData({ sdocId: sdocId! });
+      // the token markup is rendered here instead of being sent with the html
+      if (data.html_token_starts && data.html_token_ends && data.sentence_character_offsets) {
+        data.html = renderTokenMarkup(
+          data.html,
+          data.token_character_offsets,
+          data.html_token_starts,
+          data.html_token_ends,
+          data.sentence_character_offsets,
+        );
+      }
+      return data;
+    },
     enabled: !!sdocId,
     staleTime: Infinity,
   });
@@ -17,9 +17,21 @@ export type SourceDocumentDataRead = {
    */
   repo_url: string;
   /**
-   * Processed HTML of the SourceDocument
+   * Processed HTML of the SourceDocument, every token is wrapped in a <t> and every sentence in a <sent> tag unless requested without markup
    */
   html: string;
+  /**
+   * Start of each token in character offsets in the html, only if requested without markup and the html does not contain the markup
+   */
+  html_token_starts?: Array<number> | null;
+  /**
+   * End of each token in character offsets in the html, only if requested without markup and the html does not contain the markup
+   */
+  html_token_ends?: Array<number> | null;
+  /**
+   * List of character offsets of each sentence, only if requested without markup and the html does not contain the markup
+   */
+  sentence_character_offsets?: Array<any[]> | null;
   /**
    * List of tokens in the SourceDocument
    */
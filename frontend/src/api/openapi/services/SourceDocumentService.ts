@@ -91,9 +91,11 @@ export class SourceDocumentService {
   public static getByIdWithData({
     sdocId,
     onlyIfFinished = true,
+    withMarkup = false,
   }: {
     sdocId: number;
     onlyIfFinished?: boolean;
+    withMarkup?: boolean;
   }): CancelablePromise<SourceDocumentDataRead> {
     return __request(OpenAPI, {
       method: "GET",
@@ -103,6 +105,7 @@ export class SourceDocumentService {
       },
       query: {
         only_if_finished: onlyIfFinished,
+        with_markup: withMarkup,
       },
       errors: {
         422: `Validation Error`,
@@ -0,0 +1,32 @@
+// Wraps every token of the html in <t id=N> and every sentence in <sent id=N> tags, given the character offsets
+// of the tokens and sentences in the text and of the tokens in the html. Same output as the backend's
+// render_token_markup, so the document renderers work with both.
+export const renderTokenMarkup = (
+  html: string,
+  tokenCharacterOffsets: Array<any[]>,
+  htmlTokenStarts: number[],
+  htmlTokenEnds: number[],
+  sentenceCharacterOffsets: Array<any[]>,
+): string => {
+  const parts: string[] = [];
+  let currentPosition = 0;
+  let currentSentenceIdx = 0;
+  const numSentences = sentenceCharacterOffsets.length;
+  for (let tokenId = 0; tokenId < htmlTokenStarts.length; tokenId++) {
+    const [textStart, textEnd] = tokenCharacterOffsets[tokenId];
+    const htmlStart = htmlTokenStarts[tokenId];
+    const htmlEnd = htmlTokenEnds[tokenId];
+    parts.push(html.slice(currentPosition, htmlStart));
+    if (numSentences > currentSentenceIdx && sentenceCharacterOffsets[currentSentenceIdx][1] === textEnd) {
+      parts.push("</sent>");
+      currentSentenceIdx += 1;
+    }
+    if (numSentences > currentSentenceIdx && sentenceCharacterOffsets[currentSentenceIdx][0] === textStart) {
+      parts.push(`<sent id=${currentSentenceIdx}>`);
+    }
+    parts.push(`<t id=${tokenId}>`, html.slice(htmlStart, htmlEnd), "</t>");
+    currentPosition = htmlEnd;
+  }
+  parts.push(html.slice(currentPosition));
+  return parts.join("");
+};